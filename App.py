@@ -10,7 +10,7 @@ from urllib.parse import quote
 from zoneinfo import ZoneInfo
 
 # 🌐 Flask & extensions
-from flask import Flask, render_template, request, redirect, url_for, flash, current_app, jsonify, Response, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, current_app, jsonify, Response, send_file, abort
 from flask_migrate import Migrate
 from flask_mail import Mail, Message
 from dotenv import load_dotenv
@@ -106,7 +106,17 @@ if database_url.startswith("sqlite:///"):
     instance_dir = os.path.join(os.path.dirname(__file__), "instance")
     os.makedirs(instance_dir, exist_ok=True)
     with app.app_context():
+        from sqlalchemy import inspect as sa_inspect
+        nouvelles_tables = set(db.metadata.tables) - set(sa_inspect(db.engine).get_table_names())
         db.create_all()
+        # sous Postgres, ce sont les migrations qui créent et remplissent ces tables
+        if "saisons_resume" in nouvelles_tables:
+            from saisons import reconstruire_resumes
+            reconstruire_resumes()
+        if "operations_recherche" in nouvelles_tables:
+            from recherche import creer_fts, reconstruire_index
+            creer_fts()
+            reconstruire_index()
 
 # ─────────────────────────────
 # Imports des modèles après init_app
@@ -131,7 +141,7 @@ from mes_utils import (
     valider_concert_par_operation, concert_to_dict, get_debut_fin_saison,
     get_ordered_comptes_bis, get_reports_dict, extraire_infos_depuis_pdf, regrouper_cachets_par_mois,
     ensure_op_frais_previsionnels, detach_prevision_if_needed,
-    mois_nom_fr, formater_cachets_html,
+    mois_nom_fr, formater_cachets_html, compte_recette_concert,
 )
 
 COULEURS_MOIS = {
@@ -150,6 +160,28 @@ COULEURS_MOIS = {
 }
 
 
+# ------------ RECALCUL DES CONCERTS MARQUÉS (fin de requête) ------------
+
+@app.after_request
+def recalculer_concerts_en_fin_de_requete(response):
+    """
+    Les écritures de la requête ont marqué les concerts dont le partage change
+    (cf. calcul_participations) : on les recalcule ici en un seul lot,
+    au lieu d'un recalcul par route (souvent global ou en double).
+    """
+    from calcul_participations import recalculer_concerts_marques
+    from mes_utils import _alerter_recalc
+    try:
+        erreurs = recalculer_concerts_marques()
+    except Exception as e:
+        db.session.rollback()
+        _alerter_recalc("(lot)", e)
+        return response
+    for concert_id, e in erreurs.items():
+        _alerter_recalc(concert_id, e)
+    return response
+
+
 # ------------ ROUTES DE BASE ------------
 
 @app.route('/')
@@ -293,66 +325,22 @@ def supprimer_musicien(musicien_id):
 
 
 from sqlalchemy import func  # en haut si pas déjà importé
-from mes_utils import grouper_par_mois, get_credits_concerts_from_db
-from collections import defaultdict                 # ← NEW
-from models import Operation                         # ← NEW
+from vues_concerts import donnees_liste_concerts
+from verrous_concerts import verrou_concerts
 
 @app.route('/concerts')
 def liste_concerts():
-    # 🔁 Laisse la base comparer à CURRENT_DATE (évite décalages/locale)
-    concerts = (
-        Concert.query
-        .filter(Concert.date >= today_paris())
-        .order_by(Concert.date.asc())
-        .all()
-    )
-
-    musiciens = Musicien.query.all()
-    musiciens_dict = {m.id: m for m in musiciens}
-
-    credits_musiciens, credits_asso7, credits_jerome = get_credits_concerts_from_db(concerts)
-
-    # Regroupement par mois pour le template
-    groupes = grouper_par_mois(concerts, "date", descending=False)
-
-    # --- NEW: frais par musicien et par concert (hors prévisionnels globaux CB/CAISSE) ---
-    concert_ids = [c.id for c in concerts]
-    frais_par_musicien = defaultdict(dict)
-    if concert_ids:
-        rows = (
-            db.session.query(
-                Operation.concert_id,
-                Operation.musicien_id,
-                func.sum(Operation.montant).label("total"),
-            )
-            .filter(
-                Operation.concert_id.in_(concert_ids),
-                func.lower(Operation.motif) == "frais",
-                Operation.previsionnel.is_(False),          # on ignore les frais prévisionnels globaux
-                Operation.musicien_id.isnot(None)           # seulement des frais rattachés à un musicien
-            )
-            .group_by(Operation.concert_id, Operation.musicien_id)
-            .all()
-        )
-        for cid, mid, total in rows:
-            frais_par_musicien[cid][mid] = float(total or 0.0)
+    # Concerts à venir + participations, musiciens, lieux et frais : nombre de requêtes constant
+    donnees = donnees_liste_concerts(Concert.date >= today_paris())
 
     # (optionnel) petit log de diag :
     try:
-        app.logger.info(f"[concerts] {len(concerts)} à venir – ids/dates: " +
-                        ", ".join(f"{c.id}:{c.date}" for c in concerts))
+        app.logger.info(f"[concerts] {len(donnees['concerts'])} à venir – ids/dates: " +
+                        ", ".join(f"{c.id}:{c.date}" for c in donnees['concerts']))
     except Exception:
         pass
 
-    return render_template(
-        'concerts.html',
-        concerts=concerts,          # encore envoyé si ton template l’utilise
-        groupes=groupes,            # ← à utiliser pour l’affichage par mois
-        credits_musiciens=credits_musiciens,
-        credits_asso7=credits_asso7,
-        musiciens_dict=musiciens_dict,
-        frais_par_musicien=frais_par_musicien   # ← NEW
-    )
+    return render_template('concerts.html', **donnees)
 
 
 
@@ -402,50 +390,30 @@ def ajouter_concert():
         frais_prev_str = (request.form.get('frais_previsionnels') or '').strip()
 
         # --- Création Concert (lieu_id obligatoire ; on peut conserver .lieu à titre d’affichage)
-        concert = Concert(
+        champs = dict(
             date=concert_date,
             lieu=lieu_obj.nom,          # affichage historique si besoin
             lieu_id=lieu_obj.id,        # LIEN FORT
             paye=paye,
             mode_paiement_prevu=mode_paiement_prevu or 'CB ASSO7',
-            solo=solo_flag              # ⬅️ NEW
+            solo=solo_flag,
+            # Recette réelle vs attendue
+            recette=(recette if paye else None),
+            recette_attendue=(None if paye else recette),
         )
 
-        # Recette réelle vs attendue
-        if paye:
-            concert.recette = recette
-            concert.recette_attendue = None
-        else:
-            concert.recette_attendue = recette
-            concert.recette = None
-
-        db.session.add(concert)
-        db.session.commit()
-        db.session.refresh(concert)
-
-        # --- Frais prévisionnels auto (si NON payé)
-        if not paye:
-            from mes_utils import ensure_op_frais_previsionnels
-            ensure_op_frais_previsionnels(concert.id, frais_prev_str)
-
-        # --- Si payé : créer l’opération de crédit "Recette concert"
-        if paye and mode_paiement_prevu and recette:
-            compte = Musicien.query.filter_by(nom=mode_paiement_prevu).first()
-            if compte:
-                op = Operation(
-                    musicien_id=compte.id,
-                    type='credit',
-                    motif='Recette concert',
-                    montant=recette,
-                    date=concert_date,
-                    concert_id=concert.id
-                )
-                db.session.add(op)
-                db.session.commit()
+        # --- Si payé : opération de crédit "Recette concert" vers le compte du mode prévu (rôle CB / CAISSE)
+        compte = None
+        if paye and recette:
+            try:
+                compte = compte_recette_concert(mode_paiement_prevu)
+            except ValueError as e:
+                flash(str(e), "danger")
+                return redirect(url_for('ajouter_concert'))
 
-        # Recalculs
-        from calcul_participations import mettre_a_jour_credit_calcule_potentiel
-        mettre_a_jour_credit_calcule_potentiel()
+        # Concert + frais prévisionnels (si NON payé) + recette + crédits : une transaction (cf. sauvegarde_concert.py)
+        from sauvegarde_concert import enregistrer_concert
+        concert = enregistrer_concert(champs=champs, frais_previsionnels=frais_prev_str, compte_recette=compte)
 
         return redirect(url_for('liste_participations', concert_id=concert.id))
 
@@ -461,8 +429,11 @@ def modifier_concert(concert_id):
     concert = Concert.query.get_or_404(concert_id)
 
     if request.method == 'POST':
-        concert.date = date.fromisoformat(request.form['date'])
-        concert.lieu = (request.form.get('lieu') or '').strip()
+        champs = {
+            "date": date.fromisoformat(request.form['date']),
+            "lieu": (request.form.get('lieu') or '').strip(),
+            "solo": ('solo' in request.form),
+        }
 
         # Tolérant aux virgules
         recette_input = (request.form.get('recette') or '').strip()
@@ -471,33 +442,17 @@ def modifier_concert(concert_id):
         if recette_input:
             recette_float = float(recette_input)
             if concert.paye:
-                concert.recette = recette_float
-                concert.recette_attendue = None  # Nettoyage par sécurité
+                champs.update(recette=recette_float, recette_attendue=None)  # Nettoyage par sécurité
             else:
-                concert.recette_attendue = recette_float
-                concert.recette = None  # Nettoyage par sécurité
+                champs.update(recette_attendue=recette_float, recette=None)  # Nettoyage par sécurité
         else:
-            concert.recette = None
-            concert.recette_attendue = None
+            champs.update(recette=None, recette_attendue=None)
 
-        # ✅ NEW: Solo
-        concert.solo = ('solo' in request.form)
-
-        db.session.commit()
-
-        # --- NEW: Frais prévisionnels ---
-        from mes_utils import ensure_op_frais_previsionnels
+        # Concert + frais prévisionnels (aucune prévision ne subsiste si payé) + crédits de CE concert :
+        # une seule transaction (cf. sauvegarde_concert.py)
+        from sauvegarde_concert import enregistrer_concert
         frais_prev_str = (request.form.get('frais_previsionnels') or '').strip()
-        if not concert.paye:
-            # Si le concert n'est PAS payé -> on crée/MAJ/supprime l'opé prévisionnelle selon la saisie
-            ensure_op_frais_previsionnels(concert.id, frais_prev_str)
-        else:
-            # Si le concert est payé -> aucune prévision ne doit subsister
-            ensure_op_frais_previsionnels(concert.id, None)
-
-        # 🔁 Mise à jour automatique des crédits potentiels
-        from calcul_participations import mettre_a_jour_credit_calcule_potentiel
-        mettre_a_jour_credit_calcule_potentiel()
+        enregistrer_concert(concert, champs=champs, frais_previsionnels=frais_prev_str)
 
         # Redirection logique
         concert_date = concert.date
@@ -565,10 +520,7 @@ def supprimer_concert(concert_id):
     # Suppression du concert lui-même
     db.session.delete(concert)
     db.session.commit()
-
-    # 🔁 Mise à jour automatique des crédits potentiels
-    from calcul_participations import mettre_a_jour_credit_calcule_potentiel
-    mettre_a_jour_credit_calcule_potentiel()
+    # (plus de recalcul global : aucun autre concert n'est touché par cette suppression)
 
     # Redirection logique en fonction des infos conservées
     today = today_paris()
@@ -582,65 +534,14 @@ def supprimer_concert(concert_id):
         return redirect(url_for('liste_concerts'))
 
 
-from sqlalchemy import func
-from mes_utils import grouper_par_mois, get_credits_concerts_from_db
-
 @app.route('/concerts_non_payes')
 def concerts_non_payes_view():
-    from collections import defaultdict  # local pour éviter les effets de bord
-
-    # passés et non payés
-    concerts = (
-        Concert.query
-        .filter(
-            Concert.paye.is_(False),
-            Concert.date <= today_paris()
-        )
-        .order_by(Concert.date.asc())
-        .all()
-    )
+    # passés et non payés (même chargement groupé que /concerts)
+    donnees = donnees_liste_concerts(Concert.paye.is_(False), Concert.date <= today_paris())
+    return render_template("concerts_non_payes.html", **donnees)
 
-    musiciens = Musicien.query.all()
-    musiciens_dict = {m.id: m for m in musiciens}
 
-    credits_musiciens, credits_asso7, credits_jerome = get_credits_concerts_from_db(concerts)
 
-    groupes = grouper_par_mois(concerts, "date", descending=False)
-
-    # --- frais par musicien et par concert (on ignore les prévisionnels globaux) ---
-    concert_ids = [c.id for c in concerts]
-    frais_par_musicien = defaultdict(dict)
-    if concert_ids:
-        rows = (
-            db.session.query(
-                Operation.concert_id,
-                Operation.musicien_id,
-                func.sum(Operation.montant).label("total"),
-            )
-            .filter(
-                Operation.concert_id.in_(concert_ids),
-                func.lower(Operation.motif) == "frais",
-                Operation.previsionnel.is_(False),     # exclut les frais « prévisionnels »
-                Operation.musicien_id.isnot(None)      # uniquement des frais rattachés à un musicien
-            )
-            .group_by(Operation.concert_id, Operation.musicien_id)
-            .all()
-        )
-        for cid, mid, total in rows:
-            frais_par_musicien[cid][mid] = float(total or 0.0)
-
-    return render_template(
-        "concerts_non_payes.html",
-        groupes=groupes,
-        credits_musiciens=credits_musiciens,
-        credits_asso7=credits_asso7,
-        musiciens_dict=musiciens_dict,
-        frais_par_musicien=frais_par_musicien  # ← NEW
-    )
-
-
-
-from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
 
 from sqlalchemy import func  # si pas déjà importé
 
@@ -649,217 +550,216 @@ def toggle_concert_paye(concert_id):
     from mes_utils import creer_recette_concert_si_absente, supprimer_recette_concert_pour_concert
     from models import Operation
 
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        return "Concert non trouvé", 404
+    # verrou du concert (verrous_concerts.py) : deux bascules simultanées s'exécutent l'une après l'autre
+    with verrou_concerts([concert_id]):
+        concert = Concert.query.get(concert_id)
+        if not concert:
+            return "Concert non trouvé", 404
 
-    # etat_cible = True  -> on passe en PAYÉ
-    # etat_cible = False -> on repasse en NON PAYÉ
-    etat_cible = not concert.paye
-
-    if etat_cible:
-        # ===== NON PAYÉ -> PAYÉ =====
-        try:
-            # 1) recette finale = recette existante, sinon recette_attendue, sinon 0
-            if concert.recette is None:
-                if concert.recette_attendue is not None:
-                    concert.recette = float(concert.recette_attendue or 0.0)
-                else:
-                    concert.recette = float(concert.recette or 0.0)
-
-            # 2) marquer payé & nettoyer l'attendu
-            concert.paye = True
-            concert.recette_attendue = None
-
-            # 3) créer l’opération "Recette concert" si absente
-            mode_final = (getattr(concert, "mode_paiement_prevu", "") or "CB ASSO7").strip()
-            creer_recette_concert_si_absente(
-                concert_id=concert.id,
-                montant=float(concert.recette or 0.0),
-                date_op=None,
-                mode=mode_final
-            )
+        # etat_cible = True  -> on passe en PAYÉ
+        # etat_cible = False -> on repasse en NON PAYÉ
+        etat_cible = not concert.paye
 
-            # 4) 🔥 purge des opérations PRÉVISIONNELLES + reset du champ prévisionnel
-            removed = 0
+        if etat_cible:
+            # ===== NON PAYÉ -> PAYÉ =====
+            try:
+                # 1) recette finale = recette existante, sinon recette_attendue, sinon 0
+                if concert.recette is None:
+                    if concert.recette_attendue is not None:
+                        concert.recette = float(concert.recette_attendue or 0.0)
+                    else:
+                        concert.recette = float(concert.recette or 0.0)
+
+                # 2) marquer payé & nettoyer l'attendu
+                concert.paye = True
+                concert.recette_attendue = None
+
+                # 3) créer l’opération "Recette concert" si absente
+                mode_final = (getattr(concert, "mode_paiement_prevu", "") or "CB ASSO7").strip()
+                creer_recette_concert_si_absente(
+                    concert_id=concert.id,
+                    montant=float(concert.recette or 0.0),
+                    date_op=None,
+                    mode=mode_final
+                )
 
-            # 4.a) si on a mémorisé une op spécifique
-            if getattr(concert, "op_prevision_frais_id", None):
-                op_prev = Operation.query.get(concert.op_prevision_frais_id)
-                if op_prev:
-                    db.session.delete(op_prev)
+                # 4) 🔥 purge des opérations PRÉVISIONNELLES + reset du champ prévisionnel
+                removed = 0
+
+                # 4.a) si on a mémorisé une op spécifique
+                if getattr(concert, "op_prevision_frais_id", None):
+                    op_prev = Operation.query.get(concert.op_prevision_frais_id)
+                    if op_prev:
+                        db.session.delete(op_prev)
+                        removed += 1
+                    concert.op_prevision_frais_id = None
+
+                # 4.b) ceinture et bretelles : supprimer toute op prévisionnelle pour ce concert
+                ops_prev = Operation.query.filter_by(concert_id=concert.id, previsionnel=True).all()
+                for op in ops_prev:
+                    db.session.delete(op)
                     removed += 1
-                concert.op_prevision_frais_id = None
-
-            # 4.b) ceinture et bretelles : supprimer toute op prévisionnelle pour ce concert
-            ops_prev = Operation.query.filter_by(concert_id=concert.id, previsionnel=True).all()
-            for op in ops_prev:
-                db.session.delete(op)
-                removed += 1
 
-            # 4.c) On CONSERVE concert.frais_previsionnels (valeur dérivée) : les opérations
-            #      prévisionnelles sont bien supprimées ci-dessus (pas d'écriture "à venir"
-            #      fantôme tant que le concert est payé), mais on garde la valeur du champ pour
-            #      pouvoir recalculer correctement le POTENTIEL si le concert est dé-validé plus tard.
-            #      (Avant : concert.frais_previsionnels = None -> frais prévisionnels perdus.)
-
-            db.session.add(concert)
-            db.session.commit()
-            db.session.refresh(concert)
-
-            if removed:
-                print(f"[i] toggle_paye: {removed} opération(s) prévisionnelle(s) supprimée(s) (concert_id={concert.id})")
-
-            # 5) Recalcul (réel) + (optionnel) potentiel global
-            from calcul_participations import mettre_a_jour_credit_calcule_reel_pour_concert
-            mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
-            try:
-                from calcul_participations import mettre_a_jour_credit_calcule_potentiel
-                mettre_a_jour_credit_calcule_potentiel()
-            except Exception:
-                pass
+                # 4.c) On CONSERVE concert.frais_previsionnels (valeur dérivée) : les opérations
+                #      prévisionnelles sont bien supprimées ci-dessus (pas d'écriture "à venir"
+                #      fantôme tant que le concert est payé), mais on garde la valeur du champ pour
+                #      pouvoir recalculer correctement le POTENTIEL si le concert est dé-validé plus tard.
+                #      (Avant : concert.frais_previsionnels = None -> frais prévisionnels perdus.)
 
-            return redirect(url_for('archives_concerts'))
+                db.session.add(concert)
+                db.session.commit()
+                db.session.refresh(concert)
 
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Erreur lors du passage NON PAYÉ -> PAYÉ pour concert {concert.id}: {e}")
-            return "Erreur serveur", 500
+                if removed:
+                    print(f"[i] toggle_paye: {removed} opération(s) prévisionnelle(s) supprimée(s) (concert_id={concert.id})")
 
-    else:
-        # ===== PAYÉ -> NON PAYÉ =====
-        try:
-            # 1) Restaurer recette_attendue si absente, depuis la recette réelle
-            if (concert.recette_attendue is None) and (concert.recette is not None):
-                try:
-                    concert.recette_attendue = float(concert.recette) or 0.0
-                except Exception:
-                    concert.recette_attendue = 0.0
+                # 5) Recalcul (réel) : concert marqué par le commit, recalculé en fin de requête
+                return redirect(url_for('archives_concerts'))
 
-            # 2) Supprimer l'opération 'Recette concert' liée (idempotent)
-            nb_suppr = supprimer_recette_concert_pour_concert(concert.id)
-            print(f"[INFO] toggle_paye: {nb_suppr} 'Recette concert' supprimée(s) pour concert_id={concert.id}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erreur lors du passage NON PAYÉ -> PAYÉ pour concert {concert.id}: {e}")
+                return "Erreur serveur", 500
 
-            # 3) Réinitialiser l'état "non payé"
-            concert.recette = None
-            concert.paye = False
+        else:
+            # ===== PAYÉ -> NON PAYÉ =====
+            try:
+                # 1) Restaurer recette_attendue si absente, depuis la recette réelle
+                if (concert.recette_attendue is None) and (concert.recette is not None):
+                    try:
+                        concert.recette_attendue = float(concert.recette) or 0.0
+                    except Exception:
+                        concert.recette_attendue = 0.0
 
-            db.session.commit()
-            db.session.refresh(concert)
+                # 2) Supprimer l'opération 'Recette concert' liée (idempotent)
+                nb_suppr = supprimer_recette_concert_pour_concert(concert.id)
+                print(f"[INFO] toggle_paye: {nb_suppr} 'Recette concert' supprimée(s) pour concert_id={concert.id}")
 
-            # 4) Recalcul : crédit POTENTIEL pour CE concert (avec frais prévisionnels pris en compte par l'étape 10)
-            from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-            print(f"[✓] Recalcul crédit POTENTIEL pour concert non payé id={concert.id}")
-            mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
+                # 3) Réinitialiser l'état "non payé"
+                concert.recette = None
+                concert.paye = False
 
-            return redirect(url_for('liste_concerts'))
+                db.session.commit()
+                db.session.refresh(concert)
 
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Erreur lors du passage PAYÉ -> NON PAYÉ pour concert {concert.id}: {e}")
-            return "Erreur serveur", 500
+                # 4) Recalcul POTENTIEL : concert marqué par le commit, recalculé en fin de requête
+                return redirect(url_for('liste_concerts'))
 
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erreur lors du passage PAYÉ -> NON PAYÉ pour concert {concert.id}: {e}")
+                return "Erreur serveur", 500
 
 
-from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
 
 @app.route("/valider_paiement_concert", methods=["POST"])
 def valider_paiement_concert():
     from mes_utils import creer_recette_concert_si_absente
-    from calcul_participations import mettre_a_jour_credit_calcule_reel_pour_concert
     from models import Operation  # 👈 pour supprimer les prévisionnels
 
     data = request.get_json(silent=True) or {}
-    concert_id = data.get("concert_id")
+    try:
+        concert_id = int(data.get("concert_id"))
+    except (TypeError, ValueError):
+        return jsonify(success=False, message="Concert introuvable"), 404
     compte = (data.get("compte") or "").strip()
     recette_raw = data.get("recette")
 
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        return jsonify(success=False, message="Concert introuvable"), 404
-
-    try:
-        def _to_float(x):
-            if x is None:
-                return None
-            s = str(x).strip().replace(",", ".")
-            return float(s) if s else None
-
-        # 1) recette finale
-        recette_post = _to_float(recette_raw)
-        if recette_post is not None:
-            concert.recette = recette_post
-        elif concert.recette_attendue is not None:
-            concert.recette = float(concert.recette_attendue)
-        else:
-            concert.recette = float(concert.recette or 0.0)
+    with verrou_concerts([concert_id]):  # cf. toggle_concert_paye
+        concert = Concert.query.get(concert_id)
+        if not concert:
+            return jsonify(success=False, message="Concert introuvable"), 404
 
-        # 2) marquer payé
-        concert.paye = True
-        concert.recette_attendue = None
+        try:
+            def _to_float(x):
+                if x is None:
+                    return None
+                s = str(x).strip().replace(",", ".")
+                return float(s) if s else None
+
+            # 1) recette finale
+            recette_post = _to_float(recette_raw)
+            if recette_post is not None:
+                concert.recette = recette_post
+            elif concert.recette_attendue is not None:
+                concert.recette = float(concert.recette_attendue)
+            else:
+                concert.recette = float(concert.recette or 0.0)
 
-        # 3) mode de paiement
-        mode_final = (compte or getattr(concert, "mode_paiement_prevu", "") or "Compte").strip()
+            # 2) marquer payé
+            concert.paye = True
+            concert.recette_attendue = None
 
-        # 4) créer l’opération recette si absente
-        creer_recette_concert_si_absente(
-            concert_id=concert.id,
-            montant=concert.recette,
-            date_op=None,
-            mode=mode_final
-        )
+            # 3) mode de paiement
+            mode_final = (compte or getattr(concert, "mode_paiement_prevu", "") or "Compte").strip()
 
-        # 5) 🔥 PURGE des opérations PRÉVISIONNELLES liées + reset des frais prévisionnels
-        ops_prev = Operation.query.filter_by(concert_id=concert.id, previsionnel=True).all()
-        removed = 0
-        for op in ops_prev:
-            db.session.delete(op)
-            removed += 1
-        # On CONSERVE concert.frais_previsionnels (cf. toggle_concert_paye) : on supprime
-        # les opérations prévisionnelles mais on garde la valeur du champ pour que la
-        # dé-validation éventuelle recalcule le potentiel sans perdre les frais prévisionnels.
-        # (Avant : concert.frais_previsionnels = 0.0 -> frais prévisionnels perdus.)
+            # 4) créer l’opération recette si absente
+            creer_recette_concert_si_absente(
+                concert_id=concert.id,
+                montant=concert.recette,
+                date_op=None,
+                mode=mode_final
+            )
 
-        db.session.commit()
-        if removed:
-            print(f"[i] {removed} opération(s) prévisionnelle(s) supprimée(s) pour concert {concert.id}")
+            # 5) 🔥 PURGE des opérations PRÉVISIONNELLES liées + reset des frais prévisionnels
+            ops_prev = Operation.query.filter_by(concert_id=concert.id, previsionnel=True).all()
+            removed = 0
+            for op in ops_prev:
+                db.session.delete(op)
+                removed += 1
+            # On CONSERVE concert.frais_previsionnels (cf. toggle_concert_paye) : on supprime
+            # les opérations prévisionnelles mais on garde la valeur du champ pour que la
+            # dé-validation éventuelle recalcule le potentiel sans perdre les frais prévisionnels.
+            # (Avant : concert.frais_previsionnels = 0.0 -> frais prévisionnels perdus.)
 
-        # 6) recalculs (crédit RÉEL)
-        try:
-            db.session.expire_all()
-            mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
             db.session.commit()
-        except Exception as e:
-            app.logger.exception("Recalcul crédit réel échoué pour concert %s : %s", concert.id, e)
-            flash("⚠️ Le recalcul des crédits a échoué : les soldes affichés peuvent être "
-                  "temporairement faux. Réessayez l'opération.", "danger")
-
-        # 7) Redirection vers l’archive de la saison
-        d = (concert.date or datetime.utcnow().date())
-        start_year = d.year if d.month >= 9 else d.year - 1
-        season_label = f"{start_year}-{start_year+1}"
-        try:
-            redirect_url = url_for("archives_concerts_saison", saison=season_label)
-        except Exception:
+            if removed:
+                print(f"[i] {removed} opération(s) prévisionnelle(s) supprimée(s) pour concert {concert.id}")
+
+            # 6) recalcul (crédit RÉEL) : en fin de requête, avec alerte flash en cas d'échec
+
+            # 7) Redirection vers l’archive de la saison
+            d = (concert.date or datetime.utcnow().date())
+            start_year = d.year if d.month >= 9 else d.year - 1
+            season_label = f"{start_year}-{start_year+1}"
             try:
-                redirect_url = url_for("archives_concerts") + f"#saison-{season_label}"
+                redirect_url = url_for("archives_concerts_saison", saison=season_label)
             except Exception:
-                redirect_url = url_for("archives_concerts")
+                try:
+                    redirect_url = url_for("archives_concerts") + f"#saison-{season_label}"
+                except Exception:
+                    redirect_url = url_for("archives_concerts")
 
-        return jsonify(success=True, redirect_url=redirect_url, season_label=season_label)
+            return jsonify(success=True, redirect_url=redirect_url, season_label=season_label)
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify(success=False, message=str(e)), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify(success=False, message=str(e)), 400
+
+
+
+@app.route("/valider_paiements_concerts", methods=["POST"])
+def valider_paiements_concerts_view():
+    """
+    Validation groupée (JSON) : {"paiements": [{"concert_id": 12, "recette": 800, "compte": "Compte"}, …]}.
+    Tout ou rien : une seule ligne en erreur → rien n'est validé, erreurs détaillées par ligne.
+    """
+    from mes_utils import valider_paiements_concerts
 
+    data = request.get_json(silent=True) or {}
+    paiements = data.get("paiements")
+    if not isinstance(paiements, list) or not paiements:
+        return jsonify(success=False, message="Aucun paiement à valider.", erreurs=[]), 400
 
+    resultat = valider_paiements_concerts(paiements)
+    if resultat["erreurs"]:
+        return jsonify(success=False, message="Aucun paiement validé.", erreurs=resultat["erreurs"]), 400
+    return jsonify(success=True, valides=resultat["valides"])
 
-from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
 
 @app.route("/annuler_paiement_concert", methods=["POST"])
 def annuler_paiement_concert():
     from mes_utils import supprimer_recette_concert_pour_concert
-    from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
 
     data = request.get_json(silent=True) or {}
     concert_id = data.get("concert_id")
@@ -881,10 +781,7 @@ def annuler_paiement_concert():
         db.session.add(concert)
         db.session.commit()
 
-        # 4) Recalcul des crédits potentiels
-        mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
-        db.session.commit()
-
+        # 4) Recalcul des crédits potentiels : en fin de requête (concert marqué)
         return jsonify(success=True, deleted=nb_suppr)
     except Exception as e:
         db.session.rollback()
@@ -1376,20 +1273,15 @@ def liste_participations(concert_id):
         ~Musicien.prenom.ilike('%ASSO7%')
     ).order_by(Musicien.nom).all()
 
-    # Trouver Jérôme
-    jerome = Musicien.query.filter(
-        db.func.lower(Musicien.nom) == "arnould",
-        db.func.lower(Musicien.prenom).like("jérôme%")
-    ).first()
-    jerome_id = jerome.id if jerome else None
+    # Trouver Jérôme (bénéficiaire du bonus, cf. annuaire.py)
+    from annuaire import ROLE_BONUS, id_role
+    jerome_id = id_role(ROLE_BONUS)
 
     if request.method == 'POST':
         participants_ids = set(int(mid) for mid in request.form.getlist('participants'))
-        enregistrer_participations(concert.id, participants_ids, jerome_id=jerome_id)
-
-        # ✅ Recalcul des participations potentielles après validation
-        from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-        mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
+        # ✅ Participations ajoutées/retirées + crédits recalculés : une transaction (cf. sauvegarde_concert.py)
+        from sauvegarde_concert import enregistrer_concert
+        enregistrer_concert(concert, participants_ids=participants_ids, jerome_id=jerome_id)
 
         # Redirection logique identique à celle d’ajouter_concert
         concert_date = concert.date
@@ -1428,11 +1320,7 @@ def ajouter_participation(concert_id):
         participation = Participation(concert_id=concert.id, musicien_id=musicien_id, paye=paye)
         db.session.add(participation)
         db.session.commit()
-
-        # ✅ Recalcul des participations réelles si le concert est payé
-        if concert.paye:
-            from calcul_participations import mettre_a_jour_credit_calcule_reel_pour_concert
-            mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
+        # ✅ Recalcul (réel ou potentiel) du concert en fin de requête
 
         return redirect(url_for('liste_participations', concert_id=concert.id))
 
@@ -1481,6 +1369,8 @@ def supprimer_participation(participation_id):
 @app.route("/participants_concert/<int:concert_id>")
 def participants_concert(concert_id):
     """Renvoie (JSON) la liste des participants du concert avec montants potentiel/réel et gain_fixe."""
+    from calcul_participations import _is_asso7
+
     concert = Concert.query.get_or_404(concert_id)
 
     parts = []
@@ -1498,11 +1388,81 @@ def participants_concert(concert_id):
             "potentiel": float(p.credit_calcule_potentiel or 0),
             "reel": float(p.credit_calcule or 0),
             "fixe": (None if p.gain_fixe is None else float(p.gain_fixe)),
+            "asso7": _is_asso7(m),
         })
 
     return jsonify(success=True, concert_id=concert_id, items=parts, paye=bool(concert.paye))
 
 
+def _montant_saisi(val) -> float | None:
+    """Montant saisi dans un formulaire JSON (tolère "1 200,50") ; vide/None → None, invalide → ValueError."""
+    raw = "" if val is None else str(val).strip()
+    raw = (raw.replace("\xa0", "").replace(" ", "").replace(",", "."))
+    if raw == "":
+        return None
+    return round(float(raw), 2)
+
+
+@app.post("/api/concerts/<int:concert_id>/simulate")
+def api_simuler_partage(concert_id):
+    """
+    Simulation "et si…" du partage d'un concert, SANS rien écrire (aperçu en direct du pop-up).
+    JSON attendu (tout est optionnel, absent = valeur actuelle) :
+    {
+      "recette": 1200, "recette_attendue": 1200, "frais": 150, "frais_previsionnels": 40, "paye": false,
+      "participants": [<musicien_id>, ...],                 # ensemble hypothétique
+      "overrides":   { "<participation_id>": <montant_ou_null>, ... },
+      "gains_fixes": { "<musicien_id>": <montant_ou_null>, ... }
+    }
+    """
+    from calcul_participations import simuler_partage
+
+    concert = Concert.query.get_or_404(concert_id)
+    data = request.get_json(silent=True) or {}
+
+    try:
+        hypotheses = {
+            cle: (bool(data[cle]) if cle == "paye" else _montant_saisi(data[cle]))
+            for cle in ("recette", "recette_attendue", "frais", "frais_previsionnels", "paye")
+            if cle in data
+        }
+        musicien_ids = None
+        if data.get("participants") is not None:
+            musicien_ids = [int(mid) for mid in data["participants"]]
+
+        gains = {int(mid): _montant_saisi(val) for mid, val in (data.get("gains_fixes") or {}).items()}
+        overrides = data.get("overrides") or {}
+        if overrides:
+            musicien_par_participation = dict(
+                db.session.query(Participation.id, Participation.musicien_id)
+                .filter(Participation.concert_id == concert_id)
+                .all()
+            )
+            for pid_str, val in overrides.items():
+                mid = musicien_par_participation.get(int(pid_str))
+                if mid is not None:
+                    gains[mid] = _montant_saisi(val)
+    except (TypeError, ValueError):
+        return jsonify(success=False, message="Montant ou identifiant invalide."), 400
+
+    if any(v is not None and v < 0 for v in gains.values()):
+        return jsonify(success=False, message="Un gain fixé ne peut pas être négatif."), 400
+
+    try:
+        resultat = simuler_partage(concert, musicien_ids=musicien_ids, gains_fixes=gains, **hypotheses)
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+
+    dist = resultat.pop("distribution")
+    return jsonify(
+        success=True,
+        concert_id=concert_id,
+        asso7=float(dist.get("ASSO7", 0.0)),
+        parts={str(k): float(v) for k, v in dist.items() if k != "ASSO7"},
+        **resultat,
+    )
+
+
 @app.route("/ajuster_gains", methods=["POST"])
 def ajuster_gains():
     """
@@ -1512,10 +1472,7 @@ def ajuster_gains():
       "overrides": { "<participation_id>": <montant_ou_null>, ... }
     }
     """
-    from calcul_participations import (
-        mettre_a_jour_credit_calcule_potentiel_pour_concert,
-        mettre_a_jour_credit_calcule_reel_pour_concert,
-    )
+    from calcul_participations import recalculer_concerts_marques
 
     data = request.get_json(silent=True) or {}
     concert_id_raw = data.get("concert_id")
@@ -1528,48 +1485,43 @@ def ajuster_gains():
 
     overrides = data.get("overrides") or {}
 
-    concert = Concert.query.get_or_404(concert_id)
+    # verrou du concert jusqu'au recalcul : la réponse décrit l'état laissé par CETTE requête
+    with verrou_concerts([concert_id]):
+        concert = Concert.query.get_or_404(concert_id)
 
-    # 1) enregistrer les overrides (tolère "1 200,50")
-    try:
-        for pid_str, val in overrides.items():
-            p = Participation.query.get(int(pid_str))
-            if not p or p.concert_id != concert_id:  # ici concert_id est bien un int
-                continue
-            raw = "" if val is None else str(val).strip()
-            raw = (raw.replace("\xa0", "").replace(" ", "").replace(",", "."))
-            if raw == "":
-                p.gain_fixe = None
-            else:
-                num = round(float(raw), 2)
-                if num < 0:
+        # 1) enregistrer les overrides (tolère "1 200,50")
+        try:
+            for pid_str, val in overrides.items():
+                p = Participation.query.get(int(pid_str))
+                if not p or p.concert_id != concert_id:  # ici concert_id est bien un int
+                    continue
+                num = _montant_saisi(val)
+                if num is not None and num < 0:
                     return jsonify(success=False, message="Un gain fixé ne peut pas être négatif."), 400
                 p.gain_fixe = num
-            db.session.add(p)
-        db.session.commit()
+                db.session.add(p)
+            db.session.commit()
 
-        # 🔎 DEBUG : ce qui est effectivement en DB après sauvegarde
-        saved = {
-            p.id: (p.musicien_id, (float(p.gain_fixe) if p.gain_fixe is not None else None))
-            for p in Participation.query.filter_by(concert_id=concert_id).all()  # ✅ int ici
-        }
-        print(f"[DEBUG] gain_fixe en DB pour concert {concert_id} :", saved)
+            # 🔎 DEBUG : ce qui est effectivement en DB après sauvegarde
+            saved = {
+                p.id: (p.musicien_id, (float(p.gain_fixe) if p.gain_fixe is not None else None))
+                for p in Participation.query.filter_by(concert_id=concert_id).all()  # ✅ int ici
+            }
+            print(f"[DEBUG] gain_fixe en DB pour concert {concert_id} :", saved)
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify(success=False, message=f"Erreur d'enregistrement des ajustements : {e}"), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify(success=False, message=f"Erreur d'enregistrement des ajustements : {e}"), 400
 
-    # 2) recalculs après ajustements
-    try:
-        if concert.paye:
-            mettre_a_jour_credit_calcule_reel_pour_concert(concert_id)
-        else:
-            mettre_a_jour_credit_calcule_potentiel_pour_concert(concert_id)
-        db.session.commit()
+        # 2) recalculs après ajustements (tout de suite : la réponse dépend du résultat)
+        try:
+            erreurs = recalculer_concerts_marques()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify(success=False, message=f"Erreur de recalcul : {e}"), 400
+        if concert_id in erreurs:
+            return jsonify(success=False, message=f"Erreur de recalcul : {erreurs[concert_id]}"), 400
         return jsonify(success=True)
-    except Exception as e:
-        db.session.rollback()
-        return jsonify(success=False, message=f"Erreur de recalcul : {e}"), 400
 
 
 
@@ -1604,14 +1556,10 @@ def operations():
         # --- Règle spéciale : "Remboursement frais divers" pour un MUSICIEN ---
         motif_norm = (data.get("motif") or "").strip().lower()
 
-        # id du "Qui" (nom du champ selon ton formulaire)
+        # "Qui" : id ou libellé "Prénom Nom" (le formulaire envoie le libellé) — cf. annuaire.py
+        from annuaire import resoudre_musicien
         qui_raw = data.get("musicien_id") or data.get("musicien") or data.get("qui") or ""
-        try:
-            mid = int(str(qui_raw).strip()) if qui_raw else None
-        except Exception:
-            mid = None
-
-        m = Musicien.query.get(mid) if mid else None
+        m = resoudre_musicien(qui_raw)
         is_musicien = bool(m and (m.type != "structure"))
 
         if is_musicien and motif_norm == "remboursement frais divers":
@@ -1656,15 +1604,7 @@ def operations():
 
         print("DATA POST (après normalisation):", data)
         enregistrer_operation_en_db(data)
-
-        # Recalcul potentiel si lié à un concert
-        if data.get('concert_id'):
-            try:
-                cid = int(str(data['concert_id']).strip())
-                from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(cid)
-            except Exception as e:
-                print("⚠️ Recalcul potentiel ignoré (concert_id invalide) :", e)
+        # (recalcul du concert lié : en fin de requête, s'il a été touché)
 
         # Validation éventuelle des recettes
         if (data.get('motif') == 'Recette concert') and data.get('concert_id'):
@@ -1771,7 +1711,6 @@ def operations():
 def modifier_operation(id):
     # ✅ Imports locaux pour éviter les soucis de portée
     from models import Concert, Musicien, Operation
-    from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
     # NEW ↓
     from mes_utils import motifs_pour_beneficiaire
 
@@ -1800,7 +1739,8 @@ def modifier_operation(id):
 
         # “musicien” est un libellé ("Prénom Nom" ou une structure)
         qui_raw = (data.get("musicien") or "").strip()
-        is_structure = qui_raw in ("ASSO7", "CB ASSO7", "CAISSE ASSO7", "TRESO ASSO7")
+        from annuaire import ROLE_ASSO7, ROLES_SPECIAUX, id_par_nom, role_de
+        is_structure = role_de(id_par_nom(qui_raw)) in (ROLE_ASSO7, *ROLES_SPECIAUX)
         is_musicien = not is_structure
 
         # — Remboursement frais divers (toujours DEBIT, concert requis, brut ignoré) —
@@ -1843,14 +1783,7 @@ def modifier_operation(id):
 
         # 3) Mise à jour en base
         modifier_operation_en_db(id, data)
-
-        # 4) Recalcul du potentiel pour le concert lié (nouveau ou inchangé)
-        try:
-            cid_for_recalc = data.get("concert_id") or (operation.concert_id if operation else None)
-            if cid_for_recalc:
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(int(str(cid_for_recalc)))
-        except Exception as e:
-            app.logger.warning(f"[modifier_operation] Recalcul potentiel ignoré: {e}")
+        # 4) Recalcul des concerts touchés (ancien et nouveau) : en fin de requête
 
         flash("✅ Opération modifiée avec succès", "success")
         return redirect(url_for(
@@ -1959,9 +1892,7 @@ def supprimer_operation():
         if concert_id:
             from mes_utils import recompute_frais_previsionnels
             recompute_frais_previsionnels(concert_id)  # met à jour le champ en DB
-
-            from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-            mettre_a_jour_credit_calcule_potentiel_pour_concert(concert_id)
+            # (les potentiels suivent en fin de requête : concert marqué)
 
 
         return jsonify({'success': bool(success)})
@@ -2263,15 +2194,10 @@ def page_archives():
 
 @app.route('/archives/concerts')
 def archives_concerts():
-    concerts = Concert.query.order_by(Concert.date.desc()).all()
-    saisons = set()
-    for concert in concerts:
-        saisons.add(saison_from_date(concert.date))
-    return render_template('archives_concerts.html', saisons=sorted(saisons, reverse=True))
-
-
-# en haut du fichier, avec tes autres imports utilitaires
-from mes_utils import collecter_frais_par_musicien
+    # Résumé par saison (cf. saisons.py) : une petite requête au lieu de charger tous les concerts
+    from saisons import resumes_saisons, ENTITE_CONCERTS
+    resumes = {r.saison: r for r in resumes_saisons(ENTITE_CONCERTS)}
+    return render_template('archives_concerts.html', saisons=list(resumes), resumes=resumes)
 
 
 @app.route('/archives/concerts/<saison>')
@@ -2282,13 +2208,9 @@ def archives_concerts_saison(saison):
     except Exception:
         return "Erreur de paramètre saison", 400
 
-    debut_saison = date(annee_debut, 9, 1)
-    fin_saison = date(annee_fin, 8, 31)
-
     concerts = (
         Concert.query.filter(
-            Concert.date >= debut_saison,
-            Concert.date <= fin_saison,
+            Concert.saison == f"{annee_debut}/{annee_fin}",
             Concert.date <= today_paris(),
             Concert.paye.is_(True)
         )
@@ -2296,15 +2218,17 @@ def archives_concerts_saison(saison):
         .all()
     )
 
-    # NEW: agrège les frais (débits 'Frais*' non prévisionnels) par musicien et par concert
-    from mes_utils import collecter_frais_par_musicien
-    frais_par_musicien = collecter_frais_par_musicien(concerts)
+    # Frais réels (hors prévisionnels) par musicien et par concert (cf. frais_concerts.py)
+    from frais_concerts import frais_par_musicien as frais_des_musiciens
+    frais_par_musicien = frais_des_musiciens(c.id for c in concerts)
 
     # Groupement par mois (ordre chronologique dans la saison)
     from mes_utils import grouper_par_mois
     groupes = grouper_par_mois(concerts, "date", descending=False)
 
     # Crédits (inchangé)
+    from annuaire import ROLE_ASSO7, id_role
+    asso7_id = id_role(ROLE_ASSO7)
     credits_musiciens = {}
     credits_asso7 = {}
     for concert in concerts:
@@ -2312,7 +2236,7 @@ def archives_concerts_saison(saison):
         credits_asso7[concert.id] = 0.0
         for part in concert.participations:
             montant = part.credit_calcule or 0.0
-            if part.musicien.nom == "ASSO7":
+            if part.musicien_id == asso7_id:
                 credits_asso7[concert.id] = montant
             else:
                 credits_musiciens[concert.id][part.musicien_id] = montant
@@ -2335,23 +2259,14 @@ def archives_concerts_saison(saison):
     
 @app.route("/archives_cachets")
 def archives_cachets():
-    toutes_les_dates = db.session.query(Cachet.date).distinct().all()
-    saisons = set()
-
-    for (dt,) in toutes_les_dates:
-        if dt < today_paris():  # uniquement passés
-            annee = dt.year
-            mois = dt.month
-            if mois >= 9:
-                debut = annee
-                fin = annee + 1
-            else:
-                debut = annee - 1
-                fin = annee
-            saisons.add(f"{debut}/{str(fin)[-2:]}")
+    # Saisons ayant au moins un cachet passé, lues dans le résumé par saison (cf. saisons.py)
+    from saisons import resumes_saisons, ENTITE_CACHETS
+    resumes = {}
+    for r in resumes_saisons(ENTITE_CACHETS, avant=today_paris()):
+        debut, fin = r.saison.split("/")
+        resumes[f"{debut}/{fin[-2:]}"] = r
 
-    saisons = sorted(saisons, reverse=True)
-    return render_template("archives_cachets.html", saisons=saisons)
+    return render_template("archives_cachets.html", saisons=list(resumes), resumes=resumes)
 
 from sqlalchemy import and_
 try:
@@ -2366,15 +2281,10 @@ from mes_utils import regrouper_cachets_par_mois  # en haut du fichier si pas d
 def archives_cachets_saison(saison):
     try:
         annee_debut = int(saison.split("-")[0])
-        date_debut = datetime(annee_debut, 9, 1).date()
-        date_fin = datetime(annee_debut + 1, 8, 31).date()
     except Exception:
         return "Format de saison invalide", 400
 
-    cachets = Cachet.query.filter(
-        Cachet.date >= date_debut,
-        Cachet.date <= date_fin
-    ).all()
+    cachets = Cachet.query.filter(Cachet.saison == f"{annee_debut}/{annee_debut + 1}").all()
 
     # ✅ même structure que pour “À venir” : [( 'Septembre', [(musicien, [cachets]), ...] ), ...]
     cachets_par_mois = regrouper_cachets_par_mois(cachets, ordre_scolaire=True)
@@ -2404,58 +2314,115 @@ def archives_cachets_saison(saison):
 
 @app.route("/archives_operations")
 def archives_operations():
+    # Saisons ayant au moins une opération passée, lues dans le résumé par saison (cf. saisons.py)
+    from saisons import resumes_saisons, format_court, ENTITE_OPERATIONS
+    resumes = {format_court(r.saison): r for r in resumes_saisons(ENTITE_OPERATIONS, avant=today_paris())}
 
-    aujourd_hui = datetime.now().date()
-
-    # On filtre les opérations passées
-    operations_passees = Operation.query.filter(Operation.date < aujourd_hui).all()
-
-    # On extrait les saisons à partir des dates
-    saisons = set()
-    for op in operations_passees:
-        annee = op.date.year
-        mois = op.date.month
-        if mois >= 9:
-            debut_saison = annee
-            fin_saison = annee + 1
-        else:
-            debut_saison = annee - 1
-            fin_saison = annee
-        saison_str = f"{str(debut_saison)[-2:]}/{str(fin_saison)[-2:]}"
-        saisons.add(saison_str)
+    return render_template("archives_operations.html", saisons=list(resumes), resumes=resumes)
 
-    saisons = sorted(saisons, reverse=True)
-
-    return render_template("archives_operations.html", saisons=saisons)
-    
-    
 
 @app.route("/archives_operations_saison/<saison_url>")
 def archives_operations_saison(saison_url):
+    """
+    Archives d'une saison : seuls les bandeaux de mois sont rendus ici (1 requête agrégée) ;
+    les opérations de chaque mois arrivent ensuite par /api/archives_operations/… (cf. archives.py).
+    """
+    from archives import mois_de_la_saison
+    from saisons import saison_de
+
     saison = saison_url.replace("-", "/")
     debut_saison, fin_saison = get_debut_fin_saison(saison)
-    print(f"🔍 Début saison : {debut_saison}, Fin saison : {fin_saison}")
+    if debut_saison is None:
+        abort(404)
 
     # Opérations passées de la saison (on garde tout, même auto_debit/auto_cb)
-    operations = (
-        Operation.query.join(Musicien)
-        .filter(
-            Operation.date >= debut_saison,
-            Operation.date <= fin_saison,
-            Operation.date <= today_paris()
-        )
-        .order_by(Operation.date.desc())
-        .all()
-    )
-
-    # ✅ Groupement par mois (descendant pour archives)
-    from mes_utils import grouper_par_mois
-    groupes = grouper_par_mois(operations, "date", descending=True)
+    mois = mois_de_la_saison(saison_de(debut_saison), today_paris())
 
     return render_template(
         "archives_operations_saison.html",
         saison=saison,
-        groupes=groupes,
+        mois=mois,
+    )
+
+
+@app.get("/api/archives_operations/<saison_url>/<mois>")
+def api_archives_operations_mois(saison_url, mois):
+    """
+    Bloc mensuel des archives d'une saison (JSON), paginé par clé :
+      ?apres=<curseur suivant de la page précédente>&limite=100
+    → {success, mois, operations: [...], suivant}
+    """
+    from archives import bloc_mois, bornes_mois, LIMITE_BLOC
+
+    debut_saison, fin_saison = get_debut_fin_saison(saison_url)
+    try:
+        debut_mois, _fin_mois = bornes_mois(mois)
+        if debut_saison is None or not (debut_saison.date() <= debut_mois <= fin_saison.date()):
+            raise ValueError(f"Le mois {mois} n'appartient pas à la saison {saison_url}.")
+        bloc = bloc_mois(
+            mois, today_paris(),
+            apres=request.args.get("apres") or None,
+            limite=request.args.get("limite", default=LIMITE_BLOC, type=int),
+        )
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+
+    return jsonify(success=True, **bloc)
+
+
+@app.get("/api/operations/search")
+def api_rechercher_operations():
+    """
+    Recherche d'opérations côté serveur (pop-up 🔍 des archives), paginée par clé.
+    Paramètres (query string) :
+      critere     : montant | date | qui | motif | precision | concert   (défaut : montant)
+      q           : valeur cherchée ("50", "17/09/2025", "jerome", "morgat"…)
+      tolerance   : écart admis sur le montant (défaut 0 = montant exact, en valeur absolue)
+      saison      : "24-25" (une saison) ou "toutes" (défaut)
+      passees     : 1 → seulement les opérations datées d'aujourd'hui ou avant (archives)
+      musicien_id, concert_id : filtres exacts optionnels
+      limite      : taille de page (défaut 50, max 200)
+      apres       : curseur `suivant` de la page précédente
+    """
+    from recherche import rechercher_operations, operation_en_dict, LIMITE_DEFAUT
+    from saisons import saison_de
+
+    args = request.args
+    critere = (args.get("critere") or "montant").strip().lower()
+    valeur = args.get("q") or ""
+
+    try:
+        saison = fin = None
+        saisie = (args.get("saison") or "toutes").strip()
+        if saisie.lower() != "toutes":
+            debut_saison, _fin_saison = get_debut_fin_saison(saisie)
+            if debut_saison is None:
+                raise ValueError(f"Saison invalide : {saisie}")
+            saison = saison_de(debut_saison)
+        if args.get("passees") == "1":
+            fin = today_paris()
+
+        if critere == "montant":
+            try:
+                valeur = _montant_saisi(valeur.replace("€", "").strip().lstrip("+-−"))
+            except ValueError:
+                raise ValueError("Montant invalide (ex. : 50 ou 1 200,50).")
+        operations, suivant = rechercher_operations(
+            critere, valeur,
+            tolerance=_montant_saisi(args.get("tolerance")) or 0.0,
+            saison=saison, fin=fin,
+            musicien_id=args.get("musicien_id", type=int),
+            concert_id=args.get("concert_id", type=int),
+            limite=args.get("limite", default=LIMITE_DEFAUT, type=int),
+            apres=args.get("apres") or None,
+        )
+    except ValueError as e:
+        return jsonify(success=False, message=str(e) or "Recherche invalide."), 400
+
+    return jsonify(
+        success=True,
+        operations=[operation_en_dict(op) for op in operations],
+        suivant=suivant,
     )
 
 
@@ -2485,7 +2452,8 @@ def reports():
 
         cible = Musicien.query.get(musicien_id)
         if cible:
-            r = Report.query.filter_by(musicien_id=cible.id).first()
+            # report saisi à la main et encore actif (les reports de clôture ne se modifient pas ici)
+            r = Report.query.filter_by(musicien_id=cible.id, saison=None, cloture_saison=None).first()
             if r:
                 r.montant = montant
             else:
@@ -2500,6 +2468,46 @@ def reports():
                            reports=reports_dict)
 
 
+@app.route('/reports/cloture', methods=['GET', 'POST'])
+def cloture_saison():
+    """
+    Clôture de saison (cf. clotures.py) : aperçu des reports qui seraient écrits (GET),
+    puis clôture ou réouverture de la dernière saison clôturée (POST action=cloturer|rouvrir).
+    """
+    from clotures import cloturer_saison, rouvrir_saison, derniere_saison_cloturee
+    from saisons import saison_de
+
+    if request.method == 'POST':
+        saison = request.form.get('saison', '')
+        try:
+            if request.form.get('action') == 'rouvrir':
+                n = rouvrir_saison(saison)
+                flash(f"Saison {saison} rouverte ({n} compte(s)).", "success")
+            else:
+                lignes = cloturer_saison(saison)
+                flash(f"Saison {saison} clôturée : {len(lignes)} report(s) écrit(s).", "success")
+        except (ValueError, RuntimeError) as e:
+            flash(f"❌ {e}", "danger")
+        return redirect(url_for('cloture_saison'))
+
+    derniere = derniere_saison_cloturee()
+    # par défaut : la dernière saison terminée
+    debut = int(saison_de(today_paris()).split("/")[0])
+    saison = request.args.get('saison') or f"{debut - 1}/{debut}"
+    try:
+        apercu = cloturer_saison(saison, simulation=True)
+        erreur = None
+    except ValueError as e:
+        apercu, erreur = [], str(e)
+
+    return render_template('cloture_saison.html',
+                           saison=saison,
+                           derniere=derniere,
+                           apercu=apercu,
+                           erreur=erreur,
+                           format_currency=format_currency)
+
+
 # --------- LIONEL ---------
 
 
@@ -2550,22 +2558,16 @@ def upload_pdf():
     file_path = os.path.join(UPLOAD_FOLDER, filename)
     print("[DEBUG] Chemin de sauvegarde du fichier :", file_path)
     file.save(file_path)
-    print("[DEBUG] Fichier sauvé. Lancement de l'extraction...")
-
-    try:
-        infos = extraire_infos_depuis_pdf(file_path)
-        print("[DEBUG] Extraction réussie, infos :", infos)
-        print("[DEBUG] Encodage des infos JSON :", json.dumps({"success": True, **infos}, ensure_ascii=False))
-        return Response(
-            json.dumps({"success": True, **infos}, ensure_ascii=False),
-            content_type='application/json; charset=utf-8'
-        )
-    except Exception as e:
-        print("[DEBUG][ERREUR extraction]:", str(e))
-        return Response(
-            json.dumps({"success": False, "message": "Erreur d’analyse du PDF.", "error": str(e)}, ensure_ascii=False),
-            content_type='application/json; charset=utf-8'
-        )
+    print("[DEBUG] Fichier sauvé. Extraction confiée à un job de fond...")
+
+    # L'analyse (OCR/texte) est lourde en CPU : elle part dans un worker (jobs.py),
+    # le navigateur suit /jobs/<id> puis lit /jobs/<id>/resultat.
+    job = soumettre_job("extraction_pdf", chemin=os.path.abspath(file_path))
+    return Response(
+        json.dumps({"success": True, **_urls_job(job)}, ensure_ascii=False),
+        status=202,
+        content_type='application/json; charset=utf-8'
+    )
 
 @app.route('/test_flash')
 def test_flash():
@@ -2577,13 +2579,78 @@ def test_page():
     return render_template("test.html")
 
 
-from flask import send_file
-from exports import generer_export_excel
+# ------------ TÂCHES DE FOND (jobs.py) ------------
+
+from jobs import soumettre as soumettre_job, job_en_dict, resultat_job, STATUT_TERMINE
+from models import Job
+
+
+def _urls_job(job):
+    return {
+        "job_id": job.id,
+        "statut_url": url_for('statut_job', job_id=job.id),
+        "resultat_url": url_for('resultat_job_route', job_id=job.id),
+    }
 
-@app.route('/export_general')
+
+def _veut_json() -> bool:
+    # formulaire HTML : suivi de la tâche ; appel fetch / API (JSON) : URLs du job
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+
+@app.route('/export_general', methods=['GET', 'POST'])
 def export_general():
-    chemin = generer_export_excel()
-    return send_file(chemin, as_attachment=True)
+    """
+    POST : lance l'export Excel en tâche de fond ; le fichier se récupère sur /jobs/<id>/resultat.
+    GET : simple page avec le bouton d'export (un lien suivi ou préchargé ne lance rien).
+    """
+    if request.method == 'GET':
+        return render_template('export_general.html')
+    job = soumettre_job("export_excel")
+    if _veut_json():
+        return jsonify(success=True, **_urls_job(job)), 202
+    return redirect(url_for('suivi_job', job_id=job.id))
+
+
+@app.route('/recalcul_complet', methods=['POST'])
+def recalcul_complet():
+    """Recalcul de tous les crédits (réels + potentiels) en tâche de fond."""
+    job = soumettre_job("recalcul_complet")
+    return jsonify(success=True, **_urls_job(job)), 202
+
+
+@app.route('/jobs/<int:job_id>')
+def statut_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify(success=False, message="Job introuvable"), 404
+    data = job_en_dict(job)
+    if job.statut == STATUT_TERMINE:
+        data["resultat_url"] = url_for('resultat_job_route', job_id=job.id)
+    return jsonify(success=True, **data)
+
+
+@app.route('/jobs/<int:job_id>/resultat')
+def resultat_job_route(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify(success=False, message="Job introuvable"), 404
+    if job.statut != STATUT_TERMINE:
+        return jsonify(success=False, statut=job.statut, message=job.message or "Job non terminé"), 409
+
+    resultat = resultat_job(job) or {}
+    if job.type == "export_excel":
+        return send_file(resultat["chemin"], as_attachment=True, download_name=resultat.get("nom"))
+    return Response(
+        json.dumps({"success": True, **resultat}, ensure_ascii=False),
+        content_type='application/json; charset=utf-8'
+    )
+
+
+@app.route('/jobs/<int:job_id>/suivi')
+def suivi_job(job_id):
+    job = db.get_or_404(Job, job_id)
+    return render_template('job_suivi.html', job=job)
 
 # Enregistrement du filtre global Jinja (au cas où import plus haut serait ignoré)
 from mes_utils import format_currency as fc
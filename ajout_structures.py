@@ -1,13 +1,14 @@
 from extensions import db
 from App import app
 from models import Musicien
+from annuaire import ROLE_ASSO7, ROLE_CB, ROLE_CAISSE, ROLE_TRESO, id_role
 
 with app.app_context():
-    structures = ["ASSO7", "CB ASSO7", "CAISSE ASSO7", "TRESO ASSO7"]
+    structures = {ROLE_ASSO7: "ASSO7", ROLE_CB: "CB ASSO7", ROLE_CAISSE: "CAISSE ASSO7", ROLE_TRESO: "TRESO ASSO7"}
 
-    for nom in structures:
-        if not Musicien.query.filter_by(nom=nom, type="structure").first():
-            nouvelle_structure = Musicien(prenom="", nom=nom, actif=True, type="structure")
+    for role, nom in structures.items():
+        if id_role(role) is None:
+            nouvelle_structure = Musicien(prenom="", nom=nom, actif=True, type="structure", role=role)
             db.session.add(nouvelle_structure)
 
     db.session.commit()
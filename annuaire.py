@@ -0,0 +1,242 @@
+# annuaire.py
+"""
+Annuaire des musiciens, chargé une fois par processus : RÔLES particuliers et INDEX DES NOMS.
+
+Rôles (colonne musiciens.role, au plus un titulaire par rôle) :
+  - ROLE_ASSO7   : la structure ASSO7 (part ASSO7 du partage),
+  - ROLE_CB      : le compte CB ASSO7,
+  - ROLE_CAISSE  : le compte CAISSE ASSO7,
+  - ROLE_TRESO   : la ligne TRESO ASSO7,
+  - ROLE_BONUS   : le bénéficiaire du bonus de 10% (Jérôme).
+
+Un rôle sans titulaire explicite retombe sur l'ancienne règle de nom (plus petit id),
+ce qui garde les bases non migrées / non renseignées fonctionnelles.
+
+Index des noms : "Prénom Nom" (et "Nom Prénom") normalisés — sans accents, casse ni espaces
+superflus — vers l'id ; resoudre_musicien() accepte indifféremment un id ou un nom affiché.
+
+L'annuaire partagé par les threads ne contient que des données VALIDÉES : une transaction qui crée,
+modifie ou supprime un Musicien (flush) lit son propre annuaire, gardé dans session.info et relu
+après chaque flush qui touche les musiciens ; au commit l'annuaire partagé est invalidé (relu à la
+recherche suivante), au rollback seul l'annuaire de la session est oublié.
+Les recherches sont ensuite des accès dict O(1) : role_de(id), id_role(role), id_par_nom(nom).
+"""
+
+import threading
+import unicodedata
+
+from sqlalchemy import event
+
+from models import db, Musicien
+
+ROLE_ASSO7 = "asso7"
+ROLE_CB = "cb"
+ROLE_CAISSE = "caisse"
+ROLE_TRESO = "treso"
+ROLE_BONUS = "bonus"
+
+ROLES = (ROLE_ASSO7, ROLE_CB, ROLE_CAISSE, ROLE_TRESO, ROLE_BONUS)
+ROLES_TRESORERIE = (ROLE_CB, ROLE_CAISSE)
+ROLES_SPECIAUX = ROLES_TRESORERIE + (ROLE_TRESO,)  # comptes sans participations (cf. soldes.credit_reel)
+
+
+# --------------------------- Règles historiques (par nom) ---------------------------
+
+def role_par_nom(nom: str | None, prenom: str | None) -> str | None:
+    """Rôle déduit du nom, comme le faisaient _is_asso7 / _is_jerome / filter_by(nom='CB ASSO7')."""
+    n = (nom or "").strip()
+    p = (prenom or "").strip()
+    if n.upper() == "ASSO7" or p.upper() == "ASSO7":
+        return ROLE_ASSO7
+    n_bas = " ".join(n.lower().split())
+    if n_bas == "cb asso7":
+        return ROLE_CB
+    if n_bas == "caisse asso7":
+        return ROLE_CAISSE
+    if n_bas == "treso asso7":
+        return ROLE_TRESO
+    if n.casefold() == "arnould" and p.casefold().startswith("jérôme"):
+        return ROLE_BONUS
+    return None
+
+
+def normaliser_nom(txt) -> str:
+    """'  Jérôme   ARNOULD ' → 'jerome arnould' (clé de l'index des noms)."""
+    s = unicodedata.normalize("NFKD", str(txt or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.casefold().split())
+
+
+def role_du_mode_paiement(mode: str | None) -> str | None:
+    """
+    Compte de trésorerie désigné par un mode de paiement (Concert.mode_paiement_prevu, formulaires) :
+    "Compte", "CB_ASSO7", "cb asso7"… → ROLE_CB ; "Espèces", "CAISSE_ASSO7", "caisse asso7"… → ROLE_CAISSE.
+    None si le mode ne désigne ni l'un ni l'autre.
+    """
+    m = normaliser_nom(mode)
+    for ch in ("_", "-", ".", "/"):
+        m = m.replace(ch, " ")
+    m = " ".join(m.split())
+    if any(tok in m for tok in ("compte", "cb asso7", "cbasso7", "cb", "cb asso")):
+        return ROLE_CB
+    if any(tok in m for tok in ("especes", "espece", "caisse asso7", "caisseasso7", "caisse")):
+        return ROLE_CAISSE
+    return None
+
+
+def nom_affiche(prenom: str | None, nom: str | None) -> str:
+    """Libellé utilisé par les formulaires d'opérations : "Prénom Nom" (ou "Nom" seul)."""
+    return f"{(prenom or '').strip()} {(nom or '').strip()}".strip()
+
+
+# --------------------------- Annuaire ---------------------------
+
+class Annuaire:
+    __slots__ = ("ids_par_role", "roles_par_id", "ids_par_nom", "noms_par_id")
+
+    def __init__(self, lignes):
+        """lignes : (id, nom, prenom, role) de tous les musiciens."""
+        explicites, par_nom = {}, {}
+        self.ids_par_nom, self.noms_par_id = {}, {}
+        lignes = sorted(lignes, key=lambda l: l[0])
+        for mid, nom, prenom, role in lignes:
+            if role in ROLES:
+                explicites.setdefault(role, mid)
+            deduit = role_par_nom(nom, prenom)
+            if deduit:
+                par_nom.setdefault(deduit, mid)
+            self.noms_par_id[mid] = nom_affiche(prenom, nom)
+            # homonymes : le plus petit id l'emporte (comme l'ancien parcours de Musicien.query.all())
+            self.ids_par_nom.setdefault(normaliser_nom(self.noms_par_id[mid]), mid)
+        for mid, nom, prenom, _role in lignes:
+            self.ids_par_nom.setdefault(normaliser_nom(f"{nom or ''} {prenom or ''}"), mid)
+        self.ids_par_role = {r: explicites.get(r, par_nom.get(r)) for r in ROLES}
+        self.ids_par_role = {r: mid for r, mid in self.ids_par_role.items() if mid is not None}
+        self.roles_par_id = {mid: r for r, mid in self.ids_par_role.items()}
+
+    def __repr__(self):
+        return f"<Annuaire {self.ids_par_role}>"
+
+
+_annuaire = None
+_generation = 0  # incrémentée à chaque invalidation : un annuaire lu avant n'est pas publié
+_verrou = threading.Lock()
+
+_CLE_SESSION = "annuaire_a_invalider"     # musiciens écrits dans la transaction en cours
+_CLE_LOCAL = "annuaire_de_la_session"     # annuaire de cette transaction (écritures non validées)
+
+
+def _lire(session) -> Annuaire:
+    return Annuaire(session.query(Musicien.id, Musicien.nom, Musicien.prenom, Musicien.role).all())
+
+
+def _musiciens_ecrits(session) -> bool:
+    """La transaction a-t-elle des écritures de Musicien, déjà envoyées (flush) ou en attente ?"""
+    if session.info.get(_CLE_SESSION):
+        return True
+    return any(isinstance(o, Musicien) for o in (*session.new, *session.dirty, *session.deleted))
+
+
+def annuaire() -> Annuaire:
+    """
+    Annuaire courant (une requête au premier appel puis après chaque invalidation).
+    Une session qui a écrit des musiciens non validés lit le sien, jamais publié aux autres threads.
+    """
+    global _annuaire
+    session = db.session()
+    if _musiciens_ecrits(session):
+        local = session.info.get(_CLE_LOCAL)
+        if local is None:
+            local = _lire(session)  # autoflush : les écritures en attente sont lues aussi
+            session.info[_CLE_LOCAL] = local
+        return local
+
+    courant = _annuaire
+    if courant is not None:
+        return courant
+    with _verrou:
+        if _annuaire is not None:
+            return _annuaire
+        generation = _generation
+    lu = _lire(session)  # aucune écriture de musicien dans cette transaction : données validées
+    with _verrou:
+        if _annuaire is None and generation == _generation:
+            _annuaire = lu
+        return _annuaire or lu
+
+
+def invalider() -> None:
+    global _annuaire, _generation
+    with _verrou:
+        _annuaire = None
+        _generation += 1
+
+
+def id_role(role: str) -> int | None:
+    return annuaire().ids_par_role.get(role)
+
+
+def role_de(musicien_id: int | None) -> str | None:
+    return annuaire().roles_par_id.get(musicien_id)
+
+
+def ids_roles(*roles) -> set:
+    ids = annuaire().ids_par_role
+    return {ids[r] for r in roles if r in ids}
+
+
+def musicien_role(role: str) -> Musicien | None:
+    """Musicien titulaire du rôle (db.session.get : carte d'identité de la session, sinon 1 lecture par PK)."""
+    mid = id_role(role)
+    return db.session.get(Musicien, mid) if mid is not None else None
+
+
+def id_par_nom(nom: str | None) -> int | None:
+    """Id du musicien dont le nom affiché correspond (sans accents ni casse), sinon None."""
+    return annuaire().ids_par_nom.get(normaliser_nom(nom)) if nom else None
+
+
+def resoudre_musicien(valeur) -> Musicien | None:
+    """
+    Musicien désigné par un id (int ou "12") ou par un nom affiché ("Prénom Nom", structure…).
+    Une seule lecture par clé primaire ; aucun parcours de la table.
+    """
+    if valeur is None:
+        return None
+    texte = str(valeur).strip()
+    if not texte:
+        return None
+    ann = annuaire()
+    mid = int(texte) if texte.isdigit() and int(texte) in ann.noms_par_id else ann.ids_par_nom.get(normaliser_nom(texte))
+    return db.session.get(Musicien, mid) if mid is not None else None
+
+
+def est_asso7(musicien_id: int | None) -> bool:
+    return role_de(musicien_id) == ROLE_ASSO7
+
+
+def est_beneficiaire_bonus(musicien_id: int | None) -> bool:
+    return role_de(musicien_id) == ROLE_BONUS
+
+
+# --------------------------- Invalidation ---------------------------
+
+@event.listens_for(db.session, "after_flush")
+def _noter_musiciens_touches(session, flush_context):
+    if any(isinstance(o, Musicien) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_CLE_SESSION] = True
+        session.info.pop(_CLE_LOCAL, None)  # relu à la prochaine recherche de cette session
+
+
+@event.listens_for(db.session, "after_commit")
+def _apres_commit(session):
+    session.info.pop(_CLE_LOCAL, None)
+    if session.info.pop(_CLE_SESSION, False):
+        invalider()  # écritures validées : l'annuaire partagé sera relu
+
+
+@event.listens_for(db.session, "after_rollback")
+def _apres_rollback(session):
+    # rien n'a été validé : l'annuaire partagé reste juste
+    session.info.pop(_CLE_LOCAL, None)
+    session.info.pop(_CLE_SESSION, None)
@@ -0,0 +1,182 @@
+# archives.py
+"""
+Archives des opérations par saison, CHARGÉES À LA DEMANDE.
+
+La page d'une saison ne rend plus que les bandeaux de mois (1 requête agrégée sur la
+colonne Operation.saison : nombre d'opérations par mois) ; chaque bloc mensuel est ensuite lu par la route JSON
+/api/archives_operations/<saison>/<AAAA-MM>, page par page, paginé par CLÉ (date desc, id desc)
+avec le même curseur que la recherche (recherche.curseur).
+
+Les blocs sont gardés en cache par saison, dans le processus web. Le cache d'une saison est
+invalidé au commit de toute écriture qui touche une opération de cette saison (dates avant /
+après modification), et tout le cache quand un libellé affiché change (musicien renommé,
+concert ou lieu modifié). Écritures en masse : appeler marquer_archives_perimees().
+"""
+
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import event, extract, func, inspect, and_, or_
+from sqlalchemy.orm import joinedload
+
+from models import db, Concert, Lieu, Musicien, Operation
+from recherche import curseur, lire_curseur, operation_en_dict
+from saisons import saison_de
+
+LIMITE_BLOC = 100
+LIMITE_BLOC_MAX = 200
+TOUTES = "*"
+
+
+# --------------------------- Mois ---------------------------
+
+def bornes_mois(cle: str) -> tuple:
+    """'2025-03' → (date(2025, 3, 1), date(2025, 3, 31)) ; ValueError si illisible."""
+    try:
+        annee, mois = (int(x) for x in cle.split("-"))
+        premier = date(annee, mois, 1)
+    except (TypeError, ValueError):
+        raise ValueError(f"Mois invalide : {cle}")
+    suivant = (premier.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return premier, suivant - timedelta(days=1)
+
+
+def _operations_archivees(debut, fin):
+    """Mêmes opérations que l'ancienne page : rattachées à un musicien, datées entre debut et fin."""
+    return Operation.query.join(Musicien).filter(Operation.date >= debut, Operation.date <= fin)
+
+
+def mois_de_la_saison(saison: str, jusqu_au) -> list:
+    """
+    Bandeaux de la page : [{cle: 'AAAA-MM', label: 'Mars 2025', nb: 12}, ...] du plus récent
+    au plus ancien, pour les mois de `saison` ('2024/2025') qui ont au moins une opération
+    datée au plus tard `jusqu_au`. Une requête (colonne saison indexée, GROUP BY mois).
+    """
+    from mes_utils import mois_annee_fr  # import local : mes_utils importe ce module
+
+    annee = extract("year", Operation.date)
+    mois = extract("month", Operation.date)
+    lignes = (
+        Operation.query.join(Musicien)
+        .filter(Operation.saison == saison, Operation.date <= jusqu_au)
+        .with_entities(annee, mois, func.count(Operation.id))
+        .group_by(annee, mois)
+        .all()
+    )
+    blocs = []
+    for a, m, nb in sorted(lignes, key=lambda l: (int(l[0]), int(l[1])), reverse=True):
+        premier = date(int(a), int(m), 1)
+        blocs.append({"cle": f"{premier:%Y-%m}", "label": mois_annee_fr(premier), "nb": int(nb)})
+    return blocs
+
+
+# --------------------------- Blocs mensuels (cache) ---------------------------
+
+_cache = {}        # {saison: {(mois, apres, limite): bloc}}
+_jour_cache = None  # `jusqu_au` des blocs en cache : un nouveau jour repart d'un cache vide
+_generation = 0    # incrémentée à chaque invalidation : un bloc calculé avant n'est pas stocké
+_verrou = threading.Lock()
+
+
+def invalider(saisons=None) -> None:
+    """Oublie les blocs des saisons données (toutes si None ou si TOUTES en fait partie)."""
+    global _generation
+    with _verrou:
+        _generation += 1
+        if saisons is None or TOUTES in saisons:
+            _cache.clear()
+        else:
+            for saison in saisons:
+                _cache.pop(saison, None)
+
+
+def bloc_mois(mois: str, jusqu_au, *, apres: str | None = None, limite: int = LIMITE_BLOC) -> dict:
+    """
+    Une page d'un bloc mensuel : {mois, operations: [...], suivant: curseur | None}.
+    Opérations datées du mois et au plus tard `jusqu_au` (aujourd'hui pour les archives).
+    Lève ValueError si le mois ou le curseur est illisible.
+    """
+    debut, fin = bornes_mois(mois)
+    limite = max(1, min(int(limite or LIMITE_BLOC), LIMITE_BLOC_MAX))
+    saison = saison_de(debut)
+    cle = (mois, apres, limite)
+
+    global _jour_cache, _generation
+    with _verrou:
+        if _jour_cache != jusqu_au:
+            _cache.clear()
+            _jour_cache = jusqu_au
+            _generation += 1
+        bloc = _cache.get(saison, {}).get(cle)
+        generation = _generation
+    if bloc is not None:
+        return bloc
+
+    q = _operations_archivees(debut, min(fin, jusqu_au)).options(
+        joinedload(Operation.musicien),
+        joinedload(Operation.concert).joinedload(Concert.lieu_obj),
+    )
+    if apres:
+        jour, op_id = lire_curseur(apres)
+        q = q.filter(or_(Operation.date < jour, and_(Operation.date == jour, Operation.id < op_id)))
+    operations = q.order_by(Operation.date.desc(), Operation.id.desc()).limit(limite + 1).all()
+
+    bloc = {
+        "mois": mois,
+        "operations": [operation_en_dict(op) for op in operations[:limite]],
+        "suivant": curseur(operations[limite - 1]) if len(operations) > limite else None,
+    }
+    with _verrou:
+        if generation == _generation:
+            _cache.setdefault(saison, {})[cle] = bloc
+    return bloc
+
+
+# --------------------------- Invalidation ---------------------------
+
+# Libellés affichés dans les blocs qui ne sont pas portés par l'opération elle-même
+_ATTRS_LIBELLES = {
+    Musicien: ("nom", "prenom"),
+    Concert: ("date", "lieu", "lieu_id", "lieu_obj"),
+    Lieu: ("nom",),
+}
+
+_CLE_SESSION = "archives_saisons_perimees"
+
+
+def marquer_archives_perimees(session, saisons=None) -> None:
+    """Note les saisons (toutes si None) dont le cache sera oublié au prochain commit de `session`."""
+    session.info.setdefault(_CLE_SESSION, set()).update(saisons if saisons is not None else (TOUTES,))
+
+
+def _saisons_operation(op) -> set:
+    dates = {op.date, *(inspect(op).attrs["date"].history.deleted or ())}
+    return {saison_de(d) for d in dates if d is not None}
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_saisons_touchees(session, flush_context):
+    saisons = set()
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        if isinstance(obj, Operation):
+            saisons |= _saisons_operation(obj)
+        elif type(obj) in _ATTRS_LIBELLES and obj not in session.new:
+            etat = inspect(obj)
+            if obj in session.deleted or any(
+                etat.attrs[a].history.has_changes() for a in _ATTRS_LIBELLES[type(obj)]
+            ):
+                saisons.add(TOUTES)
+    if saisons:
+        marquer_archives_perimees(session, saisons)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalider_apres_commit(session):
+    saisons = session.info.pop(_CLE_SESSION, None)
+    if saisons:
+        invalider(saisons)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_apres_rollback(session):
+    session.info.pop(_CLE_SESSION, None)
@@ -0,0 +1,19 @@
+# caches.py
+"""
+Caches de niveau module (un exemplaire par processus), invalidés ensemble.
+
+Chaque module invalide déjà son cache au commit des écritures de SON processus ; un autre
+processus (serveur web ↔ worker de jobs.py) ne le voit pas. vider_caches() repart d'un état
+neuf : début de chaque tâche de fond, changement de base dans les tests.
+"""
+
+
+def vider_caches() -> None:
+    """Annuaire des musiciens, archives par saison, frais par concert."""
+    import annuaire
+    import archives
+    import frais_concerts
+
+    annuaire.invalider()
+    archives.invalider()
+    frais_concerts.invalider()
@@ -1,6 +1,17 @@
 # calcul_participations.py
 
-from models import db, Concert, Participation, Musicien
+from sqlalchemy import bindparam, event, select, update
+
+from annuaire import ROLE_ASSO7, id_role, est_asso7, est_beneficiaire_bonus
+from models import db, Concert, Participation, Musicien, Operation, CATEGORIE_FRAIS
+from monnaie import Money
+from resume_concerts import resume_a_changer, resume_des_credits
+from verrous_concerts import ids_verrouillables, verrou_concerts
+from partage import (
+    ConcertPartage, ParticipantPartage,
+    partage_concert, appliquer_gains_fixes, distributions_par_lots,
+    distribution, frais_effectifs, recette_utilisee,
+)
 
 # --------------------------- Utilitaires ---------------------------
 
@@ -14,14 +25,40 @@ def get_recette_utilisee(concert: Concert) -> float | None:
 
 
 def _is_jerome(m: Musicien) -> bool:
-    n = (m.nom or "").strip().casefold()
-    p = (m.prenom or "").strip().casefold()
-    return n == "arnould" and p.startswith("jérôme")
+    # bénéficiaire du bonus de 10% (rôle explicite, sinon "Jérôme Arnould") — cf. annuaire.py
+    return est_beneficiaire_bonus(m.id)
 
 
 def _is_asso7(m: Musicien) -> bool:
-    # tu utilises un Musicien "ASSO7" (nom ou prénom) comme structure
-    return (m.nom or "").strip().upper() == "ASSO7" or (m.prenom or "").strip().upper() == "ASSO7"
+    # la structure ASSO7 (rôle explicite, sinon nom ou prénom "ASSO7") — cf. annuaire.py
+    return est_asso7(m.id)
+
+
+def concert_partage(concert: Concert, participations=None, musiciens=None) -> ConcertPartage:
+    """
+    Photographie un Concert (et ses participations) en enregistrement pur pour partage.py.
+    participations / musiciens ({id: Musicien}) peuvent être fournis déjà chargés (recalcul par lots) ;
+    sinon on lit la base. Les participations dont le musicien n'existe plus sont ignorées.
+    """
+    if participations is None:
+        participations = Participation.query.filter_by(concert_id=concert.id).all()
+    participants = []
+    for p in participations:
+        m = musiciens.get(p.musicien_id) if musiciens is not None else Musicien.query.get(p.musicien_id)
+        if not m:
+            continue
+        participants.append(ParticipantPartage(
+            p.musicien_id, est_asso7=_is_asso7(m), est_jerome=_is_jerome(m), gain_fixe=p.gain_fixe,
+        ))
+    return ConcertPartage(
+        id=concert.id,
+        recette=concert.recette,
+        recette_attendue=concert.recette_attendue,
+        frais=concert.frais,
+        frais_previsionnels=concert.frais_previsionnels,
+        paye=concert.paye,
+        participants=participants,
+    )
 
 
 # --------------------------- Partage "standard" ---------------------------
@@ -38,97 +75,39 @@ def partage_benefices_concert(concert: Concert):
         print(f"[!] Concert id={concert.id} ignoré (aucune recette/preview)")
         return {}, 0.0, 0.0
 
-    frais = float(concert.frais or 0.0)
-    benefices = recette_utilisee - frais
+    benefices = recette_utilisee - float(concert.frais or 0.0)
     if benefices <= 0:
         print(f"[!] Concert id={concert.id} ignoré (bénéfice négatif ou nul)")
         return {}, 0.0, 0.0
 
-    # participants (objets Participation + Musicien chargés)
-    parts = Participation.query.filter_by(concert_id=concert.id).all()
-    if not parts:
+    # partage "standard" sur les frais réels seuls (sans prévisionnels)
+    enreg = concert_partage(concert)
+    enreg.frais_previsionnels = 0.0
+    resultats, part_asso7, pour_jerome, part_unitaire = partage_concert(enreg)
+    if not enreg.participants:
         return {}, 0.0, 0.0
 
-    musiciens_map = {p.musicien_id: Musicien.query.get(p.musicien_id) for p in parts}
-    presents = [m for m in musiciens_map.values() if m]
-
-    # détection
-    jerome_obj = next((m for m in presents if _is_jerome(m)), None)
-    asso7_obj = next((m for m in presents if _is_asso7(m)), None)
-
-    # 10% pour Jérôme s'il est là
-    pour_jerome = round(benefices * 0.10, 2) if jerome_obj else 0.0
-    reste = benefices - pour_jerome
-
-    # parts égales entre tous les participants "hors ASSO7" + 1 part pour ASSO7
-    nb_participants_hors_asso7 = sum(1 for m in presents if not _is_asso7(m))
-    nb_parts = nb_participants_hors_asso7 + 1  # +1 pour ASSO7
-    part_unitaire = round(reste / nb_parts, 2) if nb_parts else 0.0
-
-    # montants par musicien (hors ASSO7)
-    resultats = {}
-    for mid, m in musiciens_map.items():
-        if _is_asso7(m):
-            continue
-        if jerome_obj and m.id == jerome_obj.id:
-            resultats[mid] = round(part_unitaire + pour_jerome, 2)
-        else:
-            resultats[mid] = part_unitaire
-
-    # Bouclage EXACT : la part d'ASSO7 absorbe le reliquat d'arrondi (quelques centimes),
-    # de sorte que somme(musiciens) + part_asso7 == bénéfices (aucun centime perdu/créé).
-    total_musiciens = round(sum(resultats.values()), 2)
-    part_asso7 = round(benefices - total_musiciens, 2)
-
     print(f"[✓] Concert id={concert.id} → part={part_unitaire}, asso7={part_asso7}, jerome={pour_jerome}, total_benef={benefices}")
     return resultats, part_asso7, pour_jerome
 
 
-# calcul_participations.py
-
-from models import db  # <-- on utilise no_autoflush pour éviter tout flush accidentel
-
 def _build_base_distribution(concert: Concert) -> dict:
     """
     Construit un dict de référence:
        { <musicien_id:int>: montant, "ASSO7": montant }
     à partir du partage standard.
 
-    NEW: si le concert N'EST PAS payé, on inclut les frais_previsionnels
-    dans les frais pris en compte pour le calcul de partage (gains fixes gérés ailleurs).
+    Si le concert N'EST PAS payé, les frais_previsionnels s'ajoutent aux frais
+    pris en compte (gains fixes gérés ailleurs). Calcul pur : concert.frais n'est
+    jamais modifié, donc aucun risque d'autoflush d'une valeur temporaire.
     """
-    # --- frais effectifs = frais réels + (frais prévisionnels si non payé) ---
-    try:
-        frais_prev = float(getattr(concert, "frais_previsionnels", 0.0) or 0.0) if not getattr(concert, "paye", False) else 0.0
-        if frais_prev < 0:
-            frais_prev = 0.0
-    except Exception:
-        frais_prev = 0.0
-
-    # On calcule les crédits en surclassant temporairement concert.frais
-    original_frais = float(concert.frais or 0.0)
-    if frais_prev > 0.0:
-        effective_frais = original_frais + frais_prev
-        # Pas d'écriture en DB: no_autoflush + restauration dans le finally
-        with db.session.no_autoflush:
-            try:
-                concert.frais = effective_frais
-                credits_musiciens, part_asso7, _bonus_j = partage_benefices_concert(concert)
-            finally:
-                concert.frais = original_frais  # on restaure
-    else:
-        credits_musiciens, part_asso7, _bonus_j = partage_benefices_concert(concert)
+    enreg = concert_partage(concert, participations=concert.participations)
+    credits_musiciens, part_asso7, _bonus_j, _unit = partage_concert(enreg)
 
     base = {"ASSO7": float(part_asso7 or 0.0)}
     # inclure uniquement les participations présentes (y compris ASSO7)
-    for p in concert.participations:
-        m = Musicien.query.get(p.musicien_id)
-        if not m:
-            continue
-        if _is_asso7(m):
-            # la clé réservée pour la structure
-            base["ASSO7"] = float(part_asso7 or 0.0)
-        else:
+    for p in enreg.participants:
+        if not p.est_asso7:
             base[p.musicien_id] = float(credits_musiciens.get(p.musicien_id, 0.0))
     return base
 
@@ -143,7 +122,7 @@ def _collect_overrides(concert_id: int) -> dict:
         m = Musicien.query.get(p.musicien_id)
         if not m:
             continue
-        key = "ASSO7" if (m.nom or "").strip().upper() == "ASSO7" or (m.prenom or "").strip().upper() == "ASSO7" else p.musicien_id
+        key = "ASSO7" if _is_asso7(m) else p.musicien_id
         overrides[key] = float(p.gain_fixe)
     print(f"[FIXES] overrides lus pour concert {concert_id} :", overrides)  # ⬅️ ajout
     return overrides
@@ -154,6 +133,7 @@ def _appliquer_gains_fixes(concert_id: int, parts: dict) -> dict:
     parts: { <musicien_id:int>: montant, 'ASSO7': montant }
     Applique les montants fixés et redistribue proportionnellement
     le reste entre les non-fixés (y compris ASSO7 si non fixé).
+    (règle dans partage.appliquer_gains_fixes)
     """
     if not parts:
         return parts
@@ -162,44 +142,10 @@ def _appliquer_gains_fixes(concert_id: int, parts: dict) -> dict:
     if not overrides:
         return parts
 
-    # cast -> float
-    parts = {k: float(v or 0.0) for k, v in parts.items()}
-    total_net = sum(parts.values())
-
-    # somme des fixes qui ciblent uniquement des clés existantes
+    adjusted = appliquer_gains_fixes(parts, overrides)
+    total_net = sum(float(v or 0.0) for v in parts.values())
     somme_fixes = sum(v for k, v in overrides.items() if k in parts)
-
-    if somme_fixes > total_net + 1e-6:
-        raise ValueError("La somme des gains fixés dépasse le total disponible.")
-
-    # clés qui restent à répartir (toutes celles qui ne sont pas fixées)
-    rest_keys = [k for k in parts.keys() if k not in overrides]
-    base_rest_sum = sum(parts[k] for k in rest_keys)
-    reste_a_repartir = total_net - somme_fixes
-
-    adjusted = {}
-
-    # 1) appliquer fixes
-    for k, v in overrides.items():
-        if k in parts:
-            adjusted[k] = float(v)
-
-    # 2) redistribuer le reste proportionnellement aux parts "de base"
-    if base_rest_sum <= 0:
-        # tout ce qui reste va à ASSO7 si présent
-        for k in rest_keys:
-            adjusted[k] = 0.0
-        if "ASSO7" in parts:
-            adjusted["ASSO7"] = adjusted.get("ASSO7", 0.0) + reste_a_repartir
-    else:
-        for k in rest_keys:
-            poids = parts[k] / base_rest_sum
-            adjusted[k] = reste_a_repartir * poids
-
-    # (optionnel) arrondir au centime
-    adjusted = {k: round(v, 2) for k, v in adjusted.items()}
-
-    print(f"[FIXES] overrides={overrides} | total={total_net} | somme_fixes={somme_fixes} | reste={reste_a_repartir}")
+    print(f"[FIXES] overrides={overrides} | total={total_net} | somme_fixes={somme_fixes} | reste={total_net - somme_fixes}")
     return adjusted
 
 
@@ -207,12 +153,12 @@ def _appliquer_gains_fixes(concert_id: int, parts: dict) -> dict:
 
 def _assurer_part_asso7(concert: Concert) -> None:
     """Ajoute automatiquement une participation ASSO7 si la structure existe mais n'est pas présente."""
-    asso7 = Musicien.query.filter(Musicien.nom.ilike("ASSO7")).first()
-    if not asso7:
+    asso7_id = id_role(ROLE_ASSO7)
+    if asso7_id is None:
         return
-    if any(p.musicien_id == asso7.id for p in concert.participations):
+    if any(p.musicien_id == asso7_id for p in concert.participations):
         return
-    nouvelle_part = Participation(concert_id=concert.id, musicien_id=asso7.id)
+    nouvelle_part = Participation(concert_id=concert.id, musicien_id=asso7_id)
     db.session.add(nouvelle_part)
     concert.participations.append(nouvelle_part)
     print(f"[+] Participation ajoutée pour ASSO7 au concert id={concert.id}")
@@ -222,7 +168,9 @@ def _write_parts(concert: Concert, parts_final: dict, *, to_field: str) -> None:
     """
     Écrit les parts dans Participation.<to_field>.
     to_field ∈ {"credit_calcule", "credit_calcule_potentiel"}.
+    Met aussi à jour le résumé du concert (cf. resume_concerts.py).
     """
+    credits = []
     for part in concert.participations:
         m = Musicien.query.get(part.musicien_id)
         if not m:
@@ -236,24 +184,29 @@ def _write_parts(concert: Concert, parts_final: dict, *, to_field: str) -> None:
             part.credit_calcule_potentiel = value
 
         db.session.add(part)
+        credits.append((part.musicien_id, value))
+
+    for champ, valeur in resume_des_credits(credits, id_role(ROLE_ASSO7)).items():
+        setattr(concert, champ, valeur)
 
 
 # --------------------------- API appelées par les routes ---------------------------
 
 def mettre_a_jour_credit_calcule(concert: Concert) -> None:
     """Remplit credit_calcule selon le partage standard (utilisé lors du paiement)."""
-    credits, credit_asso7, _ = partage_benefices_concert(concert)
-    for part in concert.participations:
-        m = Musicien.query.get(part.musicien_id)
-        if not m:
-            continue
-        if _is_asso7(m):
-            part.credit_calcule = float(credit_asso7 or 0.0)
-        else:
-            part.credit_calcule = float(credits.get(part.musicien_id, 0.0))
-        print(f"[✓] crédit réel → participation id={part.id} → {part.credit_calcule:.2f}")
-        db.session.add(part)
-    db.session.commit()
+    with verrou_concerts([concert.id]):
+        credits, credit_asso7, _ = partage_benefices_concert(concert)
+        for part in concert.participations:
+            m = Musicien.query.get(part.musicien_id)
+            if not m:
+                continue
+            if _is_asso7(m):
+                part.credit_calcule = float(credit_asso7 or 0.0)
+            else:
+                part.credit_calcule = float(credits.get(part.musicien_id, 0.0))
+            print(f"[✓] crédit réel → participation id={part.id} → {part.credit_calcule:.2f}")
+            db.session.add(part)
+        db.session.commit()
 
 
 def mettre_a_jour_credit_calcule_reel_pour_concert(concert_id: int) -> None:
@@ -264,25 +217,26 @@ def mettre_a_jour_credit_calcule_reel_pour_concert(concert_id: int) -> None:
     - applique les fixes
     - écrit dans credit_calcule
     """
-    db.session.expire_all()
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        print(f"[!] Concert id={concert_id} introuvable.")
-        return
+    with verrou_concerts([concert_id]):
+        db.session.expire_all()
+        concert = Concert.query.get(concert_id)
+        if not concert:
+            print(f"[!] Concert id={concert_id} introuvable.")
+            return
 
-    _assurer_part_asso7(concert)
+        _assurer_part_asso7(concert)
 
-    # Distribution de base + fixes
-    base = _build_base_distribution(concert)
-    final = _appliquer_gains_fixes(concert.id, base)
+        # Distribution de base + fixes
+        base = _build_base_distribution(concert)
+        final = _appliquer_gains_fixes(concert.id, base)
 
-    # Zéro le potentiel et écris le réel
-    for part in concert.participations:
-        part.credit_calcule_potentiel = 0.0
-        db.session.add(part)
-    _write_parts(concert, final, to_field="credit_calcule")
-    db.session.commit()
-    print(f"[✓] Réel ajusté écrit pour concert id={concert.id}")
+        # Zéro le potentiel et écris le réel
+        for part in concert.participations:
+            part.credit_calcule_potentiel = 0.0
+            db.session.add(part)
+        _write_parts(concert, final, to_field="credit_calcule")
+        db.session.commit()
+        print(f"[✓] Réel ajusté écrit pour concert id={concert.id}")
 
 
 def mettre_a_jour_credit_calcule_potentiel_pour_concert(concert_id: int) -> None:
@@ -292,60 +246,58 @@ def mettre_a_jour_credit_calcule_potentiel_pour_concert(concert_id: int) -> None
     """
     from models import Musicien  # import local pour éviter les imports circulaires
 
-    db.session.expire_all()
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        print(f"[!] Concert id={concert_id} introuvable.")
-        return
+    with verrou_concerts([concert_id]):
+        db.session.expire_all()
+        concert = Concert.query.get(concert_id)
+        if not concert:
+            print(f"[!] Concert id={concert_id} introuvable.")
+            return
 
-    _assurer_part_asso7(concert)
+        _assurer_part_asso7(concert)
 
-    if concert.paye:
-        # si déjà payé, calcule le réel
-        mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
-        return
+        if concert.paye:
+            # si déjà payé, calcule le réel
+            mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
+            return
 
-    # --- NON PAYÉ ---
-    # 1) Construire la distribution de base en tenant compte des frais prévisionnels
-    #    (sans modifier la base : surcharge en mémoire pendant le partage)
-    credits_musiciens, part_asso7, _bonus_j = _partage_with_previsionnels_if_needed(concert)
+        # --- NON PAYÉ ---
+        # 1) Distribution de base, frais prévisionnels inclus (calcul pur, rien n'est modifié)
+        base = _build_base_distribution(concert)
 
-    base = {"ASSO7": float(part_asso7 or 0.0)}
-    for p in concert.participations:
-        m = Musicien.query.get(p.musicien_id)
-        if not m:
-            continue
-        if _is_asso7(m):
-            base["ASSO7"] = float(part_asso7 or 0.0)
-        else:
-            base[p.musicien_id] = float(credits_musiciens.get(p.musicien_id, 0.0))
-
-    # 2) Appliquer les gains fixes/ajustements
-    final = _appliquer_gains_fixes(concert.id, base)
+        # 2) Appliquer les gains fixes/ajustements
+        final = _appliquer_gains_fixes(concert.id, base)
 
-    # 3) Reset du "réel" par précaution
-    for part in concert.participations:
-        part.credit_calcule = 0.0
-        db.session.add(part)
+        # 3) Reset du "réel" par précaution
+        for part in concert.participations:
+            part.credit_calcule = 0.0
+            db.session.add(part)
 
-    # 4) Écrire le potentiel
-    _write_parts(concert, final, to_field="credit_calcule_potentiel")
-    db.session.commit()
-    print(f"[✓] Potentiel ajusté (frais + prévisionnels) écrit pour concert id={concert.id}")
+        # 4) Écrire le potentiel
+        _write_parts(concert, final, to_field="credit_calcule_potentiel")
+        db.session.commit()
+        print(f"[✓] Potentiel ajusté (frais + prévisionnels) écrit pour concert id={concert.id}")
 
 # -------------------------------------------------------------------
 # Recalc global (compat avec l'ancien import dans mes_utils.py)
 # -------------------------------------------------------------------
 
-def mettre_a_jour_credit_calcule_potentiel() -> None:
+def mettre_a_jour_credit_calcule_potentiel(*, par_lots: bool = True) -> None:
     """
     Back-compat: recalcul global attendu par mes_utils.py
       - Concerts NON PAYÉS  -> écrit POTENTIEL ajusté
       - Concerts PAYÉS      -> écrit RÉEL ajusté (et remet POTENTIEL à 0)
 
+    Par défaut, passe par recalculer_credits_par_lots() (3 requêtes de lecture par lot,
+    écritures groupées). par_lots=False conserve l'ancienne boucle concert par concert.
+
     Robustesse : ignore les concerts qui lèvent une ValueError (ex: gains fixés > total)
     et continue avec les autres ; loggue les erreurs inattendues.
     """
+    if par_lots:
+        db.session.info.pop(_CLE_A_RECALCULER, None)
+        recalculer_credits_par_lots()
+        return
+
     import logging
     from models import Concert  # import local pour éviter d’éventuels cycles
 
@@ -376,27 +328,419 @@ def mettre_a_jour_credit_calcule_potentiel() -> None:
     print("✅ Mise à jour des crédits potentiels et réels terminée.")
 
 
+# -------------------------------------------------------------------
+# Recalc global PAR LOTS (tout en mémoire, écritures groupées)
+# -------------------------------------------------------------------
+
+TAILLE_LOT_RECALCUL = 200  # concerts par lot (= par commit, sous le verrou de ces concerts)
+ESSAIS_LOT = 3             # relectures d'un lot modifié entre sa lecture et son écriture
+
+_participations = Participation.__table__
+
+# compare-et-échange : la ligne n'est réécrite que si ses crédits sont encore ceux qui ont été lus
+_CAS_PARTICIPATION = (
+    _participations.update()
+    .where(
+        _participations.c.id == bindparam("p_id"),
+        _participations.c.credit_calcule.is_not_distinct_from(
+            bindparam("lu_reel", type_=_participations.c.credit_calcule.type)),
+        _participations.c.credit_calcule_potentiel.is_not_distinct_from(
+            bindparam("lu_potentiel", type_=_participations.c.credit_calcule_potentiel.type)),
+    )
+    .values(
+        credit_calcule=bindparam("reel", type_=_participations.c.credit_calcule.type),
+        credit_calcule_potentiel=bindparam("potentiel", type_=_participations.c.credit_calcule_potentiel.type),
+    )
+)
+
+
+def _empreinte(concerts, participations) -> tuple:
+    """Données de partage d'un lot, telles que lues (objets chargés)."""
+    return (
+        sorted((c.id, c.paye, c.recette, c.recette_attendue, c.frais, c.frais_previsionnels) for c in concerts),
+        sorted((p.id, p.concert_id, p.musicien_id, p.gain_fixe, p.cloture_saison) for p in participations),
+    )
+
+
+def _empreinte_en_base(concert_ids) -> tuple:
+    """Même empreinte, relue en base dans la transaction en cours."""
+    concerts = db.session.execute(
+        select(Concert.id, Concert.paye, Concert.recette, Concert.recette_attendue, Concert.frais,
+               Concert.frais_previsionnels)
+        .where(Concert.id.in_(concert_ids), Concert.paye.isnot(None))
+    ).all()
+    participations = db.session.execute(
+        select(Participation.id, Participation.concert_id, Participation.musicien_id, Participation.gain_fixe,
+               Participation.cloture_saison)
+        .where(Participation.concert_id.in_(concert_ids))
+    ).all()
+    return sorted(tuple(r) for r in concerts), sorted(tuple(r) for r in participations)
+
+
+def _recalculer_lot(concert_ids: list, valider: bool, logger):
+    """
+    Un lot de recalculer_credits_par_lots, appelé SOUS le verrou de ses concerts.
+    Renvoie (participations réécrites, {concert_id: ValueError}), ou None si un autre processus a
+    modifié le lot entre sa lecture et son écriture (tout est annulé, le lot est à relire).
+    """
+    from soldes import marquer_soldes_a_rafraichir  # import local pour éviter les cycles
+
+    # 1) Lectures (3 requêtes)
+    concerts = (Concert.query.filter(Concert.id.in_(concert_ids), Concert.paye.isnot(None))
+                .order_by(Concert.id).all())
+    participations = (Participation.query.filter(Participation.concert_id.in_(concert_ids))
+                      .order_by(Participation.id).all())
+    musiciens = {m.id: m for m in Musicien.query.all()}
+
+    parts_par_concert = {}
+    for p in participations:
+        parts_par_concert.setdefault(p.concert_id, []).append(p)
+
+    # 2) Participation ASSO7 automatique (cf. _assurer_part_asso7)
+    asso7_id = id_role(ROLE_ASSO7)
+    nouvelles = []
+    if asso7_id in musiciens:
+        for c in concerts:
+            liste = parts_par_concert.setdefault(c.id, [])
+            if not any(p.musicien_id == asso7_id for p in liste):
+                nouvelle_part = Participation(concert_id=c.id, musicien_id=asso7_id)
+                liste.append(nouvelle_part)
+                nouvelles.append(nouvelle_part)
+        if nouvelles:
+            db.session.add_all(nouvelles)
+            db.session.flush()  # attribue les id ; commit avec le lot
+            print(f"[+] Participation ASSO7 ajoutée à {len(nouvelles)} concert(s)")
+    lu = _empreinte(concerts, [*participations, *nouvelles])
+
+    # 3) Calcul en mémoire de tout le lot avant la première écriture
+    enregs = [concert_partage(c, parts_par_concert.get(c.id, []), musiciens) for c in concerts]
+    distributions, erreurs = distributions_par_lots(enregs)
+
+    lignes, resumes, touches = [], [], set()
+    for c in concerts:
+        parts = [p for p in parts_par_concert.get(c.id, []) if p.musicien_id in musiciens]
+        if c.id in erreurs:
+            logger.warning("Recalc %s ignoré (concert %s) : %s",
+                           "RÉEL" if c.paye else "POTENTIEL", c.id, erreurs[c.id])
+            final = None
+        else:
+            final = distributions[c.id]
+
+        credits = []
+        for p in parts:
+            actuel = p.credit_calcule if c.paye else p.credit_calcule_potentiel
+            if final is None or p.cloture_saison is not None:
+                credits.append((p.musicien_id, actuel or 0.0))  # crédit laissé tel quel
+                continue  # (clôture : crédit figé par la clôture de sa saison, cf. clotures.py)
+            valeur = float(final.get("ASSO7" if p.musicien_id == asso7_id else p.musicien_id, 0.0))
+            credits.append((p.musicien_id, valeur))
+            reel, potentiel = (valeur, 0.0) if c.paye else (0.0, valeur)
+            if p.credit_calcule == reel and p.credit_calcule_potentiel == potentiel:
+                continue
+            lignes.append({"p_id": p.id, "reel": reel, "potentiel": potentiel,
+                           "lu_reel": p.credit_calcule, "lu_potentiel": p.credit_calcule_potentiel})
+            touches.add(p.musicien_id)
+
+        # Résumé du concert (cf. resume_concerts.py), écrit dans le même commit que ses crédits
+        resume = resume_des_credits(credits, asso7_id)
+        if resume_a_changer(c, resume):
+            resumes.append({"id": c.id, **resume})
+
+    # 4) UPDATE groupé (une instruction par table), puis commit du lot
+    if resumes:
+        db.session.execute(update(Concert), resumes)
+    if lignes:
+        if valider:
+            resultat = db.session.execute(_CAS_PARTICIPATION, lignes)
+            if resultat.supports_sane_multi_rowcount() and resultat.rowcount != len(lignes):
+                db.session.rollback()  # crédits réécrits entre-temps par une route
+                return None
+        else:
+            # transaction de l'appelant, qui tient déjà le verrou de ces concerts
+            db.session.execute(update(Participation), [
+                {"id": l["p_id"], "credit_calcule": l["reel"], "credit_calcule_potentiel": l["potentiel"]}
+                for l in lignes
+            ])
+        # l'UPDATE groupé ne passe pas par le flush : prévenir le grand livre
+        marquer_soldes_a_rafraichir(db.session, touches)
+    if valider:
+        if (lignes or resumes or nouvelles) and _empreinte_en_base(concert_ids) != lu:
+            # SQLite : nos écritures tiennent le verrou de la base, l'empreinte relue ne bougera plus
+            db.session.rollback()
+            return None
+        db.session.commit()
+    return len(lignes), erreurs
+
+
+def recalculer_credits_par_lots(taille_lot: int = TAILLE_LOT_RECALCUL, concert_ids=None, progression=None,
+                                valider: bool = True) -> dict:
+    """
+    Recalcul global (potentiel des non payés, réel des payés), par lots de `taille_lot` concerts.
+    Chaque lot est lu (3 requêtes : concerts, participations, musiciens), calculé en mémoire puis
+    écrit par UPDATE groupé et validé (un commit par lot), le tout SOUS le verrou de ses concerts
+    (verrous_concerts.py). Seules les participations dont la valeur change sont réécrites.
+    concert_ids : restreint le recalcul à ces concerts (None = tous).
+    progression : callback optionnel (fraction 0..1, message) appelé après chaque lot (cf. jobs.py).
+    valider=False : aucun commit, tout reste dans la transaction de l'appelant (qui valide ou annule).
+
+    Le worker de jobs.py est un autre processus que le serveur web : le verrou en mémoire ne les
+    sérialise pas. Sous Postgres, le FOR UPDATE du verrou suffit ; sur SQLite (pas de verrou de
+    ligne), chaque crédit n'est réécrit que s'il vaut encore ce qui a été lu, et les données de
+    partage du lot sont relues avant le commit. Si une route a validé autre chose entre-temps,
+    le lot est annulé puis relu (ESSAIS_LOT fois) : jamais de crédits calculés sur un état périmé.
+
+    Mêmes règles et même remontée d'erreurs que la boucle concert par concert :
+    un concert en erreur est journalisé et laissé tel quel, les autres continuent.
+    Renvoie {concert_id: ValueError} pour les concerts ignorés.
+    """
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+    q_concerts = db.session.query(Concert.id, Concert.paye).filter(Concert.paye.isnot(None))
+    if concert_ids is not None:
+        concert_ids = sorted({int(cid) for cid in concert_ids})
+        if not concert_ids:
+            return {}
+        q_concerts = q_concerts.filter(Concert.id.in_(concert_ids))
+    concerts = q_concerts.order_by(Concert.id).all()
+    ids = [cid for cid, _paye in concerts]
+
+    non_payes = sum(1 for _cid, paye in concerts if not paye)
+    if concert_ids is None:
+        print(f"\n🔍 Concerts non payés : {non_payes}")
+        print(f"💰 Concerts payés : {len(concerts) - non_payes}")
+    else:
+        print(f"🔁 Recalcul ciblé : {non_payes} non payé(s), {len(concerts) - non_payes} payé(s) → {concert_ids}")
+
+    erreurs, total_ecrites = {}, 0
+    for debut in range(0, len(ids), taille_lot):
+        lot = ids[debut:debut + taille_lot]
+        for _essai in range(ESSAIS_LOT if valider else 1):
+            with verrou_concerts(lot):  # relu sous le verrou : dernier état validé de ces concerts
+                resultat = _recalculer_lot(lot, valider, logger)
+            if resultat is not None:
+                ecrites, erreurs_lot = resultat
+                total_ecrites += ecrites
+                erreurs.update(erreurs_lot)
+                break
+            print(f"[!] Lot {lot[0]}…{lot[-1]} modifié pendant son recalcul : relecture")
+        else:
+            # toujours modifié : c'est l'écrivain concurrent qui a recalculé ces concerts
+            logger.warning("Recalc du lot %s…%s abandonné après %s essais (écritures concurrentes)",
+                           lot[0], lot[-1], ESSAIS_LOT)
+        if progression:
+            fait = min(debut + taille_lot, len(ids))
+            progression(fait / len(ids), f"{fait}/{len(ids)} concerts recalculés")
+
+    print(f"✅ Mise à jour des crédits potentiels et réels terminée ({total_ecrites} participation(s) modifiée(s)).")
+    return erreurs
+
+
 def _partage_with_previsionnels_if_needed(concert):
     """
-    Utilise 'frais + frais_previsionnels' pour le calcul POTENTIEL
-    (uniquement si le concert N'EST PAS payé), en se reposant sur
-    la fonction existante 'partage_benefices_concert(concert)'.
+    Partage 'frais + frais_previsionnels' pour le calcul POTENTIEL
+    (uniquement si le concert N'EST PAS payé ; sinon frais réels seuls).
+    Calcul pur sur un enregistrement : concert.frais n'est plus surchargé en mémoire.
+    """
+    resultats, part_asso7, pour_jerome, _unit = partage_concert(concert_partage(concert))
+    return resultats, part_asso7, pour_jerome
+
+
+# -------------------------------------------------------------------
+# Simulation "et si…" (lecture seule : aucune écriture, aucun flush)
+# -------------------------------------------------------------------
+
+_INCHANGE = object()
+
+
+def simuler_partage(concert: Concert, *, recette=_INCHANGE, recette_attendue=_INCHANGE, frais=_INCHANGE,
+                    frais_previsionnels=_INCHANGE, paye=_INCHANGE, musicien_ids=None,
+                    gains_fixes=None) -> dict:
+    """
+    Distribution qu'aurait le concert avec d'autres valeurs, calculée en mémoire par partage.py.
+      - recette, recette_attendue, frais, frais_previsionnels, paye : remplacent ceux du concert
+        (paramètre absent = valeur actuelle),
+      - musicien_ids : ensemble hypothétique de participants (None = participations actuelles),
+      - gains_fixes  : {musicien_id: montant ou None} remplace le gain fixé de ces musiciens.
+    Ni le concert ni ses participations ne sont modifiés (pas d'autoflush pendant les lectures).
+    Lève ValueError si les gains fixés dépassent le total (comme le recalcul).
+    """
+    gains_fixes = gains_fixes or {}
+    with db.session.no_autoflush:
+        participations = Participation.query.filter_by(concert_id=concert.id).all()
+        fixes_actuels = {p.musicien_id: p.gain_fixe for p in participations}
+        ids = list(fixes_actuels) if musicien_ids is None else list(dict.fromkeys(int(i) for i in musicien_ids))
+        musiciens = {m.id: m for m in Musicien.query.filter(Musicien.id.in_(ids)).all()} if ids else {}
+
+    participants = []
+    for mid in ids:
+        m = musiciens.get(mid)
+        if not m:
+            continue
+        gain = gains_fixes[mid] if mid in gains_fixes else fixes_actuels.get(mid)
+        participants.append(ParticipantPartage(mid, est_asso7=_is_asso7(m), est_jerome=_is_jerome(m), gain_fixe=gain))
+
+    record = concert_partage(concert, participations=[], musiciens={})
+    record.participants = participants
+    if recette is not _INCHANGE:
+        record.recette = None if recette is None else float(recette)
+    if recette_attendue is not _INCHANGE:
+        record.recette_attendue = None if recette_attendue is None else float(recette_attendue)
+    if frais is not _INCHANGE:
+        record.frais = float(frais or 0.0)
+    if frais_previsionnels is not _INCHANGE:
+        record.frais_previsionnels = float(frais_previsionnels or 0.0)
+    if paye is not _INCHANGE:
+        record.paye = bool(paye)
+
+    recette_retenue = recette_utilisee(record)
+    frais_retenus = frais_effectifs(record)
+    return {
+        "recette_utilisee": recette_retenue,
+        "frais_effectifs": frais_retenus,
+        "benefices": None if recette_retenue is None else (Money.de(recette_retenue) - Money.de(frais_retenus)).euros,
+        "paye": record.paye,
+        "distribution": distribution(record),
+    }
 
-    ⚠️ Ne modifie rien en base : on change 'concert.frais' en mémoire
-    pendant le calcul, puis on le restaure.
+
+# -------------------------------------------------------------------
+# Concerts "à recalculer" : suivi par événements, recalcul groupé en fin de requête
+# -------------------------------------------------------------------
+#
+# Les écritures qui changent le partage d'un concert marquent ce concert :
+#   - Participation : ajout / suppression / changement de concert, musicien ou gain_fixe,
+#   - Operation     : opérations de frais rattachées à un concert,
+#   - Concert       : création, recette, recette_attendue, frais, frais_previsionnels, paye.
+# Les marques posées au flush ne sont retenues qu'une fois la transaction validée
+# (un rollback les oublie). App.py recalcule le tout en un lot dans after_request ;
+# une route qui a besoin du résultat tout de suite appelle recalculer_concerts_marques().
+
+_CLE_EN_ATTENTE = "concerts_marques_non_valides"
+_CLE_A_RECALCULER = "concerts_a_recalculer"
+_CLE_RECALCUL_EN_COURS = "recalcul_concerts_en_cours"
+
+_ATTRS_CONCERT = ("recette", "recette_attendue", "frais", "frais_previsionnels", "paye")
+_ATTRS_PARTICIPATION = ("concert_id", "musicien_id", "gain_fixe")
+_ATTRS_OPERATION = ("concert_id", "categorie", "sens", "montant", "previsionnel")
+
+
+def _valeurs_attr(obj, attr: str) -> set:
+    """Valeur actuelle + anciennes valeurs (historique du flush) d'un attribut."""
+    from sqlalchemy import inspect
+    hist = inspect(obj).attrs[attr].history
+    valeurs = set(hist.added or ()) | set(hist.deleted or ()) | set(hist.unchanged or ())
+    valeurs.add(getattr(obj, attr, None))
+    return valeurs
+
+
+def _a_change(obj, attrs) -> bool:
+    from sqlalchemy import inspect
+    etat = inspect(obj)
+    return any(etat.attrs[a].history.has_changes() for a in attrs)
+
+
+def _concerts_touches(obj, nouveau_ou_supprime: bool) -> set:
+    if isinstance(obj, Concert):
+        if nouveau_ou_supprime or _a_change(obj, _ATTRS_CONCERT):
+            return {obj.id}
+        return set()
+
+    if isinstance(obj, Participation):
+        if nouveau_ou_supprime or _a_change(obj, _ATTRS_PARTICIPATION):
+            return _valeurs_attr(obj, "concert_id")
+        return set()
+
+    if isinstance(obj, Operation):
+        if CATEGORIE_FRAIS not in _valeurs_attr(obj, "categorie"):
+            return set()
+        if nouveau_ou_supprime or _a_change(obj, _ATTRS_OPERATION):
+            return _valeurs_attr(obj, "concert_id")
+    return set()
+
+
+def marquer_concerts_a_recalculer(session, concert_ids) -> None:
+    """Marque explicitement des concerts (écritures groupées qui ne passent pas par le flush)."""
+    ids = {int(cid) for cid in concert_ids if cid}
+    if ids:
+        session.info.setdefault(_CLE_EN_ATTENTE, set()).update(ids)
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_concerts_touches(session, flush_context):
+    if session.info.get(_CLE_RECALCUL_EN_COURS):
+        return  # nos propres écritures (ex: participation ASSO7 ajoutée) ne re-marquent rien
+    ids = set()
+    for obj in session.new:
+        ids |= _concerts_touches(obj, True)
+    for obj in session.deleted:
+        if not isinstance(obj, Concert):  # un concert supprimé n'a plus rien à recalculer
+            ids |= _concerts_touches(obj, True)
+    for obj in session.dirty:
+        ids |= _concerts_touches(obj, False)
+    marquer_concerts_a_recalculer(session, ids)
+
+
+@event.listens_for(db.session, "after_commit")
+def _valider_concerts_marques(session):
+    ids = session.info.pop(_CLE_EN_ATTENTE, None)
+    if ids:
+        session.info.setdefault(_CLE_A_RECALCULER, set()).update(ids)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_concerts_marques(session):
+    session.info.pop(_CLE_EN_ATTENTE, None)
+
+
+def concerts_a_recalculer() -> set:
+    """Concerts marqués par des écritures déjà validées et pas encore recalculés."""
+    return set(db.session.info.get(_CLE_A_RECALCULER, ()))
+
+
+def recalculer_concerts_marques() -> dict:
     """
-    from models import Concert  # pour éviter les imports circulaires
-    # Concert payé -> on ne touche à rien
-    if bool(getattr(concert, "paye", False)):
-        return partage_benefices_concert(concert)
+    Recalcule en UN lot les concerts marqués par les commits précédents.
+    Sous le verrou d'une route, les concerts qui ne peuvent pas être verrouillés dans l'ordre des id
+    restent marqués (recalculés en fin de requête, hors verrou).
+    Renvoie {concert_id: ValueError} pour les concerts ignorés (ex: gains fixés > total).
+    """
+    ids = db.session.info.pop(_CLE_A_RECALCULER, None)
+    if not ids:
+        return {}
+    plus_tard = ids - ids_verrouillables(ids)
+    if plus_tard:
+        db.session.info[_CLE_A_RECALCULER] = plus_tard
+        ids = ids - plus_tard
+        if not ids:
+            return {}
+    db.session.info[_CLE_RECALCUL_EN_COURS] = True
+    try:
+        with verrou_concerts(ids):  # relus sous le verrou : dernier état validé de chaque concert
+            return recalculer_credits_par_lots(concert_ids=ids)
+    finally:
+        db.session.info.pop(_CLE_RECALCUL_EN_COURS, None)
 
-    frais_orig = float(concert.frais or 0.0)
+
+def recalculer_concerts_dans_la_transaction(concert_ids) -> dict:
+    """
+    Recalcule `concert_ids` tout de suite, SANS commit : les écritures en cours qui les ont marqués
+    et leurs nouveaux crédits partent dans le même commit (ou le même rollback) de l'appelant.
+    Ces concerts ne sont pas recalculés une seconde fois en fin de requête.
+    Renvoie {concert_id: ValueError} pour les concerts dont le partage est impossible.
+    """
+    ids = {int(cid) for cid in concert_ids if cid}
+    if not ids:
+        return {}
+    db.session.flush()  # pose les marques des écritures en cours… qu'on retire aussitôt
+    db.session.info.get(_CLE_EN_ATTENTE, set()).difference_update(ids)
+    db.session.info[_CLE_RECALCUL_EN_COURS] = True
     try:
-        frais_prev = float(getattr(concert, "frais_previsionnels", 0.0) or 0.0)
-        concert.frais = frais_orig + frais_prev  # surcharge en mémoire
-        return partage_benefices_concert(concert)
+        with verrou_concerts(ids):  # normalement déjà tenu par l'appelant (réentrant)
+            return recalculer_credits_par_lots(concert_ids=ids, valider=False)
     finally:
-        concert.frais = frais_orig  # RESTAURATION systématique
+        db.session.info.pop(_CLE_RECALCUL_EN_COURS, None)
 
 
 # -------------------------------------------------------------------
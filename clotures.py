@@ -0,0 +1,306 @@
+# clotures.py
+"""
+CLÔTURE DE SAISON : l'historique d'une saison terminée est reporté dans des lignes Report.
+
+Pour chaque compte, le solde réel au 31 août (participations des concerts payés + opérations
+passées non prévisionnelles + reports encore actifs) devient UN Report tagué avec la saison
+(Report.saison). Les lignes reprises sont marquées `cloture_saison = <saison>` : les soldes
+(soldes.composantes_par_compte, donc /comptes, calculer_credit_actuel et l'export Excel) ne
+lisent plus que les lignes ouvertes (index sur cloture_saison).
+
+Ne sont PAS reprises, et restent donc lues comme avant :
+  - participations des concerts non payés (crédit potentiel) et des comptes de trésorerie,
+  - opérations prévisionnelles (gains à venir),
+  - lignes saisies après la clôture, même datées d'une saison clôturée.
+
+La clôture vérifie que chaque solde (crédit et gains à venir) est identique avant et après,
+sinon elle est annulée. Elle se prévisualise (simulation=True) et se défait (rouvrir_saison),
+saison par saison, de la plus récente à la plus ancienne.
+Une ligne clôturée ne peut plus être modifiée ni supprimée : rouvrir la saison d'abord.
+"""
+
+from sqlalchemy import and_, delete, event, func, inspect, or_, select, update
+
+from annuaire import ROLES_SPECIAUX, ids_roles
+from models import db, Concert, Musicien, Operation, Participation, Report
+from saisons import bornes_saison
+import soldes
+
+TOLERANCE = 0.005
+
+
+class SaisonCloturee(ValueError):
+    """Écriture refusée : la ligne appartient à une saison clôturée."""
+
+
+# --------------------------- Saisons clôturées ---------------------------
+
+def derniere_saison_cloturee(session=None) -> str | None:
+    """'2024/2025' si cette saison est la plus récente clôturée, None si aucune."""
+    session = session or db.session
+    return session.query(func.max(Report.saison)).scalar()
+
+
+def _verifier_saison(saison: str) -> str:
+    """Normalise '2024-2025' / '2024/2025' ; ValueError si illisible."""
+    try:
+        debut, fin = (int(x) for x in saison.replace("-", "/").split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Saison invalide : {saison}")
+    if fin != debut + 1:
+        raise ValueError(f"Saison invalide : {saison}")
+    return f"{debut}/{fin}"
+
+
+# --------------------------- Lignes reprises par une clôture ---------------------------
+
+def _ids_tresorerie() -> list:
+    """Comptes CB / CAISSE / TRESO d'après l'annuaire des rôles (un compte renommé reste reconnu)."""
+    return sorted(ids_roles(*ROLES_SPECIAUX))
+
+
+def _filtre_operations(fin):
+    """Opérations ouvertes, passées au 31 août et non prévisionnelles."""
+    return and_(
+        Operation.cloture_saison.is_(None),
+        Operation.musicien_id.isnot(None),
+        Operation.date <= fin,
+        or_(Operation.previsionnel.is_(False), Operation.previsionnel.is_(None)),
+    )
+
+
+def _filtre_participations(fin):
+    """Participations ouvertes des concerts payés datés au plus tard le 31 août (hors trésorerie)."""
+    concerts = select(Concert.id).where(Concert.paye.is_(True), Concert.date <= fin)
+    return and_(
+        Participation.cloture_saison.is_(None),
+        Participation.concert_id.in_(concerts),
+        Participation.musicien_id.notin_(_ids_tresorerie() or [-1]),
+    )
+
+
+def _reports_a_cloturer(session, saison: str, fin) -> dict:
+    """
+    { musicien_id: {report, nb_operations, nb_participations, nb_reports} } : ce que la clôture
+    reprend, en trois requêtes agrégées (GROUP BY musicien_id).
+    """
+    out = {}
+
+    def _slot(mid):
+        return out.setdefault(mid, {"report": 0.0, "nb_operations": 0, "nb_participations": 0, "nb_reports": 0})
+
+    for mid, total, nb in (
+        session.query(Operation.musicien_id, func.sum(soldes._montant_signe()), func.count(Operation.id))
+        .filter(_filtre_operations(fin))
+        .group_by(Operation.musicien_id)
+    ):
+        s = _slot(mid)
+        s["report"] += float(total or 0.0)
+        s["nb_operations"] = int(nb)
+
+    for mid, total, nb in (
+        session.query(Participation.musicien_id, func.sum(Participation.credit_calcule), func.count(Participation.id))
+        .filter(_filtre_participations(fin))
+        .group_by(Participation.musicien_id)
+    ):
+        s = _slot(mid)
+        s["report"] += float(total or 0.0)
+        s["nb_participations"] = int(nb)
+
+    for mid, total, nb in (
+        session.query(Report.musicien_id, func.sum(Report.montant), func.count(Report.id))
+        .filter(Report.cloture_saison.is_(None))
+        .group_by(Report.musicien_id)
+    ):
+        s = _slot(mid)
+        s["report"] += float(total or 0.0)
+        s["nb_reports"] = int(nb)
+
+    return out
+
+
+def _soldes() -> dict:
+    """{ musicien_id: (crédit, gains à venir) } recalculés depuis les lignes ouvertes."""
+    from mes_utils import today_paris  # import local : mes_utils importe soldes
+
+    composantes = soldes.composantes_par_compte(today_paris())
+    return {
+        mid: (soldes.credit_reel(mid, c) + c["reports"], soldes.gains_a_venir(c))
+        for mid, c in composantes.items()
+    }
+
+
+def _controler_soldes(avant: dict, apres: dict) -> None:
+    """RuntimeError si un crédit ou des gains à venir ont bougé de plus d'un demi-centime."""
+    for mid in set(avant) | set(apres):
+        a, b = avant.get(mid, (0.0, 0.0)), apres.get(mid, (0.0, 0.0))
+        if abs(a[0] - b[0]) > TOLERANCE or abs(a[1] - b[1]) > TOLERANCE:
+            raise RuntimeError(
+                f"Solde du compte {mid} modifié ({a[0]:.2f} → {b[0]:.2f}, "
+                f"à venir {a[1]:.2f} → {b[1]:.2f}) : opération annulée."
+            )
+
+
+# --------------------------- Clôture / réouverture ---------------------------
+
+def cloturer_saison(saison: str, *, simulation: bool = False) -> list:
+    """
+    Clôture `saison` ('2024/2025') : un Report par compte touché, lignes reprises marquées,
+    contrôle des soldes, commit. simulation=True : aperçu seul, aucune écriture.
+    Renvoie [{musicien_id, nom, report, nb_operations, nb_participations, nb_reports}, ...].
+    Lève ValueError si la saison n'est pas clôturable (pas terminée, déjà clôturée…).
+    """
+    from mes_utils import today_paris
+
+    session = db.session
+    saison = _verifier_saison(saison)
+    _debut, fin = bornes_saison(saison)
+    if fin >= today_paris():
+        raise ValueError(f"La saison {saison} n'est pas terminée.")
+    derniere = derniere_saison_cloturee(session)
+    if derniere and saison <= derniere:
+        raise ValueError(f"Saison {saison} déjà couverte par la clôture {derniere}.")
+
+    reprises = _reports_a_cloturer(session, saison, fin)
+    noms = {m.id: f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".strip()
+            for m in session.query(Musicien).filter(Musicien.id.in_(list(reprises) or [-1]))}
+    apercu = [{"musicien_id": mid, "nom": noms.get(mid, f"#{mid}"), **r, "report": round(r["report"], 2)}
+              for mid, r in sorted(reprises.items(), key=lambda kv: noms.get(kv[0], ""))]
+    if simulation or not reprises:
+        return apercu
+
+    avant = _soldes()
+    try:
+        # UPDATE groupés : les reports actifs sont marqués avant que les nouveaux n'existent
+        session.execute(
+            update(Report).where(Report.cloture_saison.is_(None)).values(cloture_saison=saison)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            update(Participation).where(_filtre_participations(fin)).values(cloture_saison=saison)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            update(Operation).where(_filtre_operations(fin)).values(cloture_saison=saison)
+            .execution_options(synchronize_session=False)
+        )
+        for mid, r in reprises.items():
+            session.add(Report(musicien_id=mid, montant=r["report"], saison=saison))
+        session.flush()
+        _controler_soldes(avant, _soldes())
+
+        # les UPDATE groupés ne passent pas par le flush : prévenir le grand livre
+        soldes.marquer_soldes_a_rafraichir(session, reprises)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    print(f"✅ Saison {saison} clôturée : {len(reprises)} compte(s) reporté(s).")
+    return apercu
+
+
+def rouvrir_saison(saison: str) -> int:
+    """
+    Défait la clôture de `saison` (la plus récente seulement) : ses reports de clôture sont
+    supprimés et les lignes reprises redeviennent ouvertes. Renvoie le nombre de comptes touchés.
+    """
+    session = db.session
+    saison = _verifier_saison(saison)
+    derniere = derniere_saison_cloturee(session)
+    if derniere != saison:
+        raise ValueError(
+            f"Seule la dernière saison clôturée ({derniere}) peut être rouverte." if derniere
+            else "Aucune saison clôturée."
+        )
+
+    ids = {mid for (mid,) in session.query(Report.musicien_id).filter(Report.saison == saison)}
+    avant = _soldes()
+    try:
+        session.execute(
+            delete(Report).where(Report.saison == saison).execution_options(synchronize_session=False)
+        )
+        for modele in (Report, Participation, Operation):
+            session.execute(
+                update(modele).where(modele.cloture_saison == saison).values(cloture_saison=None)
+                .execution_options(synchronize_session=False)
+            )
+        _controler_soldes(avant, _soldes())
+        soldes.marquer_soldes_a_rafraichir(session, ids)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    print(f"↩️ Saison {saison} rouverte : {len(ids)} compte(s).")
+    return len(ids)
+
+
+# --------------------------- Lignes clôturées : lecture seule ---------------------------
+
+_ATTRS_VERROUILLES = {
+    Operation: ("musicien_id", "type", "montant", "date", "previsionnel"),
+    Participation: ("musicien_id", "concert_id", "credit_calcule", "credit_calcule_potentiel"),
+    Report: ("musicien_id", "montant", "saison"),
+}
+
+
+def _verrouillee(obj) -> str | None:
+    """Saison clôturée qui couvre `obj` (valeur en base), None si la ligne est ouverte."""
+    etat = inspect(obj)
+    for attr in ("cloture_saison", "saison") if isinstance(obj, Report) else ("cloture_saison",):
+        historique = etat.attrs[attr].history
+        saison = (historique.deleted or [getattr(obj, attr)])[0]
+        if saison:
+            return saison
+    return None
+
+
+@event.listens_for(db.session, "before_flush")
+def _refuser_modification_cloturee(session, flush_context, instances):
+    for obj in (*session.dirty, *session.deleted):
+        if type(obj) not in _ATTRS_VERROUILLES or obj in session.new:
+            continue
+        saison = _verrouillee(obj)
+        if saison is None:
+            continue
+        etat = inspect(obj)
+        if obj in session.deleted or any(
+            etat.attrs[a].history.has_changes() for a in _ATTRS_VERROUILLES[type(obj)]
+        ):
+            raise SaisonCloturee(
+                f"Saison {saison} clôturée : rouvrir la saison pour modifier ou supprimer cette ligne."
+            )
+
+
+def refuser_si_cloturees(lignes) -> None:
+    """Écritures en masse : SaisonCloturee si une des lignes (attribut cloture_saison) est clôturée."""
+    saisons = sorted({l.cloture_saison for l in lignes if l.cloture_saison})
+    if saisons:
+        raise SaisonCloturee(
+            f"Saison {saisons[-1]} clôturée : rouvrir la saison pour modifier ou supprimer ces lignes."
+        )
+
+
+# -------------------------------------------------------------------
+# Script autonome :  python clotures.py apercu|cloturer|rouvrir <saison>
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+    from App import app
+
+    commande = (sys.argv[1] if len(sys.argv) > 1 else "").strip().lower()
+    saison = sys.argv[2] if len(sys.argv) > 2 else None
+    with app.app_context():
+        if commande in ("apercu", "cloturer") and saison:
+            lignes = cloturer_saison(saison, simulation=(commande == "apercu"))
+            for l in lignes:
+                print(f"  {l['nom']:<30} report {l['report']:>10.2f} € "
+                      f"({l['nb_operations']} op., {l['nb_participations']} part., {l['nb_reports']} rep.)")
+            print(f"{len(lignes)} compte(s).")
+        elif commande == "rouvrir" and saison:
+            rouvrir_saison(saison)
+        elif commande == "derniere":
+            print(derniere_saison_cloturee() or "Aucune saison clôturée.")
+        else:
+            print("Usage : python clotures.py apercu|cloturer|rouvrir <AAAA/AAAA>  |  derniere")
+            sys.exit(2)
@@ -0,0 +1,39 @@
+# conftest.py
+"""
+Base de test commune aux modules test_*.py lancés par pytest.
+
+La base jetable est choisie AVANT l'import de l'application (App lit DATABASE_URL à l'import).
+Pour chaque module de test, la fixture `client` recrée les tables, remet à zéro TOUS les caches
+de niveau module (caches.py ; sinon un module lancé avant, sur une autre base, fausserait le suivant) puis
+appelle la fonction `remplir()` du module.
+
+    python -m pytest -q test_plans_requetes.py test_verrous_concerts.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_plans_requetes.py
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = (
+    os.environ.get("TEST_DATABASE_URL")
+    or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+)
+
+
+@pytest.fixture(scope="module")
+def client(request):
+    """Client de test sur une base neuve remplie par `remplir()` du module de test."""
+    import recherche
+    from App import app
+    from caches import vider_caches
+    from models import db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        recherche.creer_fts()  # comme App.py pour une base SQLite neuve
+        vider_caches()
+        request.module.remplir()
+    return app.test_client()
@@ -5,8 +5,10 @@ from datetime import datetime, date
 import os
 from models import Musicien, Operation, Concert, Participation, Report, db
 from sqlalchemy import func
-from mes_utils import calculer_credit_actuel, calculer_gains_a_venir, mois_annee_fr
+from mes_utils import mois_annee_fr
+from soldes import lire_soldes, composantes_de, recettes_attendues_par_compte, credit_reel, gains_a_venir as gains_a_venir_compte
 from collections import defaultdict
+from annuaire import ROLE_BONUS, ROLE_CB, ROLE_CAISSE, ROLE_TRESO, ROLES_TRESORERIE, ids_roles, musicien_role, role_de, role_du_mode_paiement
 
 def mois_francais(dt):
     try:
@@ -21,16 +23,18 @@ def generer_export_excel():
     ws.title = "Comptes"
 
     musiciens = Musicien.query.filter(Musicien.actif.is_(True), Musicien.type != 'structure').all()
-    musiciens.sort(key=lambda m: (m.nom != "ARNOULD" or m.prenom != "Jérôme", m.nom, m.prenom))
+    musiciens.sort(key=lambda m: (role_de(m.id) != ROLE_BONUS, m.nom, m.prenom))  # Jérôme en tête
 
     structures = Musicien.query.filter(
         Musicien.type == 'structure',
-        ~Musicien.nom.in_(["CB ASSO7", "CAISSE ASSO7", "TRESO ASSO7"])
+        ~Musicien.id.in_(ids_roles(ROLE_CB, ROLE_CAISSE, ROLE_TRESO))
     ).all()
-    cb = Musicien.query.filter_by(nom="CB ASSO7").first()
-    caisse = Musicien.query.filter_by(nom="CAISSE ASSO7").first()
-    tous = [*musiciens, *structures, cb, caisse]
-    tous_avec_treso = tous + [Musicien(prenom="", nom="TRESO ASSO7")]
+    cb = musicien_role(ROLE_CB)
+    caisse = musicien_role(ROLE_CAISSE)
+    tous = [*musiciens, *structures, *(m for m in (cb, caisse) if m is not None)]
+    # ligne TRESO = CB + CAISSE (colonne calculée, reconnue par identité et non par son nom)
+    treso = Musicien(prenom="", nom=getattr(musicien_role(ROLE_TRESO), "nom", None) or "TRESO ASSO7")
+    tous_avec_treso = tous + [treso]
 
     pastel_colors = [
         "FFEBEE", "E3F2FD", "E8F5E9", "FFFDE7", "F3E5F5",
@@ -57,26 +61,28 @@ def generer_export_excel():
     ws.cell(row=5, column=1, value="CRÉDIT POTENTIEL").font = Font(bold=True)
     ws.cell(row=7, column=1, value="REPORTS").font = Font(bold=True)
 
-    concerts = Concert.query.all()
+    # Soldes lus dans le grand livre (une requête) au lieu d'un recalcul par compte
+    soldes = lire_soldes()
+    recettes_attendues = recettes_attendues_par_compte()
     valeurs = {}
 
     for idx, m in enumerate(tous_avec_treso):
-        nom = m.nom
         col = 2 + idx * 6
         fill = PatternFill(start_color=pastel_colors[idx % len(pastel_colors)],
                            end_color=pastel_colors[idx % len(pastel_colors)], fill_type="solid")
-        if nom == "TRESO ASSO7":
-            cb_vals = valeurs.get("CB ASSO7", {})
-            caisse_vals = valeurs.get("CAISSE ASSO7", {})
+        if m is treso:
+            cb_vals = valeurs.get(getattr(cb, "id", None), {})
+            caisse_vals = valeurs.get(getattr(caisse, "id", None), {})
             credit = (cb_vals.get("credit", 0) + caisse_vals.get("credit", 0))
             report = (cb_vals.get("report", 0) + caisse_vals.get("report", 0))
             gains_a_venir = (cb_vals.get("gains_a_venir", 0) + caisse_vals.get("gains_a_venir", 0))
         else:
-            credit = calculer_credit_actuel(m, concerts)
-            report = db.session.query(func.sum(Report.montant)).filter_by(musicien_id=m.id).scalar() or 0
-            credit += report
-            gains_a_venir = calculer_gains_a_venir(m, concerts)
-            valeurs[nom] = {
+            c = composantes_de(soldes, m.id)
+            report = c["reports"]
+            credit = credit_reel(m.id, c) + report
+            recettes = recettes_attendues.get(m.id, 0.0) if role_de(m.id) in ROLES_TRESORERIE else None
+            gains_a_venir = gains_a_venir_compte(c, recettes)
+            valeurs[m.id] = {
                 "credit": round(credit, 2),
                 "report": round(report, 2),
                 "gains_a_venir": round(gains_a_venir, 2)
@@ -95,31 +101,32 @@ def generer_export_excel():
             cell.fill = fill
 
     mouvements_par_personne = defaultdict(list)
+    concerts_non_payes = Concert.query.filter(Concert.paye.is_(False)).all()
     for idx, m in enumerate(tous_avec_treso):
-        nom = m.nom
-        if nom == "TRESO ASSO7":
+        if m is treso:
             continue
-        operations = Operation.query.filter_by(musicien_id=m.id).all()
+        # Lignes ouvertes seulement : les saisons clôturées sont résumées par la ligne REPORTS
+        operations = Operation.query.filter_by(musicien_id=m.id, cloture_saison=None).all()
         for op in operations:
             label = ""
             if op.concert:
                 c = op.concert
                 label = f"{c.lieu} - {c.date.strftime('%d/%m/%Y')}"
-            mouvements_par_personne[nom].append({
+            mouvements_par_personne[m.id].append({
                 "date": op.date,
                 "type": "crédit" if op.type == "credit" else "débit",
                 "motif": op.motif,
                 "detail": op.precision,
-                "montant": op.montant if op.type == "credit" else -op.montant,
+                "montant": op.montant_signe,
                 "concert": label
             })
-        participations = Participation.query.filter_by(musicien_id=m.id).all()
+        participations = Participation.query.filter_by(musicien_id=m.id, cloture_saison=None).all()
         for p in participations:
             c = p.concert
             if c:
                 montant = p.credit_calcule if c.paye else p.credit_calcule_potentiel
                 label = f"{c.lieu} - {c.date.strftime('%d/%m/%Y')}"
-                mouvements_par_personne[nom].append({
+                mouvements_par_personne[m.id].append({
                     "date": c.date,
                     "type": "crédit",
                     "motif": "participation",
@@ -127,14 +134,12 @@ def generer_export_excel():
                     "montant": montant,
                     "concert": label
                 })
-        if m.nom in ["CB ASSO7", "CAISSE ASSO7"]:
-            concerts_recettes = Concert.query.filter(
-                Concert.paye.is_(False),
-                Concert.mode_paiement_prevu == m.nom
-            ).all()
+        role = role_de(m.id)
+        if role in ROLES_TRESORERIE:
+            concerts_recettes = [c for c in concerts_non_payes if role_du_mode_paiement(c.mode_paiement_prevu) == role]
             for c in concerts_recettes:
                 label = f"{c.lieu} - {c.date.strftime('%d/%m/%Y')}"
-                mouvements_par_personne[m.nom].append({
+                mouvements_par_personne[m.id].append({
                     "date": c.date,
                     "type": "crédit",
                     "motif": "Recette attendue",
@@ -146,11 +151,10 @@ def generer_export_excel():
     row_base = 10
     max_rows = row_base
     for idx, m in enumerate(tous_avec_treso):
-        nom = m.nom
-        if nom == "TRESO ASSO7":
+        if m is treso:
             continue
         col = 2 + idx * 6
-        mouvements = mouvements_par_personne[nom]
+        mouvements = mouvements_par_personne[m.id]
         mouvements.sort(key=lambda x: x['date'] or aujourd_hui, reverse=True)
         last_month = None
         row = row_base
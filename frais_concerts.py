@@ -0,0 +1,185 @@
+# frais_concerts.py
+"""
+Frais des concerts : UNE agrégation pour tous les usages, avec cache par concert.
+
+Une requête (GROUP BY concert, musicien, prévisionnel, sens sur ix_operations_concert_categorie)
+lit toutes les opérations de catégorie 'frais' d'un lot de concerts ; on en déduit :
+  - reels          : somme des frais non prévisionnels      → Concert.frais
+  - previsionnels  : frais prévisionnels débités à CB ASSO7 → Concert.frais_previsionnels
+  - par_musicien   : frais réels nets rattachés à chaque musicien (listes de concerts, archives) :
+                     débit +montant, crédit −montant (un remboursement les réduit)
+
+Les lignes agrégées sont gardées en cache par concert, dans le processus web. Le cache d'un
+concert est oublié au commit de toute écriture d'une opération de frais qui le touche (concert
+avant ET après modification) ; dans la transaction en cours, ces concerts sont relus en base.
+Écritures en masse : appeler marquer_frais_perimes().
+
+Les écritures de Concert.frais / frais_previsionnels (mes_utils) lisent toujours la base
+(fraiche=True) : un autre processus web a pu écrire entre-temps.
+"""
+
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect
+
+from models import db, CATEGORIE_FRAIS, Operation
+
+
+class FraisConcert:
+    __slots__ = ("concert_id", "reels", "previsionnels", "par_musicien")
+
+    def __init__(self, concert_id: int, reels: float = 0.0, previsionnels: float = 0.0, par_musicien=None):
+        self.concert_id = concert_id
+        self.reels = reels
+        self.previsionnels = previsionnels
+        self.par_musicien = par_musicien or {}
+
+    def __repr__(self):
+        return f"<FraisConcert {self.concert_id} reels={self.reels} prev={self.previsionnels}>"
+
+
+# --------------------------- Agrégation ---------------------------
+
+def _lignes_en_base(concert_ids) -> dict:
+    """{concert_id: [(musicien_id, previsionnel, sens, total), ...]} en une requête."""
+    lignes = {cid: [] for cid in concert_ids}
+    rows = (
+        db.session.query(Operation.concert_id, Operation.musicien_id, Operation.previsionnel,
+                         Operation.sens, func.sum(Operation.montant))
+        .filter(Operation.concert_id.in_(list(concert_ids)), Operation.categorie == CATEGORIE_FRAIS)
+        .group_by(Operation.concert_id, Operation.musicien_id, Operation.previsionnel, Operation.sens)
+        .all()
+    )
+    for cid, mid, prev, sens, total in rows:
+        lignes[cid].append((mid, bool(prev), sens, float(total or 0.0)))
+    return lignes
+
+
+def _frais(concert_id: int, lignes, cb_id) -> FraisConcert:
+    reels = previsionnels = 0.0
+    par_musicien = defaultdict(float)
+    for mid, prev, sens, total in lignes:
+        if not prev:
+            reels += total
+            if mid is not None:
+                par_musicien[mid] -= (sens or 0) * total  # sens : -1 débit, +1 crédit
+        elif sens == -1 and cb_id is not None and mid == cb_id:
+            previsionnels += total
+    return FraisConcert(concert_id, reels, previsionnels, dict(par_musicien))
+
+
+def frais_des_concerts(concert_ids, *, fraiche: bool = False) -> dict:
+    """
+    {concert_id: FraisConcert} pour chaque concert demandé (frais nuls si aucune opération).
+    Au plus une requête pour les concerts absents du cache ; fraiche=True relit tout en base.
+    """
+    from annuaire import ROLE_CB, id_role  # import local : annuaire importe models
+
+    ids = {int(cid) for cid in concert_ids if cid}
+    if not ids:
+        return {}
+
+    session = db.session
+    if session.autoflush and (session.new or session.dirty or session.deleted):
+        session.flush()  # comme l'autoflush d'une requête : les marques du flush sont posées
+    en_cours = session.info.get(_CLE_SESSION, set())
+
+    lignes = {}
+    with _verrou:
+        generation = _generation
+        if not fraiche:
+            lignes = {cid: _cache[cid] for cid in ids - en_cours if cid in _cache}
+    a_lire = ids - set(lignes)
+    if a_lire:
+        lues = _lignes_en_base(a_lire)
+        lignes.update(lues)
+        with _verrou:
+            if generation == _generation:
+                _cache.update((cid, l) for cid, l in lues.items() if cid not in en_cours)
+
+    cb_id = id_role(ROLE_CB)
+    return {cid: _frais(cid, l, cb_id) for cid, l in lignes.items()}
+
+
+def frais_du_concert(concert_id: int, *, fraiche: bool = False) -> FraisConcert:
+    return frais_des_concerts([concert_id], fraiche=fraiche).get(int(concert_id)) or FraisConcert(concert_id)
+
+
+def frais_par_musicien(concert_ids) -> dict:
+    """{concert_id: {musicien_id: total net}} des frais réels rattachés à un musicien (gabarits)."""
+    return {cid: f.par_musicien for cid, f in frais_des_concerts(concert_ids).items() if f.par_musicien}
+
+
+# --------------------------- Cache et invalidation ---------------------------
+
+_cache = {}        # {concert_id: [(musicien_id, previsionnel, sens, total), ...]}
+_generation = 0    # incrémentée à chaque invalidation : une lecture commencée avant n'est pas stockée
+_verrou = threading.Lock()
+
+_CLE_SESSION = "frais_concerts_perimes"
+_ATTRS_OPERATION = ("concert_id", "categorie", "musicien_id", "previsionnel", "sens", "montant")
+
+
+def invalider(concert_ids=None) -> None:
+    """Oublie le cache des concerts donnés (tous si None)."""
+    global _generation
+    with _verrou:
+        _generation += 1
+        if concert_ids is None:
+            _cache.clear()
+        else:
+            for cid in concert_ids:
+                _cache.pop(cid, None)
+
+
+def marquer_frais_perimes(session, concert_ids) -> None:
+    """Note des concerts dont le cache sera oublié au prochain commit de `session`."""
+    session.info.setdefault(_CLE_SESSION, set()).update(int(c) for c in concert_ids if c)
+
+
+def concerts_marques(session) -> set:
+    """Concerts dont les frais ont changé dans la transaction en cours de `session`."""
+    return set(session.info.get(_CLE_SESSION, ()))
+
+
+def _concerts_de(op, *, modifie: bool) -> set:
+    etat = inspect(op)
+    if modifie and not any(etat.attrs[a].history.has_changes() for a in _ATTRS_OPERATION):
+        return set()
+    categories = {op.categorie, *(etat.attrs["categorie"].history.deleted or ())}
+    if CATEGORIE_FRAIS not in categories:
+        return set()
+    return {op.concert_id, *(etat.attrs["concert_id"].history.deleted or ())}
+
+
+@event.listens_for(Operation.concert_id, "set", active_history=True)
+@event.listens_for(Operation.categorie, "set", active_history=True)
+def _garder_ancienne_valeur(target, value, oldvalue, initiator):
+    """Rien à faire : active_history charge l'ancienne valeur d'un attribut expiré (ex: après commit),
+    pour que le flush sache aussi quel concert QUITTE l'opération."""
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_concerts_touches(session, flush_context):
+    concerts = set()
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, Operation):
+            concerts |= _concerts_de(obj, modifie=False)
+    for obj in session.dirty:
+        if isinstance(obj, Operation):
+            concerts |= _concerts_de(obj, modifie=True)
+    if concerts:
+        marquer_frais_perimes(session, concerts)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalider_apres_commit(session):
+    concerts = session.info.pop(_CLE_SESSION, None)
+    if concerts:
+        invalider(concerts)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_apres_rollback(session):
+    session.info.pop(_CLE_SESSION, None)
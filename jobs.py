@@ -0,0 +1,268 @@
+# jobs.py
+"""
+Tâches de fond SANS broker externe.
+
+Le serveur tourne avec un seul processus gunicorn (gthread) : un recalcul complet, un export
+Excel ou la lecture d'un PDF y bloqueraient tous les threads (GIL). On les confie donc à un
+pool de processus (ProcessPoolExecutor), et la table `jobs` (SQLite ou Postgres) sert de suivi :
+  - soumettre(type, **parametres)  → crée la ligne, lance la tâche, rend la main tout de suite,
+  - le worker met à jour statut / progression / résultat dans la même table,
+  - les routes /jobs/<id> et /jobs/<id>/resultat lisent cette ligne.
+
+Les workers sont des processus "spawn" (pas de fork d'un processus multi-threadé) : chacun
+importe l'application une fois puis enchaîne les tâches, en repartant de caches vides
+(caches.vider_caches) : le serveur web a pu écrire entre deux tâches.
+
+Chaque job note le processus web propriétaire de son pool (Job.proprietaire). Au démarrage d'un
+pool, seuls les jobs non finis d'un propriétaire disparu sont soldés en échec ; ceux d'un
+processus qu'on ne peut pas vérifier (autre machine, ancien job) le sont après DELAI_ORPHELIN.
+JOBS_SYNCHRONES=1 (ou app.config["JOBS_SYNCHRONES"]) exécute la tâche dans un thread et
+attend sa fin (tests, scripts).
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from caches import vider_caches
+from models import db, Job
+
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINE = "termine"
+STATUT_ECHEC = "echec"
+STATUTS_FINIS = (STATUT_TERMINE, STATUT_ECHEC)
+
+NB_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+DUREE_CONSERVATION = timedelta(days=7)
+DELAI_ORPHELIN = timedelta(hours=6)
+
+_DEMARRAGE = uuid.uuid4().hex[:12]  # distingue ce processus d'un précédent de même pid
+
+_executor = None
+_verrou = threading.Lock()
+_app_worker = None  # application Flask du processus worker
+
+
+# --------------------------- Tâches (exécutées dans le worker) ---------------------------
+
+def _tache_recalcul_complet(parametres: dict, progression) -> dict:
+    from calcul_participations import recalculer_credits_par_lots
+    erreurs = recalculer_credits_par_lots(progression=progression)
+    return {"concerts_ignores": {str(cid): str(e) for cid, e in erreurs.items()}}
+
+
+def _tache_export_excel(parametres: dict, progression) -> dict:
+    from exports import generer_export_excel
+    progression(0.1, "Génération du classeur…")
+    chemin = os.path.abspath(generer_export_excel())
+    return {"chemin": chemin, "nom": os.path.basename(chemin)}
+
+
+def _tache_extraction_pdf(parametres: dict, progression) -> dict:
+    from mes_utils import extraire_infos_depuis_pdf
+    progression(0.1, "Lecture du PDF…")
+    return extraire_infos_depuis_pdf(parametres["chemin"])
+
+
+TACHES = {
+    "recalcul_complet": _tache_recalcul_complet,
+    "export_excel": _tache_export_excel,
+    "extraction_pdf": _tache_extraction_pdf,
+}
+
+
+# --------------------------- Côté worker ---------------------------
+
+def _initialiser_worker():
+    """Une fois par processus worker : charge l'application (config, DB, modèles)."""
+    global _app_worker
+    from App import app
+    _app_worker = app
+
+
+def _maj_job(job_id: int, **valeurs) -> None:
+    Job.query.filter_by(id=job_id).update(valeurs, synchronize_session=False)
+    db.session.commit()
+
+
+def _executer(job_id: int) -> None:
+    """Exécute la tâche `job_id` et consigne son issue dans la table jobs."""
+    from flask import current_app
+    app = _app_worker or current_app._get_current_object()
+    with app.app_context():
+        try:
+            job = db.session.get(Job, job_id)
+            if job is None:
+                return
+            tache = TACHES[job.type]
+            vider_caches()  # le serveur web a pu écrire depuis la dernière tâche de ce worker
+            parametres = json.loads(job.parametres or "{}")
+            _maj_job(job_id, statut=STATUT_EN_COURS, started_at=datetime.utcnow())
+
+            def progression(fraction: float, message: str | None = None) -> None:
+                valeurs = {"progression": max(0.0, min(1.0, float(fraction)))}
+                if message:
+                    valeurs["message"] = message[:255]
+                _maj_job(job_id, **valeurs)
+
+            resultat = tache(parametres, progression)
+            _maj_job(
+                job_id, statut=STATUT_TERMINE, progression=1.0, message="Terminé",
+                resultat=json.dumps(resultat, ensure_ascii=False, default=str),
+                finished_at=datetime.utcnow(),
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Job {job_id} en échec : {e}")
+            _maj_job(job_id, statut=STATUT_ECHEC, message=str(e)[:255],
+                     erreur=traceback.format_exc(), finished_at=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+
+# --------------------------- Côté serveur web ---------------------------
+
+def _proprietaire() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{_DEMARRAGE}"
+
+
+def _proprietaire_vivant(proprietaire: str | None) -> bool | None:
+    """True / False si le processus propriétaire tourne encore ou non ; None si invérifiable."""
+    try:
+        hote, pid, demarrage = (proprietaire or "").rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return None  # job d'avant la colonne proprietaire
+    if hote != socket.gethostname():
+        return None
+    if pid == os.getpid():
+        return demarrage == _DEMARRAGE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # pid vivant, d'un autre utilisateur
+    return True
+
+
+def _recuperer_orphelins() -> None:
+    """Au (re)démarrage du pool : solde en échec les jobs non finis dont le processus a disparu."""
+    limite = datetime.utcnow() - DELAI_ORPHELIN
+    non_finis = (
+        db.session.query(Job.id, Job.proprietaire, Job.started_at, Job.created_at)
+        .filter(Job.statut.in_((STATUT_EN_ATTENTE, STATUT_EN_COURS)))
+        .all()
+    )
+    orphelins = []
+    for job_id, proprietaire, started_at, created_at in non_finis:
+        vivant = _proprietaire_vivant(proprietaire)
+        if vivant is False or (vivant is None and (started_at or created_at) < limite):
+            orphelins.append(job_id)
+    if orphelins:
+        Job.query.filter(Job.id.in_(orphelins), Job.statut.in_((STATUT_EN_ATTENTE, STATUT_EN_COURS))).update(
+            {"statut": STATUT_ECHEC, "message": "Interrompu (redémarrage du serveur)",
+             "finished_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+    db.session.commit()
+    if orphelins:
+        print(f"[jobs] {len(orphelins)} tâche(s) interrompue(s) marquée(s) en échec")
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _verrou:
+        if _executor is None:
+            _recuperer_orphelins()
+            _executor = ProcessPoolExecutor(
+                max_workers=NB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialiser_worker,
+            )
+        return _executor
+
+
+def _purger_anciens() -> None:
+    limite = datetime.utcnow() - DUREE_CONSERVATION
+    Job.query.filter(Job.statut.in_(STATUTS_FINIS), Job.created_at < limite).delete(synchronize_session=False)
+
+
+def _surveiller(app, job_id: int, future) -> None:
+    """Callback du pool : un worker mort (BrokenProcessPool…) n'a pas pu écrire son échec."""
+    global _executor
+    exc = future.exception()
+    if exc is None:
+        return
+    from concurrent.futures.process import BrokenProcessPool
+    if isinstance(exc, BrokenProcessPool):
+        with _verrou:
+            _executor = None  # on repartira d'un pool neuf à la prochaine soumission
+    with app.app_context():
+        try:
+            _maj_job(job_id, statut=STATUT_ECHEC, message=f"Worker interrompu : {exc}"[:255],
+                     erreur=repr(exc), finished_at=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+
+def _synchrone(app) -> bool:
+    return bool(app.config.get("JOBS_SYNCHRONES") or os.getenv("JOBS_SYNCHRONES") == "1")
+
+
+def soumettre(type_job: str, **parametres) -> Job:
+    """Enregistre un job et le lance en arrière-plan ; renvoie la ligne Job (statut en_attente)."""
+    from flask import current_app
+    if type_job not in TACHES:
+        raise ValueError(f"Type de job inconnu : {type_job}")
+
+    app = current_app._get_current_object()
+    synchrone = _synchrone(app)
+    pool = None if synchrone else _pool()  # (1re fois : solde les orphelins AVANT d'insérer ce job)
+    _purger_anciens()
+    job = Job(type=type_job, statut=STATUT_EN_ATTENTE, progression=0.0, proprietaire=_proprietaire(),
+              parametres=json.dumps(parametres, ensure_ascii=False, default=str))
+    db.session.add(job)
+    db.session.commit()
+
+    if synchrone:
+        # thread dédié = contexte d'application (et session) séparés de la requête
+        t = threading.Thread(target=_executer_dans_app, args=(app, job.id))
+        t.start()
+        t.join()
+        db.session.refresh(job)
+    else:
+        future = pool.submit(_executer, job.id)
+        future.add_done_callback(lambda f, job_id=job.id: _surveiller(app, job_id, f))
+    return job
+
+
+def _executer_dans_app(app, job_id: int) -> None:
+    with app.app_context():
+        _executer(job_id)
+
+
+def job_en_dict(job: Job) -> dict:
+    """Représentation JSON d'un job pour les routes de suivi."""
+    return {
+        "id": job.id,
+        "type": job.type,
+        "statut": job.statut,
+        "progression": round(float(job.progression or 0.0), 3),
+        "message": job.message,
+        "termine": job.statut in STATUTS_FINIS,
+        "succes": job.statut == STATUT_TERMINE,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def resultat_job(job: Job) -> dict | None:
+    return json.loads(job.resultat) if job.resultat else None
@@ -24,8 +24,20 @@ from dotenv import load_dotenv
 from sqlalchemy import and_, extract, func, or_
 
 # 📁 Modules internes
-from models import db, Cachet, Concert, Musicien
+from models import db, Cachet, Concert, Musicien, CATEGORIE_FRAIS
 from calcul_participations import partage_benefices_concert, mettre_a_jour_credit_calcule_potentiel
+import soldes  # noqa: F401 — branche le suivi du grand livre des soldes (account_balances)
+import recherche  # noqa: F401 — branche la tenue à jour de l'index de recherche des opérations
+import archives  # noqa: F401 — branche l'invalidation du cache des archives par saison
+import saisons  # noqa: F401 — branche la tenue à jour du résumé par saison (saisons_resume)
+import clotures  # noqa: F401 — branche le verrouillage des lignes des saisons clôturées
+import frais_concerts  # agrégation des frais par concert (cache invalidé au commit)
+import resume_concerts  # noqa: F401 — branche la tenue à jour des frais réels sur concerts (avant commit)
+from verrous_concerts import verrou_concerts  # écritures sérialisées par concert
+from annuaire import (
+    ROLE_ASSO7, ROLE_BONUS, ROLE_CB, ROLE_CAISSE, ROLE_TRESO, ROLES_SPECIAUX, ROLES_TRESORERIE,
+    id_role, ids_roles, role_de, role_du_mode_paiement, musicien_role, resoudre_musicien, nom_affiche,
+)
 
 # ─────────────────────────────────────────────
 # 1bis. ⏰ DATE "AUJOURD'HUI" — fuseau Europe/Paris (et non UTC du serveur Render)
@@ -41,6 +53,17 @@ def today_paris():
         return date.today()
 
 
+def _recalculer_marques(concert_id):
+    """Recalcule tout de suite les concerts marqués (utile hors requête web : pas d'after_request)."""
+    from calcul_participations import recalculer_concerts_marques
+    try:
+        for cid, e in recalculer_concerts_marques().items():
+            _alerter_recalc(cid, e)
+    except Exception as e:
+        db.session.rollback()
+        _alerter_recalc(concert_id, e)
+
+
 def _alerter_recalc(concert_id, exc):
     """
     Journalise une erreur de recalcul de crédits et, si on est dans une requête web,
@@ -68,9 +91,10 @@ def _alerter_recalc(concert_id, exc):
 # def charger_json(filepath):
 # def get_operations_dict():
 def get_reports_dict(musiciens):
+    """Reports saisis à la main et encore actifs (hors reports de clôture, cf. clotures.py)."""
     d = {}
     for m in musiciens:
-        report = Report.query.filter_by(musicien_id=m.id).first()
+        report = Report.query.filter_by(musicien_id=m.id, saison=None, cloture_saison=None).first()
         d[m.id] = report.montant if report else 0.0
     return d
 
@@ -233,35 +257,20 @@ from models import Musicien, Operation, Participation, Concert, Report, db
 
 
 def get_etat_comptes():
-    """Construit le tableau pour /comptes (musiciens + structures)."""
+    """
+    Construit le tableau pour /comptes (musiciens + structures).
+
+    Les soldes sont lus dans le grand livre (table account_balances, cf. soldes.py), tenu à
+    jour à chaque écriture : le nombre de requêtes est CONSTANT et ne dépend ni du nombre
+    de comptes ni de la profondeur de l'historique.
+    """
+    from soldes import lire_soldes, composantes_de, recettes_attendues_par_compte, credit_reel
+
     aujourd_hui = today_paris()
     tableau = []
 
-    concerts = Concert.query.all()
-
-    def _sum_ops(musicien_id: int, *, passees: bool) -> float:
-        """
-        Somme (credit - debit) des opérations.
-        - passées  := date <= aujourd_hui ET (previsionnel is False/None)
-        - à venir := (date > aujourd_hui) OU (previsionnel is True)
-        """
-        q = Operation.query.filter(Operation.musicien_id == musicien_id)
-        if passees:
-            q = (q.filter(Operation.date <= aujourd_hui)
-                   .filter(or_(Operation.previsionnel.is_(False),
-                               Operation.previsionnel.is_(None))))
-        else:
-            q = q.filter(or_(Operation.date > aujourd_hui,
-                             Operation.previsionnel.is_(True)))
-
-        total = 0.0
-        for op in q.all():
-            typ = (op.type or "").lower().replace("é", "e")
-            if typ == "credit":
-                total += (op.montant or 0.0)
-            elif typ == "debit":
-                total -= (op.montant or 0.0)
-        return total
+    composantes = lire_soldes(aujourd_hui)
+    recettes_attendues = recettes_attendues_par_compte()
 
     # ---------- MUSICIENS (tout ce qui n'est PAS 'structure') ----------
     musiciens = (
@@ -272,30 +281,17 @@ def get_etat_comptes():
     )
 
     for m in musiciens:
+        c = composantes_de(composantes, m.id)
         # Crédit réel = participations réelles + reports + opérations passées
-        credit_reel = (db.session.query(func.sum(Participation.credit_calcule))
-                       .filter_by(musicien_id=m.id)
-                       .scalar() or 0.0)
-
-        report = (db.session.query(func.sum(Report.montant))
-                  .filter_by(musicien_id=m.id)
-                  .scalar() or 0.0)
-
-        ops_passees = _sum_ops(m.id, passees=True)
-        credit_reel += report + ops_passees
-
+        credit = c["parts_reelles"] + (c["reports"] + c["ops_passees"])
         # Gains à venir = participations potentielles + opérations à venir (inclut prévisionnels)
-        gains_potentiels = (db.session.query(func.sum(Participation.credit_calcule_potentiel))
-                            .filter_by(musicien_id=m.id)
-                            .scalar() or 0.0)
-        ops_avenir = _sum_ops(m.id, passees=False)
-        gains_potentiels += ops_avenir
+        gains = c["parts_potentielles"] + c["ops_a_venir"]
 
         tableau.append({
             "nom": f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".strip(),
-            "credit": credit_reel,
-            "gains_a_venir": gains_potentiels,
-            "credit_potentiel": credit_reel + gains_potentiels,
+            "credit": credit,
+            "gains_a_venir": gains,
+            "credit_potentiel": credit + gains,
             "structure": False
         })
 
@@ -307,97 +303,55 @@ def get_etat_comptes():
         Musicien.query
         .filter(
             Musicien.type == 'structure',
-            ~Musicien.nom.in_(["CB ASSO7", "CAISSE ASSO7", "TRESO ASSO7"])
+            ~Musicien.id.in_(ids_roles(*ROLES_SPECIAUX) or [-1])
         )
         .order_by(Musicien.nom)
         .all()
     )
 
     for s in structures:
-        credit = calculer_credit_actuel(s, concerts)
-
-        report_s = (db.session.query(func.sum(Report.montant))
-                    .filter_by(musicien_id=s.id)
-                    .scalar() or 0.0)
-        credit += report_s
-
-        gains_a_venir = (db.session.query(func.sum(Participation.credit_calcule_potentiel))
-                         .filter_by(musicien_id=s.id)
-                         .scalar() or 0.0)
-        gains_a_venir += _sum_ops(s.id, passees=False)
+        c = composantes_de(composantes, s.id)
+        credit = credit_reel(s.id, c) + c["reports"]
+        gains = c["parts_potentielles"] + c["ops_a_venir"]
 
         tableau.append({
             "nom": (s.nom or "").strip(),
             "credit": credit,
-            "gains_a_venir": gains_a_venir,
-            "credit_potentiel": credit + gains_a_venir,
-            "structure": True
-        })
-
-    # ---------- STRUCTURES SPÉCIALES ----------
-    cb_asso7 = Musicien.query.filter_by(nom="CB ASSO7").first()
-    caisse_asso7 = Musicien.query.filter_by(nom="CAISSE ASSO7").first()
-
-    # --- CB ASSO7 ---
-    if cb_asso7:
-        credit_cb = calculer_credit_actuel(cb_asso7, concerts)
-        report_cb = (db.session.query(func.sum(Report.montant))
-                     .filter_by(musicien_id=cb_asso7.id)
-                     .scalar() or 0.0)
-        credit_cb += report_cb
-
-        recettes_a_venir_cb = (db.session.query(func.sum(Concert.recette_attendue))
-                               .filter(Concert.paye.is_(False),
-                                       Concert.mode_paiement_prevu == "CB ASSO7")
-                               .scalar() or 0.0)
-        # ➕ inclure aussi les opérations à venir (dont prévisionnels)
-        ops_avenir_cb = _sum_ops(cb_asso7.id, passees=False)
-
-        gains_cb = (recettes_a_venir_cb or 0.0) + ops_avenir_cb
-
-        tableau.append({
-            "nom": "CB ASSO7",
-            "credit": credit_cb,
-            "gains_a_venir": gains_cb,
-            "credit_potentiel": credit_cb + gains_cb,
+            "gains_a_venir": gains,
+            "credit_potentiel": credit + gains,
             "structure": True
         })
 
-    # --- CAISSE ASSO7 ---
-    if caisse_asso7:
-        credit_caisse = calculer_credit_actuel(caisse_asso7, concerts)
-        report_caisse = (db.session.query(func.sum(Report.montant))
-                         .filter_by(musicien_id=caisse_asso7.id)
-                         .scalar() or 0.0)
-        credit_caisse += report_caisse
+    # ---------- STRUCTURES SPÉCIALES (titulaires des rôles, cf. annuaire.py) ----------
+    cb_asso7 = musicien_role(ROLE_CB)
+    caisse_asso7 = musicien_role(ROLE_CAISSE)
 
-        recettes_a_venir_caisse = (db.session.query(func.sum(Concert.recette_attendue))
-                                   .filter(Concert.paye.is_(False),
-                                           Concert.mode_paiement_prevu == "CAISSE ASSO7")
-                                   .scalar() or 0.0)
-        # ➕ inclure aussi les opérations à venir (dont prévisionnels)
-        ops_avenir_caisse = _sum_ops(caisse_asso7.id, passees=False)
-
-        gains_caisse = (recettes_a_venir_caisse or 0.0) + ops_avenir_caisse
+    # --- CB ASSO7 / CAISSE ASSO7 : opérations passées + reports ; à venir = recettes attendues + ops à venir ---
+    lignes_speciales = []
+    for compte in (cb_asso7, caisse_asso7):
+        if not compte:
+            continue
+        c = composantes_de(composantes, compte.id)
+        credit = c["ops_passees"] + c["reports"]
+        gains = recettes_attendues.get(compte.id, 0.0) + c["ops_a_venir"]
 
-        tableau.append({
-            "nom": "CAISSE ASSO7",
-            "credit": credit_caisse,
-            "gains_a_venir": gains_caisse,
-            "credit_potentiel": credit_caisse + gains_caisse,
+        lignes_speciales.append({
+            "nom": compte.nom,
+            "credit": credit,
+            "gains_a_venir": gains,
+            "credit_potentiel": credit + gains,
             "structure": True
         })
+    tableau.extend(lignes_speciales)
 
     # --- TRESO ASSO7 = CB + CAISSE ---
-    if cb_asso7 or caisse_asso7:
-        cb_row = next((r for r in tableau if r.get("nom") == "CB ASSO7"), None)
-        caisse_row = next((r for r in tableau if r.get("nom") == "CAISSE ASSO7"), None)
-
-        treso_credit = (cb_row["credit"] if cb_row else 0.0) + (caisse_row["credit"] if caisse_row else 0.0)
-        treso_gains  = (cb_row["gains_a_venir"] if cb_row else 0.0) + (caisse_row["gains_a_venir"] if caisse_row else 0.0)
+    if lignes_speciales:
+        treso_credit = sum(r["credit"] for r in lignes_speciales)
+        treso_gains = sum(r["gains_a_venir"] for r in lignes_speciales)
+        treso = musicien_role(ROLE_TRESO)
 
         tableau.append({
-            "nom": "TRESO ASSO7",
+            "nom": treso.nom if treso else "TRESO ASSO7",
             "credit": treso_credit,
             "gains_a_venir": treso_gains,
             "credit_potentiel": treso_credit + treso_gains,
@@ -425,40 +379,11 @@ def calculer_credit_actuel(musicien, concerts):
     if musicien is None:
         return 0.0
 
-    aujourd_hui = today_paris()
-    nom = (musicien.nom or "").strip().upper()
-
-    # Helper: somme des opérations passées (non prévisionnelles)
-    def _sum_ops_passees(mid: int) -> float:
-        q = (
-            Operation.query
-            .filter(Operation.musicien_id == mid)
-            .filter(Operation.date <= aujourd_hui)
-            .filter(or_(Operation.previsionnel.is_(False),
-                        Operation.previsionnel.is_(None)))
-        )
-        total = 0.0
-        for op in q.all():
-            typ = (op.type or "").lower().replace("é", "e")
-            if typ == "credit":
-                total += (op.montant or 0.0)
-            elif typ == "debit":
-                total -= (op.montant or 0.0)
-        return total
-
-    # Structures "spéciales" : uniquement les opérations passées
-    if nom in ["CB ASSO7", "CAISSE ASSO7", "TRESO ASSO7"]:
-        return _sum_ops_passees(musicien.id)
-
-    # Structures "classiques" (dont ASSO7) et musiciens normaux :
-    # on lit ce qui a été ÉCRIT lors du paiement : Participation.credit_calcule (réel),
-    # puis on ajoute leurs opérations passées.
-    parts_reelles = (
-        db.session.query(func.sum(Participation.credit_calcule))
-        .filter(Participation.musicien_id == musicien.id)
-        .scalar() or 0.0
-    )
-    return float(parts_reelles) + _sum_ops_passees(musicien.id)
+    from soldes import composantes_par_compte, composantes_de, credit_reel
+
+    # Agrégats SQL restreints à ce compte (au lieu de charger toutes ses opérations en Python)
+    composantes = composantes_par_compte(today_paris(), musicien_ids=[musicien.id])
+    return credit_reel(musicien.id, composantes_de(composantes, musicien.id))
 
 
 
@@ -466,7 +391,7 @@ def calculer_credit_actuel(musicien, concerts):
 def calculer_gains_a_venir(musicien, concerts):
     aujourd_hui = today_paris()
     credit = 0.0
-    nom = (musicien.nom or "").strip().upper()
+    role = role_de(musicien.id)
 
     # Pour les concerts non payés, on lit Participation.credit_calcule_potentiel
     for concert in concerts:
@@ -479,19 +404,14 @@ def calculer_gains_a_venir(musicien, concerts):
     # (Aligné sur _sum_ops de get_etat_comptes : sinon la page web et l'export Excel
     #  affichaient des "gains à venir" différents pour le même musicien. Les prévisionnels
     #  sont exclus du crédit ACTUEL, donc aucun double comptage ici.)
-    operations = Operation.query.filter_by(musicien_id=musicien.id).all()
-    for op in operations:
-        if op.date > aujourd_hui or bool(getattr(op, "previsionnel", False)):
-            typ = (op.type or "").lower()
-            if typ == "debit":
-                credit -= op.montant or 0
-            elif typ == "credit":
-                credit += op.montant or 0
-
-    # Recette attendue pour CB ASSO7 / CAISSE ASSO7
-    if nom in ["CB ASSO7", "CAISSE ASSO7"]:
+    from soldes import composantes_par_compte, composantes_de
+    composantes = composantes_par_compte(aujourd_hui, musicien_ids=[musicien.id])
+    credit += composantes_de(composantes, musicien.id)["ops_a_venir"]
+
+    # Recette attendue pour CB ASSO7 / CAISSE ASSO7 (mode de paiement prévu → rôle du compte)
+    if role in ROLES_TRESORERIE:
         for concert in concerts:
-            if not concert.paye and concert.mode_paiement_prevu and nom in concert.mode_paiement_prevu.upper():
+            if not concert.paye and role_du_mode_paiement(concert.mode_paiement_prevu) == role:
                 credit += concert.recette_attendue or 0
 
     return credit
@@ -503,54 +423,14 @@ from typing import Dict
 from sqlalchemy import func, or_, case
 from models import db, Operation  # Concert pas nécessaire ici
 
-def collecter_frais_par_musicien(concerts):
-    """
-    Renvoie un dict { concert_id: { musicien_id: total_frais } }.
-    On additionne:
-      - DEBIT  -> +montant
-      - CREDIT -> -montant   (ex: remboursement)
-    On ignore les opérations prévisionnelles.
-    """
-    concert_ids = [c.id for c in concerts] or [-1]
-
-    signed_sum = func.sum(
-        case(
-            (func.lower(Operation.type) == "debit",  Operation.montant),
-            (func.lower(Operation.type) == "credit", -Operation.montant),
-            else_=0.0,
-        )
-    )
-
-    rows = (
-        Operation.query
-        .with_entities(Operation.concert_id, Operation.musicien_id, signed_sum.label("total"))
-        .filter(
-            Operation.concert_id.in_(concert_ids),
-            db.func.lower(db.func.coalesce(Operation.motif, "" )).in_(["frais", "frais de concerts"]),
-            Operation.previsionnel.is_(False)
-        )
-        .group_by(Operation.concert_id, Operation.musicien_id)
-        .all()
-    )
-
-    out = {}
-    for cid, mid, total in rows:
-        if total is None:
-            continue
-        out.setdefault(cid, {})[mid] = float(total)
-    return out
-
-
-
 def verifier_ou_creer_structures():
     """
     Vérifie si ASSO7 et CB ASSO7 existent, sinon les crée comme musiciens 'structure'.
     """
-    noms_structures = ['ASSO7', 'CB ASSO7']
-    for nom in noms_structures:
-        existant = Musicien.query.filter_by(nom=nom).first()
-        if not existant:
-            nouveau = Musicien(nom=nom, prenom='', actif=True, type='structure')
+    noms_structures = {ROLE_ASSO7: 'ASSO7', ROLE_CB: 'CB ASSO7'}
+    for role, nom in noms_structures.items():
+        if id_role(role) is None:
+            nouveau = Musicien(nom=nom, prenom='', actif=True, type='structure', role=role)
             db.session.add(nouveau)
             print(f"✅ Création automatique : {nom}")
     db.session.commit()
@@ -709,17 +589,14 @@ def get_credits_concerts_from_db(concerts):
                 part.credit_calcule if concert.paye else part.credit_calcule_potentiel
             ) or 0.0
 
-            musicien = part.musicien
-            nom = (musicien.nom or "").strip().upper()
-            prenom = (musicien.prenom or "").strip().upper()
-
-            if nom == "ASSO7":
+            role = role_de(part.musicien_id)
+            if role == ROLE_ASSO7:
                 credit_asso7 = montant
-            elif nom == "ARNOULD" and prenom.startswith("JÉRÔME"):
+            elif role == ROLE_BONUS:
                 credit_jerome = montant
-                credits[musicien.id] = montant
+                credits[part.musicien_id] = montant
             else:
-                credits[musicien.id] = montant
+                credits[part.musicien_id] = montant
 
         credits_musiciens[concert.id] = credits
         credits_asso7[concert.id] = credit_asso7
@@ -729,34 +606,45 @@ def get_credits_concerts_from_db(concerts):
 
 
 
-def enregistrer_participations(concert_id, participants_ids, jerome_id=None):
+def preparer_participations(concert, participants_ids, jerome_id=None) -> None:
     """
-    Met à jour la liste des participants d'un concert SANS détruire les données
-    déjà saisies/calculées (gain_fixe, credit_calcule, credit_calcule_potentiel)
-    pour les participants conservés.
-      - on ne supprime QUE les participations devenues absentes ;
+    Met la liste des participants d'un concert (éventuellement pas encore inséré) à jour EN SESSION,
+    sans flush ni commit, SANS détruire les données déjà saisies/calculées (gain_fixe,
+    credit_calcule, credit_calcule_potentiel) des participants conservés :
+      - on ne retire QUE les participations devenues absentes ;
       - on n'ajoute QUE les nouvelles ;
-      - on ne mute PAS le set reçu en argument ;
-      - rollback en cas d'erreur.
+      - on ne mute PAS le set reçu en argument.
     """
     ids = set(participants_ids or [])
     if jerome_id:
         ids.add(jerome_id)
 
+    existantes = {p.musicien_id: p for p in concert.participations}
+    # 1) Retirer les participations qui ne sont plus dans la liste
+    for mid, part in existantes.items():
+        if mid not in ids:
+            concert.participations.remove(part)
+            # suppression explicite : un orphelin supprimé par cascade n'apparaît pas dans
+            # session.deleted pour les écouteurs after_flush (grand livre, recalcul, recherche…)
+            db.session.delete(part)
+    # 2) Ajouter uniquement les nouveaux (les conservés gardent gain_fixe & crédits)
+    for mid in ids:
+        if mid not in existantes:
+            concert.participations.append(Participation(musicien_id=mid))
+
+
+def enregistrer_participations(concert_id, participants_ids, jerome_id=None):
+    """
+    Met à jour la liste des participants d'un concert et valide (cf. preparer_participations) ;
+    rollback en cas d'erreur. Enregistrement complet d'un concert : sauvegarde_concert.py.
+    """
     try:
-        existantes = {
-            p.musicien_id: p
-            for p in Participation.query.filter_by(concert_id=concert_id).all()
-        }
-        # 1) Retirer les participations qui ne sont plus dans la liste
-        for mid, part in existantes.items():
-            if mid not in ids:
-                db.session.delete(part)
-        # 2) Ajouter uniquement les nouveaux (les conservés gardent gain_fixe & crédits)
-        for mid in ids:
-            if mid not in existantes:
-                db.session.add(Participation(concert_id=concert_id, musicien_id=mid))
-        db.session.commit()
+        with verrou_concerts([concert_id]):
+            concert = db.session.get(Concert, concert_id)
+            if concert is None:
+                raise ValueError(f"Concert introuvable id={concert_id}")
+            preparer_participations(concert, participants_ids, jerome_id=jerome_id)
+            db.session.commit()
     except Exception:
         db.session.rollback()
         raise
@@ -798,19 +686,15 @@ def recalculer_frais_concert(concert_id: int, op_to_remove_id: int | None = None
         print(f"❌ Le concert {concert_id} n'existe pas")
         return 0.0
 
-    # 2) Construction de la requête: Frais réels uniquement (prévisionnels exclus)
-    q = db.session.query(db.func.coalesce(db.func.sum(Operation.montant), 0.0)).filter(
-        Operation.concert_id == concert_id,
-        db.func.lower(db.func.coalesce(Operation.motif, "" )).in_(["frais", "frais de concerts"]),
-        db.or_(Operation.previsionnel.is_(False), Operation.previsionnel.is_(None))
-    )
-
+    # 2) Frais réels uniquement (prévisionnels exclus), relus en base (cf. frais_concerts.py)
+    frais_total = frais_concerts.frais_du_concert(concert_id, fraiche=True).reels
 
     # 3) Si on connaît l'ID d'une op à retirer (appel avant suppression), on l'exclut de la somme
     if op_to_remove_id:
-        q = q.filter(Operation.id != op_to_remove_id)
-
-    frais_total = float(q.scalar() or 0.0)
+        op = db.session.get(Operation, op_to_remove_id)
+        if (op is not None and op.concert_id == concert_id and op.categorie == CATEGORIE_FRAIS
+                and not op.previsionnel):
+            frais_total -= float(op.montant or 0.0)
     print(f"✅ Total des frais (hors prévisionnels){' et hors op '+str(op_to_remove_id) if op_to_remove_id else ''} : {frais_total:.2f} €")
 
     # 4) Écriture en base
@@ -843,6 +727,23 @@ def concert_to_dict(concert):
     }
 
 
+def compte_recette_concert(mode: str | None):
+    """
+    Compte qui reçoit la recette d'un concert selon le mode de paiement :
+    titulaire du rôle CB ou CAISSE (cf. annuaire.role_du_mode_paiement), quel que soit son nom.
+    AUCUN fallback vers 'ASSO7' : ValueError si le mode ne désigne ni l'un ni l'autre.
+    """
+    role = role_du_mode_paiement(mode)
+    cible_benef = musicien_role(role) if role else None
+
+    if not cible_benef:
+        raise ValueError(
+            f"Impossible de déterminer le bénéficiaire de la recette pour mode='{mode}'. "
+            f"Attendu: CB ASSO7 ou CAISSE ASSO7."
+        )
+    return cible_benef
+
+
 def creer_recette_concert_si_absente(concert_id, montant=None, date_op=None, mode=None):
     """
     Crée (si absente) l'opération de crédit 'Recette concert' au profit de CB ASSO7 ou CAISSE ASSO7,
@@ -876,51 +777,7 @@ def creer_recette_concert_si_absente(concert_id, montant=None, date_op=None, mod
     date_finale = date_op or getattr(concert, "date", None) or _date.today()
 
     # -- Résolution du bénéficiaire à partir du 'mode' effectif --
-    #    On accepte : "Compte", "CB_ASSO7", "cb asso7", "Espèces", "CAISSE_ASSO7", "caisse asso7", etc.
-    def _norm(s: str) -> str:
-        s = (s or "").strip().lower()
-        # simpliste mais efficace (évite d'ajouter une dépendance unidecode)
-        remap = str.maketrans({"é": "e", "è": "e", "ê": "e", "à": "a", "ù": "u", "ï": "i", "î": "i", "ô": "o", "ç": "c"})
-        s = s.translate(remap)
-        for ch in ("_", "-", ".", "/"):
-            s = s.replace(ch, " ")
-        s = " ".join(s.split())
-        return s
-
-    mode_eff = _norm(mode or getattr(concert, "mode_paiement_prevu", "") or "compte")
-
-    # Dictionnaire des intentions → cible
-    # tout ce qui ressemble à "compte" ou "cb..." => CB ASSO7
-    # tout ce qui ressemble à "especes" ou "caisse..." => CAISSE ASSO7
-    def _is_cb(key: str) -> bool:
-        return any(tok in key for tok in [
-            "compte", "cb asso7", "cbasso7", "cb", "cb asso", "cb_asso7"
-        ])
-
-    def _is_caisse(key: str) -> bool:
-        return any(tok in key for tok in [
-            "especes", "espece", "caisse asso7", "caisseasso7", "caisse", "caisse_asso7"
-        ])
-
-    musiciens = Musicien.query.all()
-
-    def _find_by_nom(targets):
-        return next(
-            (m for m in musiciens if (m.nom or "").strip().lower() in targets),
-            None
-        )
-
-    cible_benef = None
-    if _is_cb(mode_eff):
-        cible_benef = _find_by_nom({"cb asso7"})
-    elif _is_caisse(mode_eff):
-        cible_benef = _find_by_nom({"caisse asso7"})
-
-    if not cible_benef:
-        raise ValueError(
-            f"Impossible de déterminer le bénéficiaire de la recette pour mode='{mode}'. "
-            f"Attendu: CB ASSO7 ou CAISSE ASSO7."
-        )
+    cible_benef = compte_recette_concert(mode or getattr(concert, "mode_paiement_prevu", "") or "compte")
 
     # -- Idempotence : existe déjà ? --
     op_existante = Operation.query.filter_by(
@@ -1020,112 +877,228 @@ def supprimer_recette_concert_pour_concert(concert_id: int) -> int:
     return suppr_count
     
 def basculer_statut_paiement_concert(concert_id: int, paye: bool, montant: float | None = None, mode: str | None = None):
-    from calcul_participations import (
-        mettre_a_jour_credit_calcule_reel_pour_concert,
-        mettre_a_jour_credit_calcule_potentiel_pour_concert,
-    )
     from mes_utils import creer_recette_concert_si_absente, supprimer_recette_concert_pour_concert
-    
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        raise ValueError(f"Concert introuvable id={concert_id}")
 
-    # utilitaires locaux
+    # verrou du concert (verrous_concerts.py) : deux bascules du même concert ne se croisent pas
+    with verrou_concerts([concert_id]):
+        concert = Concert.query.get(concert_id)
+        if not concert:
+            raise ValueError(f"Concert introuvable id={concert_id}")
+
+        # utilitaires locaux
+        def _to_float(x):
+            if x is None:
+                return None
+            s = str(x).strip().replace(",", ".")
+            return float(s) if s else None
+
+        if paye:
+            # ===== NON PAYÉ -> PAYÉ =====
+            # 1) Déterminer recette finale
+            montant_val = _to_float(montant)
+            if montant_val is not None:
+                concert.recette = montant_val
+            elif concert.recette_attendue is not None:
+                concert.recette = float(concert.recette_attendue)
+            else:
+                concert.recette = float(concert.recette or 0.0)
+
+            # 2) Etat payé + nettoyer la prévision
+            concert.paye = True
+            concert.recette_attendue = None
+            db.session.add(concert)
+
+            # 3) Créer (si absente) l'opération 'Recette concert' vers le bon compte
+            mode_final = (mode or getattr(concert, "mode_paiement_prevu", "") or "Compte").strip()
+            creer_recette_concert_si_absente(
+                concert_id=concert.id,
+                montant=concert.recette,
+                date_op=None,
+                mode=mode_final
+            )
+
+            # 4) Commit + recalcul réel (concert marqué par le commit)
+            db.session.commit()
+            _recalculer_marques(concert.id)
+
+            return {
+                "concert_id": concert.id,
+                "paye": True,
+                "recette": concert.recette,
+                "mode": mode_final,
+            }
+
+        else:
+            # ===== PAYÉ -> NON PAYÉ =====
+            try:
+                # 1) Restaurer recette_attendue si absente
+                if (concert.recette_attendue is None) and (concert.recette is not None):
+                    try:
+                        concert.recette_attendue = float(concert.recette) or 0.0
+                    except Exception:
+                        concert.recette_attendue = 0.0
+
+                # 2) Supprimer opérations 'Recette concert'
+                nb_suppr = supprimer_recette_concert_pour_concert(concert.id)
+                print(f"[INFO] {nb_suppr} op(s) 'Recette concert' supprimée(s) pour concert_id={concert.id}")
+
+                # 3) Etat non payé + nettoyer recette
+                concert.recette = None
+                concert.paye = False
+                db.session.add(concert)
+
+                # 4) Commit + recalcul potentiel (concert marqué par le commit)
+                db.session.commit()
+                _recalculer_marques(concert.id)
+
+                return {
+                    "concert_id": concert.id,
+                    "paye": False,
+                    "recette_attendue": float(concert.recette_attendue or 0.0),
+                    "recettes_supprimees": nb_suppr,
+                }
+
+            except Exception as e:
+                db.session.rollback()
+                raise
+
+
+def valider_paiements_concerts(paiements) -> dict:
+    """
+    Validation groupée des paiements (fin de tournée, /concerts_non_payes) — TOUT OU RIEN.
+    paiements : [{"concert_id": …, "recette": montant | None, "compte": mode | None}, …]
+      (recette absente → recette_attendue ; compte absent → mode_paiement_prevu du concert).
+
+    Pour chaque concert : recette finale, payé, opération 'Recette concert' créée ou mise à jour,
+    opérations prévisionnelles purgées (frais_previsionnels conservé, cf. toggle_concert_paye).
+    Puis UN recalcul groupé des crédits réels et UN commit.
+
+    Renvoie {"valides": [{concert_id, recette, compte}, …], "erreurs": [{index, concert_id, message}, …]} ;
+    à la moindre erreur rien n'est écrit (rollback) et "valides" est vide.
+    """
+    import math
+    from datetime import date as _date
+    from calcul_participations import recalculer_concerts_dans_la_transaction
+
     def _to_float(x):
         if x is None:
             return None
         s = str(x).strip().replace(",", ".")
         return float(s) if s else None
 
-    if paye:
-        # ===== NON PAYÉ -> PAYÉ =====
-        # 1) Déterminer recette finale
-        montant_val = _to_float(montant)
-        if montant_val is not None:
-            concert.recette = montant_val
-        elif concert.recette_attendue is not None:
-            concert.recette = float(concert.recette_attendue)
-        else:
-            concert.recette = float(concert.recette or 0.0)
+    paiements = list(paiements or [])
+    erreurs = []
 
-        # 2) Etat payé + nettoyer la prévision
-        concert.paye = True
-        concert.recette_attendue = None
-        db.session.add(concert)
+    def _erreur(i, cid, message):
+        erreurs.append({"index": i, "concert_id": cid, "message": str(message)})
 
-        # 3) Créer (si absente) l'opération 'Recette concert' vers le bon compte
-        mode_final = (mode or getattr(concert, "mode_paiement_prevu", "") or "Compte").strip()
-        creer_recette_concert_si_absente(
-            concert_id=concert.id,
-            montant=concert.recette,
-            date_op=None,
-            mode=mode_final
-        )
-
-        # 4) Commit + recalcul réel
-        db.session.commit()
+    # 1) Lectures groupées : concerts, opérations 'Recette concert' et prévisionnelles existantes
+    ids = set()
+    for p in paiements:
         try:
-            db.session.expire_all()
-            mettre_a_jour_credit_calcule_reel_pour_concert(concert.id)
-            db.session.commit()
-        except Exception as e:
-            _alerter_recalc(concert.id, e)
+            ids.add(int(p.get("concert_id")))
+        except (TypeError, ValueError, AttributeError):
+            pass
+    # verrou des concerts du lot (verrous_concerts.py), pris AVANT de les lire
+    with verrou_concerts(ids):
+        concerts = {c.id: c for c in Concert.query.filter(Concert.id.in_(ids)).all()} if ids else {}
+        recettes = {}
+        prevs = []
+        if concerts:
+            for op in Operation.query.filter(
+                Operation.concert_id.in_(list(concerts)),
+                or_(Operation.motif == "Recette concert", Operation.previsionnel.is_(True)),
+            ).all():
+                if op.previsionnel:
+                    prevs.append(op)
+                else:
+                    recettes.setdefault(op.concert_id, op)
 
-        return {
-            "concert_id": concert.id,
-            "paye": True,
-            "recette": concert.recette,
-            "mode": mode_final,
-        }
+        # 2) Contrôles et écritures en session, concert par concert
+        valides, index_de = [], {}  # index_de : {concert_id: rang dans `paiements`}
+        for i, p in enumerate(paiements):
+            if not isinstance(p, dict):
+                _erreur(i, None, "Ligne invalide : objet attendu.")
+                continue
+            cid = p.get("concert_id")
+            try:
+                concert = concerts.get(int(cid))
+            except (TypeError, ValueError):
+                concert = None
+            if concert is None:
+                _erreur(i, cid, "Concert introuvable")
+                continue
+            if concert.id in index_de:
+                _erreur(i, concert.id, "Concert présent deux fois dans le lot")
+                continue
+            index_de[concert.id] = i
+            if concert.paye:
+                # re-valider réécrirait en silence l'opération 'Recette concert' existante
+                _erreur(i, concert.id, "Concert déjà payé : repassez-le en non payé pour changer sa recette.")
+                continue
+            try:
+                montant = _to_float(p.get("recette"))
+                if montant is None:
+                    montant = concert.recette_attendue if concert.recette_attendue is not None else concert.recette
+                montant = float(montant or 0.0)
+                if not math.isfinite(montant):
+                    raise ValueError(f"Recette invalide : {p.get('recette')}")
+                if montant <= 0:
+                    raise ValueError("Recette <= 0 : renseignez une recette positive avant de valider le paiement.")
+                mode = ((p.get("compte") or "").strip() or getattr(concert, "mode_paiement_prevu", "") or "Compte").strip()
+                compte = compte_recette_concert(mode)
+            except ValueError as e:
+                _erreur(i, concert.id, e)
+                continue
 
-    else:
-        # ===== PAYÉ -> NON PAYÉ =====
-        try:
-            # 1) Restaurer recette_attendue si absente
-            if (concert.recette_attendue is None) and (concert.recette is not None):
-                try:
-                    concert.recette_attendue = float(concert.recette) or 0.0
-                except Exception:
-                    concert.recette_attendue = 0.0
-
-            # 2) Supprimer opérations 'Recette concert'
-            nb_suppr = supprimer_recette_concert_pour_concert(concert.id)
-            print(f"[INFO] {nb_suppr} op(s) 'Recette concert' supprimée(s) pour concert_id={concert.id}")
-
-            # 3) Etat non payé + nettoyer recette
-            concert.recette = None
-            concert.paye = False
-            db.session.add(concert)
+            concert.recette = montant
+            concert.paye = True
+            concert.recette_attendue = None
+            concert.op_prevision_frais_id = None
+
+            op = recettes.get(concert.id)
+            date_op = concert.date or _date.today()
+            if op is None:
+                db.session.add(Operation(
+                    musicien_id=compte.id, type="credit", motif="Recette concert",
+                    precision=(f"Recette concert {getattr(concert, 'titre', '') or ''}").strip() or None,
+                    montant=montant, date=date_op, concert_id=concert.id,
+                ))
+            else:
+                op.montant, op.date, op.musicien_id = montant, date_op, compte.id
+            valides.append({"concert_id": concert.id, "recette": montant, "compte": mode})
 
-            # 4) Commit + recalcul potentiel
-            db.session.commit()
-            try:
-                db.session.expire_all()
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
-                db.session.commit()
-            except Exception as e:
-                _alerter_recalc(concert.id, e)
+        if erreurs:
+            db.session.rollback()
+            return {"valides": [], "erreurs": erreurs}
 
-            return {
-                "concert_id": concert.id,
-                "paye": False,
-                "recette_attendue": float(concert.recette_attendue or 0.0),
-                "recettes_supprimees": nb_suppr,
-            }
+        try:
+            for op in prevs:
+                db.session.delete(op)
 
+            # 3) Recalcul groupé des crédits réels, dans la même transaction
+            for cid, e in recalculer_concerts_dans_la_transaction(index_de).items():
+                _erreur(index_de[cid], cid, e)
+            if erreurs:
+                db.session.rollback()
+                return {"valides": [], "erreurs": erreurs}
+
+            # 4) Un seul commit
+            db.session.commit()
         except Exception as e:
             db.session.rollback()
-            raise
+            return {"valides": [], "erreurs": [{"index": None, "concert_id": None, "message": str(e)}]}
+
+        print(f"[OK] Paiement validé pour {len(valides)} concert(s) : {sorted(index_de)}")
+        return {"valides": valides, "erreurs": []}
 
 
 from datetime import date
 from models import db, Operation, Concert, Musicien
 
 def _get_compte_cbaso7():
-    # Adapte si tu as une façon “officielle” d’identifier CB ASSO7
-    return Musicien.query.filter(
-        (Musicien.nom.ilike('%ASSO7%')) | (Musicien.prenom.ilike('%ASSO7%'))
-    ).first()
+    # CB ASSO7 d'après l'annuaire des rôles (cf. annuaire.py)
+    return musicien_role(ROLE_CB)
 
 def _parse_montant(txt: str | None) -> float | None:
     if not txt:
@@ -1139,93 +1112,58 @@ def _parse_montant(txt: str | None) -> float | None:
     except Exception:
         return None
 
+def frais_previsionnels_du_concert(concert_id: int) -> float | None:
+    """Valeur de concerts.frais_previsionnels : opérations prévisionnelles 'Frais' (débit) imputées
+    à CB ASSO7 pour ce concert ; None si nulle ou sans CB ASSO7 (une requête, relue en base)."""
+    if not id_role(ROLE_CB):
+        return None  # Pas de CB ASSO7 => par prudence, le champ à None
+    total = frais_concerts.frais_du_concert(concert_id, fraiche=True).previsionnels
+    return None if float(total) == 0.0 else float(total)
+
+
 def recompute_frais_previsionnels(concert_id: int) -> float:
     """Recalcule concerts.frais_previsionnels en sommant les opérations
     prévisionnelles 'Frais' (débit) imputées à CB ASSO7 pour ce concert."""
-    from models import db, Operation, Musicien, Concert
-
-    cb_id = (
-        Musicien.query
-        .filter(db.func.lower(db.func.trim(Musicien.nom)) == 'cb asso7')
-        .with_entities(Musicien.id)
-        .scalar()
-    )
-    if not cb_id:
-        # Pas de CB ASSO7 => par prudence, 0 ET on met le champ à None
-        c = Concert.query.get(concert_id)
-        if c:
-            c.frais_previsionnels = None
-            db.session.add(c)
-            db.session.commit()
-        return 0.0
-
-    total = (
-        db.session.query(db.func.coalesce(db.func.sum(Operation.montant), 0.0))
-        .filter(
-            Operation.concert_id == concert_id,
-            Operation.previsionnel.is_(True),
-            db.func.lower(db.func.coalesce(Operation.motif, '')) == 'frais',
-            db.func.lower(db.func.coalesce(Operation.type,  '')) == 'debit',
-            Operation.musicien_id == cb_id,
-        )
-        .scalar()
-        or 0.0
-    )
+    total = frais_previsionnels_du_concert(concert_id)
 
     c = Concert.query.get(concert_id)
     if c:
-        c.frais_previsionnels = (None if float(total) == 0.0 else float(total))
+        c.frais_previsionnels = total
         db.session.add(c)
         db.session.commit()
-    return float(total)
+    return float(total or 0.0)
 
-def ensure_op_frais_previsionnels(concert_id: int, frais_txt: str | None) -> None:
+
+def preparer_op_frais_previsionnels(concert, frais_txt: str | None):
     """
-    Crée / met à jour / supprime l'opération prévisionnelle 'Frais' liée à un concert.
+    Crée / met à jour / supprime EN SESSION (sans flush ni commit) l'opération prévisionnelle 'Frais'
+    d'un concert, éventuellement pas encore inséré.
     ✅ Imputée par défaut à **CB ASSO7** (fallback 'ASSO7' si CB absent).
+    Renvoie l'opération conservée (None si supprimée) : après le flush, lier_op_frais_previsionnels()
+    pose concert.op_prevision_frais_id, et frais_previsionnels_du_concert() donne le nouveau total.
     """
-    from models import db, Concert, Operation, Musicien
-
-    concert = Concert.query.get(concert_id)
-    if not concert:
-        return
-
     montant = _parse_montant(frais_txt)
 
     # CB ASSO7 prioritaire
-    cb = Musicien.query.filter(Musicien.nom == "CB ASSO7").first()
-    if not cb:
-        cb = Musicien.query.filter(Musicien.nom == "ASSO7").first()
+    cb = musicien_role(ROLE_CB) or musicien_role(ROLE_ASSO7)
+
+    ops_prev = []
+    if concert.id is not None:
+        ops_prev = Operation.query.filter_by(concert_id=concert.id, previsionnel=True, motif="Frais").all()
 
     # — Cas SUPPRESSION : montant vide/0 → on purge TOUTES les prévisionnelles "Frais" de ce concert
     if not montant:
-        ops_prev = Operation.query.filter_by(
-            concert_id=concert.id,
-            previsionnel=True,
-            motif="Frais"
-        ).all()
         for opx in ops_prev:
             db.session.delete(opx)
-
         concert.op_prevision_frais_id = None
-        # On ne fixe pas directement frais_previsionnels : on laisse le recompute
-        db.session.add(concert)
-        db.session.commit()
-
-        # recalcul agrégé (mettra None si total = 0)
-        recompute_frais_previsionnels(concert.id)
-        return
+        return None
 
     # — Cas CREATION / MISE A JOUR
     op = None
     if concert.op_prevision_frais_id:
-        op = Operation.query.get(concert.op_prevision_frais_id)
-    if not op:
-        op = Operation.query.filter_by(
-            concert_id=concert.id,
-            previsionnel=True,
-            motif="Frais"
-        ).first()
+        op = db.session.get(Operation, concert.op_prevision_frais_id)
+    if not op and ops_prev:
+        op = ops_prev[0]
 
     if not op:
         op = Operation(
@@ -1233,16 +1171,13 @@ def ensure_op_frais_previsionnels(concert_id: int, frais_txt: str | None) -> Non
             type="debit",
             motif="Frais",
             nature="frais",
-            precision=f"Frais prévisionnels — Concert #{concert.id} {concert.lieu}",
             montant=montant,
             date=concert.date,
-            concert_id=concert.id,
             previsionnel=True,
             auto_cb_asso7=False,  # visible dans « à venir »
         )
+        op.concert = concert  # concert_id posé au flush (concert éventuellement nouveau)
         db.session.add(op)
-        db.session.flush()           # récupère op.id
-        concert.op_prevision_frais_id = op.id
     else:
         op.musicien_id = (cb.id if cb else op.musicien_id)
         op.type = "debit"
@@ -1252,9 +1187,31 @@ def ensure_op_frais_previsionnels(concert_id: int, frais_txt: str | None) -> Non
         op.date = concert.date
         op.previsionnel = True
         op.auto_cb_asso7 = False
-        db.session.add(op)
+    return op
+
+
+def lier_op_frais_previsionnels(concert, op) -> None:
+    """Après flush (ids connus) : lien concert → opération prévisionnelle et libellé de l'opération."""
+    if op is None:
+        return
+    if not op.precision:
+        op.precision = f"Frais prévisionnels — Concert #{concert.id} {concert.lieu}"
+    concert.op_prevision_frais_id = op.id
+
 
-    db.session.add(concert)
+def ensure_op_frais_previsionnels(concert_id: int, frais_txt: str | None) -> None:
+    """
+    Crée / met à jour / supprime l'opération prévisionnelle 'Frais' liée à un concert, puis valide
+    et recalcule concert.frais_previsionnels (mettra None si total = 0).
+    Enregistrement complet d'un concert en une transaction : sauvegarde_concert.py.
+    """
+    concert = Concert.query.get(concert_id)
+    if not concert:
+        return
+
+    op = preparer_op_frais_previsionnels(concert, frais_txt)
+    db.session.flush()           # récupère op.id
+    lier_op_frais_previsionnels(concert, op)
     db.session.commit()
 
     # recalcul agrégé (et écrit le champ concert.frais_previsionnels)
@@ -1277,8 +1234,6 @@ def detach_prevision_if_needed(op: Operation):
 # 5. 💸 GESTION DES OPÉRATIONS
 # ─────────────────────────────────────────────
 
-from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-
 def enregistrer_operation_en_db(data):
     # --- Helpers locaux (évite toute dépendance externe) ---
     def _to_float(x):
@@ -1307,15 +1262,12 @@ def enregistrer_operation_en_db(data):
         # mais s'il faut un fallback strict :
         return "debit"
 
-    nom_saisi = (data.get("musicien") or "").strip().lower()
-    musiciens = Musicien.query.all()
-
-    cible = next(
-        (m for m in musiciens if f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".strip().lower() == nom_saisi),
-        None
-    )
+    # 🎯 Bénéficiaire : id ("musicien_id" ou "musicien") ou nom affiché, via l'index de annuaire.py
+    qui = data.get("musicien_id") or data.get("musicien")
+    cible = resoudre_musicien(qui)
     if not cible:
-        raise ValueError(f"Musicien introuvable pour le nom : {data.get('musicien')}")
+        raise ValueError(f"Musicien introuvable pour le nom : {qui}")
+    libelle_cible = nom_affiche(cible.prenom, cible.nom)
 
     # 📆 Conversion date : accepte 'jj/mm/aaaa' ou déjà 'aaaa-mm-jj'
     date_str = (data.get("date") or "").strip()
@@ -1338,11 +1290,11 @@ def enregistrer_operation_en_db(data):
     precision = data.get("precision", "")
 
     # 🎯 Déduction automatique du type selon le motif (garde ta logique existante)
-    cible_nom_normalise = (cible.nom or "").strip().lower()
+    cible_role = role_de(cible.id)
     concert_id = _to_int_or_none(data.get("concert_id"))  # <- *** fix: '' devient None ***
     if motif == "Frais de concerts": 
         # même règle qu'avant : CB/CAISSE => débit, sinon crédit
-        type_op = "debit" if cible_nom_normalise in ["cb asso7", "caisse asso7"] else "credit"
+        type_op = "debit" if cible_role in ROLES_TRESORERIE else "credit"
     elif motif == "Frais divers":
         # hors concert => toujours débit
         type_op = "debit"
@@ -1388,13 +1340,13 @@ def enregistrer_operation_en_db(data):
         )
         db.session.add(commission_debit)
 
-        lionel = next((m for m in musiciens if f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".lower() == "lionel arnould"), None)
+        lionel = resoudre_musicien("Lionel Arnould")
         if lionel:
             commission_credit = Operation(
                 musicien_id=lionel.id,
                 type="credit",
                 motif="Commission Lionel",
-                precision=f"3% brut de {data.get('musicien')}",
+                precision=f"3% brut de {libelle_cible}",
                 montant=commission,
                 date=date_op,
                 operation_liee_id=op.id
@@ -1405,15 +1357,15 @@ def enregistrer_operation_en_db(data):
     # Si on saisit une opération sur ASSO7, on crée une op miroir sur CB ASSO7 (mode Compte)
     # ou CAISSE ASSO7 (mode Espèces) pour impacter la trésorerie.
     # Cette op "auto_cb_asso7" est ignorée côté ASSO7 dans les totaux.
-    if cible_nom_normalise == "asso7":
+    if cible_role == ROLE_ASSO7:
         mode_val = (data.get("mode") or "Compte").strip().lower()
 
         # cible trésorerie: CB pour "compte/cb/carte", CAISSE pour "espèces/caisse"
         cible_treso = None
         if mode_val in ("compte", "cb", "carte", "cb asso7"):
-            cible_treso = next((m for m in musiciens if (m.nom or "").strip().lower() == "cb asso7"), None)
+            cible_treso = musicien_role(ROLE_CB)
         elif mode_val in ("especes", "espèces", "caisse", "caisse asso7"):
-            cible_treso = next((m for m in musiciens if (m.nom or "").strip().lower() == "caisse asso7"), None)
+            cible_treso = musicien_role(ROLE_CAISSE)
 
         if cible_treso:
             op_treso = Operation(
@@ -1434,13 +1386,13 @@ def enregistrer_operation_en_db(data):
     is_remb_frais  = (str(motif or "").strip().lower() == "remboursement frais divers")
     is_frais_divers = (str(motif or "").strip().lower() == "frais divers")
 
-    if (is_salaire or is_remb_frais or is_frais_divers) and cible_nom_normalise not in ["cb asso7", "caisse asso7"]:
+    if (is_salaire or is_remb_frais or is_frais_divers) and cible_role not in ROLES_TRESORERIE:
         mode_val = (data.get("mode") or "Compte").strip().lower()
         cible_debit = None
         if mode_val == "compte":
-            cible_debit = next((m for m in musiciens if (m.nom or "").strip().lower() == "cb asso7"), None)
+            cible_debit = musicien_role(ROLE_CB)
         elif mode_val in ("especes", "espèces"):
-            cible_debit = next((m for m in musiciens if (m.nom or "").strip().lower() == "caisse asso7"), None)
+            cible_debit = musicien_role(ROLE_CAISSE)
 
         if cible_debit:
             db.session.flush()  # garantir op.id
@@ -1454,8 +1406,8 @@ def enregistrer_operation_en_db(data):
             debit_auto = Operation(
                 musicien_id=cible_debit.id,
                 type="debit",
-                motif=f"Débit {lib} {data.get('musicien') or (cible.prenom + ' ' + (cible.nom or ''))}".strip(),
-                precision=f"{lib} payé à {data.get('musicien') or (cible.prenom + ' ' + (cible.nom or ''))}".strip(),
+                motif=f"Débit {lib} {libelle_cible}".strip(),
+                precision=f"{lib} payé à {libelle_cible}".strip(),
                 montant=float(montant),
                 date=date_op,
                 operation_liee_id=op.id,
@@ -1472,13 +1424,10 @@ def enregistrer_operation_en_db(data):
         try:
             concert = Concert.query.get(concert_id)
             if concert:
-                # 1) toujours recalculer la somme des frais SQL (évite écarts si modifs/suppressions)
+                # toujours recalculer la somme des frais SQL (évite écarts si modifs/suppressions) ;
+                # le partage suit via le suivi des concerts marqués (calcul_participations)
                 recalculer_frais_concert(concert.id)
                 db.session.flush()  # s'assure que concert.frais est à jour en DB
-
-                # 2) recalcul immédiat des potentiels pour CE concert
-                from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
         except Exception as e:
             print("⚠️ Erreur mise à jour frais concert:", e)
 
@@ -1496,108 +1445,115 @@ def enregistrer_operation_en_db(data):
     # 💾 Enregistrement global + recalcul
     try:
         db.session.commit()
-        
-        # --- RECOMPUTE POTENTIAL (FIX UnboundLocalError) --------------------------
-        # Recalcule le crédit potentiel si l'opération est liée à un concert
-        cid_raw = data.get("concert_id")
-        try:
-            cid = int(str(cid_raw).strip()) if cid_raw else None
-        except Exception:
-            cid = None
-
-        if cid:
-            # Import local AVANT l'appel (évite l'UnboundLocalError)
-            from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-            try:
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(cid)
-            except Exception as e:
-                # On logge mais on ne casse pas la requête
-                print(f"[WARN] Recalcul potentiel ignoré pour concert {cid}: {e}")
-    # --------------------------------------------------------------------------
-            
-        print(f"[OK] Operation {motif} enregistrée pour {data.get('musicien')}")
-
-        if concert_id:
-            db.session.expire_all()
-            concert_verif = Concert.query.get(concert_id)
-            print(f"[CHECK] Avant recalcul → concert_id={concert_id}, payé={concert_verif.paye}")
-            mettre_a_jour_credit_calcule_potentiel_pour_concert(concert_id)
+        # (le concert lié, s'il est touché, est recalculé avec les autres concerts marqués)
+        print(f"[OK] Operation {motif} enregistrée pour {libelle_cible}")
     except Exception as e:
         db.session.rollback()
         print(f"❌ Erreur lors de l'enregistrement de l'opération : {e}")
         raise
 
 
+def _operations_liees(operation_id: int):
+    """
+    Fermeture du graphe operation_liee_id autour d'une opération (enfants, parents, pairs
+    réciproques, à toute profondeur) en UNE requête récursive (SQLite ≥ 3.8.3 et Postgres).
+    UNION (et non UNION ALL) élimine les doublons : les cycles salaire ⇄ débit auto terminent.
+    Renvoie les lignes (id, musicien_id, concert_id, categorie, date, cloture_saison) des opérations trouvées.
+    """
+    from sqlalchemy import Integer, cast, literal, select
+
+    ops = Operation.__table__
+    courante, voisine = ops.alias("courante"), ops.alias("voisine")
+
+    # CAST explicite : Postgres doit typer le terme initial de l'UNION récursive
+    liees = select(cast(literal(operation_id), Integer).label("id")).cte("liees", recursive=True)
+    liees = liees.union(
+        select(voisine.c.id)
+        .select_from(
+            liees
+            .join(courante, courante.c.id == liees.c.id)
+            .join(voisine, or_(voisine.c.operation_liee_id == courante.c.id,
+                               voisine.c.id == courante.c.operation_liee_id))
+        )
+    )
+    return db.session.execute(
+        select(ops.c.id, ops.c.musicien_id, ops.c.concert_id, ops.c.categorie, ops.c.date, ops.c.cloture_saison)
+        .where(ops.c.id.in_(select(liees.c.id)))
+    ).all()
+
+
 def supprimer_operation_en_db(operation_id: int):
     """
     Supprime une opération et TOUTES ses opérations liées, en cassant d'abord les FK (operation_liee_id) pour éviter
     la violation de contrainte sur la table auto-référente 'operations'.
 
-    Stratégie :
-      1) Explore le graphe des liens via operation_liee_id (enfants directs et indirects + pair réciproque éventuel).
-      2) Met operation_liee_id = NULL sur TOUTES les lignes qui pointent vers l'un des IDs à supprimer (y compris entre elles).
-      3) Supprime les opérations collectées.
-      4) Commit + recalcul éventuel si concert associé.
+    Stratégie (nombre de requêtes constant, quelle que soit la profondeur des liens) :
+      1) Une requête récursive (CTE) collecte les opérations liées (enfants, parents, pairs réciproques).
+      2) Met operation_liee_id = NULL sur TOUTES les lignes qui pointent vers l'un des IDs à supprimer
+         (ainsi que concerts.op_prevision_frais_id).
+      3) Supprime les opérations collectées en un seul DELETE.
+      4) Les écritures groupées ne passent pas par le flush : on marque explicitement les soldes,
+         l'index de recherche, les saisons (cache des archives, résumés) et les concerts (frais)
+         touchés, puis commit.
     """
-    op = db.session.get(Operation, operation_id)
-    if not op:
-        raise ValueError(f"Opération ID={operation_id} introuvable.")
-
-    # --- 1) Construire l'ensemble des opérations à supprimer (cascade applicative) ---
-    to_delete = set()
-    stack = [op]
+    from sqlalchemy import delete, update, inspect as sa_inspect
+    from calcul_participations import marquer_concerts_a_recalculer
 
-    seen = set()
-    while stack:
-        cur = stack.pop()
-        if cur.id in seen:
-            continue
-        seen.add(cur.id)
-        to_delete.add(cur)
-
-        # enfants (ceux qui pointent vers cur)
-        enfants = Operation.query.filter_by(operation_liee_id=cur.id).all()
-        for e in enfants:
-            if e.id not in seen:
-                stack.append(e)
-
-        # lien réciproque éventuel (cur pointe vers un "pair")
-        if cur.operation_liee_id:
-            pair = db.session.get(Operation, cur.operation_liee_id)
-            if pair and pair.id not in seen:
-                stack.append(pair)
-
-    if not to_delete:
-        return True
+    # --- 1) Construire l'ensemble des opérations à supprimer (cascade en base) ---
+    lignes = _operations_liees(int(operation_id))
+    if not lignes:
+        raise ValueError(f"Opération ID={operation_id} introuvable.")
 
-    ids_to_delete = [o.id for o in to_delete]
+    clotures.refuser_si_cloturees(lignes)  # le DELETE groupé ne passe pas par le flush
+    ids_to_delete = sorted(l.id for l in lignes)
 
-    # --- 2) Casser TOUTES les références vers ces IDs (y compris références croisées dans le lot) ---
     try:
-        # Mettre operation_liee_id = NULL pour toute ligne (dans toute la table) qui référence l'un des IDs
-        # synchronize_session=False : plus efficace, on flush ensuite.
-        (
-            db.session.query(Operation)
-            .filter(Operation.operation_liee_id.in_(ids_to_delete))
-            .update({Operation.operation_liee_id: None}, synchronize_session=False)
+        # --- 2) Casser TOUTES les références vers ces IDs (y compris références croisées dans le lot) ---
+        db.session.execute(
+            update(Operation)
+            .where(Operation.operation_liee_id.in_(ids_to_delete))
+            .values(operation_liee_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(Concert)
+            .where(Concert.op_prevision_frais_id.in_(ids_to_delete))
+            .values(op_prevision_frais_id=None)
+            .execution_options(synchronize_session=False)
         )
-        db.session.flush()
 
         # --- 3) Supprimer les opérations collectées ---
-        # On peut supprimer dans n'importe quel ordre maintenant que les FK sont nullifiées
-        for o in to_delete:
-            db.session.delete(o)
+        db.session.execute(
+            delete(Operation)
+            .where(Operation.id.in_(ids_to_delete))
+            .execution_options(synchronize_session=False)
+        )
 
+        # Les objets déjà chargés de ces opérations n'existent plus : on les sort de la session
+        # (sinon l'expiration au commit les ferait relire… et échouer).
+        supprimes = set(ids_to_delete)
+        for obj in list(db.session.identity_map.values()):
+            identite = sa_inspect(obj).identity
+            if isinstance(obj, Operation) and identite and identite[0] in supprimes:
+                db.session.expunge(obj)
+
+        # --- 4) Grand livre, recherche, saisons + concerts dont des frais ont été supprimés ---
+        soldes.marquer_soldes_a_rafraichir(db.session, {l.musicien_id for l in lignes})
+        recherche.marquer_operations_a_indexer(db.session, ids_to_delete)
+        saisons_touchees = {saisons.saison_de(l.date) for l in lignes}
+        archives.marquer_archives_perimees(db.session, saisons_touchees)
+        saisons.marquer_saisons_a_resumer(
+            db.session, {(saisons.ENTITE_OPERATIONS, s) for s in saisons_touchees}
+        )
+        marquer_concerts_a_recalculer(
+            db.session,
+            {l.concert_id for l in lignes if l.categorie == CATEGORIE_FRAIS},
+        )
+        frais_concerts.marquer_frais_perimes(
+            db.session, {l.concert_id for l in lignes if l.categorie == CATEGORIE_FRAIS}
+        )
         db.session.commit()
 
-        # --- 4) Recalcul éventuel si une des opérations supprimées concernait un concert ---
-        try:
-            # On tente un recalcul minimal : si l'op initiale avait un concert_id
-            if getattr(op, "concert_id", None):
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(op.concert_id)
-        except Exception as e:
-            print(f"[WARN] recalcul après suppression op {op.id} : {e}")
-
         print(f"[OK] Suppression cascade réussie pour opérations {ids_to_delete}")
         return True
 
@@ -1628,7 +1584,7 @@ def annuler_operation(id):
         db.session.delete(op_liee)
 
     # Mémorise si c'était un frais de concert AVANT suppression
-    etait_frais = (operation.motif or "").strip().lower() in {"frais", "frais de concerts"}
+    etait_frais = operation.categorie == CATEGORIE_FRAIS
 
     db.session.delete(operation)
     db.session.commit()
@@ -1646,16 +1602,8 @@ def annuler_operation(id):
             concert.paye = False
             db.session.add(concert)
             db.session.commit()
-            # Recalcul des crédits potentiels POUR CE concert.
-            # (Avant : appel à mettre_a_jour_credit_calcule_potentiel(concert) qui ne prend
-            #  AUCUN argument -> TypeError avalée, le recalcul ne se faisait jamais.)
-            try:
-                from calcul_participations import mettre_a_jour_credit_calcule_potentiel_pour_concert
-                print(f"[INFO] Recalcul des participations potentielles pour concert {concert.id}")
-                mettre_a_jour_credit_calcule_potentiel_pour_concert(concert.id)
-                db.session.commit()
-            except Exception as e:
-                _alerter_recalc(concert.id, e)
+            # Recalcul des crédits potentiels POUR CE concert : le passage paye=False
+            # le marque, recalculé avec les autres concerts marqués (fin de requête).
 
     return True
 
@@ -1762,7 +1710,7 @@ def modifier_operation_en_db(operation_id, form_data):
         s = str(x).strip()
         return int(s) if s.isdigit() else None
 
-    def _infer_type_from_motif_if_missing(type_val, motif_val, cible_nom_norm):
+    def _infer_type_from_motif_if_missing(type_val, motif_val, cible_role):
         t = (type_val or "").strip().lower()
         if t:
             return "credit" if t.startswith("cr") else "debit"
@@ -1772,7 +1720,7 @@ def modifier_operation_en_db(operation_id, form_data):
         if m == "recette concert":
             return "credit"
         if m == "frais":
-            return "debit" if cible_nom_norm in ["cb asso7", "caisse asso7"] else "credit"
+            return "debit" if cible_role in ROLES_TRESORERIE else "credit"
         return "debit"
 
     # Copie modifiable
@@ -1792,32 +1740,15 @@ def modifier_operation_en_db(operation_id, form_data):
     if not op:
         raise ValueError(f"Opération ID={operation_id} introuvable.")
 
-    # --- Récupération de tous les musiciens
-    musiciens = Musicien.query.all()
-
-    # --- Détermination du musicien cible ---
-    musicien_id = data.get("musicien")  # ID (str) attendu, mais on tolère legacy nom complet
-    nom_saisi = (data.get("musicien_nom") or "").strip().lower()  # Ancien fallback
-
-    cible = None
-    if musicien_id:
-        # Cherche d'abord par ID
-        cible = next((m for m in musiciens if str(m.id) == str(musicien_id)), None)
-        if not cible:
-            # Cas legacy : nom complet dans "musicien"
-            cible = next(
-                (m for m in musiciens if f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".strip().lower() == str(musicien_id).strip().lower()),
-                None
-            )
-    elif nom_saisi:
-        # Fallback pour les vieux formulaires où seul le nom serait transmis
-        cible = next(
-            (m for m in musiciens if f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".strip().lower() == nom_saisi),
-            None
-        )
+    # --- Détermination du musicien cible (index de annuaire.py, pas de parcours de la table) ---
+    musicien_id = data.get("musicien_id") or data.get("musicien")  # ID attendu, mais on tolère le nom complet
+    nom_saisi = (data.get("musicien_nom") or "").strip()  # Ancien fallback
+
+    cible = resoudre_musicien(musicien_id) if musicien_id else resoudre_musicien(nom_saisi)
 
     if not cible:
         raise ValueError(f"Musicien introuvable pour l'identifiant '{musicien_id}' ou le nom : '{nom_saisi}'")
+    libelle_cible = nom_affiche(cible.prenom, cible.nom)
 
     # Conversion date si nécessaire (à ce stade, data["date"] est au bon format ISO)
     try:
@@ -1828,7 +1759,7 @@ def modifier_operation_en_db(operation_id, form_data):
 
     # Normalisations champs
     motif = data.get("motif")
-    cible_nom_normalise = (cible.nom or "").strip().lower()
+    cible_role = role_de(cible.id)
     concert_id = _to_int_or_none(data.get("concert_id"))  # <-- fix: '' -> None
     montant_val = _to_float(data.get("montant"))
     brut_val = _to_float(data.get("brut"))
@@ -1836,7 +1767,7 @@ def modifier_operation_en_db(operation_id, form_data):
         raise ValueError("Montant manquant ou invalide.")
 
     # Type selon motif (même logique que création, avec fallback)
-    type_op = _infer_type_from_motif_if_missing(data.get("type"), motif, cible_nom_normalise)
+    type_op = _infer_type_from_motif_if_missing(data.get("type"), motif, cible_role)
 
     # --- MAJ de l’opération principale (sans commit)
     op.musicien = cible
@@ -1863,14 +1794,12 @@ def modifier_operation_en_db(operation_id, form_data):
 
     # --- Sync / recréation de l'opération liée auto_cb_asso7 lors d'une MODIFICATION ---
     try:
-        cible_nom = (getattr(op.musicien, "nom", "") or "").strip().lower()
-
-        if cible_nom == "asso7":
+        if role_de(op.musicien_id) == ROLE_ASSO7:
             mode_val = (str(data.get("mode") or "Compte")).strip().lower()
 
             # Trouver la cible trésorerie (CB ou CAISSE)
-            cb = next((m for m in musiciens if (m.nom or "").strip().lower() == "cb asso7"), None)
-            caisse = next((m for m in musiciens if (m.nom or "").strip().lower() == "caisse asso7"), None)
+            cb = musicien_role(ROLE_CB)
+            caisse = musicien_role(ROLE_CAISSE)
 
             cible_treso = None
             if mode_val in ("compte", "cb", "carte", "cb asso7"):
@@ -1942,13 +1871,13 @@ def modifier_operation_en_db(operation_id, form_data):
         )
         db.session.add(commission_debit)
 
-        lionel = next((m for m in musiciens if f"{(m.prenom or '').strip()} {(m.nom or '').strip()}".lower() == "lionel arnould"), None)
+        lionel = resoudre_musicien("Lionel Arnould")
         if lionel:
             commission_credit = Operation(
                 musicien_id=lionel.id,
                 type="credit",
                 motif="Commission Lionel",
-                precision=f"3% brut de {data.get('musicien') or (cible.prenom + ' ' + cible.nom)}",
+                precision=f"3% brut de {libelle_cible}",
                 montant=commission,
                 date=date_op,
                 operation_liee_id=op.id
@@ -1958,13 +1887,13 @@ def modifier_operation_en_db(operation_id, form_data):
     is_remb_frais = (str(motif or "").strip().lower() == "remboursement frais divers")
 
     # 🔥 Débit automatique du compte payeur (CB/CAISSE) pour Salaire ou Remboursement frais (≠ ASSO7)
-    if (is_salaire or is_remb_frais) and cible_nom_normalise not in ["cb asso7", "caisse asso7"]:
+    if (is_salaire or is_remb_frais) and cible_role not in ROLES_TRESORERIE:
         mode_val = (data.get("mode") or "Compte").strip().lower()
         cible_debit = None
         if mode_val == "compte":
-            cible_debit = next((m for m in musiciens if (m.nom or "").strip().lower() == "cb asso7"), None)
+            cible_debit = musicien_role(ROLE_CB)
         elif mode_val in ("especes", "espèces"):
-            cible_debit = next((m for m in musiciens if (m.nom or "").strip().lower() == "caisse asso7"), None)
+            cible_debit = musicien_role(ROLE_CAISSE)
 
         if cible_debit:
             db.session.flush()
@@ -1972,8 +1901,8 @@ def modifier_operation_en_db(operation_id, form_data):
             debit_auto = Operation(
                 musicien_id=cible_debit.id,
                 type="debit",
-                motif=f"Débit {lib} {data.get('musicien') or (cible.prenom + ' ' + (cible.nom or ''))}".strip(),
-                precision=f"{lib} payé à {data.get('musicien') or (cible.prenom + ' ' + (cible.nom or ''))}".strip(),
+                motif=f"Débit {lib} {libelle_cible}".strip(),
+                precision=f"{lib} payé à {libelle_cible}".strip(),
                 montant=float(montant_val),
                 date=date_op,
                 operation_liee_id=op.id,
@@ -1993,23 +1922,8 @@ def modifier_operation_en_db(operation_id, form_data):
             print("⚠️ Erreur mise à jour frais concert:", e)
 
     db.session.commit()
-
-    # ✅ Recalcul du partage du concert concerné (après commit et rechargement)
-    if concert_id:
-        try:
-            from calcul_participations import partage_benefices_concert, mettre_a_jour_credit_calcule_potentiel
-            db.session.expire_all()
-            concert = Concert.query.get(concert_id)
-            if concert:
-                if concert.paye:
-                    print(f"🎯 Recalcul du crédit RÉEL pour concert payé ID={concert.id}")
-                    partage_benefices_concert(concert)
-                else:
-                    print(f"🎯 Recalcul du crédit POTENTIEL pour concert non payé ID={concert.id}")
-                    mettre_a_jour_credit_calcule_potentiel(concert)
-                db.session.commit()
-        except Exception as e:
-            print(f"⚠️ Erreur lors du recalcul du partage pour concert ID={concert_id} :", e)
+    # ✅ Partage des concerts touchés (ancien et nouveau concert_id) : recalcul groupé
+    #    en fin de requête via le suivi des concerts marqués (calcul_participations).
 
     return op
 
@@ -2084,11 +1998,9 @@ def saisons_from_dates(dt):
 def saison_from_date(dt):
     """
     Reçoit une date (datetime.date) et renvoie la saison correspondante au format '2023/2024'.
+    Même valeur que la colonne `saison` d'Operation / Concert / Cachet (models.saison_de).
     """
-    if dt.month < 9:
-        return f"{dt.year - 1}/{dt.year}"
-    else:
-        return f"{dt.year}/{dt.year + 1}"
+    return saisons.saison_de(dt)
 
 def charger_concerts():
     chemin = Path("data/concerts.json")
@@ -2105,85 +2017,62 @@ def generer_tableau_comptes():
     """
     Génère la liste des comptes pour chaque musicien et structure,
     avec CAISSE ASSO7 et TRESO ASSO7 toujours présents en bas, même à 0.
+    Les montants sont lus dans le grand livre des soldes (cf. soldes.lire_soldes).
     Retourne :
         - tableau_comptes : liste de dictionnaires avec crédits et infos.
         - musiciens_length : nombre de musiciens dans la liste (utile pour affichage).
     """
-    concerts = Concert.query.all()
+    from soldes import lire_soldes, composantes_de, recettes_attendues_par_compte, credit_reel, gains_a_venir
+
+    composantes = lire_soldes()
+    recettes_attendues = recettes_attendues_par_compte()
     musiciens = [m for m in Musicien.query.filter_by(actif=True, type='musicien').all()]
 
-    noms_structures = ['ASSO7', 'CB ASSO7', 'CAISSE ASSO7', 'TRESO ASSO7']
-    structures_dict = {nom: Musicien.query.filter_by(nom=nom).first() for nom in noms_structures}
+    def _montants(m):
+        c = composantes_de(composantes, m.id)
+        credit = credit_reel(m.id, c)
+        recettes = recettes_attendues.get(m.id, 0.0) if role_de(m.id) in ROLES_TRESORERIE else None
+        gains = gains_a_venir(c, recettes)
+        return credit, gains, credit + gains
 
     tableau_comptes = []
     # 1. Tous les musiciens physiques
     for m in musiciens:
+        credit, gains, potentiel = _montants(m)
         tableau_comptes.append({
             'nom': f"{m.prenom} {m.nom}".strip(),
-            'credit_actuel': calculer_credit_actuel(m, concerts),
-            'gains_a_venir': calculer_gains_a_venir(m, concerts),
-            'credit_potentiel': calculer_credit_potentiel(m, concerts),
+            'credit_actuel': credit,
+            'gains_a_venir': gains,
+            'credit_potentiel': potentiel,
             'type': 'musicien'
         })
 
     musiciens_length = len(tableau_comptes)
-    
-    # --- Ajout virtuel des gains à venir des recettes concerts à venir aux structures CB ASSO7 ou CAISSE ASSO7 ---
-    for concert in concerts:
-        if not concert.paye and concert.recette and concert.mode_paiement_prevu:
-            # On crédite le "gains_a_venir" du bon compte structure (CB ASSO7 ou CAISSE ASSO7)
-            for ligne in tableau_comptes:
-                if ligne['nom'] == concert.mode_paiement_prevu:
-                    ligne['gains_a_venir'] += float(concert.recette)
-            # Et aussi pour TRESO ASSO7 (qui additionne CB et CAISSE)
-            # --> ce sera pris en compte plus bas par la somme des deux
-    
 
-    # 2. Structures spéciales (sauf TRESO ASSO7)
-    for nom in ['ASSO7', 'CB ASSO7', 'CAISSE ASSO7']:
-        s = structures_dict.get(nom)
-        if s:
-            tableau_comptes.append({
-                'nom': s.nom,
-                'credit_actuel': calculer_credit_actuel(s, concerts),
-                'gains_a_venir': calculer_gains_a_venir(s, concerts),
-                'credit_potentiel': calculer_credit_potentiel(s, concerts),
-                'type': 'structure'
-            })
-        else:
-            tableau_comptes.append({
-                'nom': nom,
-                'credit_actuel': 0.0,
-                'gains_a_venir': 0.0,
-                'credit_potentiel': 0.0,
-                'type': 'structure'
-            })
-
-    # 3. Ligne TRESO ASSO7 = somme CB ASSO7 + CAISSE ASSO7
-    cb = structures_dict.get('CB ASSO7')
-    caisse = structures_dict.get('CAISSE ASSO7')
-
-    # On recalcule ici, même si la structure n'existe pas (reste à 0)
-    if cb:
-        credit_actuel_cb = calculer_credit_actuel(cb, concerts)
-        gains_a_venir_cb = calculer_gains_a_venir(cb, concerts)
-        credit_potentiel_cb = calculer_credit_potentiel(cb, concerts)
-    else:
-        credit_actuel_cb = gains_a_venir_cb = credit_potentiel_cb = 0.0
-
-    if caisse:
-        credit_actuel_caisse = calculer_credit_actuel(caisse, concerts)
-        gains_a_venir_caisse = calculer_gains_a_venir(caisse, concerts)
-        credit_potentiel_caisse = calculer_credit_potentiel(caisse, concerts)
-    else:
-        credit_actuel_caisse = gains_a_venir_caisse = credit_potentiel_caisse = 0.0
+    # 2. Structures spéciales (sauf TRESO ASSO7), titulaires des rôles de l'annuaire ; les recettes
+    #    attendues des concerts non payés sont comptées dans les gains à venir de CB ASSO7 / CAISSE ASSO7.
+    montants_structures = {}
+    for role, libelle in ((ROLE_ASSO7, 'ASSO7'), (ROLE_CB, 'CB ASSO7'), (ROLE_CAISSE, 'CAISSE ASSO7')):
+        s = musicien_role(role)
+        credit, gains, potentiel = _montants(s) if s else (0.0, 0.0, 0.0)
+        montants_structures[role] = (credit, gains, potentiel)
+        tableau_comptes.append({
+            'nom': s.nom if s else libelle,
+            'credit_actuel': credit,
+            'gains_a_venir': gains,
+            'credit_potentiel': potentiel,
+            'type': 'structure'
+        })
 
-    # Ajoute la ligne TRESO ASSO7 toujours, même si non présente dans la base
+    # 3. Ligne TRESO ASSO7 = somme CB ASSO7 + CAISSE ASSO7 (toujours présente, même à 0)
+    cb = montants_structures[ROLE_CB]
+    caisse = montants_structures[ROLE_CAISSE]
+    treso = musicien_role(ROLE_TRESO)
     tableau_comptes.append({
-        'nom': 'TRESO ASSO7',
-        'credit_actuel': credit_actuel_cb + credit_actuel_caisse,
-        'gains_a_venir': gains_a_venir_cb + gains_a_venir_caisse,
-        'credit_potentiel': credit_potentiel_cb + credit_potentiel_caisse,
+        'nom': treso.nom if treso else 'TRESO ASSO7',
+        'credit_actuel': cb[0] + caisse[0],
+        'gains_a_venir': cb[1] + caisse[1],
+        'credit_potentiel': cb[2] + caisse[2],
         'type': 'structure'
     })
 
@@ -2216,14 +2105,14 @@ def get_tous_musiciens_actifs():
     Inclut type 'musicien' ET 'personne' (legacy), et accepte NULL/vides.
     Exclut les structures (ASSO7, CB ASSO7, CAISSE ASSO7, TRESO ASSO7).
     """
-    structures_noms = {"asso7", "cb asso7", "caisse asso7", "treso asso7"}
+    structures_ids = ids_roles(ROLE_ASSO7, *ROLES_SPECIAUX)
 
     return (
         Musicien.query
         .filter(
             Musicien.actif.is_(True),
-            # exclure les structures par leur nom (sécurité)
-            not_(func.lower(func.trim(Musicien.nom)).in_(structures_noms)),
+            # exclure les structures d'après l'annuaire des rôles (sécurité)
+            Musicien.id.notin_(structures_ids or [-1]),
             # accepter plusieurs types "humains"
             or_(
                 Musicien.type.is_(None),
@@ -0,0 +1,43 @@
+"""Grand livre des soldes (table account_balances)
+
+Revision ID: 3c9e1a7d52f4
+Revises: 08bcb2ad25c4
+Create Date: 2026-10-18 09:12:03.418207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1a7d52f4'
+down_revision = '08bcb2ad25c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('account_balances',
+    sa.Column('musicien_id', sa.Integer(), nullable=False),
+    sa.Column('parts_reelles', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('reports', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('ops_passees', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('ops_a_venir', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('parts_potentielles', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('date_arrete', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.ForeignKeyConstraint(['musicien_id'], ['musiciens.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('musicien_id')
+    )
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_account_balances_date_arrete'), ['date_arrete'], unique=False)
+
+    # La table est remplie par : python soldes.py rebuild
+    # (en attendant, les comptes sans ligne sont recalculés à chaque lecture, cf. soldes.lire_soldes)
+
+
+def downgrade():
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_account_balances_date_arrete'))
+
+    op.drop_table('account_balances')
@@ -0,0 +1,44 @@
+"""Table des tâches de fond (jobs)
+
+Revision ID: 7d41b6e0c2a9
+Revises: 3c9e1a7d52f4
+Create Date: 2026-10-18 10:47:31.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d41b6e0c2a9'
+down_revision = '3c9e1a7d52f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('statut', sa.String(length=20), nullable=False, server_default='en_attente'),
+    sa.Column('progression', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('message', sa.String(length=255), nullable=True),
+    sa.Column('parametres', sa.Text(), nullable=True),
+    sa.Column('resultat', sa.Text(), nullable=True),
+    sa.Column('erreur', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_jobs_statut'), ['statut'], unique=False)
+        batch_op.create_index(batch_op.f('ix_jobs_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_created_at'))
+        batch_op.drop_index(batch_op.f('ix_jobs_statut'))
+
+    op.drop_table('jobs')
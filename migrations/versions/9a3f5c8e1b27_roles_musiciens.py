@@ -0,0 +1,60 @@
+"""Rôles explicites des musiciens (colonne musiciens.role)
+
+Revision ID: 9a3f5c8e1b27
+Revises: 7d41b6e0c2a9
+Create Date: 2026-10-18 11:21:54.640318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3f5c8e1b27'
+down_revision = '7d41b6e0c2a9'
+branch_labels = None
+depends_on = None
+
+
+def _role_par_nom(nom, prenom):
+    # copie figée de annuaire.role_par_nom (une migration ne doit pas dépendre du code applicatif)
+    n = (nom or "").strip()
+    p = (prenom or "").strip()
+    if n.upper() == "ASSO7" or p.upper() == "ASSO7":
+        return "asso7"
+    n_bas = " ".join(n.lower().split())
+    if n_bas == "cb asso7":
+        return "cb"
+    if n_bas == "caisse asso7":
+        return "caisse"
+    if n_bas == "treso asso7":
+        return "treso"
+    if n.casefold() == "arnould" and p.casefold().startswith("jérôme"):
+        return "bonus"
+    return None
+
+
+def upgrade():
+    with op.batch_alter_table('musiciens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('role', sa.String(length=20), nullable=True))
+        batch_op.create_unique_constraint('uq_musiciens_role', ['role'])
+
+    # Reprise : chaque rôle au musicien de plus petit id qui porte le nom historique
+    conn = op.get_bind()
+    musiciens = sa.table('musiciens', sa.column('id', sa.Integer), sa.column('nom', sa.String),
+                         sa.column('prenom', sa.String), sa.column('role', sa.String))
+    attribues = {}
+    for mid, nom, prenom in conn.execute(
+        sa.select(musiciens.c.id, musiciens.c.nom, musiciens.c.prenom).order_by(musiciens.c.id)
+    ):
+        role = _role_par_nom(nom, prenom)
+        if role and role not in attribues:
+            attribues[role] = mid
+    for role, mid in attribues.items():
+        conn.execute(musiciens.update().where(musiciens.c.id == mid).values(role=role))
+
+
+def downgrade():
+    with op.batch_alter_table('musiciens', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_musiciens_role', type_='unique')
+        batch_op.drop_column('role')
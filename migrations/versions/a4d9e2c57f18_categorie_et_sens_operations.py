@@ -0,0 +1,65 @@
+"""Colonnes normalisées categorie (motif) et sens (type) sur operations
+
+Revision ID: a4d9e2c57f18
+Revises: f1b7c4e83a52
+Create Date: 2026-10-18 20:07:31.642195
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d9e2c57f18'
+down_revision = 'f1b7c4e83a52'
+branch_labels = None
+depends_on = None
+
+
+# Copie figée de models.CATEGORIES_MOTIF (motif normalisé → catégorie ; le reste : 'autre')
+CATEGORIES_MOTIF = {
+    "frais": "frais",
+    "frais de concerts": "frais",
+    "frais divers": "frais divers",
+    "remboursement frais divers": "remboursement",
+    "remboursement": "remboursement",
+    "salaire": "salaire",
+    "commission lionel": "commission",
+    "recette concert": "recette concert",
+    "achat": "achat",
+    "vente": "vente",
+}
+
+
+def _remplir():
+    """categorie et sens de chaque opération existante, en deux UPDATE."""
+    t = sa.table('operations', sa.column('motif', sa.String), sa.column('type', sa.String),
+                 sa.column('categorie', sa.String), sa.column('sens', sa.SmallInteger))
+    motif = sa.func.lower(sa.func.trim(sa.func.coalesce(t.c.motif, '')))
+    typ = sa.func.lower(sa.func.trim(sa.func.coalesce(t.c.type, '')))
+    op.execute(t.update().values(categorie=sa.case(CATEGORIES_MOTIF, value=motif, else_='autre')))
+    op.execute(t.update().values(sens=sa.case(
+        (typ.in_(('credit', 'crédit')), 1),
+        (typ.in_(('debit', 'débit')), -1),
+        else_=0,
+    )))
+
+
+def upgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('categorie', sa.String(length=20), nullable=False,
+                                      server_default='autre'))
+        batch_op.add_column(sa.Column('sens', sa.SmallInteger(), nullable=False, server_default='0'))
+    _remplir()
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.create_index('ix_operations_concert_categorie',
+                              ['concert_id', 'categorie', 'previsionnel'], unique=False)
+
+    # Ensuite, l'application tient les colonnes à jour depuis `motif` et `type` (models.py)
+
+
+def downgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_index('ix_operations_concert_categorie')
+        batch_op.drop_column('sens')
+        batch_op.drop_column('categorie')
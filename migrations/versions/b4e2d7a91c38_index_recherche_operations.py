@@ -0,0 +1,142 @@
+"""Index de recherche des opérations (operations_recherche + FTS5 / pg_trgm)
+
+Revision ID: b4e2d7a91c38
+Revises: 9a3f5c8e1b27
+Create Date: 2026-10-18 14:02:37.218904
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e2d7a91c38'
+down_revision = '9a3f5c8e1b27'
+branch_labels = None
+depends_on = None
+
+
+COLONNES_TEXTE = ('qui', 'motif', 'precision', 'concert')
+LONGUEURS = {'qui': 255, 'motif': 255, 'precision': 255, 'concert': 400}
+TAILLE_LOT = 500
+
+# copie figée de recherche.DDL_FTS (une migration ne doit pas dépendre du code applicatif)
+DDL_FTS_SQLITE = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS operations_recherche_fts USING fts5(
+        qui, motif, precision, concert,
+        content='operations_recherche', content_rowid='operation_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS operations_recherche_ai AFTER INSERT ON operations_recherche BEGIN
+        INSERT INTO operations_recherche_fts(rowid, qui, motif, precision, concert)
+        VALUES (new.operation_id, new.qui, new.motif, new.precision, new.concert);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operations_recherche_ad AFTER DELETE ON operations_recherche BEGIN
+        INSERT INTO operations_recherche_fts(operations_recherche_fts, rowid, qui, motif, precision, concert)
+        VALUES ('delete', old.operation_id, old.qui, old.motif, old.precision, old.concert);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operations_recherche_au AFTER UPDATE ON operations_recherche BEGIN
+        INSERT INTO operations_recherche_fts(operations_recherche_fts, rowid, qui, motif, precision, concert)
+        VALUES ('delete', old.operation_id, old.qui, old.motif, old.precision, old.concert);
+        INSERT INTO operations_recherche_fts(rowid, qui, motif, precision, concert)
+        VALUES (new.operation_id, new.qui, new.motif, new.precision, new.concert);
+    END""",
+)
+
+
+def _normaliser(txt) -> str:
+    """Copie figée de annuaire.normaliser_nom : sans accents, casse ni espaces superflus."""
+    s = unicodedata.normalize("NFKD", str(txt or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.casefold().split())
+
+
+def _remplir_index():
+    """Une ligne par opération, textes calculés comme recherche._lignes_index (copie figée)."""
+    bind = op.get_bind()
+    inspecteur = sa.inspect(bind)
+    avec_lieux = ('lieux' in inspecteur.get_table_names()
+                  and 'lieu_id' in {c['name'] for c in inspecteur.get_columns('concerts')})
+
+    o = sa.table('operations', sa.column('id', sa.Integer), sa.column('musicien_id', sa.Integer),
+                 sa.column('concert_id', sa.Integer), sa.column('motif', sa.String),
+                 sa.column('precision', sa.String))
+    m = sa.table('musiciens', sa.column('id', sa.Integer), sa.column('prenom', sa.String),
+                 sa.column('nom', sa.String))
+    c = sa.table('concerts', sa.column('id', sa.Integer), sa.column('date', sa.Date),
+                 sa.column('lieu', sa.String), sa.column('lieu_id', sa.Integer))
+    l = sa.table('lieux', sa.column('id', sa.Integer), sa.column('nom', sa.String),
+                 sa.column('ville', sa.String), sa.column('organisme', sa.String))
+    index = sa.table('operations_recherche', *(sa.column(col, sa.String) for col in COLONNES_TEXTE),
+                     sa.column('operation_id', sa.Integer))
+
+    colonnes_lieu = (l.c.nom, l.c.ville, l.c.organisme) if avec_lieux else ()
+    jointure = o.outerjoin(m, m.c.id == o.c.musicien_id).outerjoin(c, c.c.id == o.c.concert_id)
+    if avec_lieux:
+        jointure = jointure.outerjoin(l, l.c.id == c.c.lieu_id)
+    requete = sa.select(o.c.id, m.c.prenom, m.c.nom, o.c.motif, o.c.precision, c.c.date, c.c.lieu,
+                        *colonnes_lieu).select_from(jointure)
+
+    lignes = []
+    for op_id, prenom, nom, motif, precision, c_date, c_lieu, *lieu in bind.execute(requete):
+        concert = ""
+        if c_date is not None:
+            concert = " ".join(x for x in [c_date.strftime("%d/%m/%Y"), c_lieu, *lieu] if x)
+        textes = {
+            'qui': f"{(prenom or '').strip()} {(nom or '').strip()}".strip(),
+            'motif': motif, 'precision': precision, 'concert': concert,
+        }
+        lignes.append({'operation_id': op_id,
+                       **{col: _normaliser(textes[col])[:LONGUEURS[col]] for col in COLONNES_TEXTE}})
+    for i in range(0, len(lignes), TAILLE_LOT):
+        bind.execute(index.insert(), lignes[i:i + TAILLE_LOT])
+
+
+def upgrade():
+    op.create_table(
+        'operations_recherche',
+        sa.Column('operation_id', sa.Integer(), nullable=False),
+        sa.Column('qui', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('motif', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('precision', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('concert', sa.String(length=400), nullable=False, server_default=''),
+        sa.ForeignKeyConstraint(['operation_id'], ['operations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('operation_id'),
+    )
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_operations_montant'), ['montant'], unique=False)
+
+    dialecte = op.get_bind().dialect.name
+    if dialecte == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for col in COLONNES_TEXTE:
+            op.execute(
+                f"CREATE INDEX ix_operations_recherche_{col}_trgm "
+                f"ON operations_recherche USING gin ({col} gin_trgm_ops)"
+            )
+    elif dialecte == 'sqlite':
+        try:
+            for ddl in DDL_FTS_SQLITE:
+                op.execute(ddl)
+        except Exception as e:  # SQLite sans FTS5 : l'application retombe sur LIKE
+            print(f"⚠️ FTS5 indisponible : {e}")
+
+    # après les triggers : la table FTS5 se remplit avec l'index
+    _remplir_index()
+
+
+def downgrade():
+    dialecte = op.get_bind().dialect.name
+    if dialecte == 'postgresql':
+        for col in COLONNES_TEXTE:
+            op.execute(f"DROP INDEX IF EXISTS ix_operations_recherche_{col}_trgm")
+    elif dialecte == 'sqlite':
+        for trigger in ('operations_recherche_ai', 'operations_recherche_ad', 'operations_recherche_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS operations_recherche_fts")
+
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_operations_montant'))
+    op.drop_table('operations_recherche')
@@ -0,0 +1,51 @@
+"""Montant signé persisté sur operations + index couvrant des soldes
+
+Revision ID: b8e3f6a1d092
+Revises: a4d9e2c57f18
+Create Date: 2026-10-18 20:41:09.318554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f6a1d092'
+down_revision = 'a4d9e2c57f18'
+branch_labels = None
+depends_on = None
+
+
+# anciens index des soldes, remplacés par UN index couvrant qui porte toutes leurs colonnes
+ANCIENS_INDEX = [
+    ('ix_operations_musicien_date', ['musicien_id', 'date', 'previsionnel']),
+    ('ix_operations_ouvertes', ['cloture_saison', 'musicien_id']),
+]
+INDEX_SOLDES = ('ix_operations_musicien_date_signe',
+                ['musicien_id', 'date', 'previsionnel', 'cloture_saison', 'montant_signe'])
+
+
+def upgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('montant_signe', sa.Float(), nullable=False, server_default='0'))
+
+    # `sens` est déjà normalisé (a4d9e2c57f18) : une seule UPDATE
+    t = sa.table('operations', sa.column('montant', sa.Float), sa.column('sens', sa.SmallInteger),
+                 sa.column('montant_signe', sa.Float))
+    op.execute(t.update().values(montant_signe=t.c.sens * sa.func.coalesce(t.c.montant, 0.0)))
+
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        for ancien, _colonnes in ANCIENS_INDEX:
+            batch_op.drop_index(ancien)
+        batch_op.create_index(INDEX_SOLDES[0], INDEX_SOLDES[1], unique=False)
+
+    # Ensuite, l'application tient la colonne à jour depuis `type` et `montant` (models.py)
+
+
+def downgrade():
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_index(INDEX_SOLDES[0])
+        for ancien, colonnes in ANCIENS_INDEX:
+            batch_op.create_index(ancien, colonnes, unique=False)
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_column('montant_signe')
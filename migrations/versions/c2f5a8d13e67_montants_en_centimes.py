@@ -0,0 +1,56 @@
+"""Montants en centimes entiers (INTEGER) au lieu de Float / Numeric
+
+Revision ID: c2f5a8d13e67
+Revises: b8e3f6a1d092
+Create Date: 2026-10-18 21:26:53.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f5a8d13e67'
+down_revision = 'b8e3f6a1d092'
+branch_labels = None
+depends_on = None
+
+
+# table → [(colonne, type d'origine), ...] ; côté Python : monnaie.Centimes (euros ↔ centimes)
+MONTANTS = {
+    'concerts': [('recette', sa.Float()), ('recette_attendue', sa.Float()),
+                 ('frais', sa.Float()), ('frais_previsionnels', sa.Float())],
+    'participations': [('credit_calcule', sa.Float()), ('credit_calcule_potentiel', sa.Float()),
+                       ('gain_fixe', sa.Numeric(10, 2))],
+    'operations': [('montant', sa.Float()), ('montant_signe', sa.Float()), ('brut', sa.Float())],
+    'cachets': [('montant', sa.Float())],
+    'reports': [('montant', sa.Float())],
+    'account_balances': [('parts_reelles', sa.Float()), ('reports', sa.Float()), ('ops_passees', sa.Float()),
+                         ('ops_a_venir', sa.Float()), ('parts_potentielles', sa.Float())],
+    'saisons_resume': [('total', sa.Float())],
+}
+
+
+def upgrade():
+    for table, colonnes in MONTANTS.items():
+        # euros → centimes arrondis (CAST en NUMERIC : arrondi du demi-centime vers le haut sous Postgres)
+        op.execute(sa.text(
+            f"UPDATE {table} SET "
+            + ", ".join(f"{col} = ROUND(CAST({col} AS NUMERIC) * 100)" for col, _type in colonnes)
+        ))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for col, ancien_type in colonnes:
+                batch_op.alter_column(col, existing_type=ancien_type, type_=sa.Integer(),
+                                      postgresql_using=f"{col}::integer")
+
+
+def downgrade():
+    dialecte = op.get_bind().dialect
+    for table, colonnes in MONTANTS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for col, ancien_type in colonnes:
+                batch_op.alter_column(col, existing_type=sa.Integer(), type_=ancien_type,
+                                      postgresql_using=f"{col}::{ancien_type.compile(dialect=dialecte)}")
+        op.execute(sa.text(
+            f"UPDATE {table} SET " + ", ".join(f"{col} = {col} / 100.0" for col, _type in colonnes)
+        ))
@@ -0,0 +1,34 @@
+"""Résumé par saison des opérations, concerts et cachets (table saisons_resume)
+
+Revision ID: c7f1e9a24d56
+Revises: b4e2d7a91c38
+Create Date: 2026-10-18 15:26:11.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f1e9a24d56'
+down_revision = 'b4e2d7a91c38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('saisons_resume',
+    sa.Column('entite', sa.String(length=20), nullable=False),
+    sa.Column('saison', sa.String(length=9), nullable=False),
+    sa.Column('nb', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('total', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('date_min', sa.Date(), nullable=True),
+    sa.Column('date_max', sa.Date(), nullable=True),
+    sa.PrimaryKeyConstraint('entite', 'saison')
+    )
+
+    # La table est remplie par la migration suivante (d3a8b6f04e17), une fois la colonne saison posée
+
+
+def downgrade():
+    op.drop_table('saisons_resume')
@@ -0,0 +1,84 @@
+"""Colonne saison (indexée) sur operations, concerts et cachets
+
+Revision ID: d3a8b6f04e17
+Revises: c7f1e9a24d56
+Create Date: 2026-10-18 16:41:52.377016
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8b6f04e17'
+down_revision = 'c7f1e9a24d56'
+branch_labels = None
+depends_on = None
+
+
+# table → (nom de l'index composite, colonnes)
+INDEX_SAISON = {
+    'concerts': ('ix_concerts_saison_date', ['saison', 'date']),
+    'operations': ('ix_operations_saison_musicien', ['saison', 'musicien_id']),
+    'cachets': ('ix_cachets_saison_musicien', ['saison', 'musicien_id']),
+}
+
+# entité de saisons_resume → (table, colonne sommée) ; cf. saisons._ENTITES
+RESUME = {
+    'operations': ('operations', 'montant'),
+    'concerts': ('concerts', 'recette'),
+    'cachets': ('cachets', 'montant'),
+}
+
+
+def _remplir_saisons(table):
+    """'2024/2025' pour chaque ligne, une UPDATE par saison (1er septembre → 31 août)."""
+    bind = op.get_bind()
+    t = sa.table(table, sa.column('date', sa.Date), sa.column('saison', sa.String))
+    d_min, d_max = bind.execute(sa.select(sa.func.min(t.c.date), sa.func.max(t.c.date))).one()
+    if d_min is None:
+        return
+    premiere = d_min.year if d_min.month >= 9 else d_min.year - 1
+    derniere = d_max.year if d_max.month >= 9 else d_max.year - 1
+    maj = (
+        t.update()
+        .where(t.c.date >= sa.bindparam('debut'), t.c.date <= sa.bindparam('fin'))
+        .values(saison=sa.bindparam('valeur'))
+    )
+    for annee in range(premiere, derniere + 1):
+        bind.execute(maj, {'debut': date(annee, 9, 1), 'fin': date(annee + 1, 8, 31),
+                           'valeur': f"{annee}/{annee + 1}"})
+
+
+def _remplir_resume():
+    """saisons_resume (migration c7f1e9a24d56) : une ligne par (entité, saison), GROUP BY saison."""
+    op.execute(sa.text("DELETE FROM saisons_resume"))
+    for entite, (table, colonne) in RESUME.items():
+        op.execute(sa.text(
+            f"INSERT INTO saisons_resume (entite, saison, nb, total, date_min, date_max) "
+            f"SELECT '{entite}', saison, COUNT(id), COALESCE(SUM({colonne}), 0), MIN(date), MAX(date) "
+            f"FROM {table} WHERE saison IS NOT NULL GROUP BY saison"
+        ))
+
+
+def upgrade():
+    for table, (nom_index, colonnes) in INDEX_SAISON.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('saison', sa.String(length=9), nullable=True))
+        _remplir_saisons(table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(nom_index, colonnes, unique=False)
+    _remplir_resume()
+
+    # Ensuite, l'application tient la colonne à jour à chaque affectation de `date` (models.py),
+    # et saisons_resume à chaque écriture (saisons.py)
+
+
+def downgrade():
+    op.execute(sa.text("DELETE FROM saisons_resume"))
+    for table, (nom_index, _colonnes) in INDEX_SAISON.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(nom_index)
+            batch_op.drop_column('saison')
@@ -0,0 +1,65 @@
+"""Résumé dénormalisé des concerts + index couvrant des concerts non payés
+
+Revision ID: d9b4e1f7a263
+Revises: c2f5a8d13e67
+Create Date: 2026-10-18 22:14:37.502118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b4e1f7a263'
+down_revision = 'c2f5a8d13e67'
+branch_labels = None
+depends_on = None
+
+
+def _asso7_id(conn):
+    """Même règle que annuaire.py : rôle explicite 'asso7', sinon nom ou prénom 'ASSO7' (plus petit id)."""
+    lignes = conn.execute(sa.text("SELECT id, nom, prenom, role FROM musiciens ORDER BY id")).fetchall()
+    for mid, _nom, _prenom, role in lignes:
+        if role == 'asso7':
+            return mid
+    for mid, nom, prenom, _role in lignes:
+        if (nom or '').strip().upper() == 'ASSO7' or (prenom or '').strip().upper() == 'ASSO7':
+            return mid
+    return None
+
+
+def upgrade():
+    with op.batch_alter_table('concerts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nb_participants', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('part_asso7', sa.Integer(), nullable=True))        # centimes
+        batch_op.add_column(sa.Column('total_distribue', sa.Integer(), nullable=True))   # centimes
+        batch_op.create_index('ix_concerts_paye_date_mode',
+                              ['paye', 'date', 'mode_paiement_prevu', 'recette_attendue'], unique=False)
+
+    # Remplissage initial depuis les participations (montants déjà en centimes, cf. c2f5a8d13e67) ;
+    # ensuite, le recalcul des crédits tient ces colonnes à jour (resume_concerts.py).
+    conn = op.get_bind()
+    c = sa.table('concerts', sa.column('id'), sa.column('paye', sa.Boolean), sa.column('nb_participants'),
+                 sa.column('part_asso7'), sa.column('total_distribue'))
+    p = sa.table('participations', sa.column('concert_id'), sa.column('musicien_id'),
+                 sa.column('credit_calcule'), sa.column('credit_calcule_potentiel'))
+    m = sa.table('musiciens', sa.column('id'))
+
+    credit = sa.case((c.c.paye.is_(True), p.c.credit_calcule), else_=p.c.credit_calcule_potentiel)
+    parts = sa.select().select_from(p.join(m, m.c.id == p.c.musicien_id)).where(p.c.concert_id == c.c.id)
+    asso7_id = _asso7_id(conn)
+
+    op.execute(c.update().values(
+        nb_participants=parts.with_only_columns(sa.func.count()).scalar_subquery(),
+        total_distribue=parts.with_only_columns(sa.func.coalesce(sa.func.sum(credit), 0)).scalar_subquery(),
+        part_asso7=parts.where(p.c.musicien_id == asso7_id)
+                        .with_only_columns(sa.func.coalesce(sa.func.sum(credit), 0)).scalar_subquery(),
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('concerts', schema=None) as batch_op:
+        batch_op.drop_index('ix_concerts_paye_date_mode')
+        batch_op.drop_column('total_distribue')
+        batch_op.drop_column('part_asso7')
+        batch_op.drop_column('nb_participants')
@@ -0,0 +1,49 @@
+"""Clôture de saison : reports tagués par saison, lignes clôturées (cloture_saison)
+
+Revision ID: e5c2a9d71b40
+Revises: d3a8b6f04e17
+Create Date: 2026-10-18 17:58:03.641290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c2a9d71b40'
+down_revision = 'd3a8b6f04e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('saison', sa.String(length=9), nullable=True))
+        batch_op.add_column(sa.Column('cloture_saison', sa.String(length=9), nullable=True))
+
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cloture_saison', sa.String(length=9), nullable=True))
+        batch_op.create_index('ix_operations_ouvertes', ['cloture_saison', 'musicien_id'], unique=False)
+
+    with op.batch_alter_table('participations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cloture_saison', sa.String(length=9), nullable=True))
+        batch_op.create_index('ix_participations_ouvertes', ['cloture_saison', 'musicien_id'], unique=False)
+
+    # Aucune saison clôturée au départ : tout reste ouvert (python clotures.py apercu <saison>)
+
+
+def downgrade():
+    # Revenir à « tout ouvert » : sinon les reports de clôture doubleraient l'historique
+    op.execute("DELETE FROM reports WHERE saison IS NOT NULL")
+
+    with op.batch_alter_table('participations', schema=None) as batch_op:
+        batch_op.drop_index('ix_participations_ouvertes')
+        batch_op.drop_column('cloture_saison')
+
+    with op.batch_alter_table('operations', schema=None) as batch_op:
+        batch_op.drop_index('ix_operations_ouvertes')
+        batch_op.drop_column('cloture_saison')
+
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('cloture_saison')
+        batch_op.drop_column('saison')
@@ -0,0 +1,28 @@
+"""Processus propriétaire des jobs (jobs.proprietaire)
+
+Revision ID: e8a3c5f19b64
+Revises: d9b4e1f7a263
+Create Date: 2026-10-18 23:12:40.518236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c5f19b64'
+down_revision = 'd9b4e1f7a263'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('proprietaire', sa.String(length=120), nullable=True))
+
+    # Jobs existants : proprietaire NULL → soldés après jobs.DELAI_ORPHELIN s'ils ne finissent pas
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('proprietaire')
@@ -0,0 +1,51 @@
+"""Index des filtres fréquents (participations, opérations, cachets, reports)
+
+Revision ID: f1b7c4e83a52
+Revises: e5c2a9d71b40
+Create Date: 2026-10-18 19:12:44.508113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7c4e83a52'
+down_revision = 'e5c2a9d71b40'
+branch_labels = None
+depends_on = None
+
+
+# table → [(nom de l'index, colonnes), ...] ; cf. test_plans_requetes.py
+INDEX = {
+    'participations': [
+        ('ix_participations_concert_id', ['concert_id']),
+        ('ix_participations_musicien_id', ['musicien_id']),
+    ],
+    'operations': [
+        ('ix_operations_date', ['date']),
+        ('ix_operations_musicien_date', ['musicien_id', 'date', 'previsionnel']),
+        ('ix_operations_concert_motif', ['concert_id', 'motif']),
+        ('ix_operations_operation_liee_id', ['operation_liee_id']),
+    ],
+    'cachets': [
+        ('ix_cachets_musicien_date', ['musicien_id', 'date']),
+    ],
+    'reports': [
+        ('ix_reports_ouverts', ['cloture_saison', 'musicien_id']),
+    ],
+}
+
+
+def upgrade():
+    for table, index in INDEX.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for nom, colonnes in index:
+                batch_op.create_index(nom, colonnes, unique=False)
+
+
+def downgrade():
+    for table, index in INDEX.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for nom, _colonnes in index:
+                batch_op.drop_index(nom)
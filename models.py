@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import Index, event
+
+from monnaie import Centimes  # montants : centimes entiers en base, euros en Python
 
 
 db = SQLAlchemy()
@@ -13,6 +15,8 @@ class Musicien(db.Model):
     prenom = db.Column(db.String(100), nullable=True)
     actif = db.Column(db.Boolean, default=True)
     type = db.Column(db.String(20), default='musicien')
+    # Rôle particulier (ASSO7, CB, CAISSE, TRESO, bonus) : au plus un musicien par rôle, cf. annuaire.py
+    role = db.Column(db.String(20), nullable=True, unique=True)
 
     @property
     def credit_actuel(self):
@@ -40,6 +44,7 @@ class Concert(db.Model):
     # Tri/filtre fréquents
     date = db.Column(db.Date, nullable=False, index=True)
     paye = db.Column(db.Boolean, default=False, index=True)
+    saison = db.Column(db.String(9), nullable=True)  # '2024/2025', suit `date` (cf. saison_de plus bas)
 
     # ⚠️ Texte libre historique (on le garde mais NON obligatoire)
     #    On l’alimente souvent avec lieu_obj.nom pour l’affichage retro-compat.
@@ -58,9 +63,9 @@ class Concert(db.Model):
     )
 
     # Montants
-    recette = db.Column(db.Float, nullable=True)
-    recette_attendue = db.Column(db.Float, nullable=True)
-    frais = db.Column(db.Float, nullable=True)
+    recette = db.Column(Centimes, nullable=True)
+    recette_attendue = db.Column(Centimes, nullable=True)
+    frais = db.Column(Centimes, nullable=True)
 
     # Participations
     participations = db.relationship(
@@ -79,7 +84,12 @@ class Concert(db.Model):
 
     # Prévisions / mode de paiement
     mode_paiement_prevu = db.Column(db.String(32), default='CB ASSO7')
-    frais_previsionnels = db.Column(db.Float, nullable=True)
+    frais_previsionnels = db.Column(Centimes, nullable=True)
+
+    # Résumé dénormalisé (cf. resume_concerts.py) : les listes n'ont plus à relire les participations
+    nb_participants = db.Column(db.Integer, nullable=False, default=0)
+    part_asso7 = db.Column(Centimes, nullable=True)        # crédit ASSO7 (réel si payé, sinon potentiel)
+    total_distribue = db.Column(Centimes, nullable=True)   # somme des crédits des participations
 
     # Opération de frais prévisionnels (liée, optionnelle)
     op_prevision_frais_id = db.Column(db.Integer, db.ForeignKey('operations.id'), nullable=True)
@@ -100,13 +110,15 @@ class Participation(db.Model):
     __tablename__ = 'participations'
 
     id = db.Column(db.Integer, primary_key=True)
-    concert_id = db.Column(db.Integer, db.ForeignKey('concerts.id'), nullable=False)
-    musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id', ondelete="CASCADE"), nullable=False)
+    concert_id = db.Column(db.Integer, db.ForeignKey('concerts.id'), nullable=False, index=True)
+    musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id', ondelete="CASCADE"), nullable=False, index=True)
     paye = db.Column(db.Boolean, default=False)
-    credit_calcule = db.Column(db.Float, default=0.0, nullable=True)
-    credit_calcule_potentiel = db.Column(db.Float, default=0.0)
+    credit_calcule = db.Column(Centimes, default=0.0, nullable=True)
+    credit_calcule_potentiel = db.Column(Centimes, default=0.0)
     musicien = db.relationship('Musicien', backref=db.backref('participations', lazy=True))
-    gain_fixe = db.Column(db.Numeric(10, 2), nullable=True)  # None = non fixé, sinon montant absolu
+    gain_fixe = db.Column(Centimes, nullable=True)  # None = non fixé, sinon montant absolu
+    # Saison dont la clôture a reporté ce crédit dans un Report (NULL = ligne ouverte, cf. clotures.py)
+    cloture_saison = db.Column(db.String(9), nullable=True)
 
 
 class Operation(db.Model):
@@ -116,11 +128,16 @@ class Operation(db.Model):
     musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id'), nullable=True)
     type = db.Column(db.String(20), nullable=False)  # 'credit', 'debit'
     motif = db.Column(db.String(100))
+    # Formes normalisées, tenues à jour depuis `motif` et `type` (cf. categorie_de / sens_de plus bas)
+    categorie = db.Column(db.String(20), nullable=False, default="autre")  # 'frais', 'salaire', …
+    sens = db.Column(db.SmallInteger, nullable=False, default=0)           # +1 crédit, -1 débit
     nature = db.Column(db.String(50), nullable=True)
     precision = db.Column(db.String(255))
-    montant = db.Column(db.Float, nullable=False)
+    montant = db.Column(Centimes, nullable=False, index=True)  # recherche par montant (recherche.py)
+    montant_signe = db.Column(Centimes, nullable=False, default=0.0)  # sens * montant, suit `type` et `montant`
     date = db.Column(db.Date, nullable=False)
-    brut = db.Column(db.Float, nullable=True)
+    saison = db.Column(db.String(9), nullable=True)  # '2024/2025', suit `date`
+    brut = db.Column(Centimes, nullable=True)
 
     # ⬇️ FK standard vers concerts
     concert_id = db.Column(db.Integer, db.ForeignKey('concerts.id'), nullable=True)
@@ -135,7 +152,7 @@ class Operation(db.Model):
     auto_cb_asso7 = db.Column(db.Boolean, default=False, nullable=False)
 
     # auto-liens entre opérations (salaire / débit auto / commission, etc.)
-    operation_liee_id = db.Column(db.Integer, db.ForeignKey('operations.id'), nullable=True)
+    operation_liee_id = db.Column(db.Integer, db.ForeignKey('operations.id'), nullable=True, index=True)
     operation_liee = db.relationship('Operation', remote_side=[id], backref='operations_liees')
 
     auto_debit_salaire = db.Column(db.Boolean, default=False, nullable=False)
@@ -143,6 +160,9 @@ class Operation(db.Model):
     # utilisé pour “Frais (prévisionnels)”
     previsionnel = db.Column(db.Boolean, nullable=False, default=False)
 
+    # Saison dont la clôture a reporté cette opération dans un Report (NULL = ligne ouverte, cf. clotures.py)
+    cloture_saison = db.Column(db.String(9), nullable=True)
+
 
 class Cachet(db.Model):
     __tablename__ = 'cachets'
@@ -150,7 +170,8 @@ class Cachet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
-    montant = db.Column(db.Float, nullable=False)
+    saison = db.Column(db.String(9), nullable=True)  # '2024/2025', suit `date`
+    montant = db.Column(Centimes, nullable=False)
     nombre = db.Column(db.Integer, nullable=False, default=1)
 
     musicien = db.relationship("Musicien", backref=db.backref("cachets", lazy=True))
@@ -159,13 +180,200 @@ class Cachet(db.Model):
         return f"<Cachet {self.musicien.nom} - {self.date} - {self.montant}€ x{self.nombre}>"
 
 
+# --- Saison (septembre → août) stockée sur les lignes datées ---
+
+def saison_de(jour):
+    """date → '2024/2025' (None si pas de date). Format canonique, réexporté par saisons.py."""
+    if jour is None:
+        return None
+    debut = jour.year if jour.month >= 9 else jour.year - 1
+    return f"{debut}/{debut + 1}"
+
+
+def _suivre_saison(target, value, oldvalue, initiator):
+    target.saison = saison_de(value)
+
+
+# `saison` est recalculée à chaque affectation de `date` (constructeur compris).
+# Les UPDATE en masse qui changent une date doivent la poser eux-mêmes.
+for _modele in (Concert, Operation, Cachet):
+    event.listen(_modele.date, "set", _suivre_saison)
+
+
+# --- Catégorie du motif et sens de l'opération (égalités simples, indexables) ---
+
+# motif normalisé (minuscules, espaces de bord retirés) → catégorie ; tout autre motif : 'autre'
+CATEGORIES_MOTIF = {
+    "frais": "frais",
+    "frais de concerts": "frais",
+    "frais divers": "frais divers",
+    "remboursement frais divers": "remboursement",
+    "remboursement": "remboursement",
+    "salaire": "salaire",
+    "commission lionel": "commission",
+    "recette concert": "recette concert",
+    "achat": "achat",
+    "vente": "vente",
+}
+CATEGORIE_AUTRE = "autre"
+CATEGORIE_FRAIS = "frais"
+
+
+def categorie_de(motif):
+    """'Frais de concerts' → 'frais', 'Salaire' → 'salaire', motif libre ou vide → 'autre'."""
+    return CATEGORIES_MOTIF.get((motif or "").strip().lower(), CATEGORIE_AUTRE)
+
+
+def sens_de(type_op):
+    """'credit'/'crédit' → +1, 'debit'/'débit' → -1, autre → 0."""
+    t = (type_op or "").strip().lower().replace("é", "e")
+    return 1 if t == "credit" else -1 if t == "debit" else 0
+
+
+def _suivre_categorie(target, value, oldvalue, initiator):
+    target.categorie = categorie_de(value)
+
+
+def _suivre_sens(target, value, oldvalue, initiator):
+    target.sens = sens_de(value)
+    target.montant_signe = sens_de(value) * (target.montant or 0.0)
+
+
+def _suivre_montant(target, value, oldvalue, initiator):
+    target.montant_signe = sens_de(target.type) * (value or 0.0)
+
+
+# Comme `saison` : recalculées à chaque affectation (constructeur compris) ;
+# un UPDATE en masse de `motif`, `type` ou `montant` doit poser categorie / sens / montant_signe lui-même.
+event.listen(Operation.motif, "set", _suivre_categorie)
+event.listen(Operation.type, "set", _suivre_sens)
+event.listen(Operation.montant, "set", _suivre_montant)
+
+# Requêtes par saison : pages d'archives, résumés, comptes d'un musicien sur une saison
+Index('ix_concerts_saison_date', Concert.saison, Concert.date)
+Index('ix_operations_saison_musicien', Operation.saison, Operation.musicien_id)
+Index('ix_cachets_saison_musicien', Cachet.saison, Cachet.musicien_id)
+
+# Soldes : seules les lignes non clôturées sont agrégées (cloture_saison IS NULL, cf. clotures.py)
+# (côté operations : ix_operations_musicien_date_signe ci-dessous, qui porte aussi cloture_saison)
+Index('ix_participations_ouvertes', Participation.cloture_saison, Participation.musicien_id)
+
+# Filtres fréquents (vérifiés par test_plans_requetes.py : aucune page ne doit parcourir toute la table)
+Index('ix_operations_date', Operation.date)                                   # archives par mois, tri date desc
+# Soldes : index COUVRANT, le seul sur montant_signe (le SUM par compte, d'un compte ou du grand livre
+# complet, lignes ouvertes seulement, se lit dans l'index sans la table)
+Index('ix_operations_musicien_date_signe', Operation.musicien_id, Operation.date, Operation.previsionnel,
+      Operation.cloture_saison, Operation.montant_signe)
+Index('ix_operations_concert_motif', Operation.concert_id, Operation.motif)   # recette d'un concert (motif exact)
+Index('ix_operations_concert_categorie', Operation.concert_id, Operation.categorie, Operation.previsionnel)  # frais
+Index('ix_cachets_musicien_date', Cachet.musicien_id, Cachet.date)
+Index('ix_concerts_paye_date_mode', Concert.paye, Concert.date, Concert.mode_paiement_prevu,
+      Concert.recette_attendue)  # non payés, recettes attendues par mode (couvrant)
+
+
 class Report(db.Model):
     __tablename__ = 'reports'
 
     id = db.Column(db.Integer, primary_key=True)
     musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id'), nullable=False)
-    montant = db.Column(db.Float, nullable=False)
+    montant = db.Column(Centimes, nullable=False)
     musicien = db.relationship('Musicien', backref=db.backref('reports', lazy=True))
+    # Report de clôture : solde au 31 août de cette saison (NULL = report saisi sur /reports)
+    saison = db.Column(db.String(9), nullable=True)
+    # Saison dont la clôture a repris ce report dans un report plus récent (NULL = report actif)
+    cloture_saison = db.Column(db.String(9), nullable=True)
+
+
+Index('ix_reports_ouverts', Report.cloture_saison, Report.musicien_id)
+
+class SoldeCompte(db.Model):
+    """
+    Grand livre des soldes : UNE ligne par compte (Musicien), tenue à jour dans la même
+    transaction que chaque écriture (cf. soldes.py). Lire les soldes = O(comptes).
+    Les opérations sont réparties passées / à venir à la date `date_arrete`.
+    """
+    __tablename__ = 'account_balances'
+
+    musicien_id = db.Column(db.Integer, db.ForeignKey('musiciens.id', ondelete='CASCADE'), primary_key=True)
+
+    # Passé : participations réelles + reports + opérations passées
+    parts_reelles = db.Column(Centimes, nullable=False, default=0.0)
+    reports = db.Column(Centimes, nullable=False, default=0.0)
+    ops_passees = db.Column(Centimes, nullable=False, default=0.0)
+
+    # À venir : opérations futures ou prévisionnelles
+    ops_a_venir = db.Column(Centimes, nullable=False, default=0.0)
+
+    # Prévisionnel : participations potentielles (concerts non payés)
+    parts_potentielles = db.Column(Centimes, nullable=False, default=0.0)
+
+    date_arrete = db.Column(db.Date, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    musicien = db.relationship(
+        'Musicien',
+        backref=db.backref('solde', uselist=False, cascade='all, delete-orphan')
+    )
+
+class Job(db.Model):
+    """
+    Tâche de fond (recalcul complet, export Excel, lecture PDF) exécutée hors du
+    processus web par jobs.py. La table sert de file ET de suivi : statut,
+    progression (0..1) et résultat JSON, lisibles depuis n'importe quel worker.
+    """
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='en_attente', index=True)  # en_attente | en_cours | termine | echec
+    progression = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(255), nullable=True)
+    parametres = db.Column(db.Text, nullable=True)  # JSON
+    resultat = db.Column(db.Text, nullable=True)    # JSON
+    erreur = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # processus web qui a lancé la tâche : "hôte:pid:démarrage" (cf. jobs._proprietaire_vivant)
+    proprietaire = db.Column(db.String(120), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.type} {self.statut} {self.progression:.0%}>"
+
+class ResumeSaison(db.Model):
+    """
+    Résumé d'une saison (septembre → août) pour une entité : operations, concerts ou cachets.
+    Nombre, total (montants / recettes) et dates extrêmes, tenus à jour au commit (cf. saisons.py).
+    """
+    __tablename__ = 'saisons_resume'
+
+    entite = db.Column(db.String(20), primary_key=True)   # operations | concerts | cachets
+    saison = db.Column(db.String(9), primary_key=True)    # '2024/2025'
+    nb = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(Centimes, nullable=False, default=0.0)
+    date_min = db.Column(db.Date, nullable=True)
+    date_max = db.Column(db.Date, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ResumeSaison {self.entite} {self.saison} nb={self.nb}>"
+
+class OperationRecherche(db.Model):
+    """
+    Index de recherche des opérations (cf. recherche.py) : une ligne par opération, textes
+    NORMALISÉS (sans accents, minuscules). Tenu à jour au commit de chaque écriture.
+    Index plein texte selon la base : FTS5 (SQLite) ou trigrammes pg_trgm (Postgres).
+    """
+    __tablename__ = 'operations_recherche'
+
+    operation_id = db.Column(db.Integer, db.ForeignKey('operations.id', ondelete='CASCADE'), primary_key=True)
+    qui = db.Column(db.String(255), nullable=False, default='')        # "prenom nom"
+    motif = db.Column(db.String(255), nullable=False, default='')
+    precision = db.Column(db.String(255), nullable=False, default='')
+    concert = db.Column(db.String(400), nullable=False, default='')    # "jj/mm/aaaa lieu ville organisme"
+
+    def __repr__(self) -> str:
+        return f"<OperationRecherche op={self.operation_id} {self.qui!r}>"
 
 # --- NOUVEAUX MODÈLES ---
 
@@ -0,0 +1,174 @@
+# monnaie.py
+"""
+Montants en CENTIMES ENTIERS, de la base jusqu'aux calculs.
+
+  - centimes(x) / euros(c) : conversions (arrondi commercial : demi-centime vers le haut),
+  - Money                  : petite valeur immuable en centimes (somme, taux, division, répartition exacte),
+  - Centimes               : type de colonne SQLAlchemy, INTEGER en base, euros (float) côté Python.
+
+Les modèles gardent leur interface en euros (formulaires, gabarits, exports inchangés) mais la
+base stocke et additionne des entiers : SUM exactes, plus de dérive d'arrondi entre /comptes,
+l'export Excel et les archives. Le partage des bénéfices (partage.py) calcule en centimes.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy.types import Integer, TypeDecorator
+
+_CENTIME = Decimal("0.01")
+
+
+def centimes(valeur) -> int:
+    """12.345 → 1235, Decimal('3.10') → 310, Money → ses centimes. (None interdit.)"""
+    if isinstance(valeur, Money):
+        return valeur.centimes
+    if isinstance(valeur, int):
+        return valeur * 100
+    # repr() du float : 0.1 reste '0.1' (pas 0.1000000000000000055…)
+    d = valeur if isinstance(valeur, Decimal) else Decimal(repr(float(valeur)))
+    return int(d.quantize(_CENTIME, rounding=ROUND_HALF_UP) * 100)
+
+
+def euros(cts: int) -> float:
+    """1235 → 12.35 (float le plus proche, affichage et API en euros)."""
+    return cts / 100
+
+
+def division_arrondie(a: int, b: int) -> int:
+    """a / b arrondi au plus proche (demi vers le haut) en entiers, pour a ≥ 0 et b > 0."""
+    return (2 * a + b) // (2 * b)
+
+
+class Money:
+    """Montant en centimes entiers. Money.de(12.3) + Money(5) → Money(1235)."""
+
+    __slots__ = ("centimes",)
+
+    def __init__(self, cts: int = 0):
+        self.centimes = int(cts)
+
+    @classmethod
+    def de(cls, valeur) -> "Money":
+        """Depuis des euros (float, Decimal, str numérique, int) ; None → 0."""
+        if valeur is None:
+            return cls(0)
+        if isinstance(valeur, str):
+            valeur = Decimal(valeur.replace(",", ".").strip() or "0")
+        return cls(centimes(valeur))
+
+    @property
+    def euros(self) -> float:
+        return euros(self.centimes)
+
+    # --- arithmétique (Money ou 0, pour sum()) ---
+
+    def __add__(self, autre):
+        if isinstance(autre, Money):
+            return Money(self.centimes + autre.centimes)
+        if autre == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, autre):
+        if isinstance(autre, Money):
+            return Money(self.centimes - autre.centimes)
+        if autre == 0:
+            return self
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.centimes)
+
+    def fois(self, taux) -> "Money":
+        """Montant × taux (0.10 = 10 %), arrondi au centime (demi vers le haut)."""
+        produit = Decimal(self.centimes) * Decimal(repr(float(taux)))
+        return Money(int(produit.quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+    def divise(self, n: int) -> "Money":
+        """Part d'un montant en n parts égales, arrondie au centime (le reliquat reste à placer)."""
+        q = Decimal(self.centimes) / Decimal(int(n))
+        return Money(int(q.quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+    def repartir(self, poids) -> list:
+        """
+        Répartit le montant au prorata de `poids` (entiers ≥ 0, somme > 0) : la somme des parts
+        est EXACTEMENT le montant. Les centimes restants vont aux plus gros restes (à égalité,
+        au premier) — méthode du plus fort reste.
+        """
+        poids = [int(p) for p in poids]
+        total = sum(poids)
+        if total <= 0:
+            raise ValueError("Répartition impossible : somme des poids nulle.")
+        bruts = [self.centimes * p for p in poids]
+        parts = [b // total for b in bruts]
+        ordre = sorted(range(len(poids)), key=lambda i: (-(bruts[i] % total), i))
+        for i in ordre[: self.centimes - sum(parts)]:
+            parts[i] += 1
+        return [Money(p) for p in parts]
+
+    # --- comparaisons ---
+
+    def __eq__(self, autre):
+        if isinstance(autre, Money):
+            return self.centimes == autre.centimes
+        return NotImplemented
+
+    # un autre type (int, float…) : NotImplemented, donc TypeError comme pour deux types sans ordre
+    def __lt__(self, autre):
+        if isinstance(autre, Money):
+            return self.centimes < autre.centimes
+        return NotImplemented
+
+    def __le__(self, autre):
+        if isinstance(autre, Money):
+            return self.centimes <= autre.centimes
+        return NotImplemented
+
+    def __gt__(self, autre):
+        if isinstance(autre, Money):
+            return self.centimes > autre.centimes
+        return NotImplemented
+
+    def __ge__(self, autre):
+        if isinstance(autre, Money):
+            return self.centimes >= autre.centimes
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.centimes)
+
+    def __bool__(self):
+        return self.centimes != 0
+
+    def __float__(self):
+        return self.euros
+
+    def __repr__(self):
+        return f"Money({self.centimes})"
+
+    def __str__(self):
+        signe = "-" if self.centimes < 0 else ""
+        e, c = divmod(abs(self.centimes), 100)
+        return f"{signe}{e}.{c:02d}"
+
+
+class Centimes(TypeDecorator):
+    """
+    Colonne monétaire : INTEGER (centimes) en base, euros (float) en Python.
+    Les littéraux comparés ou ajoutés à la colonne sont convertis de la même façon :
+    `Operation.montant == 12.5` et `SoldeCompte.ops_passees + delta` restent en euros côté code.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else centimes(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else euros(int(value))
+
+    def coerce_compared_value(self, op, value):
+        return self
@@ -0,0 +1,254 @@
+# partage.py
+"""
+Cœur PUR du partage des bénéfices d'un concert : aucune dépendance à l'ORM ni à la session.
+
+On travaille sur des enregistrements compacts (__slots__) construits à partir des modèles
+par calcul_participations.py :
+  - ConcertPartage      : recette, recette attendue, frais, frais prévisionnels, payé, participants
+  - ParticipantPartage  : musicien_id, drapeaux ASSO7 / Jérôme, gain fixé
+
+Deux points d'entrée :
+  - distribution(concert)              → un concert, calcul scalaire
+  - distributions_par_lots(concerts)   → des milliers de concerts en un appel (NumPy)
+
+Les deux calculent en CENTIMES ENTIERS (monnaie.py) et donnent exactement les mêmes montants.
+Entrées et sorties restent en euros (float) ; chaque distribution boucle au centime près.
+Clés des distributions : musicien_id (int) pour les musiciens, "ASSO7" pour la structure.
+"""
+
+import numpy as np
+
+from monnaie import Money, centimes, division_arrondie, euros
+
+CLE_ASSO7 = "ASSO7"
+POURCENT_BONUS_JEROME = 10
+
+
+# --------------------------- Enregistrements ---------------------------
+
+class ParticipantPartage:
+    __slots__ = ("musicien_id", "est_asso7", "est_jerome", "gain_fixe")
+
+    def __init__(self, musicien_id: int, est_asso7: bool = False, est_jerome: bool = False,
+                 gain_fixe: float | None = None):
+        self.musicien_id = musicien_id
+        self.est_asso7 = bool(est_asso7)
+        self.est_jerome = bool(est_jerome)
+        self.gain_fixe = None if gain_fixe is None else float(gain_fixe)
+
+    @property
+    def cle(self):
+        return CLE_ASSO7 if self.est_asso7 else self.musicien_id
+
+    def __repr__(self):
+        return f"<ParticipantPartage {self.cle} fixe={self.gain_fixe}>"
+
+
+class ConcertPartage:
+    __slots__ = ("id", "recette", "recette_attendue", "frais", "frais_previsionnels", "paye", "participants")
+
+    def __init__(self, id: int | None = None, recette: float | None = None, recette_attendue: float | None = None,
+                 frais: float | None = 0.0, frais_previsionnels: float | None = 0.0, paye: bool = False,
+                 participants: list | None = None):
+        self.id = id
+        self.recette = None if recette is None else float(recette)
+        self.recette_attendue = None if recette_attendue is None else float(recette_attendue)
+        self.frais = float(frais or 0.0)
+        self.frais_previsionnels = float(frais_previsionnels or 0.0)
+        self.paye = bool(paye)
+        self.participants = list(participants or [])
+
+    def __repr__(self):
+        return f"<ConcertPartage id={self.id} paye={self.paye} participants={len(self.participants)}>"
+
+
+# --------------------------- Règles (scalaire) ---------------------------
+
+def recette_utilisee(concert: ConcertPartage) -> float | None:
+    """Recette réelle si présente, sinon recette_attendue si non payé, sinon None."""
+    if concert.recette is not None:
+        return concert.recette
+    if not concert.paye and concert.recette_attendue is not None:
+        return concert.recette_attendue
+    return None
+
+
+def frais_effectifs(concert: ConcertPartage) -> float:
+    """Frais réels, + frais prévisionnels (ramenés à 0 s'ils sont négatifs) tant que le concert n'est pas payé."""
+    return euros(_frais_effectifs_c(concert))
+
+
+def _frais_effectifs_c(concert: ConcertPartage) -> int:
+    if concert.paye:
+        return centimes(concert.frais)
+    # un prévisionnel négatif n'augmente jamais les crédits potentiels
+    return centimes(concert.frais) + max(centimes(concert.frais_previsionnels), 0)
+
+
+def presents(concert: ConcertPartage) -> list:
+    """Participants dédoublonnés par musicien (le dernier l'emporte, ordre d'apparition conservé)."""
+    return list({p.musicien_id: p for p in concert.participants}.values())
+
+
+def partage_standard(benefices, participants: list):
+    """
+    Règle de partage (bénéfices en euros ou Money, calcul en centimes) :
+      - 10% pour Jérôme s'il est là,
+      - parts égales entre les participants hors ASSO7 + 1 part pour ASSO7,
+      - ASSO7 reçoit le reste : somme(musiciens) + part_asso7 == bénéfices, au centime près.
+    Renvoie (resultats {musicien_id: montant}, part_asso7, pour_jerome, part_unitaire) en euros.
+    """
+    benefices = Money.de(benefices)
+    jerome = next((p for p in participants if p.est_jerome), None)
+
+    # 10% pour Jérôme s'il est là
+    pour_jerome = benefices.fois(POURCENT_BONUS_JEROME / 100) if jerome else Money()
+
+    # parts égales entre tous les participants "hors ASSO7" + 1 part pour ASSO7
+    nb_parts = sum(1 for p in participants if not p.est_asso7) + 1
+    part_unitaire = (benefices - pour_jerome).divise(nb_parts)
+
+    resultats = {}
+    for p in participants:
+        if p.est_asso7:
+            continue
+        if jerome and p.musicien_id == jerome.musicien_id:
+            resultats[p.musicien_id] = part_unitaire + pour_jerome
+        else:
+            resultats[p.musicien_id] = part_unitaire
+
+    part_asso7 = benefices - sum(resultats.values(), Money())
+    return ({mid: m.euros for mid, m in resultats.items()},
+            part_asso7.euros, pour_jerome.euros, part_unitaire.euros)
+
+
+def partage_concert(concert: ConcertPartage):
+    """
+    Partage standard d'un concert (frais prévisionnels inclus si non payé).
+    Renvoie (resultats, part_asso7, pour_jerome, part_unitaire) ; tout à zéro si pas de
+    recette ou pas de bénéfice.
+    """
+    recette = recette_utilisee(concert)
+    if recette is None or not concert.participants:
+        return {}, 0.0, 0.0, 0.0
+    benefices = Money(centimes(recette) - _frais_effectifs_c(concert))
+    if benefices.centimes <= 0:
+        return {}, 0.0, 0.0, 0.0
+    return partage_standard(benefices, presents(concert))
+
+
+def gains_fixes(concert: ConcertPartage) -> dict:
+    """{cle: montant} des gains fixés saisis sur les participations."""
+    return {p.cle: p.gain_fixe for p in concert.participants if p.gain_fixe is not None}
+
+
+def appliquer_gains_fixes(parts: dict, overrides: dict) -> dict:
+    """
+    parts: { <musicien_id:int>: montant, 'ASSO7': montant }
+    Applique les montants fixés et redistribue proportionnellement
+    le reste entre les non-fixés (y compris ASSO7 si non fixé), en centimes :
+    la somme des parts redistribuées est exactement le reste (plus fort reste, cf. Money.repartir).
+    Lève ValueError si la somme des fixes dépasse le total.
+    """
+    if not parts or not overrides:
+        return parts
+
+    parts = {k: centimes(v or 0) for k, v in parts.items()}
+    total_net = sum(parts.values())
+
+    # fixes qui ciblent uniquement des clés existantes
+    adjusted = {k: centimes(v) for k, v in overrides.items() if k in parts}
+    somme_fixes = sum(adjusted.values())
+    if somme_fixes > total_net:
+        raise ValueError("La somme des gains fixés dépasse le total disponible.")
+
+    # clés qui restent à répartir (toutes celles qui ne sont pas fixées)
+    rest_keys = [k for k in parts.keys() if k not in overrides]
+    base_rest_sum = sum(parts[k] for k in rest_keys)
+    reste_a_repartir = Money(total_net - somme_fixes)
+
+    # redistribuer le reste proportionnellement aux parts "de base"
+    if base_rest_sum <= 0:
+        # tout ce qui reste va à ASSO7 si présent
+        for k in rest_keys:
+            adjusted[k] = 0
+        if CLE_ASSO7 in parts:
+            adjusted[CLE_ASSO7] = adjusted.get(CLE_ASSO7, 0) + reste_a_repartir.centimes
+    else:
+        for k, part in zip(rest_keys, reste_a_repartir.repartir(parts[k] for k in rest_keys)):
+            adjusted[k] = part.centimes
+
+    return {k: euros(v) for k, v in adjusted.items()}
+
+
+def _distribution_de_base(concert: ConcertPartage, resultats: dict, part_asso7: float) -> dict:
+    """{'ASSO7': part, <musicien_id>: part} pour les participants présents (avant gains fixés)."""
+    base = {CLE_ASSO7: float(part_asso7 or 0.0)}
+    for p in concert.participants:
+        if not p.est_asso7:
+            base[p.musicien_id] = float(resultats.get(p.musicien_id, 0.0))
+    return base
+
+
+def distribution(concert: ConcertPartage) -> dict:
+    """Distribution finale d'un concert : partage standard puis gains fixés."""
+    resultats, part_asso7, _bonus, _unit = partage_concert(concert)
+    base = _distribution_de_base(concert, resultats, part_asso7)
+    return appliquer_gains_fixes(base, gains_fixes(concert))
+
+
+# --------------------------- Lots (NumPy) ---------------------------
+
+def distributions_par_lots(concerts: list):
+    """
+    Calcule en un appel les distributions finales de nombreux concerts.
+    L'arithmétique du partage (bénéfices, bonus, part unitaire, part ASSO7) est vectorisée
+    sur des tableaux int64 de centimes : mêmes arrondis que partage_standard, sans flottants.
+    Seuls les concerts portant des gains fixés repassent par appliquer_gains_fixes().
+
+    Renvoie (distributions {concert_id: {cle: montant}}, erreurs {concert_id: ValueError}).
+    """
+    concerts = list(concerts)
+    distributions, erreurs = {}, {}
+    if not concerts:
+        return distributions, erreurs
+
+    liste_presents = [presents(c) for c in concerts]
+    recettes_retenues = [recette_utilisee(c) for c in concerts]
+    avec_recette = np.array([r is not None for r in recettes_retenues], dtype=bool)
+    recettes = np.array([0 if r is None else centimes(r) for r in recettes_retenues], dtype=np.int64)
+    frais = np.array([_frais_effectifs_c(c) for c in concerts], dtype=np.int64)
+    nb_hors_asso7 = np.array([sum(1 for p in ps if not p.est_asso7) for ps in liste_presents], dtype=np.int64)
+    # comme partage_standard : seul le premier participant "Jérôme" touche le bonus
+    jerome_ids = [next((p.musicien_id for p in ps if p.est_jerome), None) for ps in liste_presents]
+    avec_jerome = np.array([jid is not None for jid in jerome_ids], dtype=bool)
+    avec_participants = np.array([bool(c.participants) for c in concerts], dtype=bool)
+
+    benefices = recettes - frais
+    actifs = avec_participants & avec_recette & (benefices > 0)
+    benefices = np.where(actifs, benefices, 0)
+
+    # bénéfices ≥ 0 ici : division_arrondie (demi vers le haut) = Money.fois / Money.divise
+    pour_jerome = np.where(avec_jerome & actifs, division_arrondie(benefices * POURCENT_BONUS_JEROME, 100), 0)
+    part_unitaire = division_arrondie(benefices - pour_jerome, nb_hors_asso7 + 1)
+    part_jerome = part_unitaire + pour_jerome
+    total_musiciens = np.where(avec_jerome, (nb_hors_asso7 - 1) * part_unitaire + part_jerome,
+                               nb_hors_asso7 * part_unitaire)
+    part_asso7 = np.where(actifs, benefices - total_musiciens, 0)
+
+    for i, c in enumerate(concerts):
+        unit, jer, asso7 = euros(int(part_unitaire[i])), euros(int(part_jerome[i])), euros(int(part_asso7[i]))
+        actif = bool(actifs[i])
+        base = {CLE_ASSO7: asso7}
+        for p in c.participants:
+            if p.est_asso7:
+                continue
+            if not actif:
+                base[p.musicien_id] = 0.0
+            else:
+                base[p.musicien_id] = jer if p.musicien_id == jerome_ids[i] else unit
+        try:
+            distributions[c.id] = appliquer_gains_fixes(base, gains_fixes(c))
+        except ValueError as e:
+            erreurs[c.id] = e
+    return distributions, erreurs
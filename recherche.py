@@ -0,0 +1,435 @@
+# recherche.py
+"""
+Recherche d'opérations CÔTÉ SERVEUR (route /api/operations/search).
+
+Table operations_recherche : une ligne par opération avec les textes utiles à la recherche
+(qui, motif, précision, concert), NORMALISÉS comme l'index des noms (annuaire.normaliser_nom :
+sans accents, casse ni espaces superflus). Index plein texte selon la base :
+  - SQLite   : table virtuelle FTS5 `operations_recherche_fts` (contenu externe + triggers),
+               interrogée par préfixes de mots (MATCH) ;
+  - Postgres : index GIN pg_trgm sur chaque colonne (migration), interrogé par LIKE '%mot%' ;
+  - SQLite sans FTS5 : LIKE sur les colonnes normalisées.
+Le montant (valeur absolue, tolérance) et les dates passent par les index de `operations`.
+
+Pagination par CLÉ (date desc, id desc) : le curseur "AAAA-MM-JJ_id" de la dernière ligne
+rendue donne la page suivante, sans OFFSET, quelle que soit la taille de l'historique.
+
+L'index est rempli par la migration (ou `python recherche.py rebuild`), puis tenu à jour au
+commit comme le grand livre (cf. soldes.py), y compris pour les opérations d'un musicien renommé
+ou d'un concert / lieu modifié ; écritures en masse : marquer_operations_a_indexer().
+La recherche ne fait que lire.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Integer, and_, delete, event, insert, inspect, or_, select, text
+from sqlalchemy.orm import joinedload
+
+from annuaire import nom_affiche, normaliser_nom
+from models import db, Concert, Lieu, Musicien, Operation, OperationRecherche
+
+CRITERES = ("montant", "date", "qui", "motif", "precision", "concert")
+CRITERES_TEXTE = ("qui", "motif", "precision", "concert")
+
+LIMITE_DEFAUT = 50
+LIMITE_MAX = 200
+TAILLE_LOT = 500  # ids par IN (...) : reste sous la limite de variables de SQLite
+
+TABLE_FTS = "operations_recherche_fts"
+
+# Même DDL que la migration (copie figée là-bas) ; creer_fts() l'applique aux bases SQLite
+# locales construites par db.create_all().
+DDL_FTS = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_FTS} USING fts5(
+        qui, motif, precision, concert,
+        content='operations_recherche', content_rowid='operation_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS operations_recherche_ai AFTER INSERT ON operations_recherche BEGIN
+        INSERT INTO {TABLE_FTS}(rowid, qui, motif, precision, concert)
+        VALUES (new.operation_id, new.qui, new.motif, new.precision, new.concert);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS operations_recherche_ad AFTER DELETE ON operations_recherche BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, qui, motif, precision, concert)
+        VALUES ('delete', old.operation_id, old.qui, old.motif, old.precision, old.concert);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS operations_recherche_au AFTER UPDATE ON operations_recherche BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, qui, motif, precision, concert)
+        VALUES ('delete', old.operation_id, old.qui, old.motif, old.precision, old.concert);
+        INSERT INTO {TABLE_FTS}(rowid, qui, motif, precision, concert)
+        VALUES (new.operation_id, new.qui, new.motif, new.precision, new.concert);
+    END""",
+)
+
+
+# --------------------------- Textes indexés ---------------------------
+
+def _tronquer(texte: str, colonne) -> str:
+    return texte[: colonne.type.length] if colonne.type.length else texte
+
+
+def libelle_concert(concert) -> str:
+    """Libellé affiché dans les archives : "17/09/2025 — Lieu" (ou "" sans concert)."""
+    if concert is None:
+        return ""
+    lieu = concert.lieu or (concert.lieu_obj.nom if concert.lieu_obj else "")
+    return f"{concert.date.strftime('%d/%m/%Y')} — {lieu}".strip(" —")
+
+
+def _lignes_index(session, operation_ids=None) -> list:
+    """Lignes operations_recherche (dicts) des opérations demandées (toutes si None) : 1 requête."""
+    q = (
+        session.query(
+            Operation.id, Musicien.prenom, Musicien.nom, Operation.motif, Operation.precision,
+            Concert.date, Concert.lieu, Lieu.nom, Lieu.ville, Lieu.organisme,
+        )
+        .outerjoin(Musicien, Musicien.id == Operation.musicien_id)
+        .outerjoin(Concert, Concert.id == Operation.concert_id)
+        .outerjoin(Lieu, Lieu.id == Concert.lieu_id)
+    )
+    if operation_ids is not None:
+        q = q.filter(Operation.id.in_(list(operation_ids)))
+
+    lignes = []
+    for op_id, prenom, nom, motif, precision, c_date, c_lieu, l_nom, l_ville, l_orga in q.all():
+        concert = ""
+        if c_date is not None:
+            morceaux = [c_date.strftime("%d/%m/%Y"), c_lieu, l_nom, l_ville, l_orga]
+            concert = " ".join(m for m in morceaux if m)
+        lignes.append({
+            "operation_id": op_id,
+            "qui": _tronquer(normaliser_nom(nom_affiche(prenom, nom)), OperationRecherche.qui),
+            "motif": _tronquer(normaliser_nom(motif), OperationRecherche.motif),
+            "precision": _tronquer(normaliser_nom(precision), OperationRecherche.precision),
+            "concert": _tronquer(normaliser_nom(concert), OperationRecherche.concert),
+        })
+    return lignes
+
+
+def _par_lots(ids):
+    ids = sorted(ids)
+    for i in range(0, len(ids), TAILLE_LOT):
+        yield ids[i:i + TAILLE_LOT]
+
+
+# --------------------------- Index FTS5 (SQLite) ---------------------------
+
+def _fts(session) -> bool:
+    """Vrai si la table FTS5 et ses triggers existent (SQLite) ; sinon la recherche passe par LIKE."""
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    presents = session.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE name IN (:fts, :ai, :ad, :au)"),
+        {"fts": TABLE_FTS, "ai": "operations_recherche_ai", "ad": "operations_recherche_ad",
+         "au": "operations_recherche_au"},
+    ).scalar()
+    return presents == len(DDL_FTS)
+
+
+def creer_fts() -> bool:
+    """
+    SQLite : crée la table FTS5 et ses triggers s'ils manquent (base db.create_all(), drop_all…)
+    puis la remplit depuis operations_recherche ('rebuild'). Commit inclus.
+    Faux si SQLite n'a pas FTS5 (la recherche passe alors par LIKE).
+    """
+    session = db.session
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    try:
+        for ddl in DDL_FTS:
+            session.execute(text(ddl))
+        session.execute(text(f"INSERT INTO {TABLE_FTS}({TABLE_FTS}) VALUES ('rebuild')"))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"⚠️ FTS5 indisponible, recherche par LIKE : {e}")
+        return False
+    return True
+
+
+# --------------------------- Tenue à jour ---------------------------
+
+# Attributs dont dépendent les textes indexés
+_ATTRS_SUIVIS = {
+    Operation: ("musicien_id", "motif", "precision", "concert_id", "musicien", "concert"),
+    Musicien: ("nom", "prenom"),
+    Concert: ("date", "lieu", "lieu_id", "lieu_obj"),
+    Lieu: ("nom", "ville", "organisme"),
+}
+_CLE_MARQUE = {Operation: "operations", Musicien: "musiciens", Concert: "concerts", Lieu: "lieux"}
+
+_CLE_SESSION = "recherche_a_indexer"
+
+
+def _marques(session) -> dict:
+    return session.info.setdefault(_CLE_SESSION, {cle: set() for cle in _CLE_MARQUE.values()})
+
+
+def marquer_operations_a_indexer(session, operation_ids) -> None:
+    """Note des opérations à réindexer (ou à retirer de l'index) au prochain commit de `session`."""
+    _marques(session)["operations"].update(oid for oid in operation_ids if oid is not None)
+
+
+def _a_change(obj) -> bool:
+    etat = inspect(obj)
+    return any(etat.attrs[a].history.has_changes() for a in _ATTRS_SUIVIS[type(obj)])
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_operations_touchees(session, flush_context):
+    touches = [o for o in (*session.new, *session.deleted) if type(o) in _ATTRS_SUIVIS]
+    touches += [o for o in session.dirty if type(o) in _ATTRS_SUIVIS and _a_change(o)]
+    if not touches:
+        return
+    marques = _marques(session)
+    for obj in touches:
+        marques[_CLE_MARQUE[type(obj)]].add(obj.id)
+
+
+@event.listens_for(db.session, "before_commit")
+def _indexer_avant_commit(session):
+    session.flush()  # cf. soldes._rafraichir_avant_commit
+    marques = session.info.pop(_CLE_SESSION, None)
+    if not marques or not any(marques.values()):
+        return
+    ids = set(marques.get("operations", ()))
+    ids |= _operations_dependantes(session, marques)
+    rafraichir_index(ids, session=session)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_apres_rollback(session):
+    session.info.pop(_CLE_SESSION, None)
+
+
+def _operations_dependantes(session, marques: dict) -> set:
+    """Opérations dont le libellé dépend d'un musicien, concert ou lieu modifié (1 requête)."""
+    conditions = []
+    if marques.get("musiciens"):
+        conditions.append(Operation.musicien_id.in_(list(marques["musiciens"])))
+    if marques.get("concerts"):
+        conditions.append(Operation.concert_id.in_(list(marques["concerts"])))
+    if marques.get("lieux"):
+        conditions.append(Operation.concert_id.in_(
+            select(Concert.id).where(Concert.lieu_id.in_(list(marques["lieux"])))
+        ))
+    if not conditions:
+        return set()
+    return {oid for (oid,) in session.query(Operation.id).filter(or_(*conditions))}
+
+
+def rafraichir_index(operation_ids, *, session=None) -> None:
+    """Réécrit les lignes d'index de quelques opérations (les disparues sont retirées), sans commit."""
+    session = session or db.session
+    for lot in _par_lots({oid for oid in operation_ids if oid is not None}):
+        session.execute(
+            delete(OperationRecherche).where(OperationRecherche.operation_id.in_(lot)),
+            execution_options={"synchronize_session": False},
+        )
+        lignes = _lignes_index(session, lot)
+        if lignes:
+            session.execute(insert(OperationRecherche), lignes)
+
+
+def reconstruire_index() -> int:
+    """Reconstruit TOUT l'index depuis la table operations (commande `rebuild`). Commit inclus."""
+    session = db.session
+    session.execute(delete(OperationRecherche), execution_options={"synchronize_session": False})
+    lignes = _lignes_index(session)
+    for i in range(0, len(lignes), TAILLE_LOT):
+        session.execute(insert(OperationRecherche), lignes[i:i + TAILLE_LOT])
+    session.info.pop(_CLE_SESSION, None)
+    session.commit()
+    return len(lignes)
+
+
+def verifier_index() -> list:
+    """Compare l'index à un recalcul complet : [(operation_id, attendu, lu), ...] (vide = OK)."""
+    attendues = {l["operation_id"]: l for l in _lignes_index(db.session)}
+    lues = {
+        r.operation_id: {"operation_id": r.operation_id, "qui": r.qui, "motif": r.motif,
+                         "precision": r.precision, "concert": r.concert}
+        for r in db.session.query(OperationRecherche).all()
+    }
+    return [
+        (oid, attendues.get(oid), lues.get(oid))
+        for oid in sorted(set(attendues) | set(lues))
+        if attendues.get(oid) != lues.get(oid)
+    ]
+
+
+# --------------------------- Saisies ---------------------------
+
+def mots_recherches(valeur) -> list:
+    """'  Jérôme  d'Arnould ' → ['jerome', 'd', 'arnould'] (mots normalisés, ponctuation ignorée)."""
+    return re.findall(r"[^\W_]+", normaliser_nom(valeur))
+
+
+def intervalle_de_dates(valeur: str) -> tuple:
+    """
+    Date saisie → (début, fin) inclus :
+      "17/09/2025" ou "2025-09-17" → ce jour ; "09/2025" → ce mois ; "2025" → cette année.
+    Lève ValueError si la saisie n'est pas une date.
+    """
+    texte = (valeur or "").strip()
+    for fmt in ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"):
+        try:
+            jour = datetime.strptime(texte, fmt).date()
+            return jour, jour
+        except ValueError:
+            pass
+    try:
+        mois = datetime.strptime(texte, "%m/%Y").date()
+        suivant = (mois.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return mois, suivant - timedelta(days=1)
+    except ValueError:
+        pass
+    if re.fullmatch(r"\d{4}", texte):
+        annee = int(texte)
+        return date(annee, 1, 1), date(annee, 12, 31)
+    raise ValueError("Date attendue : JJ/MM/AAAA, MM/AAAA ou AAAA.")
+
+
+def curseur(op: Operation) -> str:
+    return f"{op.date.isoformat()}_{op.id}"
+
+
+def lire_curseur(valeur: str) -> tuple:
+    """'2025-09-17_42' → (date(2025, 9, 17), 42) ; ValueError si illisible."""
+    jour, _, op_id = (valeur or "").partition("_")
+    try:
+        return date.fromisoformat(jour), int(op_id)
+    except ValueError:
+        raise ValueError("Curseur de pagination invalide.")
+
+
+# --------------------------- Recherche ---------------------------
+
+def _filtre_texte(session, critere: str, mots: list, au_moins_un: bool):
+    """Condition sur Operation.id : FTS5 (MATCH) si disponible, sinon LIKE sur l'index normalisé."""
+    if _fts(session):
+        liaison = " OR " if au_moins_un else " AND "
+        expression = f"{critere} : (" + liaison.join(f'"{m}"*' for m in mots) + ")"
+        sous_requete = text(
+            f"SELECT rowid FROM {TABLE_FTS} WHERE {TABLE_FTS} MATCH :expression"
+        ).bindparams(expression=expression).columns(rowid=Integer)
+        return Operation.id.in_(sous_requete)
+
+    colonne = getattr(OperationRecherche, critere)
+    conditions = [colonne.like(f"%{m}%") for m in mots]
+    combinees = or_(*conditions) if au_moins_un else and_(*conditions)
+    return Operation.id.in_(select(OperationRecherche.operation_id).where(combinees))
+
+
+def rechercher_operations(critere: str = "montant", valeur=None, *, tolerance: float = 0.0,
+                          saison: str | None = None, debut: date | None = None, fin: date | None = None,
+                          musicien_id: int | None = None, concert_id: int | None = None,
+                          limite: int = LIMITE_DEFAUT, apres: str | None = None) -> tuple:
+    """
+    Opérations correspondant au critère, triées (date desc, id desc), une page à la fois.
+      - montant  : `valeur` (float) en valeur absolue, ± tolerance ;
+      - date     : `valeur` texte, cf. intervalle_de_dates() ;
+      - qui / motif / precision : tous les mots saisis (préfixes, sans accents) ;
+      - concert  : au moins un des mots saisis (date, lieu, ville, organisme).
+    saison ('2024/2025', colonne indexée) restreint à une saison, debut / fin bornent les dates
+    (opérations passées), musicien_id / concert_id filtrent.
+    Renvoie (operations, curseur_suivant | None). Lève ValueError si la saisie est inexploitable.
+    """
+    if critere not in CRITERES:
+        raise ValueError(f"Critère inconnu : {critere}")
+    session = db.session
+
+    q = Operation.query.options(
+        joinedload(Operation.musicien),
+        joinedload(Operation.concert).joinedload(Concert.lieu_obj),
+    )
+
+    if critere == "montant":
+        if valeur is None:
+            raise ValueError("Montant attendu.")
+        cible = abs(float(valeur))
+        ecart = abs(float(tolerance or 0.0))  # montants en centimes entiers : égalité exacte
+        bas, haut = max(cible - ecart, 0.0), cible + ecart
+        q = q.filter(or_(Operation.montant.between(bas, haut), Operation.montant.between(-haut, -bas)))
+    elif critere == "date":
+        jour_min, jour_max = intervalle_de_dates(valeur)
+        q = q.filter(Operation.date >= jour_min, Operation.date <= jour_max)
+    else:
+        mots = mots_recherches(valeur)
+        if not mots:
+            raise ValueError("Saisir au moins un mot.")
+        q = q.filter(_filtre_texte(session, critere, mots, au_moins_un=(critere == "concert")))
+
+    if saison is not None:
+        q = q.filter(Operation.saison == saison)
+    if debut is not None:
+        q = q.filter(Operation.date >= debut)
+    if fin is not None:
+        q = q.filter(Operation.date <= fin)
+    if musicien_id is not None:
+        q = q.filter(Operation.musicien_id == musicien_id)
+    if concert_id is not None:
+        q = q.filter(Operation.concert_id == concert_id)
+
+    if apres:
+        jour, op_id = lire_curseur(apres)
+        q = q.filter(or_(Operation.date < jour, and_(Operation.date == jour, Operation.id < op_id)))
+
+    limite = max(1, min(int(limite or LIMITE_DEFAUT), LIMITE_MAX))
+    operations = q.order_by(Operation.date.desc(), Operation.id.desc()).limit(limite + 1).all()
+    suivant = curseur(operations[limite - 1]) if len(operations) > limite else None
+    return operations[:limite], suivant
+
+
+def est_modifiable(op: Operation) -> bool:
+    """Même règle que les archives : pas d'opération automatique (CB ASSO7, débit salaire, commission)."""
+    return not (op.auto_cb_asso7 or op.auto_debit_salaire or (op.motif or "").lower() == "commission lionel")
+
+
+def operation_en_dict(op: Operation) -> dict:
+    """Ligne de résultat JSON (mêmes colonnes que les tableaux d'archives)."""
+    from mes_utils import format_currency  # import local : mes_utils importe ce module
+    return {
+        "id": op.id,
+        "date": op.date.isoformat(),
+        "date_affichee": op.date.strftime("%d/%m/%Y"),
+        "musicien_id": op.musicien_id,
+        "qui": nom_affiche(op.musicien.prenom, op.musicien.nom) if op.musicien else "",
+        "type": op.type,
+        "motif": op.motif or "",
+        "precision": op.precision or "",
+        "montant": float(op.montant or 0.0),
+        "montant_affiche": format_currency(op.montant),
+        "previsionnel": bool(op.previsionnel),
+        "concert_id": op.concert_id,
+        "concert": libelle_concert(op.concert),
+        "modifiable": est_modifiable(op),
+    }
+
+
+# -------------------------------------------------------------------
+# Script autonome :  python recherche.py rebuild | verifier
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+    from App import app
+
+    commande = (sys.argv[1] if len(sys.argv) > 1 else "verifier").strip().lower()
+    with app.app_context():
+        if commande == "rebuild":
+            creer_fts()
+            n = reconstruire_index()
+            print(f"✅ Index de recherche reconstruit : {n} opération(s).")
+        elif commande == "verifier":
+            ecarts = verifier_index()
+            if not ecarts:
+                print("✅ Index de recherche conforme aux opérations.")
+            else:
+                for oid, attendu, lu in ecarts[:50]:
+                    print(f"❌ opération {oid} : index={lu} / attendu={attendu}")
+                sys.exit(1)
+        else:
+            print("Usage : python recherche.py rebuild | verifier")
+            sys.exit(2)
@@ -0,0 +1,183 @@
+# resume_concerts.py
+"""
+Résumé dénormalisé des concerts, dans la table `concerts` elle-même :
+
+  - frais            : frais réels (cf. frais_concerts.py), recalculés AVANT le commit de toute
+                       transaction qui écrit une opération de frais du concert ;
+  - nb_participants,
+    part_asso7,
+    total_distribue  : écrits par le recalcul des crédits (calcul_participations), dans le même
+                       commit que les crédits des participations.
+
+frais_previsionnels garde son écriture propre (mes_utils.recompute_frais_previsionnels) : la valeur
+est volontairement conservée après le paiement, quand les opérations prévisionnelles sont purgées
+(cf. toggle_concert_paye) ; le contrôle ne la compare donc qu'aux concerts qui en ont encore.
+
+Les listes de concerts lisent ces colonnes au lieu de ré-agréger les tables filles.
+Contrôle de cohérence :  python resume_concerts.py verifier | rebuild
+"""
+
+from sqlalchemy import case, event, func, update
+
+import frais_concerts
+from models import db, Concert, Musicien, Participation
+from monnaie import Money
+
+CHAMPS_PARTICIPATIONS = ("nb_participants", "part_asso7", "total_distribue")
+CHAMPS_RESUME = CHAMPS_PARTICIPATIONS + ("frais", "frais_previsionnels")
+
+
+# --------------------------- Calcul ---------------------------
+
+def resume_des_credits(credits, asso7_id) -> dict:
+    """credits : [(musicien_id, crédit en euros)] des participations d'un concert."""
+    credits = list(credits)
+    return {
+        "nb_participants": len(credits),
+        "part_asso7": sum((Money.de(c) for mid, c in credits if mid == asso7_id), Money()).euros,
+        "total_distribue": sum((Money.de(c) for _mid, c in credits), Money()).euros,
+    }
+
+
+def resume_a_changer(concert: Concert, resume: dict) -> bool:
+    """Vrai si une colonne du résumé diffère (au centime) de `resume`."""
+    for champ, valeur in resume.items():
+        actuel = getattr(concert, champ)
+        if champ == "nb_participants":
+            if (actuel or 0) != valeur:
+                return True
+        elif actuel is None or Money.de(actuel) != Money.de(valeur):
+            return True
+    return False
+
+
+def resumes_recalcules(concert_ids=None) -> dict:
+    """
+    {concert_id: {champ: valeur}} recalculé depuis les tables filles (2 agrégations) :
+    participations (crédit réel si payé, sinon potentiel) et opérations de frais.
+    """
+    from annuaire import ROLE_ASSO7, id_role  # import local : annuaire importe models
+
+    q = db.session.query(Concert.id)
+    if concert_ids is not None:
+        q = q.filter(Concert.id.in_(list(concert_ids)))
+    ids = [cid for (cid,) in q.all()]
+    out = {cid: {"nb_participants": 0, "part_asso7": 0.0, "total_distribue": 0.0} for cid in ids}
+    if not ids:
+        return out
+
+    asso7_id = id_role(ROLE_ASSO7)
+    credit = case(
+        (Concert.paye.is_(True), Participation.credit_calcule),
+        else_=Participation.credit_calcule_potentiel,
+    )
+    rows = (
+        db.session.query(
+            Participation.concert_id,
+            func.count(Participation.id),
+            func.sum(case((Participation.musicien_id == asso7_id, credit), else_=0)),
+            func.sum(credit),
+        )
+        .join(Concert, Concert.id == Participation.concert_id)
+        .join(Musicien, Musicien.id == Participation.musicien_id)
+        .filter(Participation.concert_id.in_(ids))
+        .group_by(Participation.concert_id)
+        .all()
+    )
+    for cid, nb, asso7, total in rows:
+        out[cid] = {"nb_participants": nb, "part_asso7": float(asso7 or 0.0), "total_distribue": float(total or 0.0)}
+
+    for cid, frais in frais_concerts.frais_des_concerts(ids, fraiche=True).items():
+        out[cid]["frais"] = frais.reels
+        out[cid]["frais_previsionnels"] = frais.previsionnels
+    return out
+
+
+# --------------------------- Frais : tenus à jour avant commit ---------------------------
+
+def appliquer_frais(concert_ids) -> int:
+    """Réécrit Concert.frais des concerts donnés si la somme des opérations a changé."""
+    ids = {int(cid) for cid in concert_ids if cid}
+    if not ids:
+        return 0
+    frais = frais_concerts.frais_des_concerts(ids, fraiche=True)
+    modifies = 0
+    for concert in Concert.query.filter(Concert.id.in_(ids)).all():
+        reels = frais[concert.id].reels
+        if Money.de(concert.frais) != Money.de(reels):  # NULL = 0 : rien à réécrire
+            concert.frais = reels  # marque aussi le concert pour le recalcul des crédits
+            modifies += 1
+    return modifies
+
+
+@event.listens_for(db.session, "before_commit")
+def _frais_avant_commit(session):
+    session.flush()  # cf. soldes._rafraichir_avant_commit
+    appliquer_frais(frais_concerts.concerts_marques(session))
+
+
+# --------------------------- Contrôle de cohérence ---------------------------
+
+def verifier_resumes(tolerance: float = 0.005) -> list:
+    """
+    Compare les colonnes du résumé à un recalcul complet.
+    Retourne [(concert_id, champ, colonne, recalcul), ...] (vide = OK).
+    """
+    recalcul = resumes_recalcules()
+    concerts = {c.id: c for c in Concert.query.all()}
+    ecarts = []
+    for cid, attendu in sorted(recalcul.items()):
+        c = concerts[cid]
+        for champ in CHAMPS_RESUME:
+            if champ == "frais_previsionnels" and (c.paye or not attendu[champ]):
+                continue  # valeur conservée sans opération (cf. docstring du module)
+            lu = getattr(c, champ) or 0
+            if abs(lu - attendu[champ]) > tolerance:
+                ecarts.append((cid, champ, float(lu), float(attendu[champ])))
+    return ecarts
+
+
+def reconstruire_resumes(concert_ids=None) -> int:
+    """
+    Réécrit le résumé depuis les tables filles (UPDATE groupé des seuls concerts en écart, un commit).
+    Renvoie le nombre de concerts réécrits.
+    """
+    recalcul = resumes_recalcules(concert_ids)
+    lignes = []
+    for c in Concert.query.filter(Concert.id.in_(list(recalcul))).all():
+        attendu = recalcul[c.id]
+        resume = {champ: attendu[champ] for champ in CHAMPS_PARTICIPATIONS}
+        if Money.de(c.frais) != Money.de(attendu["frais"]):  # NULL = 0 : pas de frais saisis
+            resume["frais"] = attendu["frais"]
+        if resume_a_changer(c, resume):
+            lignes.append({"id": c.id, **resume})
+    if lignes:
+        db.session.execute(update(Concert), lignes)
+    db.session.commit()
+    return len(lignes)
+
+
+# -------------------------------------------------------------------
+# Script autonome :  python resume_concerts.py rebuild | verifier
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+    from App import app
+
+    commande = (sys.argv[1] if len(sys.argv) > 1 else "verifier").strip().lower()
+    with app.app_context():
+        if commande == "rebuild":
+            n = reconstruire_resumes()
+            print(f"✅ Résumé des concerts reconstruit : {n} concert(s).")
+        elif commande == "verifier":
+            ecarts = verifier_resumes()
+            if not ecarts:
+                print("✅ Résumé des concerts conforme au recalcul complet.")
+            else:
+                for cid, champ, lu, attendu in ecarts:
+                    print(f"❌ concert {cid} · {champ} : colonne={lu:.2f} / recalcul={attendu:.2f}")
+                sys.exit(1)
+        else:
+            print("Usage : python resume_concerts.py rebuild | verifier")
+            sys.exit(2)
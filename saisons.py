@@ -0,0 +1,213 @@
+# saisons.py
+"""
+Saisons (septembre → août) et RÉSUMÉ PAR SAISON des opérations, concerts et cachets.
+
+Table saisons_resume : une ligne par (entité, saison) avec nombre, total et dates extrêmes
+  - operations : total = somme des montants,
+  - concerts   : total = somme des recettes,
+  - cachets    : total = somme des montants.
+Les pages d'accueil des archives (choix de la saison) la lisent en UNE petite requête,
+au lieu de charger tout l'historique pour en déduire la liste des saisons.
+
+Remplie par la migration de la colonne saison (ou `python saisons.py rebuild`), puis tenue à
+jour au commit comme le grand livre (cf. soldes.py) : saison avant ET après un changement de date.
+Écritures en masse : marquer_saisons_a_resumer().
+"""
+
+from datetime import date
+
+from sqlalchemy import event, func, inspect
+
+from models import db, saison_de, Cachet, Concert, Operation, ResumeSaison
+
+ENTITE_OPERATIONS = "operations"
+ENTITE_CONCERTS = "concerts"
+ENTITE_CACHETS = "cachets"
+
+# entité → (modèle, colonne sommée)
+_ENTITES = {
+    ENTITE_OPERATIONS: (Operation, "montant"),
+    ENTITE_CONCERTS: (Concert, "recette"),
+    ENTITE_CACHETS: (Cachet, "montant"),
+}
+_ENTITE_DU_MODELE = {modele: entite for entite, (modele, _col) in _ENTITES.items()}
+
+
+# --------------------------- Saisons ---------------------------
+
+# saison_de(date) → '2024/2025' est définie dans models.py : les colonnes `saison` de
+# Operation, Concert et Cachet la suivent (événement sur `date`). Réexportée ici.
+
+
+def bornes_saison(saison: str) -> tuple:
+    """'2024/2025' → (date(2024, 9, 1), date(2025, 8, 31))."""
+    debut = int(saison.split("/")[0])
+    return date(debut, 9, 1), date(debut + 1, 8, 31)
+
+
+def format_court(saison: str) -> str:
+    """'2024/2025' → '24/25' (libellés des archives d'opérations)."""
+    debut, fin = saison.split("/")
+    return f"{debut[-2:]}/{fin[-2:]}"
+
+
+# --------------------------- Calcul ---------------------------
+
+def _agregat(session, entite: str, saison: str):
+    """(nb, total, date_min, date_max) d'une entité sur une saison : 1 requête (index sur saison)."""
+    modele, col = _ENTITES[entite]
+    return (
+        session.query(func.count(modele.id), func.sum(getattr(modele, col)),
+                      func.min(modele.date), func.max(modele.date))
+        .filter(modele.saison == saison)
+        .one()
+    )
+
+
+def _agregats_par_saison(entite: str) -> dict:
+    """{saison: [nb, total, date_min, date_max]} sur tout l'historique (GROUP BY saison)."""
+    modele, col = _ENTITES[entite]
+    lignes = (
+        db.session.query(modele.saison, func.count(modele.id), func.sum(getattr(modele, col)),
+                         func.min(modele.date), func.max(modele.date))
+        .group_by(modele.saison)
+        .all()
+    )
+    return {
+        saison: [int(nb), float(total or 0.0), d_min, d_max]
+        for saison, nb, total, d_min, d_max in lignes
+        if saison is not None
+    }
+
+
+# --------------------------- Tenue à jour ---------------------------
+
+_CLE_SESSION = "saisons_a_resumer"
+
+
+def marquer_saisons_a_resumer(session, paires) -> None:
+    """Note des (entité, saison) à recalculer au prochain commit de `session`."""
+    session.info.setdefault(_CLE_SESSION, set()).update(p for p in paires if p[1])
+
+
+def _paires_touchees(obj, *, modifie: bool) -> set:
+    entite = _ENTITE_DU_MODELE[type(obj)]
+    dates = {obj.date}
+    if modifie:
+        etat = inspect(obj)
+        col = _ENTITES[entite][1]
+        if not (etat.attrs["date"].history.has_changes() or etat.attrs[col].history.has_changes()):
+            return set()
+        dates.update(etat.attrs["date"].history.deleted or ())
+    return {(entite, saison_de(d)) for d in dates if d is not None}
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_saisons_touchees(session, flush_context):
+    paires = set()
+    for obj in (*session.new, *session.deleted):
+        if type(obj) in _ENTITE_DU_MODELE:
+            paires |= _paires_touchees(obj, modifie=False)
+    for obj in session.dirty:
+        if type(obj) in _ENTITE_DU_MODELE:
+            paires |= _paires_touchees(obj, modifie=True)
+    if paires:
+        marquer_saisons_a_resumer(session, paires)
+
+
+@event.listens_for(db.session, "before_commit")
+def _resumer_avant_commit(session):
+    session.flush()  # cf. soldes._rafraichir_avant_commit
+    paires = session.info.pop(_CLE_SESSION, None)
+    if paires:
+        rafraichir_resumes(paires, session=session)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_apres_rollback(session):
+    session.info.pop(_CLE_SESSION, None)
+
+
+def rafraichir_resumes(paires, *, session=None) -> None:
+    """Recalcule quelques lignes (entité, saison), sans commit ; une saison vidée disparaît."""
+    session = session or db.session
+    for entite, saison in sorted(paires):
+        nb, total, d_min, d_max = _agregat(session, entite, saison)
+        ligne = session.get(ResumeSaison, (entite, saison))
+        if not nb:
+            if ligne is not None:
+                session.delete(ligne)
+            continue
+        if ligne is None:
+            ligne = ResumeSaison(entite=entite, saison=saison)
+            session.add(ligne)
+        ligne.nb, ligne.total = int(nb), float(total or 0.0)
+        ligne.date_min, ligne.date_max = d_min, d_max
+
+
+def reconstruire_resumes() -> int:
+    """Reconstruit TOUTE la table depuis l'historique (commande `rebuild`). Commit inclus."""
+    db.session.query(ResumeSaison).delete(synchronize_session=False)
+    n = 0
+    for entite in _ENTITES:
+        for saison, (nb, total, d_min, d_max) in _agregats_par_saison(entite).items():
+            db.session.add(ResumeSaison(entite=entite, saison=saison, nb=nb, total=total,
+                                        date_min=d_min, date_max=d_max))
+            n += 1
+    db.session.info.pop(_CLE_SESSION, None)
+    db.session.commit()
+    return n
+
+
+# --------------------------- Lecture ---------------------------
+
+def resumes_saisons(entite: str, *, avant: date | None = None) -> list:
+    """
+    Lignes ResumeSaison d'une entité, de la plus récente à la plus ancienne (1 requête).
+    avant : ne garder que les saisons qui ont au moins une ligne datée avant ce jour.
+    Lecture seule.
+    """
+    q = ResumeSaison.query.filter(ResumeSaison.entite == entite)
+    if avant is not None:
+        q = q.filter(ResumeSaison.date_min < avant)
+    return q.order_by(ResumeSaison.saison.desc()).all()
+
+
+def verifier_resumes() -> list:
+    """Compare la table à un recalcul complet : [(entité, saison, lu, attendu), ...] (vide = OK)."""
+    ecarts = []
+    lues = {(r.entite, r.saison): (r.nb, round(r.total, 2), r.date_min, r.date_max)
+            for r in ResumeSaison.query.all()}
+    for entite in _ENTITES:
+        attendues = {(entite, s): (v[0], round(v[1], 2), v[2], v[3])
+                     for s, v in _agregats_par_saison(entite).items()}
+        for cle in sorted(set(attendues) | {c for c in lues if c[0] == entite}):
+            if lues.get(cle) != attendues.get(cle):
+                ecarts.append((*cle, lues.get(cle), attendues.get(cle)))
+    return ecarts
+
+
+# -------------------------------------------------------------------
+# Script autonome :  python saisons.py rebuild | verifier
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+    from App import app
+
+    commande = (sys.argv[1] if len(sys.argv) > 1 else "verifier").strip().lower()
+    with app.app_context():
+        if commande == "rebuild":
+            n = reconstruire_resumes()
+            print(f"✅ Résumé des saisons reconstruit : {n} ligne(s).")
+        elif commande == "verifier":
+            ecarts = verifier_resumes()
+            if not ecarts:
+                print("✅ Résumé des saisons conforme à l'historique.")
+            else:
+                for entite, saison, lu, attendu in ecarts:
+                    print(f"❌ {entite} {saison} : table={lu} / recalcul={attendu}")
+                sys.exit(1)
+        else:
+            print("Usage : python saisons.py rebuild | verifier")
+            sys.exit(2)
@@ -0,0 +1,82 @@
+# sauvegarde_concert.py
+"""
+Enregistrement d'un concert en UNE unité de travail (ajouter_concert, modifier_concert, participants) :
+
+  1. champs du concert (créé ou modifié),
+  2. opération prévisionnelle de frais (créée / mise à jour / supprimée),
+  3. participations (ajouts / retraits ; les conservées gardent gain_fixe et crédits),
+  4. UN flush, frais_previsionnels relu en une requête, UN recalcul des crédits du concert,
+  5. UN commit.
+
+Avant : jusqu'à cinq commits successifs (concert, ensure_op_frais_previsionnels,
+recompute_frais_previsionnels, enregistrer_participations, recalcul), dont les états intermédiaires
+(concert sans ses frais prévisionnels, participants sans crédits…) étaient visibles des autres
+threads. Toute erreur annule désormais l'ensemble (rollback) et remonte à la route.
+Un concert existant est verrouillé (verrous_concerts.py) du début de la sauvegarde au commit.
+"""
+
+from models import db, Concert, Operation
+from verrous_concerts import verrou_concerts
+from mes_utils import (
+    _alerter_recalc, frais_previsionnels_du_concert, lier_op_frais_previsionnels,
+    preparer_op_frais_previsionnels, preparer_participations,
+)
+
+_INCHANGE = object()
+
+
+def enregistrer_concert(concert: Concert | None = None, *, champs: dict | None = None,
+                        frais_previsionnels=_INCHANGE, participants_ids=None, jerome_id=None,
+                        compte_recette=None) -> Concert:
+    """
+    concert             : Concert existant, ou None pour en créer un.
+    champs              : {attribut: valeur} à écrire sur le concert (date, lieu_id, recette, paye, solo…).
+    frais_previsionnels : saisie du formulaire ("120,50" ; "" ou None = supprimer) ; inchangés par défaut.
+                          Un concert payé ne garde aucune opération prévisionnelle.
+    participants_ids    : musiciens participants (None = inchangés) ; jerome_id y est toujours ajouté.
+    compte_recette      : concert CRÉÉ payé avec une recette → opération 'Recette concert' vers ce compte.
+    Renvoie le concert enregistré (validé).
+    """
+    # concert existant : verrouillé (verrous_concerts.py) le temps de la sauvegarde
+    with verrou_concerts([concert.id] if concert is not None else []):
+        try:
+            nouveau = concert is None
+            if nouveau:
+                concert = Concert()
+                db.session.add(concert)
+            for attribut, valeur in (champs or {}).items():
+                setattr(concert, attribut, valeur)
+
+            op_prev = None
+            frais_touches = frais_previsionnels is not _INCHANGE
+            if frais_touches:
+                op_prev = preparer_op_frais_previsionnels(concert, None if concert.paye else frais_previsionnels)
+
+            if participants_ids is not None:
+                preparer_participations(concert, participants_ids, jerome_id=jerome_id)
+
+            if nouveau and concert.paye and concert.recette and compte_recette is not None:
+                recette = Operation(musicien_id=compte_recette.id, type='credit', motif='Recette concert',
+                                    montant=concert.recette, date=concert.date)
+                recette.concert = concert
+                db.session.add(recette)
+
+            db.session.flush()  # le seul flush explicite : ids du concert et de l'opération prévisionnelle
+
+            if frais_touches:
+                concert.frais_previsionnels = frais_previsionnels_du_concert(concert.id)
+                lier_op_frais_previsionnels(concert, op_prev)
+
+            # Recalcul des crédits de CE concert dans la même transaction (pas de second passage
+            # en fin de requête) ; un partage impossible est signalé mais n'empêche pas l'enregistrement.
+            from calcul_participations import recalculer_concerts_dans_la_transaction
+            erreurs = recalculer_concerts_dans_la_transaction([concert.id])
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    for cid, e in erreurs.items():
+        _alerter_recalc(cid, e)
+    return concert
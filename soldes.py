@@ -0,0 +1,424 @@
+# soldes.py
+
+from datetime import date
+
+from sqlalchemy import and_, case, event, func, inspect, or_, update
+
+from annuaire import ROLES_SPECIAUX, id_role, role_de, role_du_mode_paiement
+from models import db, Musicien, Participation, Report, Operation, Concert, SoldeCompte
+
+
+# --------------------------- Expressions SQL ---------------------------
+
+def _montant_signe():
+    """credit -> +montant, debit -> -montant : colonne persistée (cf. models._suivre_sens)."""
+    return Operation.montant_signe
+
+
+def _op_passee(aujourd_hui: date):
+    """passée := date <= aujourd'hui ET non prévisionnelle (False/NULL)."""
+    return and_(
+        Operation.date <= aujourd_hui,
+        or_(Operation.previsionnel.is_(False), Operation.previsionnel.is_(None)),
+    )
+
+
+def _op_a_venir(aujourd_hui: date):
+    """à venir := date > aujourd'hui OU prévisionnelle."""
+    return or_(Operation.date > aujourd_hui, Operation.previsionnel.is_(True))
+
+
+# --------------------------- Moteur ---------------------------
+
+def _composantes_vides() -> dict:
+    return {
+        "parts_reelles": 0.0,
+        "parts_potentielles": 0.0,
+        "reports": 0.0,
+        "ops_passees": 0.0,
+        "ops_a_venir": 0.0,
+    }
+
+
+def composantes_par_compte(aujourd_hui: date, musicien_ids=None) -> dict:
+    """
+    Calcule en TROIS requêtes agrégées (GROUP BY musicien_id) les composantes du solde
+    de chaque compte :
+        { musicien_id: {parts_reelles, parts_potentielles, reports, ops_passees, ops_a_venir} }
+    - participations : somme de credit_calcule (réel) et credit_calcule_potentiel
+    - reports        : somme de Report.montant
+    - opérations     : somme signée des opérations passées / à venir (cf. _op_passee / _op_a_venir)
+
+    Seules les lignes OUVERTES sont lues (cloture_saison IS NULL) : l'historique des saisons
+    clôturées est résumé par leurs reports de clôture (cf. clotures.py).
+
+    Le nombre de requêtes ne dépend PAS du nombre de musiciens.
+    musicien_ids (optionnel) restreint le calcul à quelques comptes.
+    Les comptes sans aucune écriture n'apparaissent pas : utiliser .get(mid) ou composantes_de().
+    """
+    out = {}
+
+    def _slot(mid):
+        if mid not in out:
+            out[mid] = _composantes_vides()
+        return out[mid]
+
+    q_parts = (
+        db.session.query(
+            Participation.musicien_id,
+            func.sum(Participation.credit_calcule),
+            func.sum(Participation.credit_calcule_potentiel),
+        )
+        .filter(Participation.cloture_saison.is_(None))
+        .group_by(Participation.musicien_id)
+    )
+    q_reports = (
+        db.session.query(Report.musicien_id, func.sum(Report.montant))
+        .filter(Report.cloture_saison.is_(None))
+        .group_by(Report.musicien_id)
+    )
+    signe = _montant_signe()
+    q_ops = (
+        db.session.query(
+            Operation.musicien_id,
+            func.sum(case((_op_passee(aujourd_hui), signe), else_=0)),
+            func.sum(case((_op_a_venir(aujourd_hui), signe), else_=0)),
+        )
+        .filter(Operation.cloture_saison.is_(None), Operation.musicien_id.isnot(None))
+        .group_by(Operation.musicien_id)
+    )
+
+    if musicien_ids is not None:
+        ids = list(musicien_ids) or [-1]
+        q_parts = q_parts.filter(Participation.musicien_id.in_(ids))
+        q_reports = q_reports.filter(Report.musicien_id.in_(ids))
+        q_ops = q_ops.filter(Operation.musicien_id.in_(ids))
+
+    for mid, reel, potentiel in q_parts.all():
+        s = _slot(mid)
+        s["parts_reelles"] = float(reel or 0.0)
+        s["parts_potentielles"] = float(potentiel or 0.0)
+
+    for mid, total in q_reports.all():
+        _slot(mid)["reports"] = float(total or 0.0)
+
+    for mid, passees, a_venir in q_ops.all():
+        s = _slot(mid)
+        s["ops_passees"] = float(passees or 0.0)
+        s["ops_a_venir"] = float(a_venir or 0.0)
+
+    return out
+
+
+def composantes_de(composantes: dict, musicien_id: int) -> dict:
+    return composantes.get(musicien_id) or _composantes_vides()
+
+
+def recettes_attendues_par_compte() -> dict:
+    """
+    { id du compte CB / CAISSE : somme des recette_attendue des concerts NON payés } (1 requête).
+    Le mode de paiement prévu désigne le compte par son rôle (annuaire.role_du_mode_paiement).
+    """
+    rows = (
+        db.session.query(Concert.mode_paiement_prevu, func.sum(Concert.recette_attendue))
+        .filter(Concert.paye.is_(False))
+        .group_by(Concert.mode_paiement_prevu)
+        .all()
+    )
+    out = {}
+    for mode, total in rows:
+        role = role_du_mode_paiement(mode)
+        mid = id_role(role) if role else None
+        if mid is not None:
+            out[mid] = out.get(mid, 0.0) + float(total or 0.0)
+    return out
+
+
+# --------------------------- Règles de solde ---------------------------
+
+def est_compte_tresorerie(musicien_id: int | None) -> bool:
+    """CB / CAISSE / TRESO d'après l'annuaire des rôles (pas le nom : un compte renommé reste reconnu)."""
+    return role_de(musicien_id) in ROLES_SPECIAUX
+
+
+def credit_reel(musicien_id: int | None, c: dict) -> float:
+    """
+    Crédit réel (hors reports) :
+      - CB/CAISSE/TRESO : opérations passées uniquement ;
+      - autres comptes   : participations réelles + opérations passées.
+    """
+    if est_compte_tresorerie(musicien_id):
+        return c["ops_passees"]
+    return c["parts_reelles"] + c["ops_passees"]
+
+
+def gains_a_venir(c: dict, recettes_attendues: float | None = None) -> float:
+    """
+    Gains à venir :
+      - CB/CAISSE (recettes_attendues fourni) : recettes attendues + opérations à venir ;
+      - autres comptes : participations potentielles + opérations à venir.
+    """
+    if recettes_attendues is not None:
+        return (recettes_attendues or 0.0) + c["ops_a_venir"]
+    return c["parts_potentielles"] + c["ops_a_venir"]
+
+
+# --------------------------- Grand livre (table account_balances) ---------------------------
+#
+# Chaque flush note les comptes touchés (Operation / Participation / Report / nouveau Musicien) ;
+# juste avant le COMMIT, leurs lignes SoldeCompte sont recalculées dans la MÊME transaction.
+# Les écritures en masse (query.update / query.delete) court-circuitent les événements ORM :
+# appeler marquer_soldes_a_rafraichir() explicitement dans ce cas.
+#
+# Chaque ligne se suffit à elle-même (recalculée entièrement depuis l'historique du compte) : un
+# compte sans ligne est recalculé à la lecture, jusqu'au `python soldes.py rebuild`.
+# La lecture n'écrit jamais : le décalage « à venir → passé » des jours écoulés depuis la date
+# d'arrêté est appliqué en mémoire, puis enregistré par la prochaine écriture du compte
+# ou par `python soldes.py avancer`.
+
+CHAMPS_COMPOSANTES = ("parts_reelles", "parts_potentielles", "reports", "ops_passees", "ops_a_venir")
+
+# Attributs qui influencent un solde (les autres modifications n'imposent pas de rafraîchissement)
+_ATTRS_SUIVIS = {
+    Operation: ("musicien_id", "type", "montant", "date", "previsionnel"),
+    Participation: ("musicien_id", "credit_calcule", "credit_calcule_potentiel"),
+    Report: ("musicien_id", "montant", "cloture_saison"),
+}
+
+_CLE_SESSION = "soldes_a_rafraichir"
+
+
+def _aujourd_hui() -> date:
+    from mes_utils import today_paris  # import local : mes_utils importe ce module
+    return today_paris()
+
+
+def marquer_soldes_a_rafraichir(session, musicien_ids) -> None:
+    """Note des comptes à recalculer au prochain commit de `session`."""
+    ids = session.info.setdefault(_CLE_SESSION, set())
+    ids.update(mid for mid in musicien_ids if mid is not None)
+
+
+def _musicien_ids_touches(obj, *, modifie: bool) -> set:
+    ids = {getattr(obj, "musicien_id", None)}
+    if modifie:
+        etat = inspect(obj)
+        attrs = _ATTRS_SUIVIS[type(obj)]
+        if not any(etat.attrs[a].history.has_changes() for a in attrs + ("musicien",)):
+            return set()
+        # ancien titulaire si le musicien a changé (par la FK ou par la relation)
+        ids.update(etat.attrs["musicien_id"].history.deleted or ())
+        ids.update(getattr(m, "id", None) for m in (etat.attrs["musicien"].history.deleted or ()))
+    return ids
+
+
+@event.listens_for(db.session, "after_flush")
+def _noter_comptes_touches(session, flush_context):
+    ids = set()
+    for obj in session.new:
+        if type(obj) in _ATTRS_SUIVIS:
+            ids |= _musicien_ids_touches(obj, modifie=False)
+        elif isinstance(obj, Musicien):
+            ids.add(obj.id)  # nouveau compte -> ligne à 0
+    for obj in session.deleted:
+        if type(obj) in _ATTRS_SUIVIS:
+            ids |= _musicien_ids_touches(obj, modifie=False)
+    for obj in session.dirty:
+        if type(obj) in _ATTRS_SUIVIS:
+            ids |= _musicien_ids_touches(obj, modifie=True)
+    if ids:
+        marquer_soldes_a_rafraichir(session, ids)
+
+
+@event.listens_for(db.session, "before_commit")
+def _rafraichir_avant_commit(session):
+    # before_commit passe AVANT le flush implicite du commit : on flushe d'abord,
+    # sinon les comptes marqués par ce dernier flush attendraient le commit suivant.
+    session.flush()
+    ids = session.info.pop(_CLE_SESSION, set())
+    if ids:
+        rafraichir_soldes(ids, session=session)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _oublier_apres_rollback(session):
+    session.info.pop(_CLE_SESSION, None)
+
+
+def rafraichir_soldes(musicien_ids, *, session=None, aujourd_hui: date | None = None) -> None:
+    """
+    Recalcule (agrégats SQL) les lignes du grand livre pour quelques comptes, sans commit.
+    Les lignes sont verrouillées (FOR UPDATE, ignoré par SQLite) pour que deux transactions
+    concurrentes sur le même compte ne s'écrasent pas.
+    """
+    session = session or db.session
+    ids = {mid for mid in musicien_ids if mid is not None}
+    if not ids:
+        return
+    aujourd_hui = aujourd_hui or _aujourd_hui()
+
+    # comptes supprimés entre-temps : rien à écrire
+    ids = {mid for (mid,) in session.query(Musicien.id).filter(Musicien.id.in_(ids))}
+    if not ids:
+        return
+
+    lignes = {
+        l.musicien_id: l
+        for l in session.query(SoldeCompte).filter(SoldeCompte.musicien_id.in_(ids)).with_for_update()
+    }
+    composantes = composantes_par_compte(aujourd_hui, musicien_ids=ids)
+    for mid in ids:
+        ligne = lignes.get(mid)
+        if ligne is None:
+            ligne = SoldeCompte(musicien_id=mid)
+            session.add(ligne)
+        c = composantes_de(composantes, mid)
+        for champ in CHAMPS_COMPOSANTES:
+            setattr(ligne, champ, c[champ])
+        ligne.date_arrete = aujourd_hui
+
+
+def reconstruire_grand_livre(aujourd_hui: date | None = None) -> int:
+    """Reconstruit TOUTE la table depuis l'historique (commande `rebuild`). Commit inclus."""
+    aujourd_hui = aujourd_hui or _aujourd_hui()
+    composantes = composantes_par_compte(aujourd_hui)
+
+    db.session.query(SoldeCompte).delete(synchronize_session=False)
+    ids = [mid for (mid,) in db.session.query(Musicien.id).all()]
+    for mid in ids:
+        c = composantes_de(composantes, mid)
+        db.session.add(SoldeCompte(musicien_id=mid, date_arrete=aujourd_hui,
+                                   **{champ: c[champ] for champ in CHAMPS_COMPOSANTES}))
+    db.session.info.pop(_CLE_SESSION, None)
+    db.session.commit()
+    return len(ids)
+
+
+def _decalages(aujourd_hui: date) -> dict:
+    """
+    { musicien_id: somme des opérations non prévisionnelles datées entre la date d'arrêté de sa
+    ligne (exclue) et aujourd'hui (incluse) } : montant passé de « à venir » à « passé » depuis
+    l'arrêté. Une requête, quel que soit le nombre de dates d'arrêté.
+    """
+    return {
+        mid: float(delta or 0.0)
+        for mid, delta in (
+            db.session.query(Operation.musicien_id, func.sum(_montant_signe()))
+            .join(SoldeCompte, SoldeCompte.musicien_id == Operation.musicien_id)
+            .filter(
+                SoldeCompte.date_arrete < aujourd_hui,
+                Operation.cloture_saison.is_(None),
+                Operation.date > SoldeCompte.date_arrete,
+                Operation.date <= aujourd_hui,
+                or_(Operation.previsionnel.is_(False), Operation.previsionnel.is_(None)),
+            )
+            .group_by(Operation.musicien_id)
+        )
+    }
+
+
+def avancer_grand_livre(aujourd_hui: date | None = None) -> int:
+    """
+    Enregistre le décalage « à venir → passé » des lignes arrêtées avant aujourd'hui
+    (commande `avancer`, ex: une fois par nuit). Commit inclus. Renvoie le nombre de lignes avancées.
+    L'UPDATE est conditionné sur la date d'arrêté lue : une ligne rafraîchie entre-temps par
+    une écriture n'est pas décalée deux fois.
+    """
+    aujourd_hui = aujourd_hui or _aujourd_hui()
+    arretes = dict(
+        db.session.query(SoldeCompte.musicien_id, SoldeCompte.date_arrete)
+        .filter(SoldeCompte.date_arrete < aujourd_hui)
+    )
+    deltas = _decalages(aujourd_hui)
+    for mid, d0 in arretes.items():
+        delta = deltas.get(mid, 0.0)
+        db.session.execute(
+            update(SoldeCompte)
+            .where(SoldeCompte.musicien_id == mid, SoldeCompte.date_arrete == d0)
+            .values(ops_passees=SoldeCompte.ops_passees + delta,
+                    ops_a_venir=SoldeCompte.ops_a_venir - delta,
+                    date_arrete=aujourd_hui)
+        )
+    db.session.commit()
+    return len(arretes)
+
+
+def lire_soldes(aujourd_hui: date | None = None) -> dict:
+    """
+    Lit le grand livre : { musicien_id: composantes } (même format que composantes_par_compte).
+    LECTURE SEULE (aucune écriture, aucun commit) ; trois requêtes dans le cas courant :
+      - comptes sans ligne (table pas encore construite) ou arrêtés dans le futur (horloge revenue
+        en arrière) : recalculés depuis l'historique ;
+      - lignes arrêtées avant aujourd'hui : décalage « à venir → passé » appliqué en mémoire.
+    """
+    aujourd_hui = aujourd_hui or _aujourd_hui()
+    ids = [mid for (mid,) in db.session.query(Musicien.id)]
+    lignes = {
+        r.musicien_id: {**{champ: float(getattr(r, champ) or 0.0) for champ in CHAMPS_COMPOSANTES},
+                        "date_arrete": r.date_arrete}
+        for r in db.session.query(SoldeCompte)
+    }
+
+    a_recalculer = [mid for mid in ids if mid not in lignes or lignes[mid]["date_arrete"] > aujourd_hui]
+    if a_recalculer:
+        recalcul = composantes_par_compte(aujourd_hui, musicien_ids=a_recalculer)
+        for mid in a_recalculer:
+            lignes[mid] = {**composantes_de(recalcul, mid), "date_arrete": aujourd_hui}
+
+    if any(l["date_arrete"] < aujourd_hui for l in lignes.values()):
+        for mid, delta in _decalages(aujourd_hui).items():
+            ligne = lignes.get(mid)
+            if ligne is not None and ligne["date_arrete"] < aujourd_hui:
+                ligne["ops_passees"] += delta
+                ligne["ops_a_venir"] -= delta
+
+    for l in lignes.values():
+        l.pop("date_arrete", None)
+    return lignes
+
+
+def verifier_grand_livre(aujourd_hui: date | None = None, tolerance: float = 0.005) -> list:
+    """
+    Compare le grand livre à un recalcul complet depuis l'historique.
+    Retourne la liste des écarts [(musicien_id, champ, grand_livre, recalcul), ...] (vide = OK).
+    """
+    aujourd_hui = aujourd_hui or _aujourd_hui()
+    lues = lire_soldes(aujourd_hui)
+    recalcul = composantes_par_compte(aujourd_hui)
+    ecarts = []
+    for mid in sorted(set(lues) | set(recalcul)):
+        a = composantes_de(lues, mid)
+        b = composantes_de(recalcul, mid)
+        for champ in CHAMPS_COMPOSANTES:
+            if abs(a[champ] - b[champ]) > tolerance:
+                ecarts.append((mid, champ, a[champ], b[champ]))
+    return ecarts
+
+
+# -------------------------------------------------------------------
+# Script autonome :  python soldes.py rebuild | avancer | verifier
+# -------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import sys
+    from App import app
+
+    commande = (sys.argv[1] if len(sys.argv) > 1 else "verifier").strip().lower()
+    with app.app_context():
+        if commande == "rebuild":
+            n = reconstruire_grand_livre()
+            print(f"✅ Grand livre reconstruit : {n} compte(s).")
+        elif commande == "avancer":
+            n = avancer_grand_livre()
+            print(f"✅ Grand livre arrêté à la date du jour : {n} ligne(s) avancée(s).")
+        elif commande == "verifier":
+            ecarts = verifier_grand_livre()
+            if not ecarts:
+                print("✅ Grand livre conforme au recalcul complet.")
+            else:
+                for mid, champ, lu, attendu in ecarts:
+                    print(f"❌ compte {mid} · {champ} : grand livre={lu:.2f} / recalcul={attendu:.2f}")
+                sys.exit(1)
+        else:
+            print("Usage : python soldes.py rebuild | avancer | verifier")
+            sys.exit(2)
@@ -0,0 +1,121 @@
+// static/js/archives_operations.js
+// Archives d'une saison chargées à la demande : la page ne contient que les bandeaux de mois,
+// chaque bloc est lu en JSON (/api/archives_operations/<saison>/<AAAA-MM>, paginé par clé)
+// quand il approche de l'écran ; "Afficher la suite du mois" lit la page suivante.
+
+/* ----------------- Rendu d'une ligne (partagé avec recherche_operations.js) ----------------- */
+function echapperHtml(s){
+  return (s ?? '').toString()
+    .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+}
+
+/* Colonnes : Date | Qui | Type | Motif | Précision | Montant | Concert | Actions */
+function ligneOperationArchive(op){
+  const signe = (op.type || '').toLowerCase() === 'credit' ? '+' : '-';
+  const prev = op.previsionnel ? ' <em class="prev-tag">(prévisionnel)</em>' : '';
+  const classes = [
+    (op.motif || '').toLowerCase() === 'commission lionel' ? 'operation-auto' : '',
+    op.previsionnel ? 'is-previsionnel' : '',
+  ].join(' ').trim();
+  const actions = op.modifiable
+    ? `<a href="/modifier_operation/${op.id}" class="icon-button orange" title="Modifier"><i class="fas fa-pen"></i></a>
+       <button type="button" class="delete-operation-button" data-id="${op.id}" title="Supprimer cette opération">🗑</button>`
+    : '<span title="Opération automatique non modifiable">🔒</span>';
+  return `
+    <tr class="${classes}">
+      <td>${echapperHtml(op.date_affichee)}${prev}</td>
+      <td>${echapperHtml(op.qui)}</td>
+      <td>${echapperHtml(op.type)}</td>
+      <td>${echapperHtml(op.motif)}</td>
+      <td>${echapperHtml(op.precision)}</td>
+      <td style="text-align:right;">${signe}
+        <span class="${op.previsionnel ? 'muted-italic' : ''}">${echapperHtml(op.montant_affiche)}</span>
+      </td>
+      <td>${op.concert ? echapperHtml(op.concert) : '—'}</td>
+      <td style="text-align:center;">${actions}</td>
+    </tr>`;
+}
+
+/* ----------------- Blocs mensuels ----------------- */
+const etatsMois = {};  // { 'AAAA-MM': { suivant, enCours, termine } }
+
+async function chargerBlocMois(section){
+  const cle = section.dataset.monthKey;
+  const saison = document.querySelector('[data-saison]')?.dataset.saison;
+  const etat = etatsMois[cle] || (etatsMois[cle] = { suivant: null, enCours: false, termine: false });
+  if(etat.enCours || etat.termine || !saison) return;
+  etat.enCours = true;
+
+  const tbody = section.querySelector('tbody');
+  const bouton = section.querySelector('.btn-suite-mois');
+  const params = new URLSearchParams();
+  if(etat.suivant) params.set('apres', etat.suivant);
+
+  try {
+    const resp = await fetch(`/api/archives_operations/${encodeURIComponent(saison)}/${cle}?${params.toString()}`,
+                             { headers: { 'Accept': 'application/json' } });
+    const data = await resp.json().catch(() => ({}));
+    if(!resp.ok || !data.success) throw new Error(data.message || 'Chargement impossible.');
+
+    tbody.querySelectorAll('tr.ligne-chargement').forEach(tr => tr.remove());
+    tbody.insertAdjacentHTML('beforeend', data.operations.map(ligneOperationArchive).join(''));
+    etat.suivant = data.suivant;
+    etat.termine = !data.suivant;
+    if(bouton) bouton.style.display = data.suivant ? '' : 'none';
+  } catch(e){
+    const ligne = tbody.querySelector('tr.ligne-chargement td');
+    if(ligne) ligne.textContent = `⚠️ ${e.message}`;
+    else alert(e.message);
+  } finally {
+    etat.enCours = false;
+  }
+}
+
+/* ----------------- Suppression (lignes créées dynamiquement) ----------------- */
+function supprimerOperationArchive(event){
+  const bouton = event.target.closest('.delete-operation-button');
+  if(!bouton) return;
+  event.preventDefault();
+  if(!confirm('Es-tu sûr de vouloir supprimer cette opération ?')) return;
+  fetch('/operations/supprimer', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ id: bouton.dataset.id })
+  })
+  .then(r => r.json())
+  .then(data => {
+    if(data.success) location.reload();
+    else alert('Erreur lors de la suppression de l\'opération');
+  })
+  .catch(() => alert('Erreur réseau, l\'opération n\'a pas pu être supprimée'));
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  const sections = document.querySelectorAll('section.bloc-mois');
+
+  sections.forEach(section => {
+    const bouton = section.querySelector('.btn-suite-mois');
+    if(bouton) bouton.addEventListener('click', () => chargerBlocMois(section));
+  });
+
+  if('IntersectionObserver' in window){
+    const observateur = new IntersectionObserver((entrees) => {
+      entrees.forEach(entree => {
+        if(entree.isIntersecting){
+          observateur.unobserve(entree.target);
+          chargerBlocMois(entree.target);
+        }
+      });
+    }, { rootMargin: '400px 0px' });
+    sections.forEach(section => observateur.observe(section));
+  } else {
+    sections.forEach(section => chargerBlocMois(section));
+  }
+
+  const conteneur = document.querySelector('.archives-ops');
+  if(conteneur) conteneur.addEventListener('click', supprimerOperationArchive);
+});
+
+window.ligneOperationArchive = ligneOperationArchive;
+window.chargerBlocMois = chargerBlocMois;
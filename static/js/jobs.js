@@ -0,0 +1,39 @@
+/* ===============================
+   Suivi des tâches de fond (jobs.py)
+   =============================== */
+(function () {
+  // Interroge /jobs/<id> jusqu'à la fin du job ; onProgress(job) à chaque étape.
+  // Résout avec le statut final (succes = true/false).
+  function suivreJob(statutUrl, onProgress, intervalle = 700) {
+    return new Promise((resolve, reject) => {
+      function tick() {
+        fetch(statutUrl, { headers: { "Accept": "application/json" } })
+          .then(r => r.json())
+          .then(job => {
+            if (!job.success) { reject(new Error(job.message || "Job introuvable")); return; }
+            if (onProgress) onProgress(job);
+            if (job.termine) { resolve(job); return; }
+            setTimeout(tick, intervalle);
+          })
+          .catch(reject);
+      }
+      tick();
+    });
+  }
+
+  // Lance un job (réponse 202 {job_id, statut_url, resultat_url}) puis attend son résultat JSON.
+  function attendreResultatJob(lancement, onProgress) {
+    return lancement
+      .then(r => r.json())
+      .then(data => {
+        if (!data.success) throw new Error(data.message || "Lancement impossible");
+        return suivreJob(data.statut_url, onProgress).then(job => {
+          if (!job.succes) throw new Error(job.message || "La tâche a échoué");
+          return fetch(data.resultat_url).then(r => r.json());
+        });
+      });
+  }
+
+  window.suivreJob = suivreJob;
+  window.attendreResultatJob = attendreResultatJob;
+})();
@@ -578,14 +578,12 @@ function initScanPaye() {
         const formData = new FormData();
         formData.append("file", file);
 
-        fetch("/upload_pdf", {
+        attendreResultatJob(fetch("/upload_pdf", {
             method: "POST",
             body: formData
-        })
-        .then(res => res.text())
-        .then(text => {
+        }))
+        .then(data => {
             try {
-                const data = JSON.parse(text);
                 if (data.success) {
                     document.querySelector("#montant").value = data.montant || '';
                     document.querySelector("#brut").value = data.brut || '';
@@ -611,12 +609,12 @@ function initScanPaye() {
                     alert(data.message || "PDF non reconnu ou format incorrect.");
                 }
             } catch (e) {
-                alert("Réponse serveur invalide : " + text);
-                console.error("Erreur JSON parse:", e);
+                alert("Réponse serveur invalide : " + JSON.stringify(data));
+                console.error("Erreur de lecture du résultat:", e);
             }
         })
         .catch(err => {
-            alert("Erreur lors de l’envoi du fichier.");
+            alert("Erreur lors de l’analyse du fichier : " + err.message);
             console.error(err);
         });
     }
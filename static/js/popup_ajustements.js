@@ -11,6 +11,68 @@
       .replace(",", ".");     // virgule -> point
   }
 
+  // Aperçu en direct : /api/concerts/<id>/simulate ne touche pas la base.
+  // Seule la dernière réponse compte (les saisies rapides annulent la précédente).
+  let simulationEnCours = null;
+  let minuterieSimulation = null;
+
+  function collecterOverrides(){
+    const overrides = {};
+    qsa("#ajustements-list input").forEach(inp=>{
+      const raw = normalizeNumberInput(inp.value);
+      overrides[inp.dataset.participationId] = raw === "" ? null : raw;
+    });
+    return overrides;
+  }
+
+  function afficherSimulation(res){
+    const msg = qs("#ajust-simulation");
+    qsa("#ajustements-list .row").forEach(row=>{
+      const note = qs(".note", row);
+      const cle = row.dataset.asso7 === "1" ? null : row.dataset.musicienId;
+      const montant = res ? (cle === null ? res.asso7 : res.parts[cle]) : undefined;
+      note.textContent = (montant === undefined)
+        ? ` (actuel: ${note.dataset.actuel} €)`
+        : ` (actuel: ${note.dataset.actuel} € → ${Number(montant).toFixed(2)} €)`;
+    });
+    if (msg) msg.textContent = "";
+  }
+
+  function simuler(concertId){
+    if (simulationEnCours) simulationEnCours.abort();
+    simulationEnCours = new AbortController();
+    const msg = qs("#ajust-simulation");
+
+    fetch(`/api/concerts/${concertId}/simulate`, {
+      method:"POST",
+      headers:{ "Content-Type":"application/json" },
+      body: JSON.stringify({ overrides: collecterOverrides() }),
+      signal: simulationEnCours.signal
+    })
+    .then(async r=>{
+      let payload=null;
+      try { payload = await r.json(); } catch(e){ /* pas du JSON */ }
+      if (!payload) throw new Error("Réponse invalide du serveur");
+      return payload;
+    })
+    .then(res=>{
+      if (res.success) { afficherSimulation(res); }
+      else {
+        afficherSimulation(null);
+        if (msg) msg.textContent = res.message || "Simulation impossible";
+      }
+    })
+    .catch(err=>{
+      if (err.name === "AbortError") return;
+      if (msg) msg.textContent = err.message || "Erreur réseau / serveur";
+    });
+  }
+
+  function simulerPlusTard(concertId){
+    clearTimeout(minuterieSimulation);
+    minuterieSimulation = setTimeout(()=>simuler(concertId), 150);
+  }
+
   function showPopupAjust(concertId){
     // Garde-fou : le partial doit être présent dans la page
     if (!qs("#popup-ajustements")) {
@@ -34,6 +96,8 @@
         data.items.forEach(it=>{
           const row = document.createElement("div");
           row.className = "row";
+          row.dataset.musicienId = it.musicien_id;
+          row.dataset.asso7 = it.asso7 ? "1" : "0";
 
           const label = document.createElement("label");
           label.textContent = `${it.nom}`;
@@ -45,10 +109,12 @@
           input.placeholder = "laisser vide = non fixé";
           input.value = (it.fixe !== null && it.fixe !== undefined) ? it.fixe : "";
           input.dataset.participationId = it.participation_id;
+          input.addEventListener("input", ()=>simulerPlusTard(concertId));
 
           const span = document.createElement("span");
           span.className = "note";
           const actuel = (data.paye ? Number(it.reel || 0) : Number(it.potentiel || 0)).toFixed(2);
+          span.dataset.actuel = actuel;
           span.textContent = ` (actuel: ${actuel} €)`;
 
           row.appendChild(label);
@@ -57,17 +123,15 @@
           wrap.appendChild(row);
         });
 
+        const msg = qs("#ajust-simulation");
+        if (msg) msg.textContent = "";
         qs("#popup-ajustements").style.display = "flex";
 
         const btnSave = qs("#ajust-save");
         const btnCancel = qs("#ajust-cancel");
 
         btnSave.onclick = function(){
-          const overrides = {};
-          qsa("#ajustements-list input").forEach(inp=>{
-            const raw = normalizeNumberInput(inp.value);
-            overrides[inp.dataset.participationId] = raw === "" ? null : raw;
-          });
+          const overrides = collecterOverrides();
 
           btnSave.disabled = true;
 
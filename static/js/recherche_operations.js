@@ -1,120 +1,127 @@
-// static/js/recherche_operations.js (NOUVEAU CONTENU)
+// static/js/recherche_operations.js
+// Recherche CÔTÉ SERVEUR (/api/operations/search) : la page n'a plus besoin d'avoir
+// tout rendu en HTML, et la recherche peut porter sur toutes les saisons.
+// Les lignes sont rendues par ligneOperationArchive() (archives_operations.js, chargé avant).
 
-/* ----------------- Helpers ----------------- */
-function normText(s){
-  return (s||"")
-    .toString()
-    .normalize('NFD').replace(/\p{Diacritic}/gu,'')
-    .toLowerCase()
-    .trim();
-}
-
-function parseAmountCell(td){
-  // Exemple cellule: "+ 50,00 €" ou "− 50,00 €"
-  const raw = (td.innerText||"").replace(/\s/g,'').replace('€','').replace(',', '.');
-  // garde le signe si présent, sinon parseFloat
-  const num = parseFloat(raw.replace(/[^\d.\-+]/g,''));
-  return isNaN(num) ? null : num;
-}
+const URL_RECHERCHE = '/api/operations/search';
+const TAILLE_PAGE = 50;
 
-function parseAmountQuery(q){
-  if(!q) return null;
-  const raw = q.replace(/\s/g,'').replace(',', '.');
-  const num = parseFloat(raw.replace(/[^\d.\-+]/g,''));
-  return isNaN(num) ? null : Math.abs(num);
-}
+let rechercheCourante = null;  // { params: URLSearchParams, suivant: curseur|null }
 
-function anyWordMatches(needle, hay){
-  // needle: "rennes odradek" -> match si "rennes" OU "odradek" est présent
-  const words = normText(needle).split(/\s+/).filter(Boolean);
-  const h = normText(hay);
-  return words.length === 0 ? false : words.some(w => h.includes(w));
+/* ----------------- Helpers ----------------- */
+// "50" → {q:"50"} ; "50 ± 5" / "50+-5" → {q:"50", tolerance:"5"}
+function lireSaisieMontant(q){
+  const m = (q || '').split(/±|\+\/?-/);
+  return m.length > 1 ? { q: m[0].trim(), tolerance: m[1].trim() } : { q: (q || '').trim() };
 }
 
-/* Position des colonnes dans les tableaux d’archives (fixes dans le template) :
-   0: Date | 1: Qui | 2: Type | 3: Motif | 4: Précision | 5: Montant | 6: Concert | 7: Actions
-   cf. archives_operations_saison.html :contentReference[oaicite:2]{index=2}
-*/
-
-function filtrerLignes(critere, valeur){
-  const tables = document.querySelectorAll("table.archived-table");
-  const retourBtn = document.getElementById('btn-retour-liste'); // déjà dans le template :contentReference[oaicite:3]{index=3}
-  let totalMatch = 0;
-
-  const crit = (critere||'montant').toLowerCase();
-  const q = (valeur||'').trim();
-
-  // Hints dynamiques dans la popup
+function afficherHints(crit){
   const hintMontant = document.getElementById('hint-montant');
   const hintConcert = document.getElementById('hint-concert');
   if(hintMontant && hintConcert){
     hintMontant.style.display = (crit === 'montant') ? '' : 'none';
     hintConcert.style.display = (crit === 'concert') ? '' : 'none';
   }
+}
 
-  // Préparation selon critère
-  let targetAbs = null;
-  if(crit === 'montant'){
-    targetAbs = parseAmountQuery(q);
-    if(targetAbs === null){
-      // Rien de chiffré : on n’affiche rien plutôt que tout
-      tables.forEach(tbl => tbl.querySelectorAll('tbody tr').forEach(tr => tr.style.display='none'));
-      if(retourBtn) retourBtn.style.display = '';
-      return 0;
-    }
+function blocsMois(){
+  return document.querySelectorAll('section.bloc-mois');
+}
+
+/* ----------------- Rendu des résultats (lignes : ligneOperationArchive, archives_operations.js) ----------------- */
+function conteneurResultats(){
+  const zone = document.getElementById('resultats-recherche');
+  if(!zone.querySelector('table')){
+    zone.innerHTML = `
+      <h2 class="mois-bandeau">Résultats de la recherche</h2>
+      <p id="resume-recherche" class="muted-italic"></p>
+      <table class="archived-table resultats">
+        <thead>
+          <tr>
+            <th>Date</th><th>Qui</th><th>Type</th><th>Motif</th><th>Précision</th>
+            <th style="text-align:right;">Montant</th><th>Concert</th><th style="text-align:center;">Actions</th>
+          </tr>
+        </thead>
+        <tbody></tbody>
+      </table>
+      <button type="button" id="btn-plus-resultats" style="display:none; margin-top:10px;">Afficher plus de résultats</button>`;
+    zone.querySelector('#btn-plus-resultats').addEventListener('click', pageSuivante);
   }
+  return zone;
+}
 
-  tables.forEach(tbl => {
-    const rows = tbl.querySelectorAll('tbody tr');
-    rows.forEach(tr => {
-      const tds = tr.children;
-      let keep = false;
-
-      if(crit === 'montant'){
-        const cellVal = parseAmountCell(tds[5]);
-        keep = (cellVal !== null) && (Math.abs(cellVal) === targetAbs);
-      }
-      else if(crit === 'date'){
-        // On matche en substring sur la chaine JJ/MM/AAAA déjà affichée
-        keep = normText(tds[0].innerText).includes(normText(q));
-      }
-      else if(crit === 'qui'){
-        keep = normText(tds[1].innerText).includes(normText(q));
-      }
-      else if(crit === 'motif'){
-        // Motif seul (col. 3). Si tu veux inclure aussi "Précision", remplace tds[3] par (tds[3].innerText + " " + tds[4].innerText)
-        keep = normText(tds[3].innerText).includes(normText(q));
-      }
-      else if(crit === 'concert'){
-        // Libellé “JJ/MM/AAAA — Lieu ...” : on considère match si au moins UN mot saisi est présent
-        keep = anyWordMatches(q, tds[6].innerText);
-      }
-
-      tr.style.display = keep ? '' : 'none';
-      if(keep) totalMatch++;
-    });
-  });
+async function chargerPage(){
+  const zone = conteneurResultats();
+  const params = new URLSearchParams(rechercheCourante.params);
+  if(rechercheCourante.suivant) params.set('apres', rechercheCourante.suivant);
 
-  if(retourBtn) retourBtn.style.display = '';
-  return totalMatch;
+  const resp = await fetch(`${URL_RECHERCHE}?${params.toString()}`, { headers: { 'Accept': 'application/json' } });
+  const data = await resp.json().catch(() => ({}));
+  if(!resp.ok || !data.success){
+    throw new Error(data.message || 'Recherche impossible.');
+  }
+
+  const tbody = zone.querySelector('tbody');
+  tbody.insertAdjacentHTML('beforeend', data.operations.map(ligneOperationArchive).join(''));
+  rechercheCourante.suivant = data.suivant;
+
+  const nb = tbody.children.length;
+  zone.querySelector('#resume-recherche').textContent =
+    nb === 0 ? 'Aucune opération trouvée.' : `${nb} opération(s)${data.suivant ? ' (d’autres résultats disponibles)' : ''}.`;
+  zone.querySelector('#btn-plus-resultats').style.display = data.suivant ? '' : 'none';
 }
 
-/* API publique appelée par la popup */
-function lancerRecherche(){
-  const crit = document.getElementById('critere-recherche').value;
+async function pageSuivante(){
+  if(!rechercheCourante || !rechercheCourante.suivant) return;
+  try { await chargerPage(); }
+  catch(e){ alert(e.message); }
+}
+
+/* ----------------- API publique appelée par la popup ----------------- */
+async function lancerRecherche(){
+  const crit = (document.getElementById('critere-recherche').value || 'montant').toLowerCase();
   const val  = document.getElementById('valeur-recherche').value;
-  filtrerLignes(crit, val);
+  const portee = document.getElementById('portee-recherche')?.value || 'saison';
+  const saison = document.querySelector('[data-saison]')?.dataset.saison;
+
+  const params = new URLSearchParams({ critere: crit, passees: '1', limite: String(TAILLE_PAGE) });
+  if(crit === 'montant'){
+    const { q, tolerance } = lireSaisieMontant(val);
+    params.set('q', q);
+    if(tolerance) params.set('tolerance', tolerance);
+  } else {
+    params.set('q', val.trim());
+  }
+  params.set('saison', (portee === 'saison' && saison) ? saison : 'toutes');
+
+  rechercheCourante = { params, suivant: null };
+  const zone = document.getElementById('resultats-recherche');
+  zone.innerHTML = '';
+  try {
+    await chargerPage();
+  } catch(e){
+    alert(e.message);
+    return;
+  }
+
+  blocsMois().forEach(el => el.style.display = 'none');
+  zone.style.display = '';
+  const retourBtn = document.getElementById('btn-retour-liste');
+  if(retourBtn) retourBtn.style.display = '';
   fermerPopupRecherche();
 }
 
-/* Bouton “🔁 Retour à la liste complète” déjà présent dans le template (id=btn-retour-liste) */
+/* Bouton “🔁 Retour à la liste complète” (id=btn-retour-liste) */
 window.retourListe = function(){
-  document.querySelectorAll("table.archived-table tbody tr").forEach(tr => tr.style.display='');
+  rechercheCourante = null;
+  const zone = document.getElementById('resultats-recherche');
+  if(zone){ zone.innerHTML = ''; zone.style.display = 'none'; }
+  blocsMois().forEach(el => el.style.display = '');
   const retourBtn = document.getElementById('btn-retour-liste');
   if(retourBtn) retourBtn.style.display = 'none';
 };
 
-/* Optionnel: Modifier le libellé du bouton d’ouverture quand on change de critère */
+/* Libellé du bouton d’ouverture + hints selon le critère ; Entrée lance la recherche */
 document.addEventListener('DOMContentLoaded', () => {
   const critSel = document.getElementById('critere-recherche');
   const openButtons = document.querySelectorAll('button[onclick="ouvrirPopupRecherche()"]');
@@ -122,16 +129,15 @@ document.addEventListener('DOMContentLoaded', () => {
     critSel.addEventListener('change', () => {
       const crit = critSel.value;
       openButtons.forEach(btn => {
-        if(crit === 'montant') btn.textContent = '🔍 Recherche par montant';
-        else btn.textContent = '🔍 Recherche';
+        btn.textContent = (crit === 'montant') ? '🔍 Recherche par montant' : '🔍 Recherche';
       });
-      // Hints dynamiques si la popup est ouverte
-      const hintMontant = document.getElementById('hint-montant');
-      const hintConcert = document.getElementById('hint-concert');
-      if(hintMontant && hintConcert){
-        hintMontant.style.display = (crit === 'montant') ? '' : 'none';
-        hintConcert.style.display = (crit === 'concert') ? '' : 'none';
-      }
+      afficherHints(crit);
+    });
+  }
+  const input = document.getElementById('valeur-recherche');
+  if(input){
+    input.addEventListener('keydown', (e) => {
+      if(e.key === 'Enter'){ e.preventDefault(); lancerRecherche(); }
     });
   }
 });
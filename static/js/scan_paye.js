@@ -35,18 +35,13 @@ function uploadPDF(file) {
     const formData = new FormData();
     formData.append("file", file);
 
-    fetch("/upload_pdf", {
+    attendreResultatJob(fetch("/upload_pdf", {
         method: "POST",
         body: formData
-    })
-    .then(res => {
-        console.log("Réponse serveur:", res);
-        return res.text();
-    })
-    .then(text => {
-        console.log("Texte brut reçu:", text);
+    }))
+    .then(data => {
+        console.log("Résultat reçu:", data);
         try {
-            const data = JSON.parse(text);
             if (data.success) {
                 document.querySelector("#montant").value = data.montant || '';
                 document.querySelector("#brut").value = data.brut || '';
@@ -67,12 +62,12 @@ function uploadPDF(file) {
                 alert(data.message || "PDF non reconnu ou format incorrect.");
             }
         } catch (e) {
-            alert("Réponse serveur invalide : " + text);
-            console.error("Erreur JSON parse:", e);
+            alert("Réponse serveur invalide : " + JSON.stringify(data));
+            console.error("Erreur de lecture du résultat:", e);
         }
     })
     .catch(err => {
-        alert("Erreur lors de l’envoi du fichier.");
+        alert("Erreur lors de l’analyse du fichier : " + err.message);
         console.error(err);
     });
 }
@@ -0,0 +1,82 @@
+# test_annuaire.py
+"""
+Annuaire des musiciens (annuaire.py) : l'annuaire partagé par les threads ne reflète que des données
+validées. Une transaction qui écrit des musiciens voit ses propres écritures (annuaire de la session),
+les autres threads non, jusqu'au commit ; un rollback n'a aucun effet sur l'annuaire partagé.
+
+    python -m pytest -q test_annuaire.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_annuaire.py
+"""
+
+import threading
+
+import annuaire
+from annuaire import ROLE_ASSO7, ROLE_CB, id_par_nom, id_role
+from App import app
+from models import db, Musicien
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    db.session.add_all([
+        Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7),
+        Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB),
+        Musicien(nom="Nom0", prenom="Prénom0"),
+    ])
+    db.session.commit()
+
+
+def _vu_par_un_autre_thread(recherche):
+    """Résultat de recherche() dans un autre thread (sa propre session, cf. serveur gthread)."""
+    resultat = []
+
+    def _lire():
+        with app.app_context():
+            resultat.append(recherche())
+
+    fil = threading.Thread(target=_lire)
+    fil.start()
+    fil.join()
+    return resultat[0]
+
+
+def _recherches():
+    return id_par_nom("Prénom9 Nom9"), id_role(ROLE_CB)
+
+
+# --------------------------- Tests ---------------------------
+
+def test_ecritures_non_validees_invisibles_des_autres_threads(client):
+    with app.app_context():
+        cb_id = id_role(ROLE_CB)
+        nouveau = Musicien(nom="Nom9", prenom="Prénom9")
+        db.session.add(nouveau)
+        db.session.get(Musicien, cb_id).role = None
+        nom0 = Musicien.query.filter_by(nom="Nom0").one()
+        nom0.role = ROLE_CB
+        db.session.flush()
+
+        # la transaction voit ses écritures…
+        assert _recherches() == (nouveau.id, nom0.id)
+        # …les autres threads, et l'annuaire partagé (relu ici par l'autre thread), non
+        annuaire.invalider()
+        assert _vu_par_un_autre_thread(_recherches) == (None, cb_id)
+        assert annuaire._annuaire is not None and annuaire._annuaire.ids_par_role[ROLE_CB] == cb_id
+
+        db.session.rollback()
+        assert annuaire._CLE_LOCAL not in db.session.info
+        assert _recherches() == (None, cb_id)
+
+
+def test_commit_publie_l_annuaire(client):
+    with app.app_context():
+        nouveau = Musicien(nom="Nom9", prenom="Prénom9")
+        db.session.add(nouveau)
+        assert id_par_nom("Prénom9 Nom9") == nouveau.id  # écriture en attente : lue par autoflush
+        assert _vu_par_un_autre_thread(lambda: id_par_nom("Prénom9 Nom9")) is None
+
+        db.session.commit()
+        assert annuaire._annuaire is None and annuaire._CLE_LOCAL not in db.session.info
+        assert _vu_par_un_autre_thread(lambda: id_par_nom("Prénom9 Nom9")) == nouveau.id
+        assert id_par_nom("Prénom9 Nom9") == nouveau.id
@@ -0,0 +1,195 @@
+# test_clotures.py
+"""
+Clôture de saison (clotures.py) : soldes inchangés, aperçu sans écriture, réouverture à l'identique,
+lignes clôturées en lecture seule, saisons non clôturables refusées.
+
+    python -m pytest -q test_clotures.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_clotures.py
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from annuaire import ROLE_ASSO7, ROLE_CAISSE, ROLE_CB
+from App import app
+from clotures import SaisonCloturee, _soldes, cloturer_saison, derniere_saison_cloturee, rouvrir_saison
+from models import db, Concert, Musicien, Operation, Participation, Report, saison_de
+
+SAISON = "2023/2024"
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    caisse = Musicien(nom="CAISSE ASSO7", prenom="", type="structure", role=ROLE_CAISSE)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, caisse, *musiciens])
+    db.session.flush()
+
+    aujourd_hui = date.today()
+    concerts = [
+        Concert(date=date(2023, 10, 7), lieu="Payé clos", paye=True, recette=900),
+        Concert(date=date(2024, 5, 18), lieu="Non payé clos", paye=False, recette_attendue=500),
+        Concert(date=aujourd_hui - timedelta(days=3), lieu="Payé ouvert", paye=True, recette=300),
+    ]
+    db.session.add_all(concerts)
+    db.session.flush()
+    for c in concerts:
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+
+    db.session.add_all([
+        Operation(musicien_id=cb.id, type="credit", motif="Recette concert", montant=900,
+                  date=concerts[0].date, concert_id=concerts[0].id),
+        Operation(musicien_id=musiciens[0].id, type="debit", motif="Frais", montant=45, date=date(2024, 2, 3)),
+        Operation(musicien_id=musiciens[1].id, type="debit", motif="Salaire", montant=120,
+                  date=date(2024, 6, 30)),
+        Operation(musicien_id=musiciens[2].id, type="credit", motif="Remboursement", montant=60,
+                  date=date(2024, 7, 1), previsionnel=True),
+        Operation(musicien_id=musiciens[0].id, type="debit", motif="Frais", montant=20,
+                  date=aujourd_hui - timedelta(days=1)),
+        Report(musicien_id=musiciens[2].id, montant=35),
+    ])
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+@contextmanager
+def _ecritures_capturees():
+    """Liste des INSERT / UPDATE / DELETE / COMMIT émis dans le bloc."""
+    ecritures = []
+
+    def _capter(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(INSERT|UPDATE|DELETE)\b", statement, re.I):
+            ecritures.append(statement)
+
+    def _commit(conn):
+        ecritures.append("COMMIT")
+
+    with app.app_context():
+        moteur = db.engine
+    event.listen(moteur, "before_cursor_execute", _capter)
+    event.listen(moteur, "commit", _commit)
+    try:
+        yield ecritures
+    finally:
+        event.remove(moteur, "before_cursor_execute", _capter)
+        event.remove(moteur, "commit", _commit)
+
+
+def _marques() -> dict:
+    """{(table, id): cloture_saison} des lignes que la clôture peut reprendre."""
+    return {(modele.__tablename__, ligne.id): ligne.cloture_saison
+            for modele in (Operation, Participation, Report) for ligne in modele.query.all()}
+
+
+def _egaux(avant: dict, apres: dict) -> bool:
+    return set(avant) == set(apres) and all(
+        abs(avant[mid][0] - apres[mid][0]) < 0.005 and abs(avant[mid][1] - apres[mid][1]) < 0.005
+        for mid in avant
+    )
+
+
+# --------------------------- Tests ---------------------------
+
+def test_simulation_sans_ecriture(client):
+    with app.app_context():
+        marques = _marques()
+
+    with _ecritures_capturees() as ecritures, app.app_context():
+        apercu = cloturer_saison(SAISON, simulation=True)
+    assert ecritures == []
+
+    assert apercu and all(l["nb_operations"] + l["nb_participations"] + l["nb_reports"] for l in apercu)
+    with app.app_context():
+        assert _marques() == marques
+        assert derniere_saison_cloturee() is None
+
+
+def test_cloture_puis_reouverture(client):
+    import soldes
+
+    with app.app_context():
+        avant, marques = _soldes(), _marques()
+        apercu = {l["musicien_id"]: l["report"] for l in cloturer_saison(SAISON, simulation=True)}
+
+        cloturer_saison(SAISON)
+        try:
+            assert _egaux(avant, _soldes())
+            assert soldes.verifier_grand_livre() == []
+            assert {r.musicien_id: r.montant for r in Report.query.filter_by(saison=SAISON)} == apercu
+
+            fermees = {cle for cle, saison in _marques().items() if saison == SAISON}
+            assert fermees and fermees <= set(marques)
+            # non reprises : concert non payé, opération prévisionnelle, lignes de la saison en cours
+            for p in Participation.query.filter(Participation.cloture_saison.isnot(None)):
+                assert p.concert.paye and saison_de(p.concert.date) == SAISON
+            for op in Operation.query.filter(Operation.cloture_saison.isnot(None)):
+                assert not op.previsionnel and saison_de(op.date) == SAISON
+        finally:
+            assert rouvrir_saison(SAISON) == len(apercu)
+
+        assert _marques() == marques
+        assert Report.query.filter_by(saison=SAISON).count() == 0
+        assert _egaux(avant, _soldes())
+        assert soldes.verifier_grand_livre() == []
+
+
+def test_ligne_cloturee_en_lecture_seule(client):
+    with app.app_context():
+        cloturer_saison(SAISON)
+        try:
+            frais = Operation.query.filter_by(motif="Frais", cloture_saison=SAISON).one()
+            frais.montant = 50
+            with pytest.raises(SaisonCloturee):
+                db.session.flush()
+            db.session.rollback()
+
+            part = Participation.query.filter_by(cloture_saison=SAISON).first()
+            db.session.delete(part)
+            with pytest.raises(SaisonCloturee):
+                db.session.flush()
+            db.session.rollback()
+
+            report = Report.query.filter_by(saison=SAISON).first()
+            report.montant = 0
+            with pytest.raises(SaisonCloturee):
+                db.session.commit()
+            db.session.rollback()
+
+            # une ligne ouverte reste modifiable
+            ouverte = Operation.query.filter_by(motif="Frais", cloture_saison=None).one()
+            ouverte.precision = "modifiable"
+            db.session.commit()
+        finally:
+            rouvrir_saison(SAISON)
+
+
+def test_saisons_non_cloturables(client):
+    with app.app_context():
+        with pytest.raises(ValueError, match="pas terminée"):
+            cloturer_saison(saison_de(date.today()))
+        with pytest.raises(ValueError):
+            cloturer_saison("2023/2025")
+
+        cloturer_saison(SAISON)
+        try:
+            with pytest.raises(ValueError, match="déjà couverte"):
+                cloturer_saison(SAISON)
+            with pytest.raises(ValueError, match="déjà couverte"):
+                cloturer_saison("2022/2023")
+            with pytest.raises(ValueError):
+                rouvrir_saison("2022/2023")  # seule la plus récente se rouvre
+        finally:
+            rouvrir_saison(SAISON)
+        assert derniere_saison_cloturee() is None
@@ -0,0 +1,127 @@
+# test_concerts_marques.py
+"""
+Concerts « à recalculer » (calcul_participations.py) : une écriture validée qui change le partage
+d'un concert (opération de frais, participation) marque CE concert, un rollback oublie la marque,
+et le recalcul de fin de requête (App.py, after_request) recalcule exactement les concerts marqués.
+
+    python -m pytest -q test_concerts_marques.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_concerts_marques.py
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import calcul_participations
+from annuaire import ROLE_ASSO7, ROLE_CB
+from App import app
+from calcul_participations import concerts_a_recalculer, recalculer_concerts_marques
+from models import db, Concert, Musicien, Operation, Participation
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, *musiciens])
+    db.session.flush()
+
+    for i in range(3):
+        c = Concert(date=date.today() - timedelta(days=10 + i), lieu=f"Lieu {i}", paye=False,
+                    recette_attendue=600 + 100 * i, mode_paiement_prevu="CB ASSO7")
+        db.session.add(c)
+        db.session.flush()
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+@pytest.fixture
+def recalculs(monkeypatch):
+    """Liste des ensembles de concerts passés au recalcul par lots."""
+    appels = []
+    recalculer = calcul_participations.recalculer_credits_par_lots
+
+    def _espion(*args, concert_ids=None, **kwargs):
+        appels.append(set(concert_ids or ()))
+        return recalculer(*args, concert_ids=concert_ids, **kwargs)
+
+    monkeypatch.setattr(calcul_participations, "recalculer_credits_par_lots", _espion)
+    return appels
+
+
+def _concert(lieu: str) -> Concert:
+    return Concert.query.filter_by(lieu=lieu).one()
+
+
+# --------------------------- Tests ---------------------------
+
+def test_ecriture_validee_marque_son_concert(client, recalculs):
+    with app.app_context():
+        c0, c1, c2 = _concert("Lieu 0"), _concert("Lieu 1"), _concert("Lieu 2")
+        musicien = Musicien.query.filter_by(nom="Nom0").one()
+
+        frais = Operation(musicien_id=musicien.id, type="debit", motif="Frais", montant=30,
+                          date=c0.date, concert_id=c0.id)
+        db.session.add(frais)
+        db.session.add(Operation(musicien_id=musicien.id, type="debit", motif="Salaire", montant=80,
+                                 date=c2.date, concert_id=c2.id))  # pas une opération de frais
+        db.session.flush()
+        assert concerts_a_recalculer() == set()  # marque posée, mais pas encore validée
+        db.session.commit()
+        assert concerts_a_recalculer() == {c0.id}
+
+        part = Participation.query.filter_by(concert_id=c1.id, musicien_id=musicien.id).one()
+        part.gain_fixe = 50
+        Participation.query.filter_by(concert_id=c2.id, musicien_id=musicien.id).one().paye = True  # sans effet
+        db.session.commit()
+        assert concerts_a_recalculer() == {c0.id, c1.id}
+
+        # changer une opération de frais de concert marque l'ancien ET le nouveau concert
+        recalculer_concerts_marques()
+        frais.concert_id = c2.id
+        db.session.commit()
+        assert concerts_a_recalculer() == {c0.id, c2.id}
+        recalculer_concerts_marques()
+        assert concerts_a_recalculer() == set()
+        assert recalculs == [{c0.id, c1.id}, {c0.id, c2.id}]
+
+
+def test_rollback_oublie_la_marque(client):
+    with app.app_context():
+        c0 = _concert("Lieu 0")
+        part = Participation.query.filter_by(concert_id=c0.id).first()
+        part.gain_fixe = 12
+        db.session.flush()
+        assert db.session.info.get(calcul_participations._CLE_EN_ATTENTE) == {c0.id}
+        db.session.rollback()
+        assert calcul_participations._CLE_EN_ATTENTE not in db.session.info
+        db.session.commit()
+        assert concerts_a_recalculer() == set()
+
+
+def test_fin_de_requete_recalcule_les_concerts_marques(client, recalculs):
+    with app.app_context():
+        c0, c1 = _concert("Lieu 0").id, _concert("Lieu 1").id
+        # concert 1 désynchronisé hors session (aucune marque) : la fin de requête ne doit pas y toucher
+        Participation.query.filter_by(concert_id=c1).update({"credit_calcule_potentiel": 1.0},
+                                                           synchronize_session=False)
+        db.session.commit()
+
+    reponse = client.post(f"/concerts/{c0}/toggle_paye")
+    assert reponse.status_code == 302
+    assert recalculs == [{c0}]
+
+    with app.app_context():
+        parts = Participation.query.filter_by(concert_id=c0).all()
+        assert all(p.credit_calcule_potentiel == 0 for p in parts)
+        assert sum(p.credit_calcule for p in parts) == 600
+        assert {p.credit_calcule_potentiel for p in Participation.query.filter_by(concert_id=c1)} == {1.0}
+        calcul_participations.recalculer_credits_par_lots(concert_ids=[c1])
@@ -0,0 +1,62 @@
+# test_frais_concerts.py
+"""
+Frais des concerts (frais_concerts.py) : par musicien, un remboursement (ligne 'Frais' au crédit)
+réduit les frais ; Concert.frais garde la somme des frais réels, prévisionnels exclus.
+
+    python -m pytest -q test_frais_concerts.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_frais_concerts.py
+"""
+
+from datetime import date
+
+from annuaire import ROLE_ASSO7, ROLE_CB
+from App import app
+from models import db, Concert, Musicien, Operation
+
+JOUR = date(2024, 3, 9)
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(2)]
+    db.session.add_all([asso, cb, *musiciens])
+    db.session.flush()
+
+    concert = Concert(date=JOUR, lieu="Salle", paye=False, recette_attendue=700)
+    db.session.add(concert)
+    db.session.flush()
+    db.session.add_all([
+        Operation(musicien_id=musiciens[0].id, type="debit", motif="Frais", montant=80, date=JOUR,
+                  concert_id=concert.id),
+        Operation(musicien_id=musiciens[0].id, type="credit", motif="Frais", montant=30, date=JOUR,
+                  concert_id=concert.id),  # remboursement
+        Operation(musicien_id=musiciens[1].id, type="debit", motif="Frais", montant=25, date=JOUR,
+                  concert_id=concert.id),
+        Operation(musicien_id=cb.id, type="debit", motif="Frais", montant=40, date=JOUR,
+                  concert_id=concert.id, previsionnel=True),
+    ])
+    db.session.commit()
+
+
+# --------------------------- Tests ---------------------------
+
+def test_remboursement_reduit_les_frais_du_musicien(client):
+    from frais_concerts import frais_du_concert, frais_par_musicien
+
+    with app.app_context():
+        concert = Concert.query.one()
+        m0, m1 = (m.id for m in Musicien.query.filter(Musicien.nom.like("Nom%")).order_by(Musicien.id))
+
+        assert frais_par_musicien([concert.id]) == {concert.id: {m0: 50.0, m1: 25.0}}
+        frais = frais_du_concert(concert.id, fraiche=True)
+        assert frais.reels == 135.0          # somme des lignes réelles, comme Concert.frais
+        assert frais.previsionnels == 40.0   # débit prévisionnel de CB ASSO7
+
+        # le cache suit l'écriture d'un nouveau remboursement
+        db.session.add(Operation(musicien_id=m1, type="credit", motif="Frais", montant=25, date=JOUR,
+                                 concert_id=concert.id))
+        db.session.commit()
+        assert frais_par_musicien([concert.id]) == {concert.id: {m0: 50.0, m1: 0.0}}
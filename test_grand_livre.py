@@ -0,0 +1,132 @@
+# test_grand_livre.py
+"""
+Grand livre des soldes (soldes.py) : la lecture n'écrit jamais.
+
+Table vide, lignes arrêtées avant aujourd'hui ou dans le futur : GET /comptes et lire_soldes()
+rendent les mêmes composantes qu'un recalcul complet, sans INSERT / UPDATE / DELETE ni commit ;
+`avancer_grand_livre` (commande `python soldes.py avancer`) enregistre ensuite le décalage.
+
+    python -m pytest -q test_grand_livre.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_grand_livre.py
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+import soldes
+from annuaire import ROLE_ASSO7, ROLE_CB
+from App import app
+from models import db, Concert, Musicien, Operation, Participation, Report, SoldeCompte
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    from calcul_participations import recalculer_credits_par_lots
+
+    aujourd_hui = date.today()
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, *musiciens])
+    db.session.flush()
+
+    concerts = [Concert(date=aujourd_hui - timedelta(days=30), lieu="Payé", paye=True, recette=800),
+                Concert(date=aujourd_hui + timedelta(days=15), lieu="À venir", paye=False, recette_attendue=500)]
+    db.session.add_all(concerts)
+    db.session.flush()
+    for c in concerts:
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+
+    for jours, m in ((-20, musiciens[0]), (-5, musiciens[1]), (-1, cb), (4, musiciens[0]), (8, cb)):
+        db.session.add(Operation(musicien_id=m.id, type="debit" if jours % 2 else "credit", motif="Frais",
+                                 montant=30 + abs(jours), date=aujourd_hui + timedelta(days=jours)))
+    db.session.add(Report(musicien_id=musiciens[2].id, montant=25))
+    db.session.commit()
+    recalculer_credits_par_lots()
+
+
+@contextmanager
+def _ecritures_capturees():
+    """Liste des INSERT / UPDATE / DELETE / COMMIT émis dans le bloc."""
+    ecritures = []
+
+    def _capter(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(INSERT|UPDATE|DELETE)\b", statement, re.I):
+            ecritures.append(statement)
+
+    def _commit(conn):
+        ecritures.append("COMMIT")
+
+    with app.app_context():
+        moteur = db.engine
+    event.listen(moteur, "before_cursor_execute", _capter)
+    event.listen(moteur, "commit", _commit)
+    try:
+        yield ecritures
+    finally:
+        event.remove(moteur, "before_cursor_execute", _capter)
+        event.remove(moteur, "commit", _commit)
+
+
+def _ecarts(lues: dict, aujourd_hui: date) -> list:
+    recalcul = soldes.composantes_par_compte(aujourd_hui)
+    return [(mid, champ)
+            for mid in set(lues) | set(recalcul)
+            for champ in soldes.CHAMPS_COMPOSANTES
+            if abs(soldes.composantes_de(lues, mid)[champ] - soldes.composantes_de(recalcul, mid)[champ]) > 0.005]
+
+
+# --------------------------- Tests ---------------------------
+
+def test_table_vide_lue_sans_ecriture(client):
+    with app.app_context():
+        SoldeCompte.query.delete()
+        db.session.commit()
+
+    with _ecritures_capturees() as ecritures:
+        assert client.get("/comptes").status_code == 200
+        with app.app_context():
+            lues = soldes.lire_soldes()
+    assert ecritures == []
+
+    with app.app_context():
+        assert SoldeCompte.query.count() == 0
+        assert _ecarts(lues, date.today()) == []
+        soldes.reconstruire_grand_livre()
+
+
+def test_arrete_perime_avance_en_memoire_puis_enregistre(client):
+    aujourd_hui = date.today()
+    with app.app_context():
+        soldes.reconstruire_grand_livre(aujourd_hui - timedelta(days=10))
+
+    with _ecritures_capturees() as ecritures:
+        assert client.get("/comptes").status_code == 200
+        with app.app_context():
+            lues = soldes.lire_soldes()
+    assert ecritures == []
+
+    with app.app_context():
+        assert _ecarts(lues, aujourd_hui) == []
+        assert soldes.avancer_grand_livre() == db.session.query(Musicien).count()
+        assert {d for (d,) in db.session.query(SoldeCompte.date_arrete).distinct()} == {aujourd_hui}
+        assert soldes.verifier_grand_livre() == []
+
+
+def test_arrete_futur_recalcule_sans_ecriture(client):
+    aujourd_hui = date.today()
+    with app.app_context():
+        soldes.reconstruire_grand_livre(aujourd_hui + timedelta(days=6))
+
+    with _ecritures_capturees() as ecritures, app.app_context():
+        lues = soldes.lire_soldes()
+    assert ecritures == []
+
+    with app.app_context():
+        assert _ecarts(lues, aujourd_hui) == []
+        soldes.reconstruire_grand_livre()
@@ -0,0 +1,211 @@
+# test_jobs.py
+"""
+Tâches de fond (jobs.py) : seuls les jobs d'un processus disparu sont soldés au démarrage d'un pool,
+chaque tâche repart de caches vides, un recalcul complet n'écrase pas une bascule validée
+par le serveur web pendant qu'il tourne, et un GET sur /export_general ne lance aucun export.
+
+    python -m pytest -q test_jobs.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_jobs.py
+"""
+
+import socket
+import subprocess
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+import jobs
+from annuaire import ROLE_ASSO7, ROLE_CB
+from App import app
+from models import db, Concert, Job, Musicien, Operation, Participation
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, *musiciens])
+    db.session.flush()
+
+    jour = date.today() - timedelta(days=12)
+    concerts = [Concert(date=jour, lieu="À basculer", paye=False, recette_attendue=600,
+                        mode_paiement_prevu="CB ASSO7"),
+                Concert(date=jour + timedelta(days=1), lieu="Autre", paye=False, recette_attendue=400,
+                        mode_paiement_prevu="CB ASSO7")]
+    db.session.add_all(concerts)
+    db.session.flush()
+    for c in concerts:
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+def _pid_termine() -> int:
+    processus = subprocess.Popen([sys.executable, "-c", "pass"])
+    processus.wait()
+    return processus.pid
+
+
+# --------------------------- Tests ---------------------------
+
+def test_seuls_les_vrais_orphelins_sont_soldes(client):
+    hote = socket.gethostname()
+    ancien = datetime.utcnow() - jobs.DELAI_ORPHELIN - timedelta(minutes=5)
+    proprietaires = {
+        "ce_processus": (jobs._proprietaire(), None),
+        "processus_disparu": (f"{hote}:{_pid_termine()}:0123456789ab", None),
+        "redemarrage_meme_pid": (f"{jobs._proprietaire().rsplit(':', 1)[0]}:0123456789ab", None),
+        "autre_machine_recent": ("autre-hote:4242:0123456789ab", None),
+        "autre_machine_ancien": ("autre-hote:4242:0123456789ab", ancien),
+        "sans_proprietaire_ancien": (None, ancien),
+    }
+    with app.app_context():
+        ids = {}
+        for nom, (proprietaire, debut) in proprietaires.items():
+            job = Job(type="recalcul_complet", statut=jobs.STATUT_EN_COURS, proprietaire=proprietaire,
+                      started_at=debut or datetime.utcnow())
+            db.session.add(job)
+            db.session.flush()
+            ids[nom] = job.id
+        db.session.commit()
+
+        jobs._recuperer_orphelins()
+
+        statuts = {nom: db.session.get(Job, jid).statut for nom, jid in ids.items()}
+    assert statuts == {
+        "ce_processus": jobs.STATUT_EN_COURS,
+        "processus_disparu": jobs.STATUT_ECHEC,
+        "redemarrage_meme_pid": jobs.STATUT_ECHEC,
+        "autre_machine_recent": jobs.STATUT_EN_COURS,
+        "autre_machine_ancien": jobs.STATUT_ECHEC,
+        "sans_proprietaire_ancien": jobs.STATUT_ECHEC,
+    }
+
+
+def test_tache_repart_de_caches_vides(client, monkeypatch):
+    import annuaire
+    import archives
+    import frais_concerts
+
+    vus = {}
+
+    def _tache(parametres, progression):
+        vus["annuaire"] = annuaire._annuaire
+        vus["archives"] = dict(archives._cache)
+        vus["frais"] = dict(frais_concerts._cache)
+        return {}
+
+    monkeypatch.setitem(jobs.TACHES, "recalcul_complet", _tache)
+    app.config["JOBS_SYNCHRONES"] = True
+    try:
+        with app.app_context():
+            annuaire.annuaire()  # caches remplis par une lecture précédente
+            archives._cache["2024/2025"] = {"bloc": {}}
+            frais_concerts._cache[1] = []
+            job = jobs.soumettre("recalcul_complet")
+            assert job.statut == jobs.STATUT_TERMINE, job.message
+    finally:
+        app.config.pop("JOBS_SYNCHRONES", None)
+    assert vus == {"annuaire": None, "archives": {}, "frais": {}}
+
+
+def _credits():
+    return {p.id: (p.credit_calcule, p.credit_calcule_potentiel)
+            for p in Participation.query.order_by(Participation.id).all()}
+
+
+def test_recalcul_complet_pendant_une_bascule(client, monkeypatch):
+    """
+    Le job lit ses concerts ; « l'autre processus » (thread serveur_web, hors du verrou en mémoire du
+    job) valide une bascule payé + son recalcul ; le job écrit ensuite : il doit relire, pas écraser.
+    """
+    import calcul_participations
+    import resume_concerts
+    import soldes
+    import verrous_concerts
+
+    with app.app_context():
+        concert_id = Concert.query.filter_by(lieu="À basculer").one().id
+        # recette attendue changée sans recalcul : le job a des crédits à réécrire
+        Concert.query.update({"recette_attendue": 900}, synchronize_session=False)
+        db.session.commit()
+
+    def _autre_processus():
+        return threading.current_thread().name == "serveur_web"
+
+    prendre, rendre = verrous_concerts._prendre, verrous_concerts._rendre
+    monkeypatch.setattr(verrous_concerts, "_prendre", lambda cid: None if _autre_processus() else prendre(cid))
+    monkeypatch.setattr(verrous_concerts, "_rendre", lambda cid: None if _autre_processus() else rendre(cid))
+
+    calculer = calcul_participations.distributions_par_lots
+    lectures, reponses = [], []
+
+    def _bascule():
+        reponses.append(app.test_client().post(f"/concerts/{concert_id}/toggle_paye").status_code)
+
+    def _distributions(enregs):
+        if _autre_processus():
+            return calculer(enregs)  # recalcul de fin de requête de la bascule
+        lectures.append({e.id: e.paye for e in enregs})
+        if len(lectures) == 1:  # entre la lecture du lot et son écriture
+            web = threading.Thread(target=_bascule, name="serveur_web")
+            web.start()
+            web.join()
+        return calculer(enregs)
+
+    monkeypatch.setattr(calcul_participations, "distributions_par_lots", _distributions)
+    app.config["JOBS_SYNCHRONES"] = True
+    try:
+        with app.app_context():
+            job = jobs.soumettre("recalcul_complet")
+            assert job.statut == jobs.STATUT_TERMINE, job.message
+    finally:
+        app.config.pop("JOBS_SYNCHRONES", None)
+
+    assert reponses == [302]
+    assert [l[concert_id] for l in lectures] == [False, True]  # lot annulé puis relu
+
+    with app.app_context():
+        concert = db.session.get(Concert, concert_id)
+        assert concert.paye is True
+        assert Operation.query.filter_by(concert_id=concert_id, motif="Recette concert").count() == 1
+        parts = Participation.query.filter_by(concert_id=concert_id).all()
+        assert all(p.credit_calcule_potentiel == 0 for p in parts)
+        assert sum(p.credit_calcule for p in parts) == 900
+
+        avant = _credits()
+        calcul_participations.recalculer_credits_par_lots()
+        assert _credits() == avant  # rien de périmé laissé par le job
+        assert resume_concerts.verifier_resumes() == []
+        assert soldes.verifier_grand_livre() == []
+
+
+def test_export_general_lance_seulement_en_post(client, monkeypatch):
+    monkeypatch.setitem(jobs.TACHES, "export_excel", lambda parametres, progression: {})
+    app.config["JOBS_SYNCHRONES"] = True
+    try:
+        with app.app_context():
+            avant = Job.query.count()
+
+        page = client.get("/export_general")
+        assert page.status_code == 200 and 'method="post"' in page.get_data(as_text=True)
+        with app.app_context():
+            assert Job.query.count() == avant  # lien suivi ou préchargé : aucun job
+
+        reponse = client.post("/export_general")
+        with app.app_context():
+            job = Job.query.order_by(Job.id.desc()).first()
+            assert Job.query.count() == avant + 1 and job.type == "export_excel"
+            assert reponse.status_code == 302 and reponse.location.endswith(f"/jobs/{job.id}/suivi")
+
+        reponse = client.post("/export_general", headers={"Accept": "application/json"})
+        assert reponse.status_code == 202 and reponse.get_json()["success"]
+    finally:
+        app.config.pop("JOBS_SYNCHRONES", None)
@@ -0,0 +1,60 @@
+# test_monnaie.py
+"""
+Montants en centimes (monnaie.py) : arrondi commercial (demi-centime vers le haut, pas l'arrondi
+« au pair » de round()), répartition exacte au centime, comparaisons limitées aux Money.
+
+    python -m pytest -q test_monnaie.py
+"""
+
+import random
+
+import pytest
+
+from monnaie import Money, centimes, division_arrondie
+
+
+def test_arrondi_demi_vers_le_haut():
+    # round() arrondit au pair, ou trahit la valeur binaire du float : pas centimes()
+    assert round(2.675, 2) == 2.67 and centimes(2.675) == 268
+    assert round(0.125, 2) == 0.12 and centimes(0.125) == 13
+    assert centimes(0.005) == 1 and centimes(1.005) == 101  # round(1.005, 2) == 1.0
+    assert centimes(-2.675) == -268
+    assert centimes(0.1) + centimes(0.2) == centimes(0.3)
+
+    assert Money(5).divise(2) == Money(3)
+    assert Money(1005).fois(0.10) == Money(101)   # 100,5 centimes
+    assert Money(1004).fois(0.10) == Money(100)
+    assert division_arrondie(5, 2) == 3 and division_arrondie(7, 4) == 2
+    assert Money.de("12,345") == Money(1235)
+
+
+def test_repartir_somme_exacte():
+    hasard = random.Random(11)
+    for _ in range(2000):
+        montant = Money(hasard.randint(-50_000, 500_000))
+        poids = [hasard.choice((0, 1, 3, 7, 100, hasard.randint(1, 10_000))) for _ in range(hasard.randint(1, 9))]
+        if not sum(poids):
+            poids[0] = 1
+        parts = montant.repartir(poids)
+        assert sum(parts, Money()) == montant, (montant, poids, parts)
+        for part, p in zip(parts, poids):
+            exacte = montant.centimes * p / sum(poids)
+            assert abs(part.centimes - exacte) < 1  # au plus un centime du prorata exact
+            if p == 0:
+                assert part == Money()
+
+    assert Money(100).repartir([1, 1, 1]) == [Money(34), Money(33), Money(33)]  # à égalité : le premier
+    with pytest.raises(ValueError):
+        Money(100).repartir([0, 0])
+
+
+def test_comparaisons():
+    assert Money(100) < Money(101) <= Money(101)
+    assert Money(102) > Money(101) >= Money(101)
+    assert Money(100) != 1.0 and not (Money(100) == 100)
+    assert sorted([Money(3), Money(-1), Money(2)]) == [Money(-1), Money(2), Money(3)]
+    for autre in (1, 1.0, None, "1"):
+        for comparer in (lambda: Money(100) < autre, lambda: Money(100) <= autre,
+                         lambda: Money(100) > autre, lambda: Money(100) >= autre, lambda: autre < Money(100)):
+            with pytest.raises(TypeError):
+                comparer()
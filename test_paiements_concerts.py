@@ -0,0 +1,108 @@
+# test_paiements_concerts.py
+"""
+Validation groupée des paiements (POST /valider_paiements_concerts, mes_utils.valider_paiements_concerts).
+
+Tout ou rien : une ligne refusée (concert déjà payé, recette non finie…) renvoie une erreur PAR
+LIGNE et rien n'est écrit ; en particulier, l'opération 'Recette concert' d'un concert déjà payé
+n'est jamais réécrite.
+
+    python -m pytest -q test_paiements_concerts.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_paiements_concerts.py
+"""
+
+from datetime import date, timedelta
+
+from annuaire import ROLE_ASSO7, ROLE_CAISSE, ROLE_CB
+from App import app
+from models import db, Concert, Musicien, Operation, Participation
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    caisse = Musicien(nom="CAISSE ASSO7", prenom="", type="structure", role=ROLE_CAISSE)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, caisse, *musiciens])
+    db.session.flush()
+
+    jour = date.today() - timedelta(days=20)
+    paye = Concert(date=jour, lieu="Déjà payé", paye=True, recette=700, mode_paiement_prevu="CB ASSO7")
+    a_payer = [Concert(date=jour + timedelta(days=i + 1), lieu=f"À payer {i}", paye=False,
+                       recette_attendue=500 + 100 * i, mode_paiement_prevu="CB ASSO7") for i in range(2)]
+    db.session.add_all([paye, *a_payer])
+    db.session.flush()
+    for c in (paye, *a_payer):
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+    db.session.add(Operation(musicien_id=cb.id, type="credit", motif="Recette concert", montant=700,
+                             date=paye.date, concert_id=paye.id))
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+def _ids():
+    with app.app_context():
+        paye = Concert.query.filter_by(lieu="Déjà payé").one().id
+        a_payer = [c.id for c in Concert.query.filter(Concert.lieu.like("À payer%")).order_by(Concert.id)]
+    return paye, a_payer
+
+
+def _recettes(concert_id) -> list:
+    with app.app_context():
+        return [(op.montant, op.musicien_id)
+                for op in Operation.query.filter_by(concert_id=concert_id, motif="Recette concert")]
+
+
+def _valider(client, paiements):
+    r = client.post("/valider_paiements_concerts", json={"paiements": paiements})
+    return r.status_code, r.get_json()
+
+
+# --------------------------- Tests ---------------------------
+
+def test_concert_deja_paye_refuse(client):
+    paye, (a_payer, _autre) = _ids()
+    avant = _recettes(paye)
+
+    statut, corps = _valider(client, [{"concert_id": a_payer}, {"concert_id": paye, "recette": 900}])
+    assert statut == 400
+    assert [(e["index"], e["concert_id"]) for e in corps["erreurs"]] == [(1, paye)]
+    assert "déjà payé" in corps["erreurs"][0]["message"]
+
+    assert _recettes(paye) == avant  # recette existante intacte
+    with app.app_context():
+        assert db.session.get(Concert, a_payer).paye is False  # tout ou rien
+
+
+def test_recette_non_finie_refusee(client):
+    _paye, (a_payer, autre) = _ids()
+
+    statut, corps = _valider(client, [{"concert_id": a_payer, "recette": "nan"},
+                                      {"concert_id": autre, "recette": "inf"}])
+    assert statut == 400
+    assert [(e["index"], e["concert_id"]) for e in corps["erreurs"]] == [(0, a_payer), (1, autre)]
+    assert all("Recette invalide" in e["message"] for e in corps["erreurs"])
+    assert _recettes(a_payer) == [] and _recettes(autre) == []
+
+
+def test_validation_puis_revalidation(client):
+    import soldes
+
+    _paye, (a_payer, _autre) = _ids()
+
+    statut, corps = _valider(client, [{"concert_id": a_payer, "recette": "650,50"}])
+    assert statut == 200, corps
+    assert [m for m, _mid in _recettes(a_payer)] == [650.5]
+
+    statut, corps = _valider(client, [{"concert_id": a_payer, "recette": 999}])
+    assert statut == 400
+    assert [e["index"] for e in corps["erreurs"]] == [0]
+    assert [m for m, _mid in _recettes(a_payer)] == [650.5]
+    with app.app_context():
+        assert soldes.verifier_grand_livre() == []
@@ -0,0 +1,77 @@
+# test_partage.py
+"""
+Calcul pur du partage (partage.py) : le calcul par lots (NumPy) rend exactement, concert par concert,
+la distribution du calcul scalaire, et un prévisionnel négatif ne gonfle jamais les crédits potentiels.
+
+    python -m pytest -q test_partage.py
+"""
+
+import random
+
+import pytest
+
+from partage import ConcertPartage, ParticipantPartage, distribution, distributions_par_lots, frais_effectifs
+
+ASSO7_ID = 1
+JEROME_ID = 2
+
+
+def _participants(hasard, gains_fixes: bool) -> list:
+    ids = hasard.sample(range(3, 12), hasard.randint(0, 5))
+    if hasard.random() < 0.7:
+        ids.append(ASSO7_ID)
+    if hasard.random() < 0.4:
+        ids.append(JEROME_ID)
+    hasard.shuffle(ids)
+    participants = []
+    for mid in ids:
+        fixe = None
+        if gains_fixes and hasard.random() < 0.3:
+            fixe = hasard.choice((0, 15, 42.5, 120, 5000))  # 5000 : au-delà du total → erreur
+        participants.append(ParticipantPartage(mid, est_asso7=mid == ASSO7_ID, est_jerome=mid == JEROME_ID,
+                                               gain_fixe=fixe))
+    return participants
+
+
+def _concerts(nombre: int = 400, graine: int = 7) -> list:
+    hasard = random.Random(graine)
+    concerts = []
+    for i in range(nombre):
+        paye = hasard.random() < 0.5
+        concerts.append(ConcertPartage(
+            id=i,
+            recette=hasard.choice((None, 0, 333.33, 800, 1234.56)) if paye or hasard.random() < 0.3 else None,
+            recette_attendue=hasard.choice((None, 250, 601.01, 1500)),
+            frais=hasard.choice((None, 0, 49.99, 300, 2000)),
+            frais_previsionnels=hasard.choice((None, 0, -80, 35.5, 120)),
+            paye=paye,
+            participants=_participants(hasard, gains_fixes=hasard.random() < 0.5),
+        ))
+    return concerts
+
+
+def test_lots_identiques_au_calcul_scalaire():
+    concerts = _concerts()
+    distributions, erreurs = distributions_par_lots(concerts)
+
+    assert erreurs, "le jeu de données doit contenir des concerts en erreur"
+    assert any(c.paye for c in concerts) and any(not c.paye for c in concerts)
+    for c in concerts:
+        if c.id in erreurs:
+            with pytest.raises(ValueError):
+                distribution(c)
+            assert c.id not in distributions
+        else:
+            assert distributions[c.id] == distribution(c), c
+
+
+def test_previsionnel_negatif_ramene_a_zero():
+    participants = [ParticipantPartage(3), ParticipantPartage(4), ParticipantPartage(ASSO7_ID, est_asso7=True)]
+    negatif = ConcertPartage(id=1, recette_attendue=600, frais=60, frais_previsionnels=-90,
+                             participants=participants)
+    nul = ConcertPartage(id=2, recette_attendue=600, frais=60, frais_previsionnels=0, participants=participants)
+
+    assert frais_effectifs(negatif) == 60.0
+    assert distribution(negatif) == distribution(nul) == {"ASSO7": 180.0, 3: 180.0, 4: 180.0}
+    distributions, _erreurs = distributions_par_lots([negatif, nul])
+    assert distributions[1] == distributions[2] == distribution(nul)
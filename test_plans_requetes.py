@@ -0,0 +1,251 @@
+# test_plans_requetes.py
+"""
+Plans d'exécution des requêtes des pages chaudes : /comptes, /concerts, /operations, archives.
+
+Chaque page est appelée sur une petite base de test ; toutes les requêtes SELECT émises sont
+capturées puis passées à EXPLAIN (SQLite : EXPLAIN QUERY PLAN ; Postgres : EXPLAIN avec
+enable_seqscan=off). Le test échoue si une requête FILTRÉE (WHERE) parcourt entièrement une
+table d'historique : il lui manque un index (cf. models.py et la migration f1b7c4e83a52).
+
+Les lectures volontairement complètes (requête sans WHERE : grand livre, liste des musiciens,
+tous les concerts du formulaire d'opération) ne comptent pas : aucun index ne les éviterait.
+
+    python -m pytest -q test_plans_requetes.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_plans_requetes.py
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from App import app
+from models import db, Cachet, Concert, Musicien, Operation, Participation, Report, ResumeSaison
+
+TABLES_HISTORIQUE = {"operations", "participations", "concerts", "cachets", "reports", "operations_recherche"}
+
+PAGES = [
+    "/comptes",
+    "/concerts",
+    "/operations",
+    "/archives_operations",
+    "/archives_operations_saison/24-25",
+    "/api/archives_operations/24-25/2025-03",
+    "/archives/concerts",
+    "/archives/concerts/2024-2025",
+    "/archives_cachets",
+    "/archives_cachets/2024-2025",
+    "/api/operations/search?critere=montant&q=50&saison=toutes",
+    "/api/operations/search?critere=qui&q=nom1&saison=24-25&passees=1",
+]
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    asso = Musicien(nom="ASSO7", prenom="", type="structure")
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure")
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(5)]
+    db.session.add_all([asso, cb, *musiciens])
+    db.session.flush()
+
+    concerts = []
+    for i in range(30):
+        c = Concert(date=date(2023, 9, 15) + timedelta(days=20 * i), lieu=f"Lieu {i}",
+                    paye=(i % 3 == 0), recette=1500 + i, recette_attendue=1000 + i, frais=50)
+        db.session.add(c)
+        concerts.append(c)
+    db.session.flush()
+    for i, c in enumerate(concerts):
+        for m in (musiciens[i % 5], musiciens[(i + 2) % 5], asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id,
+                                         credit_calcule=(100.0 if c.paye else 0.0),
+                                         credit_calcule_potentiel=(0.0 if c.paye else 100.0)))
+
+    for i in range(300):
+        m = (musiciens + [cb])[i % 6]
+        db.session.add(Operation(
+            musicien_id=m.id, type="credit" if i % 2 else "debit",
+            motif=["Salaire", "Frais", "Recette concert", "Remboursement"][i % 4],
+            precision=f"Précision {i}", montant=50 + (i % 7), date=date(2023, 9, 1) + timedelta(days=3 * i),
+            concert_id=concerts[i % 30].id if i % 3 == 0 else None, previsionnel=(i % 25 == 0),
+        ))
+    for i in range(40):
+        db.session.add(Cachet(musicien_id=musiciens[i % 5].id, date=date(2023, 9, 10) + timedelta(days=20 * i),
+                              montant=120.0))
+    db.session.add(Report(musicien_id=musiciens[0].id, montant=42.0))
+    db.session.commit()
+
+
+# --------------------------- Capture et EXPLAIN ---------------------------
+
+@contextmanager
+def _requetes_capturees():
+    """Liste (statement, paramètres) des SELECT émis dans le bloc."""
+    requetes = []
+
+    def _capter(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r"\s*(SELECT|WITH)\b", statement, re.I):
+            requetes.append((statement, parameters))
+
+    with app.app_context():
+        moteur = db.engine
+    event.listen(moteur, "before_cursor_execute", _capter)
+    try:
+        yield requetes
+    finally:
+        event.remove(moteur, "before_cursor_execute", _capter)
+
+
+@contextmanager
+def _ecritures_capturees():
+    """Liste des INSERT / UPDATE / DELETE émis dans le bloc."""
+    ecritures = []
+
+    def _capter(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(INSERT|UPDATE|DELETE)\b", statement, re.I):
+            ecritures.append(statement)
+
+    with app.app_context():
+        moteur = db.engine
+    event.listen(moteur, "before_cursor_execute", _capter)
+    try:
+        yield ecritures
+    finally:
+        event.remove(moteur, "before_cursor_execute", _capter)
+
+
+def _parcours_complets(conn, statement, parameters) -> list:
+    """Tables d'historique lues entièrement par le plan de `statement`."""
+    if conn.dialect.name == "postgresql":
+        plan = [ligne[0] for ligne in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        motif = re.compile(r"Seq Scan on (\w+)")
+    else:
+        plan = [ligne[-1] for ligne in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        motif = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")  # « SCAN t USING INDEX … » passe par un index
+    tables = []
+    for ligne in plan:
+        m = motif.search(ligne)
+        if m and m.group(1) in TABLES_HISTORIQUE:
+            tables.append(m.group(1))
+    return tables
+
+
+def _fautives(requetes) -> list:
+    fautives = []
+    with app.app_context(), db.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in requetes:
+            if not re.search(r"\bWHERE\b", statement, re.I):
+                continue
+            tables = _parcours_complets(conn, statement, parameters)
+            if tables:
+                fautives.append(f"{', '.join(sorted(set(tables)))} ← {' '.join(statement.split())[:240]}")
+    return fautives
+
+
+# --------------------------- Tests ---------------------------
+
+@pytest.mark.parametrize("url", PAGES)
+def test_page_sans_parcours_complet(client, url):
+    with _requetes_capturees() as requetes:
+        reponse = client.get(url)
+    assert reponse.status_code == 200, url
+    assert requetes, f"aucune requête capturée pour {url}"
+    fautives = _fautives(requetes)
+    assert not fautives, f"{url} : parcours complet de table\n" + "\n".join(fautives)
+
+
+def test_soldes_et_suppression_sans_parcours_complet(client):
+    """Requêtes hors pages : grand livre d'un compte, cascade des opérations liées, recherche."""
+    import recherche
+    import soldes
+    from mes_utils import _operations_liees
+
+    with app.app_context():
+        musicien = Musicien.query.filter_by(nom="Nom1").one()
+        operation = Operation.query.filter_by(musicien_id=musicien.id).first()
+        with _requetes_capturees() as requetes:
+            soldes.composantes_par_compte(date(2025, 3, 1), musicien_ids=[musicien.id])
+            _operations_liees(operation.id)
+            recherche.rechercher_operations("motif", "frais", musicien_id=musicien.id)
+    assert not _fautives(requetes), "\n".join(_fautives(requetes))
+
+
+def test_detecte_un_parcours_complet(client):
+    """Garde-fou : une requête filtrée sur une colonne non indexée doit être signalée."""
+    with app.app_context():
+        with _requetes_capturees() as requetes:
+            Operation.query.filter(Operation.brut > 0).all()
+    assert any(f.startswith("operations ←") for f in _fautives(requetes))
+
+
+def test_archives_en_lecture_seule(client):
+    """Résumé par saison tenu à jour par les écritures ; les pages d'archives ne l'écrivent jamais."""
+    import saisons
+
+    with app.app_context():
+        assert saisons.verifier_resumes() == []
+        ResumeSaison.query.delete()
+        db.session.commit()
+    try:
+        with _ecritures_capturees() as ecritures:
+            for url in ("/archives_operations", "/archives/concerts", "/archives_cachets"):
+                assert client.get(url).status_code == 200, url
+        assert ecritures == []
+        with app.app_context():
+            assert ResumeSaison.query.count() == 0
+    finally:
+        with app.app_context():
+            saisons.reconstruire_resumes()
+
+
+def test_recherche_en_lecture_seule(client):
+    """Index et table FTS5 construits avec la base : la recherche ne crée ni n'écrit rien."""
+    import recherche
+
+    with app.app_context():
+        assert recherche.verifier_index() == []
+    with _ecritures_capturees() as ecritures:
+        for url in PAGES:
+            if url.startswith("/api/operations/search"):
+                reponse = client.get(url)
+                assert reponse.status_code == 200, url
+                assert reponse.get_json()["operations"], url
+    assert ecritures == []
+
+
+def _plans_soldes(requetes) -> list:
+    """Lignes de plan qui lisent `operations`, pour les requêtes qui additionnent montant_signe."""
+    plans = []
+    with app.app_context(), db.engine.connect() as conn:
+        for statement, parameters in requetes:
+            if "montant_signe" not in statement:
+                continue
+            if conn.dialect.name == "postgresql":
+                plan = [ligne[0] for ligne in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+            else:
+                plan = [ligne[-1] for ligne in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            plans += [ligne for ligne in plan if re.search(r"\boperations\b", ligne)]
+    return plans
+
+
+def test_soldes_par_un_seul_index_couvrant(client):
+    """Un seul index porte montant_signe ; les soldes d'un compte et du grand livre complet le lisent."""
+    import soldes
+    from sqlalchemy import inspect as sa_inspect
+
+    with app.app_context():
+        couvrants = [i["name"] for i in sa_inspect(db.engine).get_indexes("operations")
+                     if "montant_signe" in i["column_names"]]
+        assert couvrants == ["ix_operations_musicien_date_signe"]
+
+        musicien = Musicien.query.filter_by(nom="Nom1").one()
+        with _requetes_capturees() as requetes:
+            soldes.composantes_par_compte(date(2025, 3, 1))
+            soldes.composantes_par_compte(date(2025, 3, 1), musicien_ids=[musicien.id])
+    plans = _plans_soldes(requetes)
+    assert plans and all("ix_operations_musicien_date_signe" in ligne for ligne in plans), plans
@@ -0,0 +1,124 @@
+# test_recalcul_par_lots.py
+"""
+Recalcul global par lots (calcul_participations.recalculer_credits_par_lots) : mêmes credit_calcule /
+credit_calcule_potentiel que la boucle concert par concert (par_lots=False), et même résumé hors
+concert en erreur, sur des concerts payés / non payés, avec gains fixés, bonus, participation ASSO7
+manquante et concert en erreur ; les participations clôturées ne sont jamais réécrites.
+
+    python -m pytest -q test_recalcul_par_lots.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_recalcul_par_lots.py
+"""
+
+from datetime import date, timedelta
+
+from annuaire import ROLE_ASSO7, ROLE_BONUS, ROLE_CB, id_role
+from App import app
+from models import db, Concert, Musicien, Participation
+
+CREDITS_FAUX = {"credit_calcule": 7.77, "credit_calcule_potentiel": 3.33}
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    bonus = Musicien(nom="Arnould", prenom="Jérôme", role=ROLE_BONUS)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(5)]
+    db.session.add_all([asso, cb, bonus, *musiciens])
+    db.session.flush()
+
+    jour = date(2024, 1, 6)
+    for i in range(12):
+        paye = i % 2 == 0
+        c = Concert(date=jour + timedelta(days=7 * i), lieu=f"Salle {i}", paye=paye,
+                    recette=(1000 + 37 * i) if paye else None,
+                    recette_attendue=None if paye else (800 + 53 * i),
+                    frais=(15.5 * i) if i % 3 else None, frais_previsionnels=(20 + i) if i % 4 == 1 else None)
+        if i == 10:
+            c.recette_attendue = None  # pas de recette : rien à partager
+        db.session.add(c)
+        db.session.flush()
+        presents = [musiciens[i % 5], musiciens[(i + 1) % 5], musiciens[(i + 3) % 5]]
+        if i % 3 == 0:
+            presents.append(bonus)
+        if i != 4:
+            presents.append(asso)  # concert 4 : participation ASSO7 ajoutée par le recalcul
+        for m in presents:
+            fixe = None
+            if i == 6 and m is musiciens[1]:
+                fixe = 100.0
+            elif i == 8 and m is asso:
+                fixe = 50.0
+            elif i == 9 and m is musiciens[0]:
+                fixe = 99_999.0  # au-delà du total : concert en erreur, laissé tel quel
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id, gain_fixe=fixe))
+    db.session.commit()
+
+
+def _brouiller():
+    """Crédits faux partout et participation ASSO7 du concert 4 retirée : tout est à recalculer."""
+    asso7_id = id_role(ROLE_ASSO7)
+    salle_4 = Concert.query.filter_by(lieu="Salle 4").one().id
+    Participation.query.filter_by(concert_id=salle_4, musicien_id=asso7_id).delete(synchronize_session=False)
+    Participation.query.update(CREDITS_FAUX, synchronize_session=False)
+    Concert.query.update({"nb_participants": 0, "part_asso7": None, "total_distribue": None},
+                         synchronize_session=False)
+    db.session.commit()
+
+
+def _etat() -> dict:
+    db.session.expire_all()
+    credits = {(p.concert_id, p.musicien_id): (p.credit_calcule, p.credit_calcule_potentiel)
+               for p in Participation.query.all()}
+    resumes = {c.id: (c.nb_participants, c.part_asso7, c.total_distribue) for c in Concert.query.all()}
+    return {"credits": credits, "resumes": resumes}
+
+
+# --------------------------- Tests ---------------------------
+
+def test_lots_identiques_a_la_boucle(client):
+    from calcul_participations import mettre_a_jour_credit_calcule_potentiel, recalculer_credits_par_lots
+
+    with app.app_context():
+        _brouiller()
+        mettre_a_jour_credit_calcule_potentiel(par_lots=False)
+        boucle = _etat()
+
+        _brouiller()
+        erreurs = recalculer_credits_par_lots(taille_lot=5)  # plusieurs lots
+        lots = _etat()
+
+        salle_9 = Concert.query.filter_by(lieu="Salle 9").one().id
+    assert set(erreurs) == {salle_9}
+    assert lots["credits"] == boucle["credits"]
+    # résumé : la boucle ne touche pas celui d'un concert en erreur, les lots l'alignent sur ses crédits
+    assert {cid: r for cid, r in lots["resumes"].items() if cid != salle_9} == \
+           {cid: r for cid, r in boucle["resumes"].items() if cid != salle_9}
+    # le concert en erreur garde ses crédits ; les autres ont bien été recalculés
+    assert {v for (cid, _mid), v in lots["credits"].items() if cid == salle_9} == {(7.77, 3.33)}
+    assert (7.77, 3.33) not in {v for (cid, _mid), v in lots["credits"].items() if cid != salle_9}
+
+
+def test_participations_cloturees_intactes(client):
+    from calcul_participations import recalculer_credits_par_lots
+    from resume_concerts import CHAMPS_PARTICIPATIONS, verifier_resumes
+
+    with app.app_context():
+        recalculer_credits_par_lots()
+        salle_0 = Concert.query.filter_by(lieu="Salle 0").one().id
+        Participation.query.filter_by(concert_id=salle_0).update(
+            {"cloture_saison": "2023/2024", **CREDITS_FAUX}, synchronize_session=False)
+        db.session.commit()
+        try:
+            recalculer_credits_par_lots()
+            db.session.expire_all()
+            assert {(p.credit_calcule, p.credit_calcule_potentiel)
+                    for p in Participation.query.filter_by(concert_id=salle_0)} == {(7.77, 3.33)}
+            # résumé tenu sur les crédits figés (Concert.frais est saisi ici sans opérations de frais)
+            assert [e for e in verifier_resumes() if e[1] in CHAMPS_PARTICIPATIONS] == []
+        finally:
+            Participation.query.filter_by(concert_id=salle_0).update(
+                {"cloture_saison": None}, synchronize_session=False)
+            db.session.commit()
+            recalculer_credits_par_lots()
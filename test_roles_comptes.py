@@ -0,0 +1,142 @@
+# test_roles_comptes.py
+"""
+Comptes de trésorerie désignés par leur RÔLE (annuaire.py), pas par leur nom.
+
+Le compte CB ASSO7 est renommé : /comptes, le tableau des comptes, le grand livre, la
+clôture de saison et la création d'un concert payé doivent continuer à le traiter comme le compte CB (aucune participation,
+recettes attendues des concerts non payés en gains à venir, ligne TRESO = CB + CAISSE).
+
+    python -m pytest -q test_roles_comptes.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_roles_comptes.py
+"""
+
+from datetime import date, timedelta
+
+from annuaire import ROLE_ASSO7, ROLE_CAISSE, ROLE_CB, id_role
+from App import app
+from models import db, Concert, Lieu, Musicien, Operation, Participation
+
+NOUVEAU_NOM = "Banque Pop"
+SAISON = "2023/2024"
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    caisse = Musicien(nom="CAISSE ASSO7", prenom="", type="structure", role=ROLE_CAISSE)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(3)]
+    db.session.add_all([asso, cb, caisse, *musiciens])
+    db.session.flush()
+
+    paye = Concert(date=date(2023, 11, 10), lieu="Salle payée", paye=True, recette=900,
+                   mode_paiement_prevu="CB ASSO7")
+    attendu = Concert(date=date(2024, 3, 2), lieu="Salle attendue", paye=False, recette_attendue=600,
+                      mode_paiement_prevu="CB ASSO7")
+    db.session.add_all([paye, attendu])
+    db.session.flush()
+    for c in (paye, attendu):
+        for m in (*musiciens, asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+    # participation saisie par erreur sur le compte CB : ni lue dans son solde, ni reprise par la clôture
+    db.session.add(Participation(concert_id=paye.id, musicien_id=cb.id))
+
+    db.session.add_all([
+        Operation(musicien_id=cb.id, type="credit", motif="Recette concert", montant=900,
+                  date=paye.date, concert_id=paye.id),
+        Operation(musicien_id=caisse.id, type="credit", motif="Recette concert", montant=150,
+                  date=date(2023, 12, 1)),
+        Operation(musicien_id=cb.id, type="debit", motif="Frais", montant=40, date=date(2024, 1, 5)),
+    ])
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+def _etat() -> dict:
+    from mes_utils import get_etat_comptes
+    return {l["nom"]: (l["credit"], l["gains_a_venir"]) for l in get_etat_comptes() if not l.get("separateur")}
+
+
+def _tableau() -> dict:
+    from mes_utils import generer_tableau_comptes
+    tableau, _n = generer_tableau_comptes()
+    return {l["nom"]: (l["credit_actuel"], l["gains_a_venir"]) for l in tableau}
+
+
+def _renommer_cb(nom: str) -> None:
+    db.session.get(Musicien, id_role(ROLE_CB)).nom = nom
+    db.session.commit()
+
+
+# --------------------------- Tests ---------------------------
+
+def test_cb_renomme_soldes_inchanges(client):
+    import soldes
+
+    with app.app_context():
+        etat, tableau = _etat(), _tableau()
+        assert etat["CB ASSO7"] == (860.0, 600.0)
+        assert etat["TRESO ASSO7"] == (1010.0, 600.0)
+
+        _renommer_cb(NOUVEAU_NOM)
+        try:
+            assert id_role(ROLE_CB) is not None
+            etat_apres, tableau_apres = _etat(), _tableau()
+            assert "CB ASSO7" not in etat_apres
+            assert etat_apres[NOUVEAU_NOM] == etat["CB ASSO7"]
+            assert etat_apres["TRESO ASSO7"] == etat["TRESO ASSO7"]
+            assert tableau_apres[NOUVEAU_NOM] == tableau["CB ASSO7"]
+            assert tableau_apres["TRESO ASSO7"] == tableau["TRESO ASSO7"]
+            assert soldes.verifier_grand_livre() == []
+        finally:
+            _renommer_cb("CB ASSO7")
+
+
+def test_cb_renomme_cloture(client):
+    import soldes
+    from clotures import cloturer_saison, rouvrir_saison
+
+    with app.app_context():
+        _renommer_cb(NOUVEAU_NOM)
+        try:
+            etat = _etat()
+            apercu = {l["musicien_id"]: l for l in cloturer_saison(SAISON, simulation=True)}
+            assert apercu[id_role(ROLE_CB)]["report"] == 860.0
+
+            cloturer_saison(SAISON)  # contrôle interne des soldes avant / après
+            assert _etat() == etat
+            assert soldes.verifier_grand_livre() == []
+
+            rouvrir_saison(SAISON)
+            assert _etat() == etat
+        finally:
+            _renommer_cb("CB ASSO7")
+
+
+def test_cb_renomme_concert_paye_cree(client):
+    with app.app_context():
+        lieu = Lieu(nom="Salle neuve")
+        db.session.add(lieu)
+        db.session.commit()
+        lieu_id = lieu.id
+        _renommer_cb(NOUVEAU_NOM)
+
+    try:
+        r = client.post("/concert/ajouter", data={
+            "date": (date.today() - timedelta(days=3)).isoformat(), "lieu_id": str(lieu_id),
+            "recette": "450", "paye": "on", "mode_paiement_prevu": "CB ASSO7",
+        })
+        assert r.status_code == 302
+        with app.app_context():
+            concert = Concert.query.filter_by(lieu_id=lieu_id).one()
+            recette = Operation.query.filter_by(concert_id=concert.id, motif="Recette concert").one()
+            assert recette.musicien_id == id_role(ROLE_CB)
+            assert recette.montant == 450
+    finally:
+        with app.app_context():
+            _renommer_cb("CB ASSO7")
@@ -0,0 +1,152 @@
+# test_simulation_partage.py
+"""
+Simulation « et si… » (POST /api/concerts/<id>/simulate, calcul_participations.simuler_partage) :
+rien n'est écrit (session propre, aucun flush, aucune instruction d'écriture, base inchangée), et une
+fois les mêmes hypothèses enregistrées, le recalcul donne exactement la distribution simulée.
+
+    python -m pytest -q test_simulation_partage.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_simulation_partage.py
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from annuaire import ROLE_ASSO7, ROLE_BONUS, ROLE_CB, id_role
+from App import app
+from models import db, Concert, Musicien, Participation
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure", role=ROLE_ASSO7)
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure", role=ROLE_CB)
+    bonus = Musicien(nom="Arnould", prenom="Jérôme", role=ROLE_BONUS)
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(4)]
+    db.session.add_all([asso, cb, bonus, *musiciens])
+    db.session.flush()
+
+    concert = Concert(date=date.today() - timedelta(days=5), lieu="Simulé", paye=False, recette_attendue=900,
+                      frais=40, mode_paiement_prevu="CB ASSO7")
+    db.session.add(concert)
+    db.session.flush()
+    for m in (*musiciens[:3], asso):
+        db.session.add(Participation(concert_id=concert.id, musicien_id=m.id,
+                                     gain_fixe=75 if m is musiciens[0] else None))
+    db.session.commit()
+    recalculer_credits_par_lots()
+
+
+@contextmanager
+def _ecritures_capturees():
+    """(instructions d'écriture et COMMIT émis, nombre de flush) pendant le bloc."""
+    ecritures, flushs = [], []
+
+    def _capter(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(INSERT|UPDATE|DELETE)\b", statement, re.I):
+            ecritures.append(statement)
+
+    def _commit(conn):
+        ecritures.append("COMMIT")
+
+    def _flush(session, flush_context):
+        flushs.append(session)
+
+    with app.app_context():
+        moteur = db.engine
+    event.listen(moteur, "before_cursor_execute", _capter)
+    event.listen(moteur, "commit", _commit)
+    event.listen(db.session, "before_flush", _flush)
+    try:
+        yield ecritures, flushs
+    finally:
+        event.remove(moteur, "before_cursor_execute", _capter)
+        event.remove(moteur, "commit", _commit)
+        event.remove(db.session, "before_flush", _flush)
+
+
+def _photo() -> dict:
+    concert = Concert.query.filter_by(lieu="Simulé").one()
+    colonnes = [c.key for c in Concert.__table__.columns]
+    return {
+        "concert": {k: getattr(concert, k) for k in colonnes},
+        "participations": sorted((p.id, p.musicien_id, p.gain_fixe, p.credit_calcule, p.credit_calcule_potentiel)
+                                 for p in Participation.query.filter_by(concert_id=concert.id)),
+    }
+
+
+def _hypotheses() -> dict:
+    """Recette et frais prévisionnels changés, Nom0 remplacé par Nom3 et Jérôme, gain fixé sur Nom1."""
+    ids = {m.nom: m.id for m in Musicien.query.all()}
+    return {
+        "recette_attendue": 1234.56,
+        "frais_previsionnels": 60,
+        "participants": [ids["Nom1"], ids["Nom2"], ids["Nom3"], ids["Arnould"], ids["ASSO7"]],
+        "gains_fixes": {str(ids["Nom1"]): 150},
+    }
+
+
+# --------------------------- Tests ---------------------------
+
+def test_simulation_sans_ecriture(client):
+    from calcul_participations import simuler_partage
+
+    with app.app_context():
+        avant = _photo()
+        concert_id = avant["concert"]["id"]
+        hypotheses = _hypotheses()
+
+    with _ecritures_capturees() as (ecritures, flushs):
+        reponse = client.post(f"/api/concerts/{concert_id}/simulate", json=hypotheses)
+        with app.app_context():
+            concert = db.session.get(Concert, concert_id)
+            simuler_partage(concert, recette=700, frais=0, paye=True,
+                            musicien_ids=hypotheses["participants"], gains_fixes={id_role(ROLE_ASSO7): 20})
+            assert not (db.session.new or db.session.dirty or db.session.deleted)
+    assert reponse.status_code == 200 and reponse.get_json()["success"]
+    assert ecritures == [] and flushs == []
+
+    with app.app_context():
+        assert _photo() == avant
+
+
+def test_simulation_egale_au_recalcul(client):
+    from calcul_participations import recalculer_concerts_marques
+
+    with app.app_context():
+        concert_id = Concert.query.filter_by(lieu="Simulé").one().id
+        hypotheses = _hypotheses()
+    simule = client.post(f"/api/concerts/{concert_id}/simulate", json=hypotheses).get_json()
+    assert simule["success"], simule
+
+    # mêmes hypothèses enregistrées, puis recalcul du concert marqué
+    with app.app_context():
+        concert = db.session.get(Concert, concert_id)
+        concert.recette_attendue = hypotheses["recette_attendue"]
+        concert.frais_previsionnels = hypotheses["frais_previsionnels"]
+        voulus = set(hypotheses["participants"])
+        for p in list(concert.participations):
+            if p.musicien_id not in voulus:
+                db.session.delete(p)
+        presents = {p.musicien_id for p in concert.participations}
+        for mid in voulus - presents:
+            db.session.add(Participation(concert_id=concert_id, musicien_id=mid))
+        db.session.flush()
+        for p in Participation.query.filter_by(concert_id=concert_id):
+            p.gain_fixe = hypotheses["gains_fixes"].get(str(p.musicien_id))
+        db.session.commit()
+        assert recalculer_concerts_marques() == {}
+
+        asso7_id = id_role(ROLE_ASSO7)
+        credits = {("ASSO7" if p.musicien_id == asso7_id else str(p.musicien_id)): p.credit_calcule_potentiel
+                   for p in Participation.query.filter_by(concert_id=concert_id)}
+        concert = db.session.get(Concert, concert_id)
+        frais_effectifs = (concert.frais or 0) + (concert.frais_previsionnels or 0)
+    assert credits == {"ASSO7": simule["asso7"], **simule["parts"]}
+    assert simule["frais_effectifs"] == frais_effectifs
+    assert round(sum(credits.values()), 2) == simule["benefices"]
@@ -0,0 +1,183 @@
+# test_verrous_concerts.py
+"""
+Verrou par concert (verrous_concerts.py) : écritures concurrentes sur un même concert sérialisées,
+concerts différents en parallèle.
+
+Le test de charge lance plusieurs threads sur les routes qui relisent puis réécrivent les
+participations (bascule payé / non payé, gains fixés, liste des participants) ; à la fin, chaque
+concert doit être cohérent : une seule 'Recette concert' s'il est payé (aucune sinon), crédits égaux
+à un recalcul complet, résumé et grand livre conformes.
+
+    python -m pytest -q test_verrous_concerts.py
+    TEST_DATABASE_URL=postgresql://…/base_jetable python -m pytest -q test_verrous_concerts.py
+"""
+
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from App import app
+from models import db, Concert, Musicien, Operation, Participation
+from verrous_concerts import concerts_verrouilles, verrou_concerts
+
+NB_THREADS = 8
+TOURS_PAR_THREAD = 12
+
+
+# --------------------------- Base de test (cf. conftest.py) ---------------------------
+
+def remplir():
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    asso = Musicien(nom="ASSO7", prenom="", type="structure")
+    cb = Musicien(nom="CB ASSO7", prenom="", type="structure")
+    caisse = Musicien(nom="CAISSE ASSO7", prenom="", type="structure")
+    musiciens = [Musicien(nom=f"Nom{i}", prenom=f"Prénom{i}") for i in range(4)]
+    db.session.add_all([asso, cb, caisse, *musiciens])
+    db.session.flush()
+
+    for i in range(2):
+        c = Concert(date=date.today() - timedelta(days=10 + i), lieu=f"Lieu {i}", paye=False,
+                    recette_attendue=1200 + 100 * i, mode_paiement_prevu="CB ASSO7")
+        db.session.add(c)
+        db.session.flush()
+        for m in (*musiciens[:3], asso):
+            db.session.add(Participation(concert_id=c.id, musicien_id=m.id))
+    db.session.commit()
+    recalculer_credits_par_lots()
+    soldes.reconstruire_grand_livre()
+
+
+# --------------------------- Verrou ---------------------------
+
+def _dans_le_verrou(ids, entree, sortie, pause=0.05):
+    with app.app_context(), verrou_concerts(ids):
+        entree()
+        time.sleep(pause)
+        sortie()
+
+
+def test_meme_concert_serialise(client):
+    en_cours, maxi, garde = [0], [0], threading.Lock()
+
+    def entree():
+        with garde:
+            en_cours[0] += 1
+            maxi[0] = max(maxi[0], en_cours[0])
+
+    def sortie():
+        with garde:
+            en_cours[0] -= 1
+
+    threads = [threading.Thread(target=_dans_le_verrou, args=([1], entree, sortie)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert maxi[0] == 1
+
+
+def test_concerts_differents_en_parallele(client):
+    # les deux threads doivent se retrouver DANS leur verrou en même temps
+    rendez_vous = threading.Barrier(2, timeout=5)
+    threads = [threading.Thread(target=_dans_le_verrou, args=([cid], rendez_vous.wait, lambda: None))
+               for cid in (1, 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not rendez_vous.broken
+
+
+def test_verrou_reentrant(client):
+    with app.app_context():
+        with verrou_concerts([1, 2]):
+            with verrou_concerts([2]):
+                assert concerts_verrouilles() == {1, 2}
+            assert concerts_verrouilles() == {1, 2}
+        assert concerts_verrouilles() == set()
+
+
+def test_verrou_imbrique_hors_ordre_refuse(client):
+    with app.app_context():
+        with verrou_concerts([2]):
+            with pytest.raises(RuntimeError):
+                with verrou_concerts([1]):
+                    pass
+            assert concerts_verrouilles() == {2}
+
+
+def test_recalcul_imbrique_differe_hors_ordre(client):
+    from calcul_participations import _CLE_A_RECALCULER, recalculer_concerts_marques
+
+    with app.app_context():
+        with verrou_concerts([2]):
+            db.session.info[_CLE_A_RECALCULER] = {1, 2}
+            assert recalculer_concerts_marques() == {}
+            assert db.session.info[_CLE_A_RECALCULER] == {1}  # laissé au recalcul de fin de requête
+        assert recalculer_concerts_marques() == {}
+        assert _CLE_A_RECALCULER not in db.session.info
+
+
+# --------------------------- Charge ---------------------------
+
+def _martelement(graine, concert_ids, musicien_ids, reponses):
+    hasard = random.Random(graine)
+    client = app.test_client()
+    for _ in range(TOURS_PAR_THREAD):
+        cid = hasard.choice(concert_ids)
+        action = hasard.choice(("toggle", "gains", "participants"))
+        if action == "toggle":
+            r = client.post(f"/concerts/{cid}/toggle_paye")
+        elif action == "gains":
+            with app.app_context():
+                pids = [p.id for p in Participation.query.filter_by(concert_id=cid).all()]
+            overrides = {str(hasard.choice(pids)): hasard.choice((None, 10, 25))} if pids else {}
+            r = client.post("/ajuster_gains", json={"concert_id": cid, "overrides": overrides})
+        else:
+            choisis = hasard.sample(musicien_ids, hasard.randint(1, len(musicien_ids)))
+            r = client.post(f"/concert/{cid}/participations", data={"participants": [str(m) for m in choisis]})
+        reponses.append((action, cid, r.status_code))
+
+
+def _credits():
+    return {p.id: (p.credit_calcule, p.credit_calcule_potentiel)
+            for p in Participation.query.order_by(Participation.id).all()}
+
+
+def test_charge_concurrente(client):
+    import resume_concerts
+    import soldes
+    from calcul_participations import recalculer_credits_par_lots
+
+    with app.app_context():
+        concert_ids = [c.id for c in Concert.query.order_by(Concert.id).all()]
+        musicien_ids = [m.id for m in Musicien.query.filter(~Musicien.nom.ilike("%ASSO7%")).all()]
+
+    reponses = []
+    threads = [threading.Thread(target=_martelement, args=(i, concert_ids, musicien_ids, reponses))
+               for i in range(NB_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(reponses) == NB_THREADS * TOURS_PAR_THREAD
+    en_erreur = [r for r in reponses if r[2] not in (200, 302)]
+    assert not en_erreur, en_erreur
+
+    with app.app_context():
+        for c in Concert.query.all():
+            recettes = Operation.query.filter_by(concert_id=c.id, motif="Recette concert").count()
+            assert recettes == (1 if c.paye else 0), (c.id, c.paye, recettes)
+
+        avant = _credits()
+        recalculer_credits_par_lots()
+        assert _credits() == avant  # aucune écriture perdue : le dernier état est déjà le bon
+
+        assert resume_concerts.verifier_resumes() == []
+        assert soldes.verifier_grand_livre() == []
@@ -0,0 +1,119 @@
+# verrous_concerts.py
+"""
+Verrou PAR CONCERT pour les écritures qui relisent puis réécrivent les participations d'un concert
+(bascule payé / non payé, gains fixés, liste des participants, recalcul des crédits).
+
+Deux requêtes sur le MÊME concert (ex: deux utilisateurs, deux threads gthread) s'exécutent l'une
+après l'autre ; sur des concerts différents, en parallèle.
+
+  - dans le processus : un RLock par concert, pris dans l'ordre des id (pas d'interblocage entre
+    deux lots) et réentrant (un recalcul appelé sous le verrou de la route le reprend sans attendre) ;
+    un bloc imbriqué ne peut prendre que des concerts d'id SUPÉRIEUR à ceux déjà tenus
+    (RuntimeError sinon, cf. ids_verrouillables) : l'ordre global reste le même pour tous ;
+  - Postgres : en plus, SELECT … FOR UPDATE des lignes `concerts`, au début de chaque transaction
+    ouverte sous le verrou (les autres processus web attendent la fin de la transaction).
+    SQLite n'a pas de verrou de ligne : le verrou du processus suffit (un seul processus web).
+
+    with verrou_concerts([concert_id]):
+        ...  # lectures APRÈS la prise du verrou, écritures, commit(s)
+
+À la prise du verrou, une session sans écriture en attente est expirée : les objets déjà chargés
+sont relus (valeurs validées par la requête précédente sur ce concert).
+"""
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+
+from models import db, Concert
+
+_verrous = {}   # {concert_id: [RLock, nb de threads qui le tiennent ou l'attendent]}
+_verrou = threading.Lock()
+
+_CLE_SESSION = "verrous_concerts"  # Counter des concerts verrouillés par la session
+
+
+def _ids(concert_ids) -> list:
+    return sorted({int(cid) for cid in concert_ids if cid})
+
+
+def ids_verrouillables(concert_ids, session=None) -> set:
+    """Concerts de `concert_ids` qu'un bloc imbriqué peut verrouiller sans casser l'ordre des id."""
+    tenus = concerts_verrouilles(session)
+    plafond = max(tenus, default=0)
+    return {cid for cid in _ids(concert_ids) if cid in tenus or cid > plafond}
+
+
+def _prendre(cid: int) -> None:
+    with _verrou:
+        entree = _verrous.setdefault(cid, [threading.RLock(), 0])
+        entree[1] += 1
+    entree[0].acquire()
+
+
+def _rendre(cid: int) -> None:
+    with _verrou:
+        entree = _verrous[cid]
+        entree[0].release()
+        entree[1] -= 1
+        if not entree[1]:
+            del _verrous[cid]
+
+
+def _verrouiller_en_base(connection, concert_ids) -> None:
+    """Postgres : verrou de ligne jusqu'à la fin de la transaction de `connection`."""
+    if concert_ids and connection.dialect.name == "postgresql":
+        connection.execute(
+            select(Concert.id).where(Concert.id.in_(list(concert_ids))).order_by(Concert.id).with_for_update()
+        )
+
+
+@contextmanager
+def verrou_concerts(concert_ids, session=None):
+    """Sérialise les écritures sur `concert_ids` (voir le module) le temps du bloc `with`."""
+    if session is None:
+        session = db.session()  # la Session du contexte courant (scoped_session n'expose pas in_transaction)
+    ids = _ids(concert_ids)
+    hors_ordre = set(ids) - ids_verrouillables(ids, session)
+    if hors_ordre:
+        raise RuntimeError(
+            f"Verrou des concerts {sorted(hors_ordre)} demandé sous celui de {sorted(concerts_verrouilles(session))} : "
+            f"ordre des id non respecté (risque d'interblocage)."
+        )
+    pris = []
+    tenus = session.info.setdefault(_CLE_SESSION, Counter())
+    try:
+        for cid in ids:
+            _prendre(cid)
+            pris.append(cid)
+        nouveaux = [cid for cid in ids if not tenus[cid]]
+        tenus.update(ids)
+        if session.in_transaction():
+            # transaction déjà ouverte : on verrouille tout de suite ; sinon _verrouiller_a_l_ouverture
+            _verrouiller_en_base(session.connection(), nouveaux)
+        if not (session.new or session.dirty or session.deleted):
+            session.expire_all()
+        yield
+    finally:
+        if len(pris) == len(ids):
+            tenus.subtract(ids)
+            tenus += Counter()  # retire les compteurs tombés à 0
+            if not tenus:
+                session.info.pop(_CLE_SESSION, None)
+        for cid in reversed(pris):
+            _rendre(cid)
+
+
+def concerts_verrouilles(session=None) -> set:
+    """Concerts verrouillés par `session` (dans ce thread)."""
+    return set((session or db.session).info.get(_CLE_SESSION, ()))
+
+
+@event.listens_for(db.session, "after_begin")
+def _verrouiller_a_l_ouverture(session, transaction, connection):
+    # après un commit sous le verrou, la transaction suivante reprend les verrous de ligne
+    tenus = session.info.get(_CLE_SESSION)
+    if tenus:
+        _verrouiller_en_base(connection, sorted(tenus))
@@ -0,0 +1,55 @@
+# vues_concerts.py
+"""
+Données des listes de concerts (/concerts et /concerts_non_payes) en un nombre CONSTANT de requêtes,
+quel que soit le nombre de concerts et de participants :
+
+  1. les concerts filtrés,
+  2. leurs participations, les musiciens et les lieux (selectinload : une requête IN chacun),
+  3. les frais réels par (concert, musicien) : frais_concerts.py (un GROUP BY, ou le cache).
+
+Crédits (réels si payé, sinon potentiels) et bonus sont lus sur les participations déjà chargées,
+la part ASSO7 sur le résumé du concert (resume_concerts.py) : ni la vue ni le gabarit ne déclenchent
+plus de chargement paresseux.
+"""
+
+from sqlalchemy.orm import selectinload
+
+from frais_concerts import frais_par_musicien
+from models import Concert, Participation
+from mes_utils import get_credits_concerts_from_db, grouper_par_mois
+
+
+def donnees_liste_concerts(*filtres) -> dict:
+    """
+    Concerts répondant aux `filtres` (expressions SQLAlchemy), triés par date croissante,
+    et tout ce qu'affichent concerts.html / concerts_non_payes.html :
+        concerts, groupes (par mois), credits_musiciens, credits_asso7, credits_jerome,
+        musiciens_dict ({id: Musicien} des participants), frais_par_musicien.
+    """
+    concerts = (
+        Concert.query
+        .options(
+            selectinload(Concert.participations).selectinload(Participation.musicien),
+            selectinload(Concert.lieu_obj),
+        )
+        .filter(*filtres)
+        .order_by(Concert.date.asc())
+        .all()
+    )
+
+    credits_musiciens, _credits_asso7, credits_jerome = get_credits_concerts_from_db(concerts)
+    credits_asso7 = {c.id: c.part_asso7 or 0.0 for c in concerts}  # résumé (cf. resume_concerts.py)
+    musiciens_dict = {
+        p.musicien_id: p.musicien
+        for c in concerts for p in c.participations if p.musicien is not None
+    }
+
+    return {
+        "concerts": concerts,
+        "groupes": grouper_par_mois(concerts, "date", descending=False),
+        "credits_musiciens": credits_musiciens,
+        "credits_asso7": credits_asso7,
+        "credits_jerome": credits_jerome,
+        "musiciens_dict": musiciens_dict,
+        "frais_par_musicien": frais_par_musicien(c.id for c in concerts),
+    }